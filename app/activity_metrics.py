@@ -0,0 +1,138 @@
+"""
+Summary metrics of an activity, computed once from its GPS stream at ingest.
+
+All metrics come from one pass of array operations over the stream:
+elapsed and moving time, maximum and average moving speed, maximum heart
+rate, time in each heart rate zone and splits over fixed distances (every
+kilometer, every 100 m for swims). The result is a plain dict, stored as
+JSON in activities.metrics.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from app.config import Config
+from app.gps_stream import GPSStream
+
+# Split length in meters for each activity type
+SPLIT_DISTANCES = {'swimming': 100.0, 'running': 1000.0, 'cycling': 1000.0}
+
+# Slowest speed in m/s that still counts as moving, for each activity type
+MOVING_SPEEDS = {'swimming': 0.2, 'running': 0.5, 'cycling': 1.0}
+
+# A trailing partial split shorter than this (meters) is left out
+MIN_PARTIAL_SPLIT = 1.0
+
+
+def compute_metrics(
+    activity_type: str, stream: GPSStream, heart_rate_zones: Optional[Sequence[int]] = None
+) -> Dict[str, Any]:
+    """
+    Summary metrics of an activity's stream.
+
+    heart_rate_zones are the upper bounds of all zones but the last
+    (default Config.HEART_RATE_ZONES); they are stored with the zone times.
+    An interval between two points counts as moving if its speed (the
+    recorded speed at its end, or else distance over time) is at least the
+    moving speed of activity_type; zone times only count moving intervals,
+    by the heart rate at their start.
+
+    Returns a dict with elapsed_time, moving_time, max_speed,
+    avg_moving_speed, max_heart_rate, heart_rate_zones ({'bounds',
+    'seconds'}), split_distance and splits (each with distance, seconds and
+    avg_heart_rate). Values that cannot be computed are None.
+    """
+    bounds = [int(bpm) for bpm in (heart_rate_zones or Config.HEART_RATE_ZONES)]
+    split_distance = SPLIT_DISTANCES.get(activity_type, 1000.0)
+    seconds = stream.elapsed_seconds()
+    # Guard against GPS glitches where the cumulative distance drops back
+    distances = np.maximum.accumulate(stream.distances) if len(stream) else stream.distances
+
+    intervals = np.diff(seconds)
+    interval_speeds = np.divide(
+        np.diff(distances), intervals, out=np.zeros(len(intervals)), where=intervals > 0
+    )
+    recorded_speeds = stream.speeds[1:]
+    interval_speeds = np.where(np.isnan(recorded_speeds), interval_speeds, recorded_speeds)
+    moving = (intervals > 0) & (interval_speeds >= MOVING_SPEEDS.get(activity_type, 0.5))
+    moving_time = float(intervals[moving].sum())
+
+    max_speed, max_heart_rate = _max(stream.speeds), _max(stream.heart_rates)
+    covered = float(distances[-1] - distances[0]) if len(stream) else 0.0
+    return {
+        'elapsed_time': float(seconds[-1]) if len(stream) else 0.0,
+        'moving_time': moving_time,
+        'max_speed': round(max_speed, 3) if max_speed is not None else None,
+        'avg_moving_speed': round(covered / moving_time, 3) if moving_time > 0 else None,
+        'max_heart_rate': int(max_heart_rate) if max_heart_rate is not None else None,
+        'heart_rate_zones': {
+            'bounds': bounds,
+            'seconds': _zone_seconds(stream.heart_rates[:-1], intervals, moving, bounds)
+        },
+        'split_distance': split_distance,
+        'splits': _splits(seconds, distances, stream.heart_rates, split_distance)
+    }
+
+
+def _max(values: np.ndarray) -> Optional[float]:
+    present = values[~np.isnan(values)]
+    return float(present.max()) if len(present) else None
+
+
+def _zone_seconds(
+    heart_rates: np.ndarray, intervals: np.ndarray, moving: np.ndarray, bounds: List[int]
+) -> List[float]:
+    """Moving seconds spent in each of the len(bounds) + 1 zones."""
+    counted = moving & ~np.isnan(heart_rates)
+    # A heart rate equal to a bound belongs to the zone the bound closes
+    zones = np.searchsorted(bounds, heart_rates[counted], side='left')
+    totals = np.bincount(zones, weights=intervals[counted], minlength=len(bounds) + 1)
+    return [round(float(total), 1) for total in totals]
+
+
+def _splits(
+    seconds: np.ndarray, distances: np.ndarray, heart_rates: np.ndarray, split_distance: float
+) -> List[Dict[str, Any]]:
+    """
+    Time and average heart rate of each split_distance stretch from the start.
+
+    The time each split boundary was passed is interpolated between the
+    points around it; heart rates are averaged over the points within.
+    """
+    if len(distances) < 2:
+        return []
+    start, covered = distances[0], distances[-1] - distances[0]
+
+    boundaries = np.arange(split_distance, covered + split_distance, split_distance)
+    boundaries = boundaries[boundaries <= covered]
+    if covered - (boundaries[-1] if len(boundaries) else 0.0) >= MIN_PARTIAL_SPLIT:
+        boundaries = np.append(boundaries, covered)
+    if not len(boundaries):
+        return []
+
+    # First point at or past each boundary; the one before it is short of it
+    after = np.searchsorted(distances, start + boundaries, side='left')
+    after = np.clip(after, 1, len(distances) - 1)
+    before = after - 1
+    span = distances[after] - distances[before]
+    fraction = np.divide(
+        start + boundaries - distances[before], span, out=np.ones(len(boundaries)), where=span > 0
+    )
+    passed = seconds[before] + fraction * (seconds[after] - seconds[before])
+    durations = np.diff(passed, prepend=seconds[0])
+
+    # Split of each point: a point on a boundary belongs to the split it ends
+    point_splits = np.minimum(
+        np.searchsorted(boundaries, distances - start, side='left'), len(boundaries) - 1
+    )
+    present = ~np.isnan(heart_rates)
+    counts = np.bincount(point_splits[present], minlength=len(boundaries))
+    sums = np.bincount(point_splits[present], weights=heart_rates[present], minlength=len(boundaries))
+
+    lengths = np.diff(boundaries, prepend=0.0)
+    return [
+        {
+            'distance': round(float(length), 2),
+            'seconds': round(float(duration), 1),
+            'avg_heart_rate': int(round(total / count)) if count else None
+        }
+        for length, duration, total, count in zip(lengths, durations, sums, counts)
+    ]
@@ -1,39 +1,81 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, File, Query, Request, UploadFile
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import ActivityResponse
-from app.database import get_db
-from app.services import ActivityService
-from app.exceptions import ActivityNotFoundError
+from app.database import get_async_db, get_db
+from app.services import ActivityService, AsyncActivityService, IngestService
+from app.config import Config
+from app.exceptions import ActivityNotFoundError, InvalidActivityTypeError
+from app.executors import run_in_thread
+from app.response_cache import ACTIVITIES, cached_response
+from app.uploads import save_uploads
+from app.validation import VALID_ACTIVITY_TYPES
 
 router = APIRouter()
 
 
 @router.get("/activities", response_model=dict)
-async def get_activities(db: Session = Depends(get_db)):
+async def get_activities(
+    request: Request,
+    limit: int = Query(Config.ACTIVITIES_PAGE_SIZE, ge=1, le=Config.ACTIVITIES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    activity_type: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db),
+    async_db: Optional[AsyncSession] = Depends(get_async_db)
+):
     """
-    Get all activities.
+    Get activities, newest first, one page at a time.
 
-    Returns a list of all fitness activities in the database.
+    - **limit**: Maximum number of activities to return
+    - **cursor**: next_cursor of the previous page, to continue from there
+    - **activity_type**: Optional, only return this activity type
+    - **from** / **to**: Optional, only return activities in this range (inclusive)
+
+    next_cursor is null on the last page. Pages are cached until activities
+    change and carry an ETag; a matching If-None-Match gets a 304.
     """
-    service = ActivityService(db)
-    activities = service.get_all_activities()
-    return {
-        "success": True,
-        "data": activities,
-        "count": len(activities)
-    }
+    if activity_type is not None and activity_type.lower() not in VALID_ACTIVITY_TYPES:
+        raise InvalidActivityTypeError(
+            f"Invalid activity type '{activity_type}'. "
+            f"Must be one of: {', '.join(sorted(VALID_ACTIVITY_TYPES))}"
+        )
+
+    async def build() -> ORJSONResponse:
+        args = (limit, cursor, [activity_type] if activity_type else None, start, end)
+        if async_db is not None:
+            activities, next_cursor = await AsyncActivityService(async_db).get_activities_page(*args, iso_dates=False)
+        else:
+            activities, next_cursor = ActivityService(db).get_activities_page(*args, iso_dates=False)
+        return ORJSONResponse({
+            "success": True,
+            "data": activities,
+            "count": len(activities),
+            "next_cursor": next_cursor
+        })
+
+    return await cached_response(request, (ACTIVITIES,), build)
 
 
 @router.get("/activities/{activity_id}", response_model=dict)
-async def get_activity(activity_id: int, db: Session = Depends(get_db)):
+async def get_activity(
+    activity_id: int,
+    db: Session = Depends(get_db),
+    async_db: Optional[AsyncSession] = Depends(get_async_db)
+):
     """
     Get a specific activity by ID.
 
     - **activity_id**: The ID of the activity to retrieve
     """
-    service = ActivityService(db)
-    activity = service.get_activity_by_id(activity_id)
+    if async_db is not None:
+        activity = await AsyncActivityService(async_db).get_activity_by_id(activity_id)
+    else:
+        activity = ActivityService(db).get_activity_by_id(activity_id)
     if not activity:
         raise ActivityNotFoundError(f"Activity with ID {activity_id} not found")
 
@@ -41,3 +83,55 @@ async def get_activity(activity_id: int, db: Session = Depends(get_db)):
         "success": True,
         "data": activity
     }
+
+
+@router.get("/activities/{activity_id}/stream", response_model=dict)
+async def get_activity_stream(
+    activity_id: int,
+    max_points: int = Query(Config.STREAM_MAX_POINTS, ge=2, le=Config.STREAM_MAX_POINTS_LIMIT),
+    db: Session = Depends(get_db),
+    async_db: Optional[AsyncSession] = Depends(get_async_db)
+):
+    """
+    Get the GPS track and the speed and heart rate series of an activity, downsampled for display.
+
+    - **activity_id**: The ID of the activity
+    - **max_points**: Maximum number of points per series
+
+    The track keeps the points that carry its shape (Douglas–Peucker); the
+    series keep their peaks and dips (largest-triangle-three-buckets) and
+    are plotted against seconds since start_time.
+    """
+    if async_db is not None:
+        stream = await AsyncActivityService(async_db).get_downsampled_stream(activity_id, max_points)
+    else:
+        stream = await run_in_thread(ActivityService(db).get_downsampled_stream, activity_id, max_points)
+    return {
+        "success": True,
+        "data": stream
+    }
+
+
+@router.post("/activities/bulk", response_model=dict)
+async def bulk_upload_activities(files: List[UploadFile] = File(...), db: Session = Depends(get_db)):
+    """
+    Upload many .fit files at once, as separate files and/or zip archives.
+
+    Files are parsed in parallel and stored in batched transactions. The
+    response lists the outcome of every file (zip archives are expanded to
+    their .fit members), so one broken file does not fail the whole upload.
+    Files that were uploaded before are reported as duplicates of the
+    existing activity instead of being stored again.
+    """
+    saved = await save_uploads(files)
+    summary = await run_in_thread(IngestService(db).ingest_files, saved)
+    return {
+        "success": True,
+        "data": summary["files"],
+        "count": len(summary["files"]),
+        "created": summary["created"],
+        "duplicate": summary["duplicate"],
+        "failed": summary["failed"],
+        "seconds": summary["seconds"],
+        "files_per_second": summary["files_per_second"]
+    }
@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Literal, Optional
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.services import AnalyticsService
+from app.exceptions import InvalidActivityTypeError
+from app.utils import to_naive_utc
+from app.validation import VALID_ACTIVITY_TYPES
+
+router = APIRouter()
+
+Period = Literal["daily", "weekly", "monthly"]
+
+
+def _check_activity_type(activity_type: Optional[str]) -> None:
+    if activity_type is not None and activity_type.lower() not in VALID_ACTIVITY_TYPES:
+        raise InvalidActivityTypeError(
+            f"Invalid activity type '{activity_type}'. "
+            f"Must be one of: {', '.join(sorted(VALID_ACTIVITY_TYPES))}"
+        )
+
+
+@router.get("/analytics/aggregations", response_model=dict)
+async def get_time_aggregations(
+    period: Period = "weekly",
+    activity_type: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get total duration, distance and activity count per activity type and period.
+
+    - **period**: daily, weekly (starting Monday) or monthly
+    - **activity_type**: Optional, only return this activity type
+    - **from** / **to**: Optional, only return periods overlapping this range
+
+    Totals are maintained as activities are added and deleted, so this
+    reads one row per period and activity type.
+    """
+    _check_activity_type(activity_type)
+    start, end = to_naive_utc(start), to_naive_utc(end)
+
+    service = AnalyticsService(db)
+    buckets = service.get_time_aggregations(period, [activity_type] if activity_type else None, start, end)
+    return {
+        "success": True,
+        "data": buckets,
+        "count": len(buckets)
+    }
+
+
+@router.get("/analytics/summary", response_model=dict)
+async def get_summary(
+    activity_type: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get activity count, duration, distance and average heart rate per activity type.
+
+    - **activity_type**: Optional, only summarize this activity type
+    - **from** / **to**: Optional, only include activities in this range (inclusive)
+
+    Metrics are returned as arrays aligned with activity_types, with the
+    overall totals alongside.
+    """
+    _check_activity_type(activity_type)
+    start, end = to_naive_utc(start), to_naive_utc(end)
+
+    service = AnalyticsService(db)
+    summary = service.get_summary([activity_type] if activity_type else None, start, end)
+    return {
+        "success": True,
+        "data": summary
+    }
+
+
+@router.get("/analytics/timeseries", response_model=dict)
+async def get_timeseries(
+    granularity: Period = "weekly",
+    activity_type: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get activity count, duration, distance and average heart rate per activity type over time.
+
+    - **granularity**: daily, weekly (starting Monday) or monthly
+    - **activity_type**: Optional, only include this activity type
+    - **from** / **to**: Optional, only include activities in this range (inclusive)
+
+    Returns the period start dates as labels and, per activity type, one
+    array per metric aligned with the labels.
+    """
+    _check_activity_type(activity_type)
+    start, end = to_naive_utc(start), to_naive_utc(end)
+
+    service = AnalyticsService(db)
+    timeseries = service.get_timeseries(granularity, [activity_type] if activity_type else None, start, end)
+    return {
+        "success": True,
+        "data": timeseries
+    }
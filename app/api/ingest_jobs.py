@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, File, UploadFile
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.services import IngestService
+from app.exceptions import FitFileParseError, IngestJobNotFoundError
+from app.executors import run_in_thread
+from app.uploads import is_fit_filename, save_upload
+
+router = APIRouter()
+
+
+@router.post("/ingest-jobs", status_code=202, response_model=dict)
+async def create_ingest_job(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Upload a .fit file for ingestion.
+
+    The file is stored and queued; the response returns right away with the
+    job, whose progress can be followed at /ingest-jobs/{job_id}.
+    """
+    if not is_fit_filename(file.filename):
+        raise FitFileParseError("Only .fit files are supported")
+
+    filepath, content_hash = await save_upload(file)
+    job = await run_in_thread(IngestService(db).enqueue, filepath, content_hash)
+    return {
+        "success": True,
+        "data": job
+    }
+
+
+@router.get("/ingest-jobs/{job_id}", response_model=dict)
+async def get_ingest_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Get the status of an ingest job.
+
+    - **job_id**: The ID of the job to retrieve
+
+    The status is one of queued, parsing, persisting, done or failed.
+    stage_seconds gives the time spent in each stage so far.
+    """
+    service = IngestService(db)
+    job = service.get_job(job_id)
+    if not job:
+        raise IngestJobNotFoundError(f"Ingest job with ID {job_id} not found")
+
+    return {
+        "success": True,
+        "data": job
+    }
@@ -1,33 +1,78 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models import PersonalBestResponse
-from app.database import get_db
-from app.services import PersonalBestService
+from app.database import get_async_db, get_db
+from app.services import AsyncPersonalBestService, PersonalBestService
 from app.exceptions import InvalidActivityTypeError
+from app.executors import run_in_thread
+from app.response_cache import PERSONAL_BESTS, cached_response
 from app.validation import VALID_ACTIVITY_TYPES
 
 router = APIRouter()
 
 
 @router.get("/personal-bests", response_model=dict)
-async def get_all_personal_bests(db: Session = Depends(get_db)):
+async def get_all_personal_bests(
+    request: Request,
+    db: Session = Depends(get_db),
+    async_db: Optional[AsyncSession] = Depends(get_async_db)
+):
     """
     Get all personal bests across all activity types.
 
-    Returns personal best records for swimming, cycling, and running.
+    Returns personal best records for swimming, cycling, and running. The
+    response is cached until personal bests change and carries an ETag; a
+    matching If-None-Match gets a 304.
     """
+    async def build() -> ORJSONResponse:
+        if async_db is not None:
+            pbs = await AsyncPersonalBestService(async_db).get_all_personal_bests(iso_dates=False)
+        else:
+            pbs = PersonalBestService(db).get_all_personal_bests(iso_dates=False)
+        return ORJSONResponse({
+            "success": True,
+            "data": pbs,
+            "count": len(pbs)
+        })
+
+    return await cached_response(request, (PERSONAL_BESTS,), build)
+
+
+@router.post("/personal-bests/rebuild", response_model=dict)
+async def rebuild_personal_bests(activity_type: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Recompute personal bests from the GPS points of all stored activities.
+
+    - **activity_type**: Optional, only rebuild this type (swimming, cycling, running)
+
+    Returns the number of activities, points and personal bests processed
+    with the elapsed time and throughput.
+    """
+    if activity_type is not None and activity_type.lower() not in VALID_ACTIVITY_TYPES:
+        raise InvalidActivityTypeError(
+            f"Invalid activity type '{activity_type}'. "
+            f"Must be one of: {', '.join(sorted(VALID_ACTIVITY_TYPES))}"
+        )
+
     service = PersonalBestService(db)
-    pbs = service.get_all_personal_bests()
+    stats = await run_in_thread(
+        service.rebuild_personal_bests, [activity_type] if activity_type else None
+    )
     return {
         "success": True,
-        "data": pbs,
-        "count": len(pbs)
+        "data": stats
     }
 
 
 @router.get("/personal-bests/{activity_type}", response_model=dict)
-async def get_personal_bests_by_type(activity_type: str, db: Session = Depends(get_db)):
+async def get_personal_bests_by_type(
+    activity_type: str,
+    db: Session = Depends(get_db),
+    async_db: Optional[AsyncSession] = Depends(get_async_db)
+):
     """
     Get personal bests for a specific activity type.
 
@@ -39,10 +84,39 @@ async def get_personal_bests_by_type(activity_type: str, db: Session = Depends(g
             f"Must be one of: {', '.join(sorted(VALID_ACTIVITY_TYPES))}"
         )
 
-    service = PersonalBestService(db)
-    pbs = service.get_personal_bests_by_type(activity_type)
-    return {
+    if async_db is not None:
+        pbs = await AsyncPersonalBestService(async_db).get_personal_bests_by_type(activity_type, iso_dates=False)
+    else:
+        pbs = PersonalBestService(db).get_personal_bests_by_type(activity_type, iso_dates=False)
+    return ORJSONResponse({
         "success": True,
         "data": pbs,
         "count": len(pbs)
-    }
+    })
+
+
+@router.get("/personal-bests/{activity_type}/progression", response_model=dict)
+async def get_personal_best_progression(
+    activity_type: str, distance: Optional[float] = None, db: Session = Depends(get_db)
+):
+    """
+    Get how the personal bests of an activity type improved over time.
+
+    - **activity_type**: Must be one of: swimming, cycling, running
+    - **distance**: Optional, only return the progression of this distance in meters
+
+    Returns every improvement ordered by distance and achieved date.
+    """
+    if activity_type.lower() not in VALID_ACTIVITY_TYPES:
+        raise InvalidActivityTypeError(
+            f"Invalid activity type '{activity_type}'. "
+            f"Must be one of: {', '.join(sorted(VALID_ACTIVITY_TYPES))}"
+        )
+
+    service = PersonalBestService(db)
+    entries = service.get_progression(activity_type, distance, iso_dates=False)
+    return ORJSONResponse({
+        "success": True,
+        "data": entries,
+        "count": len(entries)
+    })
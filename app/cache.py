@@ -0,0 +1,94 @@
+"""
+Cache backends.
+
+LRUCache keeps entries in process; RedisCache keeps them in Redis, or in
+anything else that speaks the same get/set/delete commands, so that several
+app processes share one cache. Both have the same get/put/pop/clear methods
+and can be used interchangeably where values are bytes.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Mapping that keeps the maxsize most recently used entries.
+
+    With a ttl, entries also expire ttl seconds after they were put. Safe
+    to share between the threads of the worker pools.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # key -> (expiry time or None, value)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Get an entry and mark it as most recently used."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            expires, value = self._entries[key]
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Add or replace an entry, evicting the least recently used ones beyond maxsize."""
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Remove an entry, if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """
+    Cache of bytes values in Redis, under keys starting with prefix.
+
+    client is a redis.Redis or any object with the same get, set (with ex),
+    delete and scan_iter methods, such as a local stand-in. Eviction is
+    left to the server's maxmemory policy; with a ttl, entries also expire
+    ttl seconds after they were put.
+    """
+
+    def __init__(self, client: Any, ttl: Optional[float] = None, prefix: str = 'victoria:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str, default: Optional[bytes] = None) -> Optional[bytes]:
+        value = self.client.get(self.prefix + key)
+        return default if value is None else value
+
+    def put(self, key: str, value: bytes) -> None:
+        self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl)) if self.ttl else None)
+
+    def pop(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        """Remove every key under the prefix."""
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
@@ -0,0 +1,164 @@
+"""
+Command line tools for maintenance tasks.
+
+Usage:
+    python -m app.cli rebuild-personal-bests [--type TYPE ...] [--chunk-size N]
+    python -m app.cli rebuild-aggregations
+    python -m app.cli rebuild-metrics
+    python -m app.cli backfill-gps-streams
+    python -m app.cli db upgrade [REVISION]
+    python -m app.cli db downgrade REVISION
+    python -m app.cli db stamp REVISION
+    python -m app.cli db current
+"""
+import argparse
+import sys
+from typing import List, Optional
+from app import schema
+from app.database import SessionLocal
+from app.exceptions import GPSStorageNotBackfilledError, SchemaVersionError
+from app.executors import shutdown_pools
+from app.services import ActivityService, AnalyticsService, PersonalBestService
+from app.validation import VALID_ACTIVITY_TYPES
+
+
+def _print_progress(done: int, total: int, elapsed: float) -> None:
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"  {done}/{total} activities, {elapsed:.1f}s, {rate:.1f} activities/s", flush=True)
+
+
+def rebuild_personal_bests(args: argparse.Namespace) -> int:
+    """Recompute personal bests from the stored GPS points."""
+    db = SessionLocal()
+    try:
+        stats = PersonalBestService(db).rebuild_personal_bests(
+            args.type, args.chunk_size, progress=_print_progress
+        )
+    except GPSStorageNotBackfilledError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+        shutdown_pools()
+
+    print(
+        f"Rebuilt {stats['personal_bests']} personal bests from {stats['activities']} activities "
+        f"and {stats['points']} GPS points in {stats['seconds']:.1f}s "
+        f"({stats['activities_per_second'] or 0:.1f} activities/s, "
+        f"{stats['points_per_second'] or 0:.0f} points/s)"
+    )
+    return 0
+
+
+def rebuild_aggregations(args: argparse.Namespace) -> int:
+    """Recompute the daily, weekly and monthly activity totals."""
+    db = SessionLocal()
+    try:
+        buckets = AnalyticsService(db).rebuild_time_aggregations()
+    finally:
+        db.close()
+
+    print(f"Rebuilt {buckets} time aggregation buckets")
+    return 0
+
+
+def rebuild_metrics(args: argparse.Namespace) -> int:
+    """Recompute the splits, moving time and other metrics of every activity."""
+    db = SessionLocal()
+    try:
+        activities = ActivityService(db).rebuild_metrics(progress=_print_progress)
+    finally:
+        db.close()
+
+    print(f"Rebuilt metrics of {activities} activities")
+    return 0
+
+
+def backfill_gps_streams(args: argparse.Namespace) -> int:
+    """Copy GPS points stored as rows into gps_streams, for GPS_STORAGE=columnar."""
+    db = SessionLocal()
+    try:
+        activities = ActivityService(db).backfill_gps_streams(progress=_print_progress)
+    finally:
+        db.close()
+
+    print(f"Copied the GPS points of {activities} activities into gps_streams")
+    return 0
+
+
+def db_upgrade(args: argparse.Namespace) -> int:
+    """Migrate the database up to a revision (default: the latest)."""
+    schema.upgrade(args.revision)
+    return 0
+
+
+def db_downgrade(args: argparse.Namespace) -> int:
+    """Migrate the database down to a revision."""
+    schema.downgrade(args.revision)
+    return 0
+
+
+def db_stamp(args: argparse.Namespace) -> int:
+    """Mark the database as being at a revision without running migrations."""
+    schema.stamp(args.revision)
+    return 0
+
+
+def db_current(args: argparse.Namespace) -> int:
+    """Show the revision the database is at and the latest revision."""
+    current, head = schema.current_revision(), schema.head_revision()
+    print(f"current: {current or '(not migrated)'}")
+    print(f"head:    {head}")
+    return 0 if current == head else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = commands.add_parser('rebuild-personal-bests', help=rebuild_personal_bests.__doc__)
+    rebuild.add_argument(
+        '--type', action='append', choices=sorted(VALID_ACTIVITY_TYPES),
+        help='Only rebuild this activity type (repeatable; default: all types)'
+    )
+    rebuild.add_argument(
+        '--chunk-size', type=int, default=None,
+        help='GPS points fetched per chunk (default: PB_REBUILD_CHUNK_SIZE)'
+    )
+    rebuild.set_defaults(handler=rebuild_personal_bests)
+
+    aggregations = commands.add_parser('rebuild-aggregations', help=rebuild_aggregations.__doc__)
+    aggregations.set_defaults(handler=rebuild_aggregations)
+
+    metrics = commands.add_parser('rebuild-metrics', help=rebuild_metrics.__doc__)
+    metrics.set_defaults(handler=rebuild_metrics)
+
+    backfill = commands.add_parser('backfill-gps-streams', help=backfill_gps_streams.__doc__)
+    backfill.set_defaults(handler=backfill_gps_streams)
+
+    db = commands.add_parser('db', help='Database schema migrations')
+    db_commands = db.add_subparsers(dest='db_command', required=True)
+    upgrade = db_commands.add_parser('upgrade', help=db_upgrade.__doc__)
+    upgrade.add_argument('revision', nargs='?', default='head')
+    upgrade.set_defaults(handler=db_upgrade)
+    downgrade = db_commands.add_parser('downgrade', help=db_downgrade.__doc__)
+    downgrade.add_argument('revision')
+    downgrade.set_defaults(handler=db_downgrade)
+    stamp = db_commands.add_parser('stamp', help=db_stamp.__doc__)
+    stamp.add_argument('revision')
+    stamp.set_defaults(handler=db_stamp)
+    current = db_commands.add_parser('current', help=db_current.__doc__)
+    current.set_defaults(handler=db_current)
+
+    args = parser.parse_args(argv)
+    if args.command != 'db':
+        try:
+            schema.check_schema_version()
+        except SchemaVersionError as e:
+            print(e, file=sys.stderr)
+            return 1
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
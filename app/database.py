@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, JSON, LargeBinary, UniqueConstraint, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import deferred, sessionmaker, relationship
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import AsyncIterator, Optional, List, Dict, Any
 from app.config import Config
 
 # Create database engine
@@ -10,10 +12,22 @@ engine = create_engine(Config.DATABASE_URL, echo=Config.DEBUG)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async drivers used for each database when DB_ASYNC is on
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+# Created on first use, so the async drivers are only imported when DB_ASYNC is on
+_async_engine: Optional[AsyncEngine] = None
+_AsyncSessionLocal: Optional[async_sessionmaker] = None
+
 
 # SQLAlchemy Models
 class ActivityModel(Base):
     __tablename__ = "activities"
+    __table_args__ = (
+        # Keyset pagination walks (activity_date, id) newest first, optionally per type
+        Index("ix_activities_type_date", "activity_type", text("activity_date DESC"), text("id DESC")),
+        Index("ix_activities_date", text("activity_date DESC"), text("id DESC")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     activity_type = Column(String, nullable=False)
@@ -23,13 +37,27 @@ class ActivityModel(Base):
     total_distance = Column(Float, nullable=False)  # meters
     avg_heart_rate = Column(Integer, nullable=True)
     file_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True, unique=True, index=True)  # sha256 of the uploaded file
+    # Splits, moving time, zone times etc. computed at ingest (see app.activity_metrics);
+    # only loaded when accessed, so activity lists do not read it
+    metrics = deferred(Column(JSON, nullable=True))
 
     gps_points = relationship("GPSPointModel", back_populates="activity", cascade="all, delete-orphan")
+    gps_stream = relationship(
+        "GPSStreamModel", back_populates="activity", uselist=False, cascade="all, delete-orphan"
+    )
     personal_bests = relationship("PersonalBestModel", back_populates="activity", cascade="all, delete-orphan")
+    personal_best_progression = relationship(
+        "PersonalBestProgressionModel", back_populates="activity", cascade="all, delete-orphan"
+    )
 
 
 class GPSPointModel(Base):
     __tablename__ = "gps_points"
+    __table_args__ = (
+        # Serves loading an activity's points in order and deleting them
+        Index("ix_gps_points_activity_id_timestamp", "activity_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     activity_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), nullable=False)
@@ -43,8 +71,22 @@ class GPSPointModel(Base):
     activity = relationship("ActivityModel", back_populates="gps_points")
 
 
+class GPSStreamModel(Base):
+    """GPS points of an activity as one compressed columnar blob (see app.stream_codec)."""
+    __tablename__ = "gps_streams"
+
+    activity_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True)
+    point_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    activity = relationship("ActivityModel", back_populates="gps_stream")
+
+
 class PersonalBestModel(Base):
     __tablename__ = "personal_bests"
+    __table_args__ = (
+        UniqueConstraint("activity_type", "distance", name="uq_personal_bests_type_distance"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     activity_type = Column(String, nullable=False)
@@ -57,19 +99,54 @@ class PersonalBestModel(Base):
     activity = relationship("ActivityModel", back_populates="personal_bests")
 
 
+class PersonalBestProgressionModel(Base):
+    """Every improvement of a personal best, appended when it is set."""
+    __tablename__ = "personal_best_progression"
+    __table_args__ = (
+        Index("ix_personal_best_progression_type_distance_date", "activity_type", "distance", "achieved_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    activity_type = Column(String, nullable=False)
+    distance = Column(Float, nullable=False)  # meters
+    best_time = Column(Integer, nullable=False)  # seconds
+    avg_pace = Column(Float, nullable=False)
+    activity_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), nullable=False)
+    achieved_date = Column(DateTime, nullable=False)
+
+    activity = relationship("ActivityModel", back_populates="personal_best_progression")
+
+
 class TimeAggregationModel(Base):
+    """Activity totals per sport and day/week/month, kept up to date as activities change."""
     __tablename__ = "time_aggregations"
+    __table_args__ = (
+        UniqueConstraint("aggregation_type", "activity_type", "date", name="uq_time_aggregations_bucket"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     activity_type = Column(String, nullable=False)
-    date = Column(DateTime, nullable=False)
+    date = Column(DateTime, nullable=False)  # start of the day, week (Monday) or month
     duration = Column(Integer, nullable=False)  # seconds
     aggregation_type = Column(String, nullable=False)  # 'daily', 'weekly', 'monthly'
+    total_distance = Column(Float, nullable=False, default=0.0)  # meters
+    activity_count = Column(Integer, nullable=False, default=0)
 
 
-def init_db():
-    """Initialize the database - create all tables."""
-    Base.metadata.create_all(bind=engine)
+class IngestJobModel(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_path = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # 'queued', 'parsing', 'persisting', 'done', 'failed'
+    error = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 of the uploaded file
+    duplicate = Column(Boolean, nullable=False, default=False)  # same content as an existing activity
+    activity_id = Column(Integer, ForeignKey("activities.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, nullable=False)  # queued
+    parsing_started_at = Column(DateTime, nullable=True)
+    persisting_started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)  # done or failed
 
 
 def get_db():
@@ -81,6 +158,42 @@ def get_db():
         db.close()
 
 
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its driver replaced by the asyncio driver for the same database."""
+    url = make_url(url)
+    return url.set(drivername=f"{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}").render_as_string(
+        hide_password=False
+    )
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Get the async session factory, creating the async engine on first use."""
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _async_engine = create_async_engine(
+            Config.ASYNC_DATABASE_URL or async_database_url(Config.DATABASE_URL), echo=Config.DEBUG
+        )
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+
+async def get_async_db() -> AsyncIterator[Optional[AsyncSession]]:
+    """Get an async database session, or None unless DB_ASYNC is on."""
+    if not Config.DB_ASYNC:
+        yield None
+        return
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    """Close the async engine's connections, if it was created."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine, _AsyncSessionLocal = None, None
+
+
 # Legacy helper classes for backward compatibility
 # TODO: Remove these once all code is migrated to use services directly
 # Migration status: Web routes (app/web/routes.py) still use these classes
@@ -0,0 +1,131 @@
+"""
+Downsampling of GPS streams for display.
+
+The track is simplified with Douglas–Peucker, which keeps the points that
+carry its shape, and the speed and heart rate series with
+largest-triangle-three-buckets (LTTB), which keeps the peaks and dips a
+line chart would show. Both return indices into the input arrays.
+"""
+import heapq
+import math
+from typing import Any, Dict
+import numpy as np
+from app.gps_stream import GPSStream
+
+
+def douglas_peucker(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of at most max_points points that best keep the shape of the line (x, y).
+
+    Works top-down with a point budget instead of a tolerance: starting from
+    the two end points, the segment whose farthest point lies farthest from
+    it is split at that point, until max_points points are kept or every
+    remaining point lies on its segment.
+    """
+    count = len(x)
+    if count <= max_points:
+        return np.arange(count)
+    if max_points < 2:
+        return np.arange(count)[:max_points]
+
+    splits = []
+
+    def push(start: int, end: int) -> None:
+        if end - start < 2:
+            return
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = math.hypot(dx, dy)
+        if length > 0:
+            distances = np.abs(dy * px - dx * py) / length
+        else:
+            distances = np.hypot(px, py)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > 0:
+            heapq.heappush(splits, (-distances[farthest], start + 1 + farthest, start, end))
+
+    keep = [0, count - 1]
+    push(0, count - 1)
+    while splits and len(keep) < max_points:
+        _, split, start, end = heapq.heappop(splits)
+        keep.append(split)
+        push(start, split)
+        push(split, end)
+    return np.sort(keep)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of max_points points of the series (x, y) chosen with largest-triangle-three-buckets.
+
+    The first and last points are kept; the points in between are split
+    into max_points - 2 buckets and from each bucket the point is kept that
+    forms the largest triangle with the point kept from the previous bucket
+    and the average of the next bucket.
+    """
+    count = len(x)
+    if count <= max_points:
+        return np.arange(count)
+    if max_points < 3:
+        return np.array([0, count - 1])[:max_points]
+
+    # Bucket i holds the points edges[i]..edges[i + 1] - 1
+    edges = np.linspace(1, count - 1, max_points - 1).astype(np.intp)
+    selected = np.empty(max_points, dtype=np.intp)
+    selected[0], selected[-1] = 0, count - 1
+
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[end:edges[bucket + 2]].mean()
+            next_y = y[end:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle areas; the factor does not change the maximum
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _series(seconds: np.ndarray, values: np.ndarray, max_points: int, decimals: int) -> Dict[str, list]:
+    """LTTB-downsampled (elapsed seconds, value) series, leaving out missing values."""
+    present = np.flatnonzero(~np.isnan(values))
+    kept = present[lttb(seconds[present], values[present], max_points)]
+    return {
+        'elapsed_seconds': seconds[kept].tolist(),
+        'values': np.round(values[kept], decimals).tolist()
+    }
+
+
+def downsample_stream(stream: GPSStream, max_points: int) -> Dict[str, Any]:
+    """
+    Downsample a stream to at most max_points points per series, ready for JSON.
+
+    Returns the original number of points, the start time, the track
+    (points with a position, simplified with Douglas–Peucker) and the speed
+    and heart rate series against elapsed seconds (simplified with LTTB).
+    """
+    seconds = stream.elapsed_seconds()
+
+    positioned = np.flatnonzero(~np.isnan(stream.latitudes) & ~np.isnan(stream.longitudes))
+    latitudes, longitudes = stream.latitudes[positioned], stream.longitudes[positioned]
+    # Equirectangular projection, so that a degree of longitude counts for its width at this latitude
+    scale = math.cos(math.radians(float(latitudes.mean()))) if len(positioned) else 1.0
+    kept = positioned[douglas_peucker(longitudes * scale, latitudes, max_points)]
+
+    return {
+        'points': len(stream),
+        'start_time': stream.timestamps[0].item().isoformat() if len(stream) else None,
+        'track': {
+            'latitudes': stream.latitudes[kept].tolist(),
+            'longitudes': stream.longitudes[kept].tolist(),
+            'distances': np.round(stream.distances[kept], 2).tolist()
+        },
+        'speed': _series(seconds, stream.speeds, max_points, 3),
+        'heart_rate': _series(seconds, stream.heart_rates, max_points, 0)
+    }
@@ -6,8 +6,14 @@ from fastapi.responses import JSONResponse
 from app.exceptions import (
     ActivityNotFoundError,
     PersonalBestNotFoundError,
+    IngestJobNotFoundError,
     FitFileParseError,
-    InvalidActivityTypeError
+    InvalidUploadError,
+    UploadTooLargeError,
+    InvalidCursorError,
+    InvalidActivityTypeError,
+    InvalidDateRangeError,
+    GPSStorageNotBackfilledError
 )
 
 
@@ -27,6 +33,14 @@ async def personal_best_not_found_handler(request: Request, exc: PersonalBestNot
     )
 
 
+async def ingest_job_not_found_handler(request: Request, exc: IngestJobNotFoundError):
+    """Handle IngestJobNotFoundError."""
+    return JSONResponse(
+        status_code=404,
+        content={"success": False, "error": "Ingest job not found"}
+    )
+
+
 async def fit_file_parse_handler(request: Request, exc: FitFileParseError):
     """Handle FitFileParseError."""
     return JSONResponse(
@@ -35,6 +49,30 @@ async def fit_file_parse_handler(request: Request, exc: FitFileParseError):
     )
 
 
+async def invalid_upload_handler(request: Request, exc: InvalidUploadError):
+    """Handle InvalidUploadError."""
+    return JSONResponse(
+        status_code=400,
+        content={"success": False, "error": str(exc)}
+    )
+
+
+async def upload_too_large_handler(request: Request, exc: UploadTooLargeError):
+    """Handle UploadTooLargeError."""
+    return JSONResponse(
+        status_code=413,
+        content={"success": False, "error": str(exc)}
+    )
+
+
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    """Handle InvalidCursorError."""
+    return JSONResponse(
+        status_code=400,
+        content={"success": False, "error": "Invalid cursor"}
+    )
+
+
 async def invalid_activity_type_handler(request: Request, exc: InvalidActivityTypeError):
     """Handle InvalidActivityTypeError."""
     return JSONResponse(
@@ -43,9 +81,31 @@ async def invalid_activity_type_handler(request: Request, exc: InvalidActivityTy
     )
 
 
+async def invalid_date_range_handler(request: Request, exc: InvalidDateRangeError):
+    """Handle InvalidDateRangeError."""
+    return JSONResponse(
+        status_code=400,
+        content={"success": False, "error": str(exc)}
+    )
+
+
+async def gps_storage_not_backfilled_handler(request: Request, exc: GPSStorageNotBackfilledError):
+    """Handle GPSStorageNotBackfilledError."""
+    return JSONResponse(
+        status_code=409,
+        content={"success": False, "error": str(exc)}
+    )
+
+
 def register_error_handlers(app):
     """Register all error handlers with the FastAPI app."""
     app.add_exception_handler(ActivityNotFoundError, activity_not_found_handler)
     app.add_exception_handler(PersonalBestNotFoundError, personal_best_not_found_handler)
+    app.add_exception_handler(IngestJobNotFoundError, ingest_job_not_found_handler)
     app.add_exception_handler(FitFileParseError, fit_file_parse_handler)
+    app.add_exception_handler(InvalidUploadError, invalid_upload_handler)
+    app.add_exception_handler(UploadTooLargeError, upload_too_large_handler)
+    app.add_exception_handler(InvalidCursorError, invalid_cursor_handler)
     app.add_exception_handler(InvalidActivityTypeError, invalid_activity_type_handler)
+    app.add_exception_handler(InvalidDateRangeError, invalid_date_range_handler)
+    app.add_exception_handler(GPSStorageNotBackfilledError, gps_storage_not_backfilled_handler)
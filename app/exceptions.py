@@ -13,11 +13,46 @@ class PersonalBestNotFoundError(Exception):
     pass
 
 
+class IngestJobNotFoundError(Exception):
+    """Raised when an ingest job is not found."""
+    pass
+
+
 class FitFileParseError(Exception):
     """Raised when a FIT file cannot be parsed."""
     pass
 
 
+class InvalidUploadError(Exception):
+    """Raised when an uploaded file cannot be accepted."""
+    pass
+
+
+class UploadTooLargeError(InvalidUploadError):
+    """Raised when an uploaded file exceeds the maximum upload size."""
+    pass
+
+
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor cannot be decoded."""
+    pass
+
+
+class InvalidDateRangeError(Exception):
+    """Raised when a requested date range spans too many periods."""
+    pass
+
+
+class GPSStorageNotBackfilledError(Exception):
+    """Raised when columnar GPS storage is used before row-stored GPS points were backfilled."""
+    pass
+
+
+class SchemaVersionError(Exception):
+    """Raised when the database is not at the latest migration revision."""
+    pass
+
+
 class InvalidActivityTypeError(Exception):
     """Raised when an invalid activity type is provided."""
     pass
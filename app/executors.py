@@ -0,0 +1,128 @@
+"""
+Worker pools for blocking work that must not run on the event loop.
+
+CPU-bound work such as FIT parsing goes to a process pool, blocking
+database or file work goes to a thread pool and queued ingest jobs run in
+their own thread pool. Pools are created on first use with the sizes from
+Config; a size of 0 runs the work inline instead.
+"""
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import (
+    FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+)
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+from app.config import Config
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_ingest_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Get the shared process pool, or None if PARSE_WORKERS is 0."""
+    global _process_pool
+    if _process_pool is None and Config.PARSE_WORKERS > 0:
+        # spawn avoids forking a process that holds threads and DB connections
+        _process_pool = ProcessPoolExecutor(
+            max_workers=Config.PARSE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _process_pool
+
+
+def get_thread_pool() -> Optional[ThreadPoolExecutor]:
+    """Get the shared thread pool, or None if DB_WORKERS is 0."""
+    global _thread_pool
+    if _thread_pool is None and Config.DB_WORKERS > 0:
+        _thread_pool = ThreadPoolExecutor(max_workers=Config.DB_WORKERS, thread_name_prefix='db')
+    return _thread_pool
+
+
+def get_ingest_pool() -> Optional[ThreadPoolExecutor]:
+    """Get the shared ingest job pool, or None if INGEST_WORKERS is 0."""
+    global _ingest_pool
+    if _ingest_pool is None and Config.INGEST_WORKERS > 0:
+        _ingest_pool = ThreadPoolExecutor(max_workers=Config.INGEST_WORKERS, thread_name_prefix='ingest')
+    return _ingest_pool
+
+
+def _submit(pool: Optional[Executor], func: Callable, *args, **kwargs) -> Future:
+    if pool is not None:
+        return pool.submit(func, *args, **kwargs)
+    future = Future()
+    try:
+        future.set_result(func(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+async def _run(pool: Optional[Executor], func: Callable, *args, **kwargs) -> Any:
+    if pool is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+
+
+async def run_in_process(func: Callable, *args, **kwargs) -> Any:
+    """Run a picklable, CPU-bound function in the process pool."""
+    return await _run(get_process_pool(), func, *args, **kwargs)
+
+
+async def run_in_thread(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function in the thread pool."""
+    return await _run(get_thread_pool(), func, *args, **kwargs)
+
+
+def call_in_process(func: Callable, *args, **kwargs) -> Any:
+    """Run a picklable, CPU-bound function in the process pool and wait for the result."""
+    return _submit(get_process_pool(), func, *args, **kwargs).result()
+
+
+def imap_in_process(func: Callable, items: Iterable, window: Optional[int] = None) -> Iterator[Tuple[Any, Future]]:
+    """
+    Run func on each item in the process pool and yield (item, future) as each finishes.
+
+    At most window items (by default twice the pool size) are in flight at
+    once, so results never pile up faster than the caller consumes them.
+    Futures hold the result or the exception raised for that item.
+    """
+    pool = get_process_pool()
+    if pool is None:
+        for item in items:
+            yield item, _submit(None, func, item)
+        return
+
+    window = window or 2 * Config.PARSE_WORKERS
+    pending = {}
+    for item in items:
+        if len(pending) >= window:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future
+        pending[pool.submit(func, item)] = item
+
+    for future in as_completed(list(pending)):
+        yield pending.pop(future), future
+
+
+def submit_ingest(func: Callable, *args, **kwargs) -> Future:
+    """Queue a function on the ingest job pool without waiting for it."""
+    return _submit(get_ingest_pool(), func, *args, **kwargs)
+
+
+def shutdown_pools() -> None:
+    """Shut down all pools, waiting for running and queued work to finish."""
+    global _process_pool, _thread_pool, _ingest_pool
+    # Ingest jobs use the other pools, so they are stopped first
+    if _ingest_pool is not None:
+        _ingest_pool.shutdown()
+        _ingest_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown()
+        _process_pool = None
+    if _thread_pool is not None:
+        _thread_pool.shutdown()
+        _thread_pool = None
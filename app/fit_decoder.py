@@ -0,0 +1,260 @@
+"""
+Fast-path FIT decoder for the record and session messages.
+
+Definition and data messages are read straight from a memory-mapped file.
+Each definition is compiled once into a struct layout that unpacks only the
+fields the application stores and skips everything else by size, so no
+per-field objects are allocated. Values are converted the same way fitparse
+converts them (invalid values become None, scales are applied, date_time
+fields become naive UTC datetimes and the sport enum becomes its name).
+
+File and header CRCs are not verified.
+"""
+import mmap
+import struct
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from fitparse.profile import FIELD_TYPES
+from app.exceptions import FitFileParseError
+
+FIT_EPOCH = datetime(1989, 12, 31)
+
+# Global message numbers of the messages we can decode
+MESSAGE_NUMS = {
+    'session': 18,
+    'record': 20,
+}
+
+TIMESTAMP_FIELD = 253
+
+# Bytes of a FIT file header needed to read its size fields and signature
+HEADER_MIN_SIZE = 12
+
+SPORT_NAMES = FIELD_TYPES['sport'].values
+
+# struct format and invalid value for each FIT base type
+BASE_TYPES = {
+    0x00: ('B', 0xFF),  # enum
+    0x01: ('b', 0x7F),  # sint8
+    0x02: ('B', 0xFF),  # uint8
+    0x83: ('h', 0x7FFF),  # sint16
+    0x84: ('H', 0xFFFF),  # uint16
+    0x85: ('i', 0x7FFFFFFF),  # sint32
+    0x86: ('I', 0xFFFFFFFF),  # uint32
+    0x88: ('f', None),  # float32, invalid is NaN
+    0x89: ('d', None),  # float64, invalid is NaN
+    0x0A: ('B', 0),  # uint8z
+    0x8B: ('H', 0),  # uint16z
+    0x8C: ('I', 0),  # uint32z
+    0x8E: ('q', 0x7FFFFFFFFFFFFFFF),  # sint64
+    0x8F: ('Q', 0xFFFFFFFFFFFFFFFF),  # uint64
+    0x90: ('Q', 0),  # uint64z
+}
+
+
+def _date_time(value: int) -> Any:
+    # Values below 0x10000000 are relative times, which fitparse leaves as ints
+    if value >= 0x10000000:
+        return FIT_EPOCH + timedelta(seconds=value)
+    return value
+
+
+def _scaled(scale: int) -> Callable[[int], float]:
+    return lambda value: value / scale
+
+
+def _sport(value: int) -> Any:
+    return SPORT_NAMES.get(value, value)
+
+
+# Decoded fields per global message: field_def_num -> (name, converter)
+MESSAGE_FIELDS = {
+    MESSAGE_NUMS['record']: {
+        TIMESTAMP_FIELD: ('timestamp', _date_time),
+        0: ('position_lat', None),
+        1: ('position_long', None),
+        3: ('heart_rate', None),
+        5: ('distance', _scaled(100)),
+        6: ('speed', _scaled(1000)),
+    },
+    MESSAGE_NUMS['session']: {
+        TIMESTAMP_FIELD: ('timestamp', _date_time),
+        2: ('start_time', _date_time),
+        5: ('sport', _sport),
+        7: ('total_elapsed_time', _scaled(1000)),
+        9: ('total_distance', _scaled(100)),
+        16: ('avg_heart_rate', None),
+    },
+}
+
+# Every other message only has its timestamp decoded, to keep compressed
+# timestamp headers correct
+TIMESTAMP_ONLY = {TIMESTAMP_FIELD: ('timestamp', _date_time)}
+
+
+class _Layout:
+    """Precompiled decoding layout for one definition message."""
+
+    __slots__ = ('name', 'size', 'struct', 'fields', 'timestamp_index')
+
+    def __init__(self, name: Optional[str], size: int, fmt: Optional[str],
+                 fields: List[Tuple[str, Optional[Callable], Any]], timestamp_index: Optional[int]):
+        self.name = name
+        self.size = size
+        self.struct = struct.Struct(fmt) if fields else None
+        self.fields = fields
+        self.timestamp_index = timestamp_index
+
+
+def _read_definition(buf, pos: int, header: int, wanted: Dict[int, str],
+                     raw_timestamps: bool) -> Tuple[_Layout, int]:
+    """Compile the definition message starting at pos; returns the layout and the new position."""
+    endian = '>' if buf[pos + 1] else '<'
+    global_num, num_fields = struct.unpack_from(endian + 'HB', buf, pos + 2)
+    pos += 5
+
+    name = wanted.get(global_num)
+    decoded = MESSAGE_FIELDS[global_num] if name else TIMESTAMP_ONLY
+
+    fmt = [endian]
+    fields = []
+    timestamp_index = None
+    size = 0
+    for field_num, field_size, base_type in struct.iter_unpack('3B', buf[pos:pos + 3 * num_fields]):
+        base = BASE_TYPES.get(base_type)
+        if field_num in decoded and base and struct.calcsize(base[0]) == field_size:
+            if field_num == TIMESTAMP_FIELD:
+                timestamp_index = len(fields)
+            field_name, converter = decoded[field_num]
+            if raw_timestamps and field_num == TIMESTAMP_FIELD:
+                converter = None
+            fields.append((field_name, converter, base[1]))
+            fmt.append(base[0])
+        else:
+            fmt.append(f'{field_size}x')
+        size += field_size
+    pos += 3 * num_fields
+
+    if header & 0x20:
+        # Developer fields are skipped by size
+        num_dev_fields = buf[pos]
+        pos += 1
+        dev_size = sum(buf[pos + 3 * i + 1] for i in range(num_dev_fields))
+        fmt.append(f'{dev_size}x')
+        size += dev_size
+        pos += 3 * num_dev_fields
+
+    return _Layout(name, size, ''.join(fmt), fields, timestamp_index), pos
+
+
+def read_header(data) -> Tuple[int, int]:
+    """
+    Check the header at the start of data and return (header size, data size).
+
+    Raises:
+        FitFileParseError: If data is too short or is not a FIT file header.
+    """
+    if len(data) < HEADER_MIN_SIZE:
+        raise FitFileParseError("Truncated .FIT file header")
+    header_size, _, _, data_size, magic = struct.unpack_from('<2BHI4s', data)
+    if magic != b'.FIT' or header_size < HEADER_MIN_SIZE:
+        raise FitFileParseError("Invalid .FIT file header")
+    return header_size, data_size
+
+
+def _iter_buffer(buf, wanted: Dict[int, str], raw_timestamps: bool) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Decode the wanted messages from every (possibly chained) FIT file in buf."""
+    offset = 0
+    total = len(buf)
+    while offset < total:
+        header_size, data_size = read_header(buf[offset:offset + HEADER_MIN_SIZE])
+
+        pos = offset + header_size
+        end = pos + data_size
+        if end > total:
+            raise FitFileParseError(
+                f"Tried to read {data_size} bytes of .FIT data but only {total - pos} are available"
+            )
+
+        layouts = {}
+        accumulator = 0
+        while pos < end:
+            header = buf[pos]
+            pos += 1
+            if header & 0x80:
+                # Compressed timestamp header
+                local_num = (header >> 5) & 0x3
+                time_offset = header & 0x1F
+            elif header & 0x40:
+                layouts[header & 0x0F], pos = _read_definition(buf, pos, header, wanted, raw_timestamps)
+                continue
+            else:
+                local_num = header & 0x0F
+                time_offset = None
+
+            layout = layouts.get(local_num)
+            if layout is None:
+                raise FitFileParseError(
+                    f"Got data message with invalid local message type {local_num}"
+                )
+
+            if layout.struct is not None:
+                raw = layout.struct.unpack_from(buf, pos)
+                if layout.timestamp_index is not None:
+                    raw_timestamp = raw[layout.timestamp_index]
+                    if raw_timestamp != layout.fields[layout.timestamp_index][2]:
+                        accumulator = raw_timestamp
+            else:
+                raw = ()
+            pos += layout.size
+
+            if time_offset is not None:
+                timestamp = time_offset + (accumulator & ~0x1F)
+                if time_offset < (accumulator & 0x1F):
+                    timestamp += 0x20
+                accumulator = timestamp
+
+            if layout.name is None:
+                continue
+
+            values = {}
+            for (name, converter, invalid), value in zip(layout.fields, raw):
+                if value == invalid or value != value:
+                    values[name] = None
+                elif converter is not None:
+                    values[name] = converter(value)
+                else:
+                    values[name] = value
+            if time_offset is not None:
+                values['timestamp'] = accumulator if raw_timestamps else _date_time(accumulator)
+
+            yield layout.name, values
+
+        # Skip the file CRC; any remaining bytes are a chained FIT file
+        offset = end + 2
+
+
+def iter_messages(filepath: str, names: Iterable[str],
+                  raw_timestamps: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (message name, field values) for the requested message types.
+
+    Only 'record' and 'session' messages are supported, and only the fields
+    stored by the application are decoded. With raw_timestamps, timestamp
+    fields are left as seconds since the FIT epoch instead of datetimes.
+
+    Raises:
+        FitFileParseError: If the file is not a valid FIT file.
+    """
+    wanted = {MESSAGE_NUMS[name]: name for name in names}
+    with open(filepath, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            raise FitFileParseError(f"Cannot read .FIT file {filepath}: {e}") from e
+        try:
+            yield from _iter_buffer(buf, wanted, raw_timestamps)
+        except (struct.error, IndexError) as e:
+            raise FitFileParseError(f"Truncated .FIT file {filepath}: {e}") from e
+        finally:
+            buf.close()
@@ -3,7 +3,216 @@ FIT file parser for extracting activity data from .fit files.
 """
 from fitparse import FitFile
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Optional, Any, Iterator, Iterable
+from app import fit_decoder
+from app.config import Config
+from app.exceptions import FitFileParseError
+from app.gps_stream import GPSStream, fit_seconds_to_datetime64
+
+# Map sport type to our activity types
+ACTIVITY_TYPE_MAP = {
+    'swimming': 'swimming',
+    'cycling': 'cycling',
+    'running': 'running',
+    'lap_swimming': 'swimming',
+    'open_water_swimming': 'swimming',
+    'generic': 'running',  # Default fallback
+}
+
+
+class _UncachedFitFile(FitFile):
+    """FitFile that drops each message once it has been parsed instead of caching it."""
+
+    def _parse_message(self):
+        message = super()._parse_message()
+        self._messages.clear()
+        return message
+
+
+# Raw record fields collected for the GPS stream, in GPSStream.from_raw order
+RECORD_FIELDS = ('timestamp', 'position_lat', 'position_long', 'distance', 'speed', 'heart_rate')
+
+
+class _RecordColumns:
+    """
+    Raw record message values collected column by column.
+
+    With fit_seconds, timestamps are collected as seconds since the FIT epoch
+    and converted to datetime64 in one array operation.
+    """
+
+    def __init__(self, fit_seconds: bool = False):
+        self.fit_seconds = fit_seconds
+        self.columns = {name: [] for name in RECORD_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.columns['timestamp'])
+
+    def append(self, values: Dict[str, Any]) -> None:
+        get = values.get
+        for name, column in self.columns.items():
+            column.append(get(name))
+
+    def last_distance(self, default: float) -> float:
+        """The cumulative distance after the last record in these columns."""
+        for distance in reversed(self.columns['distance']):
+            if distance is not None:
+                return distance
+        return default
+
+    def to_stream(self, initial_distance: float = 0.0) -> GPSStream:
+        timestamps = self.columns['timestamp']
+        if self.fit_seconds:
+            timestamps = fit_seconds_to_datetime64(timestamps)
+        return GPSStream.from_raw(
+            timestamps,
+            *(self.columns[name] for name in RECORD_FIELDS[1:]),
+            initial_distance=initial_distance
+        )
+
+
+def _record_columns() -> _RecordColumns:
+    # The native decoder can hand over raw timestamps, which convert much faster
+    return _RecordColumns(fit_seconds=Config.FIT_DECODER == 'native')
+
+
+def _iter_messages(filepath: str, names: Iterable[str], raw_timestamps: bool = False) -> Iterator[tuple]:
+    """
+    Yield (message name, field values) for the requested message types, one at a time.
+
+    raw_timestamps is passed on to the native decoder; fitparse always yields datetimes.
+    """
+    if Config.FIT_DECODER == 'native':
+        yield from fit_decoder.iter_messages(filepath, names, raw_timestamps)
+        return
+
+    fitfile = _UncachedFitFile(filepath)
+    try:
+        for message in fitfile.get_messages(list(names)):
+            yield message.name, message.get_values()
+    finally:
+        fitfile.close()
+
+
+def _session_summary(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the activity summary from the values of a session message."""
+    sport = session.get('sport')
+    start_time = session.get('start_time')
+    total_elapsed_time = session.get('total_elapsed_time')
+    total_distance = session.get('total_distance')
+    avg_heart_rate = session.get('avg_heart_rate')
+
+    activity_type = ACTIVITY_TYPE_MAP.get(sport.lower() if isinstance(sport, str) else 'generic', 'running')
+
+    return {
+        'activity_type': activity_type,
+        'activity_date': start_time or datetime.now(),
+        'duration': int(total_elapsed_time) if total_elapsed_time else 0,
+        'total_distance': total_distance if total_distance else 0.0,
+        'avg_heart_rate': int(avg_heart_rate) if avg_heart_rate else None,
+    }
+
+
+def parse_fit_session(filepath: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse only the session summary of a .fit file.
+
+    Returns the same summary keys as parse_fit_file (without gps_points), or
+    None if the file has no session message or cannot be parsed.
+    """
+    try:
+        for _, session in _iter_messages(filepath, ('session',)):
+            return _session_summary(session)
+        return None
+    except Exception as e:
+        print(f"Error parsing FIT file {filepath}: {e}")
+        return None
+
+
+def iter_record_batches(
+    filepath: str, batch_size: Optional[int] = None, summary: Optional[Dict[str, Any]] = None
+) -> Iterator[GPSStream]:
+    """
+    Stream the GPS points of a .fit file as GPSStream batches of up to batch_size records.
+
+    The parser holds one batch of raw record values at a time and never
+    builds a Python object per point; what the caller keeps of the yielded
+    batches is up to it. Missing distances are filled forward across batch
+    boundaries.
+
+    If summary is given, the session summary (as parse_fit_session) is
+    stored in it in the same pass. Devices write the session message after
+    the records, so it is only complete once the batches are exhausted,
+    and stays empty if the file has none.
+
+    Raises:
+        FitFileParseError: If the file cannot be parsed.
+    """
+    batch_size = batch_size or Config.FIT_BATCH_SIZE
+    distance = 0.0
+    columns = _record_columns()
+    names = ('record',) if summary is None else ('session', 'record')
+    try:
+        for name, values in _iter_messages(filepath, names, columns.fit_seconds):
+            if name != 'record':
+                if not summary:
+                    summary.update(_session_summary(values))
+                continue
+            columns.append(values)
+            if len(columns) >= batch_size:
+                stream = columns.to_stream(distance)
+                distance = columns.last_distance(distance)
+                columns = _record_columns()
+                if len(stream):
+                    yield stream
+    except FitFileParseError:
+        raise
+    except Exception as e:
+        raise FitFileParseError(f"Error parsing FIT file {filepath}: {e}") from e
+
+    stream = columns.to_stream(distance)
+    if len(stream):
+        yield stream
+
+
+def read_fit_stream(filepath: str) -> Dict[str, Any]:
+    """
+    Parse a .fit file into its summary and a columnar GPS stream.
+
+    Returns the same keys as parse_fit_file, except that the GPS points are
+    returned as a GPSStream under gps_stream instead of a list under gps_points.
+
+    Raises:
+        FitFileParseError: If the file cannot be parsed or has no session message.
+    """
+    try:
+        session = None
+        columns = _record_columns()
+        for name, values in _iter_messages(filepath, ('session', 'record'), columns.fit_seconds):
+            if name == 'record':
+                columns.append(values)
+            elif session is None:
+                session = values
+    except FitFileParseError:
+        raise
+    except Exception as e:
+        raise FitFileParseError(f"Error parsing FIT file {filepath}: {e}") from e
+
+    if not session:
+        raise FitFileParseError(f"FIT file {filepath} has no session message")
+
+    activity_data = _session_summary(session)
+    activity_data['gps_stream'] = columns.to_stream()
+    return activity_data
+
+
+def parse_fit_stream(filepath: str) -> Optional[Dict[str, Any]]:
+    """Like read_fit_stream, but returns None instead of raising if the file cannot be parsed."""
+    try:
+        return read_fit_stream(filepath)
+    except Exception as e:
+        print(f"Error parsing FIT file {filepath}: {e}")
+        return None
 
 
 def parse_fit_file(filepath: str) -> Optional[Dict[str, Any]]:
@@ -18,89 +227,9 @@ def parse_fit_file(filepath: str) -> Optional[Dict[str, Any]]:
     - avg_heart_rate: Optional[int]
     - gps_points: List[Dict] with timestamp, lat, lon, distance, speed, heart_rate
     """
-    try:
-        fitfile = FitFile(filepath)
-
-        # Extract session data (summary information)
-        session_data = None
-        for record in fitfile.get_messages('session'):
-            session_data = record
-            break
-
-        if not session_data:
-            return None
-
-        # Extract key fields from session
-        sport = None
-        start_time = None
-        total_elapsed_time = 0
-        total_distance = 0.0
-        avg_heart_rate = None
-
-        for field in session_data:
-            if field.name == 'sport':
-                sport = field.value
-            elif field.name == 'start_time':
-                start_time = field.value
-            elif field.name == 'total_elapsed_time':
-                total_elapsed_time = field.value
-            elif field.name == 'total_distance':
-                total_distance = field.value
-            elif field.name == 'avg_heart_rate':
-                avg_heart_rate = field.value
-
-        # Map sport type to our activity types
-        activity_type_map = {
-            'swimming': 'swimming',
-            'cycling': 'cycling',
-            'running': 'running',
-            'lap_swimming': 'swimming',
-            'open_water_swimming': 'swimming',
-            'generic': 'running',  # Default fallback
-        }
-
-        activity_type = activity_type_map.get(sport.lower() if sport else 'generic', 'running')
-
-        # Extract GPS points (record messages)
-        gps_points = []
-        cumulative_distance = 0.0
-
-        for record in fitfile.get_messages('record'):
-            point = {}
-            for field in record:
-                if field.name == 'timestamp':
-                    point['timestamp'] = field.value
-                elif field.name == 'position_lat':
-                    # Convert from semicircles to degrees
-                    if field.value is not None:
-                        point['latitude'] = field.value * (180.0 / 2**31)
-                elif field.name == 'position_long':
-                    # Convert from semicircles to degrees
-                    if field.value is not None:
-                        point['longitude'] = field.value * (180.0 / 2**31)
-                elif field.name == 'distance':
-                    cumulative_distance = field.value
-                    point['distance'] = field.value
-                elif field.name == 'speed':
-                    point['speed'] = field.value
-                elif field.name == 'heart_rate':
-                    point['heart_rate'] = field.value
-
-            # Only add points with timestamp
-            if 'timestamp' in point:
-                if 'distance' not in point:
-                    point['distance'] = cumulative_distance
-                gps_points.append(point)
-
-        return {
-            'activity_type': activity_type,
-            'activity_date': start_time or datetime.now(),
-            'duration': int(total_elapsed_time) if total_elapsed_time else 0,
-            'total_distance': total_distance if total_distance else 0.0,
-            'avg_heart_rate': int(avg_heart_rate) if avg_heart_rate else None,
-            'gps_points': gps_points
-        }
-
-    except Exception as e:
-        print(f"Error parsing FIT file {filepath}: {e}")
+    activity_data = parse_fit_stream(filepath)
+    if not activity_data:
         return None
+
+    activity_data['gps_points'] = activity_data.pop('gps_stream').to_points()
+    return activity_data
@@ -0,0 +1,185 @@
+"""
+Columnar container for the GPS point stream of an activity.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+
+# Multiply a semicircle value by this to get degrees
+SEMICIRCLES_TO_DEGREES = 180.0 / 2**31
+
+TIMESTAMP_DTYPE = 'datetime64[us]'
+
+# FIT timestamps count seconds from 1989-12-31 00:00:00 UTC
+FIT_EPOCH = np.datetime64('1989-12-31T00:00:00', 'us')
+
+COLUMNS = ('timestamps', 'latitudes', 'longitudes', 'distances', 'speeds', 'heart_rates')
+
+
+class GPSStream:
+    """
+    GPS points of an activity stored as one NumPy array per column.
+
+    timestamps is a datetime64 array, distances holds cumulative meters and
+    the optional columns (latitudes, longitudes, speeds, heart_rates) are
+    float64 arrays with NaN for missing values.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        distances: np.ndarray,
+        speeds: np.ndarray,
+        heart_rates: np.ndarray
+    ):
+        self.timestamps = np.asarray(timestamps, dtype=TIMESTAMP_DTYPE)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.distances = np.asarray(distances, dtype=np.float64)
+        self.speeds = np.asarray(speeds, dtype=np.float64)
+        self.heart_rates = np.asarray(heart_rates, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, index) -> 'GPSStream':
+        """Select points with a slice, index array or boolean mask."""
+        return GPSStream(*(getattr(self, column)[index] for column in COLUMNS))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GPSStream):
+            return NotImplemented
+        return all(
+            np.array_equal(getattr(self, column), getattr(other, column), equal_nan=column != 'timestamps')
+            for column in COLUMNS
+        )
+
+    def __getstate__(self):
+        return tuple(getattr(self, column) for column in COLUMNS)
+
+    def __setstate__(self, state):
+        for column, values in zip(COLUMNS, state):
+            setattr(self, column, values)
+
+    @classmethod
+    def empty(cls) -> 'GPSStream':
+        """Create a stream with no points."""
+        return cls(*([] for _ in COLUMNS))
+
+    @classmethod
+    def from_raw(
+        cls,
+        timestamps: Sequence[Optional[datetime]],
+        position_lat: Sequence[Optional[int]],
+        position_long: Sequence[Optional[int]],
+        distance: Sequence[Optional[float]],
+        speed: Sequence[Optional[float]],
+        heart_rate: Sequence[Optional[int]],
+        initial_distance: float = 0.0
+    ) -> 'GPSStream':
+        """
+        Build a stream from raw record message columns (None for missing values).
+
+        Positions are converted from semicircles to degrees, missing distances
+        are filled forward from the last distance seen (starting from
+        initial_distance) and records without a timestamp are dropped, all as
+        array operations. timestamps may be datetimes or an already converted
+        datetime64 array.
+        """
+        timestamps = np.array(timestamps, dtype=TIMESTAMP_DTYPE)
+        latitudes = np.array(position_lat, dtype=np.float64) * SEMICIRCLES_TO_DEGREES
+        longitudes = np.array(position_long, dtype=np.float64) * SEMICIRCLES_TO_DEGREES
+        distances = forward_fill(np.array(distance, dtype=np.float64), initial_distance)
+
+        keep = ~np.isnat(timestamps)
+        return cls(
+            timestamps[keep],
+            latitudes[keep],
+            longitudes[keep],
+            distances[keep],
+            np.array(speed, dtype=np.float64)[keep],
+            np.array(heart_rate, dtype=np.float64)[keep]
+        )
+
+    @classmethod
+    def from_points(cls, points: List[Dict[str, Any]]) -> 'GPSStream':
+        """Build a stream from per-point dicts as accepted by GPSPointRepository.create_batch."""
+        return cls(
+            [p['timestamp'] for p in points],
+            [p.get('latitude') for p in points],
+            [p.get('longitude') for p in points],
+            [p['distance'] for p in points],
+            [p.get('speed') for p in points],
+            [p.get('heart_rate') for p in points]
+        )
+
+    @classmethod
+    def concatenate(cls, streams: Sequence['GPSStream']) -> 'GPSStream':
+        """Join several streams end to end."""
+        if not streams:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(s, column) for s in streams]) for column in COLUMNS))
+
+    def rows(self) -> Iterator[tuple]:
+        """
+        Iterate over (timestamp, latitude, longitude, distance, speed, heart_rate)
+        tuples of plain Python values, with None for missing values.
+        """
+        heart_rates = [None if hr != hr else int(hr) for hr in self.heart_rates.tolist()]
+        return zip(
+            self.timestamps.astype(object).tolist(),
+            _nan_to_none(self.latitudes),
+            _nan_to_none(self.longitudes),
+            self.distances.tolist(),
+            _nan_to_none(self.speeds),
+            heart_rates
+        )
+
+    def to_points(self) -> List[Dict[str, Any]]:
+        """Convert the stream to per-point dicts."""
+        return [
+            {
+                'timestamp': timestamp,
+                'latitude': latitude,
+                'longitude': longitude,
+                'distance': distance,
+                'speed': speed,
+                'heart_rate': heart_rate
+            }
+            for timestamp, latitude, longitude, distance, speed, heart_rate in self.rows()
+        ]
+
+    def elapsed_seconds(self) -> np.ndarray:
+        """Seconds since the first point, as float64."""
+        if not len(self):
+            return np.empty(0)
+        return (self.timestamps - self.timestamps[0]) / np.timedelta64(1, 's')
+
+
+def fit_seconds_to_datetime64(seconds: Sequence[Optional[int]]) -> np.ndarray:
+    """Convert seconds since the FIT epoch (None for missing) to a datetime64 array."""
+    values = np.array(seconds, dtype=np.float64)
+    missing = np.isnan(values)
+    timestamps = FIT_EPOCH + np.where(missing, 0, values).astype('timedelta64[s]')
+    timestamps[missing] = np.datetime64('NaT')
+    return timestamps
+
+
+def forward_fill(values: np.ndarray, initial: float = 0.0) -> np.ndarray:
+    """Replace NaN values with the last preceding non-NaN value (or initial)."""
+    valid = ~np.isnan(values)
+    if valid.all():
+        return values
+    # Index of the last valid value at or before each position; -1 if none
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(len(values)), -1))
+    filled = values[np.maximum(last_valid, 0)]
+    filled[last_valid < 0] = initial
+    return filled
+
+
+def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else v for v in values.tolist()]
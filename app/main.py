@@ -2,9 +2,12 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import os
-from app.database import init_db
 from app.config import Config
 from app.error_handlers import register_error_handlers
+from app.database import SessionLocal, dispose_async_engine
+from app.executors import shutdown_pools
+from app.schema import check_schema_version
+from app.services import IngestService
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -23,21 +26,47 @@ templates = Jinja2Templates(directory="app/templates")
 # Ensure required directories exist
 os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
 
-# Initialize database
-init_db()
-
 # Register error handlers
 register_error_handlers(app)
 
 # Register routers
 from app.api import activities as api_activities
 from app.api import personal_bests as api_personal_bests
+from app.api import ingest_jobs as api_ingest_jobs
+from app.api import analytics as api_analytics
 from app.web import routes as web_routes
 
 app.include_router(api_activities.router, prefix="/api/v1", tags=["activities"])
 app.include_router(api_personal_bests.router, prefix="/api/v1", tags=["personal-bests"])
+app.include_router(api_ingest_jobs.router, prefix="/api/v1", tags=["ingest-jobs"])
+app.include_router(api_analytics.router, prefix="/api/v1", tags=["analytics"])
 app.include_router(web_routes.router, tags=["web"])
 
+@app.on_event("startup")
+def check_database():
+    """Refuse to start against a database that has not been migrated to the latest revision."""
+    if Config.SCHEMA_CHECK:
+        check_schema_version()
+
+
+@app.on_event("startup")
+def resume_ingest_jobs():
+    """Requeue the ingest jobs the last run left queued and settle those it left running."""
+    if Config.INGEST_RESUME:
+        db = SessionLocal()
+        try:
+            IngestService(db).resume_jobs()
+        finally:
+            db.close()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the ingest, parsing and database worker pools and close the async engine."""
+    shutdown_pools()
+    await dispose_async_engine()
+
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
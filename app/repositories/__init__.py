@@ -2,11 +2,32 @@
 Repository layer - Data access abstraction.
 """
 from .activity_repository import ActivityRepository
+from .async_repositories import (
+    AsyncActivityRepository,
+    AsyncGPSPointRepository,
+    AsyncGPSStreamRepository,
+    AsyncPersonalBestRepository,
+    get_async_gps_repository,
+)
 from .gps_point_repository import GPSPointRepository
+from .gps_stream_repository import GPSStreamRepository, get_gps_repository
+from .ingest_job_repository import IngestJobRepository
+from .personal_best_progression_repository import PersonalBestProgressionRepository
 from .personal_best_repository import PersonalBestRepository
+from .time_aggregation_repository import TimeAggregationRepository
 
 __all__ = [
     "ActivityRepository",
+    "AsyncActivityRepository",
+    "AsyncGPSPointRepository",
+    "AsyncGPSStreamRepository",
+    "AsyncPersonalBestRepository",
+    "get_async_gps_repository",
     "GPSPointRepository",
+    "GPSStreamRepository",
+    "get_gps_repository",
+    "IngestJobRepository",
+    "PersonalBestProgressionRepository",
     "PersonalBestRepository",
+    "TimeAggregationRepository",
 ]
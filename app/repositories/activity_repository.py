@@ -1,8 +1,9 @@
 """
 Activity repository - handles all database operations for activities.
 """
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 from datetime import datetime
+from sqlalchemy import Row, Select, func, literal_column, select, tuple_, update
 from sqlalchemy.orm import Session, joinedload
 from app.database import ActivityModel
 from app.validation import (
@@ -12,6 +13,65 @@ from app.validation import (
     validate_file_path
 )
 
+# Columns of an activity shown in lists, selected as plain rows instead of ORM objects
+LIST_COLUMNS = (
+    ActivityModel.id,
+    ActivityModel.activity_type,
+    ActivityModel.upload_date,
+    ActivityModel.activity_date,
+    ActivityModel.duration,
+    ActivityModel.total_distance,
+    ActivityModel.avg_heart_rate,
+    ActivityModel.file_path,
+)
+
+# date_trunc fields for each aggregation period on PostgreSQL
+DATE_TRUNC_FIELDS = {'daily': 'day', 'weekly': 'week', 'monthly': 'month'}
+
+# SQLite date() modifiers giving the start of each aggregation period
+SQLITE_PERIOD_MODIFIERS = {
+    'daily': (),
+    'weekly': ('weekday 0', '-6 days'),  # forward to Sunday, back to Monday
+    'monthly': ('start of month',),
+}
+
+
+def select_list(activity_types: Optional[Sequence[str]] = None) -> Select:
+    """LIST_COLUMNS of all activities, optionally of the given types, newest first."""
+    stmt = select(*LIST_COLUMNS)
+    if activity_types:
+        stmt = stmt.where(ActivityModel.activity_type.in_(activity_types))
+    return stmt.order_by(ActivityModel.activity_date.desc())
+
+
+def select_page(
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    activity_types: Optional[Sequence[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Select:
+    """LIST_COLUMNS of one keyset page of activities; see ActivityRepository.get_page."""
+    stmt = select(*LIST_COLUMNS)
+    if activity_types:
+        stmt = stmt.where(ActivityModel.activity_type.in_(activity_types))
+    if start is not None:
+        stmt = stmt.where(ActivityModel.activity_date >= start)
+    if end is not None:
+        stmt = stmt.where(ActivityModel.activity_date <= end)
+    if after is not None:
+        stmt = stmt.where(tuple_(ActivityModel.activity_date, ActivityModel.id) < tuple_(*after))
+    return stmt.order_by(ActivityModel.activity_date.desc(), ActivityModel.id.desc()).limit(limit)
+
+
+def _period_start_column(dialect: str, period: str):
+    """SQL expression for the start of the period containing ActivityModel.activity_date."""
+    if dialect == 'sqlite':
+        return func.date(ActivityModel.activity_date, *SQLITE_PERIOD_MODIFIERS[period])
+    # The field is inlined so the same expression can be repeated in GROUP BY
+    field = literal_column(f"'{DATE_TRUNC_FIELDS[period]}'")
+    return func.date_trunc(field, ActivityModel.activity_date)
+
 
 class ActivityRepository:
     """Repository for Activity data access."""
@@ -27,7 +87,8 @@ class ActivityRepository:
         duration: int,
         total_distance: float,
         file_path: str,
-        avg_heart_rate: Optional[int] = None
+        avg_heart_rate: Optional[int] = None,
+        content_hash: Optional[str] = None
     ) -> ActivityModel:
         """Create a new activity record."""
         # Validate inputs
@@ -47,7 +108,8 @@ class ActivityRepository:
             duration=duration,
             total_distance=total_distance,
             avg_heart_rate=avg_heart_rate,
-            file_path=file_path
+            file_path=file_path,
+            content_hash=content_hash
         )
         self.db.add(activity)
         self.db.flush()  # Flush to get the ID without committing
@@ -70,6 +132,31 @@ class ActivityRepository:
 
         return query.order_by(ActivityModel.activity_date.desc()).all()
 
+    def get_all_rows(self, activity_types: Optional[Sequence[str]] = None) -> List[Row]:
+        """
+        Get the LIST_COLUMNS of all activities, optionally of the given types,
+        ordered by activity date descending, as rows rather than ORM objects.
+        """
+        return self.db.execute(select_list(activity_types)).all()
+
+    def get_page(
+        self,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Row]:
+        """
+        Get the LIST_COLUMNS of up to limit activities ordered by activity date and ID, newest first.
+
+        after is the (activity_date, id) of the last activity of the previous
+        page. Pages continue from there with a keyset condition instead of an
+        OFFSET, so every page is an index range scan no matter how deep it
+        is. start and end are inclusive bounds on the activity date.
+        """
+        return self.db.execute(select_page(limit, after, activity_types, start, end)).all()
+
     def get_by_id(self, activity_id: int, eager_load: bool = False) -> Optional[ActivityModel]:
         """
         Get a specific activity by ID.
@@ -88,6 +175,100 @@ class ActivityRepository:
 
         return query.first()
 
+    def get_by_content_hash(self, content_hash: str) -> Optional[ActivityModel]:
+        """Get the activity created from a file with the given content hash."""
+        return self.db.query(ActivityModel).filter(ActivityModel.content_hash == content_hash).first()
+
+    def get_ids_by_content_hashes(self, content_hashes: List[str]) -> Dict[str, int]:
+        """Map each of the given content hashes that is already stored to its activity ID."""
+        if not content_hashes:
+            return {}
+        rows = self.db.query(ActivityModel.content_hash, ActivityModel.id).filter(
+            ActivityModel.content_hash.in_(content_hashes)
+        ).all()
+        return dict(rows)
+
+    def count(self, activity_types: Optional[List[str]] = None) -> int:
+        """Count activities, optionally only those of the given types."""
+        query = self.db.query(ActivityModel)
+        if activity_types:
+            query = query.filter(ActivityModel.activity_type.in_(activity_types))
+        return query.count()
+
+    def summarize(
+        self,
+        period: Optional[str] = None,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Total activities per activity type, and per period if given, in a single GROUP BY.
+
+        period is daily, weekly or monthly; periods are truncated in the
+        database with date_trunc (date() modifiers on SQLite). start and end
+        are inclusive bounds on the activity date.
+
+        Returns dicts with activity_type, date (the period start, only with
+        a period), activity_count, duration, total_distance, avg_heart_rate
+        and heart_rate_count (activities with a heart rate), ordered by date
+        and activity type.
+        """
+        columns = [ActivityModel.activity_type]
+        if period is not None:
+            columns.insert(0, _period_start_column(self.db.get_bind().dialect.name, period).label('date'))
+
+        stmt = select(
+            *columns,
+            func.count(ActivityModel.id).label('activity_count'),
+            func.sum(ActivityModel.duration).label('duration'),
+            func.sum(ActivityModel.total_distance).label('total_distance'),
+            func.avg(ActivityModel.avg_heart_rate).label('avg_heart_rate'),
+            func.count(ActivityModel.avg_heart_rate).label('heart_rate_count')
+        ).group_by(*columns).order_by(*columns)
+        if activity_types:
+            stmt = stmt.where(ActivityModel.activity_type.in_(activity_types))
+        if start is not None:
+            stmt = stmt.where(ActivityModel.activity_date >= start)
+        if end is not None:
+            stmt = stmt.where(ActivityModel.activity_date <= end)
+
+        rows = []
+        for row in self.db.execute(stmt).mappings():
+            row = dict(row)
+            if isinstance(row.get('date'), str):
+                # SQLite returns dates as text
+                row['date'] = datetime.fromisoformat(row['date'])
+            rows.append(row)
+        return rows
+
+    def iter_summaries(self, chunk_size: int = 10000) -> Iterator[List[Tuple]]:
+        """
+        Stream (activity_type, activity_date, duration, total_distance) rows
+        of all activities, in chunks of up to chunk_size rows.
+        """
+        stmt = select(
+            ActivityModel.activity_type,
+            ActivityModel.activity_date,
+            ActivityModel.duration,
+            ActivityModel.total_distance
+        )
+        result = self.db.execute(stmt.execution_options(yield_per=chunk_size))
+        try:
+            for rows in result.partitions():
+                yield rows
+        finally:
+            result.close()
+
+    def get_ids_and_types(self) -> List[Tuple[int, str]]:
+        """Get (id, activity_type) of all activities, ordered by ID."""
+        return self.db.query(ActivityModel.id, ActivityModel.activity_type).order_by(ActivityModel.id).all()
+
+    def set_metrics(self, activity_id: int, metrics: Optional[Dict[str, Any]]) -> None:
+        """Replace the stored metrics of an activity."""
+        self.db.execute(update(ActivityModel).where(ActivityModel.id == activity_id).values(metrics=metrics))
+        # Let service handle commit
+
     def get_by_type(self, activity_type: str, eager_load: bool = False) -> List[ActivityModel]:
         """
         Get all activities of a specific type.
@@ -0,0 +1,99 @@
+"""
+Async repositories - the read queries of the API on an AsyncSession.
+
+Used instead of the synchronous repositories when Config.DB_ASYNC is on.
+The statements are built by the same functions as in the synchronous
+repositories, so both return the same rows. Writes stay synchronous.
+"""
+from typing import List, Optional, Sequence, Tuple, Union
+from datetime import datetime
+from sqlalchemy import Row, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from app.config import Config
+from app.database import ActivityModel, GPSStreamModel
+from app.gps_stream import GPSStream
+from app.repositories.activity_repository import select_list, select_page
+from app.repositories.gps_point_repository import select_stream, stream_from_rows
+from app.repositories.personal_best_repository import select_rows
+from app.stream_codec import decode_stream
+
+
+class AsyncActivityRepository:
+    """Async counterpart of the read methods of ActivityRepository."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+
+    async def get_by_id(self, activity_id: int) -> Optional[ActivityModel]:
+        """Get a specific activity by ID, with its metrics loaded (lazy loads are not possible here)."""
+        return await self.db.get(ActivityModel, activity_id, options=[undefer(ActivityModel.metrics)])
+
+    async def get_all_rows(self, activity_types: Optional[Sequence[str]] = None) -> List[Row]:
+        """Get all activities as rows of LIST_COLUMNS, as ActivityRepository.get_all_rows."""
+        return (await self.db.execute(select_list(activity_types))).all()
+
+    async def get_page(
+        self,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Row]:
+        """Get one keyset page of activities, as ActivityRepository.get_page."""
+        return (await self.db.execute(select_page(limit, after, activity_types, start, end))).all()
+
+    async def count(self, activity_types: Optional[List[str]] = None) -> int:
+        """Count activities, optionally only those of the given types."""
+        stmt = select(func.count()).select_from(ActivityModel)
+        if activity_types:
+            stmt = stmt.where(ActivityModel.activity_type.in_(activity_types))
+        return (await self.db.execute(stmt)).scalar_one()
+
+
+class AsyncGPSPointRepository:
+    """Async counterpart of the stream reads of GPSPointRepository."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+
+    async def get_stream(self, activity_id: int) -> GPSStream:
+        """Get all GPS points for a specific activity as a columnar GPS stream."""
+        return stream_from_rows((await self.db.execute(select_stream(activity_id))).all())
+
+
+class AsyncGPSStreamRepository:
+    """Async counterpart of the stream reads of GPSStreamRepository."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+
+    async def get_stream(self, activity_id: int) -> GPSStream:
+        """Get all GPS points for a specific activity as a columnar GPS stream, falling back to gps_points."""
+        model = await self.db.get(GPSStreamModel, activity_id)
+        if model is None:
+            return await AsyncGPSPointRepository(self.db).get_stream(activity_id)
+        return decode_stream(model.data)
+
+
+def get_async_gps_repository(db: AsyncSession) -> Union[AsyncGPSPointRepository, AsyncGPSStreamRepository]:
+    """The async GPS point repository for the storage selected by Config.GPS_STORAGE."""
+    if Config.GPS_STORAGE == 'columnar':
+        return AsyncGPSStreamRepository(db)
+    return AsyncGPSPointRepository(db)
+
+
+class AsyncPersonalBestRepository:
+    """Async counterpart of the read methods of PersonalBestRepository."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+
+    async def get_all_rows(self, activity_type: Optional[str] = None) -> List[Row]:
+        """Get all personal bests, or those of one activity type, as PersonalBestRepository.get_all_rows."""
+        return (await self.db.execute(select_rows(activity_type))).all()
@@ -1,9 +1,17 @@
 """
 GPS Point repository - handles all database operations for GPS points.
 """
-from typing import List, Dict, Any
+import csv
+import io
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
-from app.database import GPSPointModel
+from app.database import ActivityModel, GPSPointModel
+from app.gps_stream import GPSStream, TIMESTAMP_DTYPE
+
+# Column order of the rows passed to _bulk_insert
+INSERT_COLUMNS = ('activity_id', 'timestamp', 'latitude', 'longitude', 'distance', 'speed', 'heart_rate')
 
 
 class GPSPointRepository:
@@ -15,30 +23,176 @@ class GPSPointRepository:
 
     def create_batch(self, activity_id: int, points: List[Dict[str, Any]]) -> None:
         """Create multiple GPS points for an activity."""
-        gps_points = [
-            GPSPointModel(
-                activity_id=activity_id,
-                timestamp=p['timestamp'],
-                latitude=p.get('latitude'),
-                longitude=p.get('longitude'),
-                distance=p['distance'],
-                speed=p.get('speed'),
-                heart_rate=p.get('heart_rate')
+        self._bulk_insert([
+            (
+                activity_id,
+                p['timestamp'],
+                p.get('latitude'),
+                p.get('longitude'),
+                p['distance'],
+                p.get('speed'),
+                p.get('heart_rate')
             )
             for p in points
-        ]
-        self.db.add_all(gps_points)
+        ])
+        # Let service handle commit
+
+    def create_stream(self, activity_id: int, stream: GPSStream) -> None:
+        """Create GPS points for an activity from a columnar GPS stream."""
+        self._bulk_insert([(activity_id, *row) for row in stream.rows()])
         # Let service handle commit
 
+    def create_batches(self, activity_id: int, batches: Iterable[GPSStream]) -> GPSStream:
+        """
+        Create GPS points for an activity from streamed batches, inserting each batch as it arrives.
+
+        Returns all the points as one stream, so callers need not read them
+        back. The whole activity is therefore held in memory as columns (48
+        bytes per point, twice that while the batches are joined), not just
+        one batch: best efforts, metrics and the stream cache need the
+        complete stream, and reading it back would query every row just
+        inserted. What streaming avoids is a Python object per point.
+        """
+        stored = []
+        for batch in batches:
+            self.create_stream(activity_id, batch)
+            stored.append(batch)
+        # Let service handle commit
+        return GPSStream.concatenate(stored)
+
+    def _bulk_insert(self, rows: List[Tuple]) -> None:
+        """
+        Insert GPS point rows in a single round trip, bypassing the ORM unit of work.
+
+        Uses COPY FROM STDIN on PostgreSQL and an executemany Core insert
+        elsewhere. Rows are written in the session's current transaction.
+        """
+        if not rows:
+            return
+
+        connection = self.db.connection()
+        if connection.dialect.name == 'postgresql':
+            self._copy_rows(connection, rows)
+        else:
+            connection.execute(
+                GPSPointModel.__table__.insert(),
+                [dict(zip(INSERT_COLUMNS, row)) for row in rows]
+            )
+
+    @staticmethod
+    def _copy_rows(connection, rows: List[Tuple]) -> None:
+        """Stream rows to PostgreSQL with COPY ... FROM STDIN in CSV format."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+
+        copy_sql = (
+            f"COPY {GPSPointModel.__tablename__} ({', '.join(INSERT_COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT csv)"
+        )
+        with connection.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, buffer)
+
     def get_by_activity(self, activity_id: int) -> List[GPSPointModel]:
         """Get all GPS points for a specific activity."""
         return self.db.query(GPSPointModel).filter(
             GPSPointModel.activity_id == activity_id
         ).order_by(GPSPointModel.timestamp).all()
 
+    def get_stream(self, activity_id: int) -> GPSStream:
+        """Get all GPS points for a specific activity as a columnar GPS stream."""
+        return stream_from_rows(self.db.execute(select_stream(activity_id)).all())
+
+    def iter_distance_rows(
+        self, activity_types: Optional[Sequence[str]] = None, chunk_size: int = 10000
+    ) -> Iterator[List[Tuple]]:
+        """
+        Stream (activity_id, activity_type, activity_date, timestamp, distance) rows
+        for all activities, in chunks of up to chunk_size rows.
+
+        Rows are ordered by activity and timestamp and fetched through a
+        server-side cursor, so the whole table is never held in memory.
+        """
+        stmt = select(
+            ActivityModel.id,
+            ActivityModel.activity_type,
+            ActivityModel.activity_date,
+            GPSPointModel.timestamp,
+            GPSPointModel.distance
+        ).join(
+            GPSPointModel, GPSPointModel.activity_id == ActivityModel.id
+        ).order_by(ActivityModel.id, GPSPointModel.timestamp)
+        if activity_types:
+            stmt = stmt.where(ActivityModel.activity_type.in_(activity_types))
+
+        result = self.db.execute(stmt.execution_options(yield_per=chunk_size))
+        try:
+            for rows in result.partitions():
+                yield rows
+        finally:
+            result.close()
+
+    def iter_distance_chunks(
+        self, activity_types: Optional[Sequence[str]] = None, chunk_size: int = 10000
+    ) -> Iterator[List[Tuple]]:
+        """
+        Stream the elapsed seconds and cumulative distances of all activities.
+
+        Rows from iter_distance_rows are grouped into chunks of whole
+        activities of about chunk_size points, as (activity_id,
+        activity_type, activity_date, elapsed seconds, distances) tuples of
+        NumPy arrays, ready for best_efforts_for_activities.
+        """
+        chunk, chunk_points = [], 0
+        current, timestamps, distances = None, [], []
+
+        def finish_activity():
+            seconds = np.array(timestamps, dtype=TIMESTAMP_DTYPE)
+            seconds = (seconds - seconds[0]) / np.timedelta64(1, 's')
+            chunk.append((*current, seconds, np.array(distances, dtype=np.float64)))
+
+        for rows in self.iter_distance_rows(activity_types, chunk_size):
+            for activity_id, activity_type, activity_date, timestamp, distance in rows:
+                if current is None or current[0] != activity_id:
+                    if current is not None:
+                        finish_activity()
+                        if chunk_points >= chunk_size:
+                            yield chunk
+                            chunk, chunk_points = [], 0
+                    current, timestamps, distances = (activity_id, activity_type, activity_date), [], []
+                timestamps.append(timestamp)
+                distances.append(distance)
+                chunk_points += 1
+
+        if current is not None:
+            finish_activity()
+        if chunk:
+            yield chunk
+
     def delete_by_activity(self, activity_id: int) -> None:
         """Delete all GPS points for a specific activity."""
         self.db.query(GPSPointModel).filter(
             GPSPointModel.activity_id == activity_id
         ).delete()
         # Let service handle commit
+
+
+def select_stream(activity_id: int) -> Select:
+    """The stream columns of an activity's GPS points, in timestamp order."""
+    return select(
+        GPSPointModel.timestamp,
+        GPSPointModel.latitude,
+        GPSPointModel.longitude,
+        GPSPointModel.distance,
+        GPSPointModel.speed,
+        GPSPointModel.heart_rate
+    ).where(
+        GPSPointModel.activity_id == activity_id
+    ).order_by(GPSPointModel.timestamp)
+
+
+def stream_from_rows(rows: Sequence[Tuple]) -> GPSStream:
+    """Columnar GPS stream of the rows selected by select_stream."""
+    if not rows:
+        return GPSStream.empty()
+    return GPSStream(*zip(*rows))
@@ -0,0 +1,127 @@
+"""
+GPS Stream repository - GPS points stored as one compressed columnar blob per activity.
+"""
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import Config
+from app.database import ActivityModel, GPSPointModel, GPSStreamModel
+from app.gps_stream import GPSStream
+from app.repositories.gps_point_repository import GPSPointRepository
+from app.stream_codec import decode_stream, encode_stream
+
+# Blobs fetched per round trip by iter_distance_chunks
+BLOBS_PER_FETCH = 64
+
+
+class GPSStreamRepository:
+    """
+    Repository for GPS points kept in gps_streams.
+
+    Has the same stream interface as GPSPointRepository, but an activity's
+    points are one row, so reading them back decodes a single blob straight
+    into arrays instead of materializing a row per point. Activities stored
+    in gps_points before GPS_STORAGE was switched are read from there until
+    they are backfilled (ActivityService.backfill_gps_streams).
+    """
+
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+
+    def create_stream(self, activity_id: int, stream: GPSStream) -> None:
+        """Store GPS points for an activity, appending them to any points already stored."""
+        if not len(stream):
+            return
+        model = self.db.get(GPSStreamModel, activity_id)
+        if model is None:
+            model = GPSStreamModel(activity_id=activity_id)
+            self.db.add(model)
+        else:
+            stream = GPSStream.concatenate([decode_stream(model.data), stream])
+        model.point_count = len(stream)
+        model.data = encode_stream(stream)
+        self.db.flush()
+        # Let service handle commit
+
+    def create_batches(self, activity_id: int, batches: Iterable[GPSStream]) -> GPSStream:
+        """
+        Store GPS points for an activity from streamed batches.
+
+        The batches are joined and encoded once, rather than re-encoding the
+        blob for every batch, so the whole activity is held in memory as
+        columns, as with GPSPointRepository.create_batches. Returns all the
+        points as one stream.
+        """
+        stream = GPSStream.concatenate(list(batches))
+        self.create_stream(activity_id, stream)
+        # Let service handle commit
+        return stream
+
+    def get_stream(self, activity_id: int) -> GPSStream:
+        """Get all GPS points for a specific activity as a columnar GPS stream, falling back to gps_points."""
+        model = self.db.get(GPSStreamModel, activity_id)
+        if model is None:
+            return GPSPointRepository(self.db).get_stream(activity_id)
+        return decode_stream(model.data)
+
+    def get_unconverted_ids(self, activity_types: Optional[Sequence[str]] = None) -> List[int]:
+        """IDs of the activities with GPS points in gps_points but no gps_streams row."""
+        stmt = select(ActivityModel.id).where(
+            select(GPSPointModel.id).where(GPSPointModel.activity_id == ActivityModel.id).exists(),
+            ~select(GPSStreamModel.activity_id).where(GPSStreamModel.activity_id == ActivityModel.id).exists()
+        ).order_by(ActivityModel.id)
+        if activity_types:
+            stmt = stmt.where(ActivityModel.activity_type.in_(activity_types))
+        return list(self.db.execute(stmt).scalars())
+
+    def iter_distance_chunks(
+        self, activity_types: Optional[Sequence[str]] = None, chunk_size: int = 10000
+    ) -> Iterator[List[Tuple]]:
+        """
+        Stream the elapsed seconds and cumulative distances of all activities.
+
+        Yields chunks of whole activities of about chunk_size points as
+        (activity_id, activity_type, activity_date, elapsed seconds,
+        distances) tuples, like GPSPointRepository.iter_distance_chunks.
+        Blobs are fetched through a server-side cursor and decoded one at a time.
+        """
+        stmt = select(
+            ActivityModel.id,
+            ActivityModel.activity_type,
+            ActivityModel.activity_date,
+            GPSStreamModel.data
+        ).join(
+            GPSStreamModel, GPSStreamModel.activity_id == ActivityModel.id
+        ).order_by(ActivityModel.id)
+        if activity_types:
+            stmt = stmt.where(ActivityModel.activity_type.in_(activity_types))
+
+        chunk, chunk_points = [], 0
+        result = self.db.execute(stmt.execution_options(yield_per=BLOBS_PER_FETCH))
+        try:
+            for activity_id, activity_type, activity_date, data in result:
+                stream = decode_stream(data)
+                chunk.append((activity_id, activity_type, activity_date, stream.elapsed_seconds(), stream.distances))
+                chunk_points += len(stream)
+                if chunk_points >= chunk_size:
+                    yield chunk
+                    chunk, chunk_points = [], 0
+        finally:
+            result.close()
+        if chunk:
+            yield chunk
+
+    def delete_by_activity(self, activity_id: int) -> None:
+        """Delete all GPS points for a specific activity."""
+        self.db.query(GPSStreamModel).filter(
+            GPSStreamModel.activity_id == activity_id
+        ).delete()
+        # Let service handle commit
+
+
+def get_gps_repository(db: Session) -> Union[GPSPointRepository, GPSStreamRepository]:
+    """The GPS point repository for the storage selected by Config.GPS_STORAGE."""
+    if Config.GPS_STORAGE == 'columnar':
+        return GPSStreamRepository(db)
+    return GPSPointRepository(db)
@@ -0,0 +1,129 @@
+"""
+Ingest job repository - handles all database operations for ingest jobs.
+"""
+from typing import List, Optional, Sequence
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.database import IngestJobModel
+
+# Job status -> column recording when the job entered it
+STAGE_TIMESTAMPS = {
+    'parsing': 'parsing_started_at',
+    'persisting': 'persisting_started_at',
+    'done': 'finished_at',
+    'failed': 'finished_at',
+}
+
+# Statuses of jobs that have not finished yet
+IN_FLIGHT_STATUSES = ('queued', 'parsing', 'persisting')
+
+
+class IngestJobRepository:
+    """Repository for IngestJob data access."""
+
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+
+    def create(self, file_path: str, content_hash: Optional[str] = None) -> IngestJobModel:
+        """Create a new queued ingest job."""
+        job = IngestJobModel(
+            file_path=file_path,
+            content_hash=content_hash,
+            status='queued',
+            duplicate=False,
+            created_at=datetime.now()
+        )
+        self.db.add(job)
+        self.db.flush()  # Flush to get the ID without committing
+        return job
+
+    def get_by_id(self, job_id: int) -> Optional[IngestJobModel]:
+        """Get a specific ingest job by ID."""
+        return self.db.query(IngestJobModel).filter(IngestJobModel.id == job_id).first()
+
+    def get_by_status(self, statuses: Sequence[str]) -> List[IngestJobModel]:
+        """Get the jobs in any of the given statuses, oldest first."""
+        return (
+            self.db.query(IngestJobModel)
+            .filter(IngestJobModel.status.in_(statuses))
+            .order_by(IngestJobModel.id)
+            .all()
+        )
+
+    def claim(self, job_id: int) -> bool:
+        """
+        Move a queued job to parsing in one UPDATE, so only one worker runs it.
+
+        Returns False if the job is not queued, e.g. because another worker
+        claimed it first.
+        """
+        result = self.db.execute(
+            update(IngestJobModel)
+            .where(IngestJobModel.id == job_id, IngestJobModel.status == 'queued')
+            .values(status='parsing', parsing_started_at=datetime.now())
+        )
+        # Let service handle commit
+        return result.rowcount == 1
+
+    def release(self, job_id: int) -> bool:
+        """
+        Move a claimed job back to queued, undoing claim.
+
+        Returns False if the job is no longer parsing, e.g. because it was
+        finished in the meantime.
+        """
+        result = self.db.execute(
+            update(IngestJobModel)
+            .where(IngestJobModel.id == job_id, IngestJobModel.status == 'parsing')
+            .values(status='queued', parsing_started_at=None)
+        )
+        # Let service handle commit
+        return result.rowcount == 1
+
+    def has_in_flight_before(self, job_id: int, content_hash: str) -> bool:
+        """Whether a job created before job_id for the same content has not finished yet."""
+        return self.db.query(
+            self.db.query(IngestJobModel)
+            .filter(
+                IngestJobModel.content_hash == content_hash,
+                IngestJobModel.id < job_id,
+                IngestJobModel.status.in_(IN_FLIGHT_STATUSES)
+            )
+            .exists()
+        ).scalar()
+
+    def get_queued_ids_by_hash(self, content_hash: str, after_id: int) -> List[int]:
+        """IDs of the queued jobs for the same content created after after_id, oldest first."""
+        rows = (
+            self.db.query(IngestJobModel.id)
+            .filter(
+                IngestJobModel.content_hash == content_hash,
+                IngestJobModel.id > after_id,
+                IngestJobModel.status == 'queued'
+            )
+            .order_by(IngestJobModel.id)
+            .all()
+        )
+        return [job_id for job_id, in rows]
+
+    def set_status(
+        self,
+        job: IngestJobModel,
+        status: str,
+        activity_id: Optional[int] = None,
+        error: Optional[str] = None
+    ) -> IngestJobModel:
+        """Move a job to a new stage and record when it got there."""
+        if status not in STAGE_TIMESTAMPS:
+            raise ValueError(f"Invalid ingest job status: {status}")
+
+        job.status = status
+        setattr(job, STAGE_TIMESTAMPS[status], datetime.now())
+        if activity_id is not None:
+            job.activity_id = activity_id
+        if error is not None:
+            job.error = error
+        # Let service handle commit
+        return job
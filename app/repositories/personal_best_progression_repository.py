@@ -0,0 +1,79 @@
+"""
+Personal best progression repository - handles all database operations for the personal best timeline.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import Row, select
+from sqlalchemy.orm import Session
+from app.database import PersonalBestProgressionModel
+from app.validation import validate_activity_type, validate_positive_number
+
+
+class PersonalBestProgressionRepository:
+    """Repository for personal best progression data access."""
+
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Append personal best improvements to the timeline.
+
+        records are dicts with the PersonalBestModel columns, as passed to
+        PersonalBestRepository.upsert_many. They are inserted with one Core
+        executemany, without loading them into the session.
+        """
+        if not records:
+            return
+
+        rows = []
+        for record in records:
+            validate_activity_type(record['activity_type'])
+            validate_positive_number(record['distance'], "distance")
+            validate_positive_number(record['best_time'], "best_time")
+            validate_positive_number(record['avg_pace'], "avg_pace")
+            rows.append({**record, 'activity_type': record['activity_type'].lower()})
+
+        self.db.connection().execute(PersonalBestProgressionModel.__table__.insert(), rows)
+        # Let service handle commit
+
+    def delete_many(self, entry_ids: Sequence[int]) -> None:
+        """Delete timeline entries by ID."""
+        if not entry_ids:
+            return
+        table = PersonalBestProgressionModel.__table__
+        self.db.connection().execute(table.delete().where(table.c.id.in_(entry_ids)))
+        # Let service handle commit
+
+    def replace_all(
+        self, records: List[Dict[str, Any]], activity_types: Optional[Sequence[str]] = None
+    ) -> None:
+        """Replace the timeline of the given activity types (all types if None) with records."""
+        table = PersonalBestProgressionModel.__table__
+        delete = table.delete()
+        if activity_types:
+            delete = delete.where(table.c.activity_type.in_(activity_types))
+
+        connection = self.db.connection()
+        connection.execute(delete)
+        if records:
+            connection.execute(table.insert(), records)
+        # Let service handle commit
+
+    def get_by_type(self, activity_type: str, distance: Optional[float] = None) -> List[Row]:
+        """
+        Get the timeline of an activity type, optionally for one distance only, as rows.
+
+        Ordered by distance and achieved date, which the
+        (activity_type, distance, achieved_date) index serves directly.
+        """
+        stmt = select(*PersonalBestProgressionModel.__table__.columns).where(
+            PersonalBestProgressionModel.activity_type == activity_type
+        )
+        if distance is not None:
+            stmt = stmt.where(PersonalBestProgressionModel.distance == distance)
+        return self.db.execute(stmt.order_by(
+            PersonalBestProgressionModel.distance,
+            PersonalBestProgressionModel.achieved_date,
+            PersonalBestProgressionModel.id
+        )).all()
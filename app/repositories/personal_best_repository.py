@@ -1,12 +1,23 @@
 """
 Personal Best repository - handles all database operations for personal bests.
 """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
+from sqlalchemy import Row, Select, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from app.database import PersonalBestModel
 from app.validation import validate_activity_type, validate_positive_number
 
+# Dialect-specific INSERT constructs that support ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+# Columns replaced when a personal best is improved
+UPDATE_COLUMNS = ('best_time', 'avg_pace', 'activity_id', 'achieved_date')
+
 
 class PersonalBestRepository:
     """Repository for Personal Best data access."""
@@ -72,15 +83,104 @@ class PersonalBestRepository:
         # Let service handle commit
         return pb
 
+    def upsert_many(self, records: List[Dict[str, Any]]) -> List[Tuple[str, float]]:
+        """
+        Insert new personal bests and improve existing ones in a single statement.
+
+        records are dicts with activity_type, distance, best_time, avg_pace,
+        activity_id and achieved_date, at most one per (activity_type,
+        distance). Runs INSERT ... ON CONFLICT (activity_type, distance)
+        DO UPDATE ... WHERE excluded.best_time < personal_bests.best_time, so
+        a record only replaces a slower one, even if another transaction
+        wrote it in the meantime. Dialects without ON CONFLICT fall back to
+        one query per record.
+
+        Returns (activity_type, distance) of the rows written.
+        """
+        if not records:
+            return []
+
+        rows = []
+        for record in records:
+            validate_activity_type(record['activity_type'])
+            validate_positive_number(record['distance'], "distance")
+            validate_positive_number(record['best_time'], "best_time")
+            validate_positive_number(record['avg_pace'], "avg_pace")
+            rows.append({**record, 'activity_type': record['activity_type'].lower()})
+
+        connection = self.db.connection()
+        insert = UPSERT_INSERTS.get(connection.dialect.name)
+        if insert is None:
+            return self._upsert_one_by_one(rows)
+
+        table = PersonalBestModel.__table__
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['activity_type', 'distance'],
+            set_={column: stmt.excluded[column] for column in UPDATE_COLUMNS},
+            where=stmt.excluded.best_time < table.c.best_time
+        ).returning(table.c.activity_type, table.c.distance)
+        # Let service handle commit
+        return [tuple(row) for row in connection.execute(stmt)]
+
+    def _upsert_one_by_one(self, rows: List[Dict[str, Any]]) -> List[Tuple[str, float]]:
+        written = []
+        for row in rows:
+            existing = self.get_by_type_and_distance(row['activity_type'], row['distance'])
+            if existing is None:
+                self.create(**row)
+            elif row['best_time'] < existing.best_time:
+                self.update(existing, **{column: row[column] for column in UPDATE_COLUMNS})
+            else:
+                continue
+            written.append((row['activity_type'], row['distance']))
+        self.db.flush()
+        return written
+
+    def replace_all(
+        self, records: List[Dict[str, Any]], activity_types: Optional[Sequence[str]] = None
+    ) -> None:
+        """
+        Replace the personal bests of the given activity types (all types if None) with records.
+
+        Runs in the session's transaction, so readers see either the old or
+        the new set once the service commits.
+        """
+        table = PersonalBestModel.__table__
+        delete = table.delete()
+        if activity_types:
+            delete = delete.where(table.c.activity_type.in_(activity_types))
+
+        connection = self.db.connection()
+        connection.execute(delete)
+        if records:
+            connection.execute(table.insert(), records)
+        # Let service handle commit
+
     def get_by_type(self, activity_type: str) -> List[PersonalBestModel]:
         """Get all personal bests for a specific activity type."""
         return self.db.query(PersonalBestModel).filter(
             PersonalBestModel.activity_type == activity_type
         ).order_by(PersonalBestModel.distance).all()
 
+    def get_all_rows(self, activity_type: Optional[str] = None) -> List[Row]:
+        """
+        Get all personal bests, or those of one activity type, ordered by
+        activity type and distance, as rows rather than ORM objects.
+        """
+        return self.db.execute(select_rows(activity_type)).all()
+
     def get_all(self) -> List[PersonalBestModel]:
         """Get all personal bests."""
         return self.db.query(PersonalBestModel).order_by(
             PersonalBestModel.activity_type,
             PersonalBestModel.distance
         ).all()
+
+
+def select_rows(activity_type: Optional[str] = None) -> Select:
+    """All personal best columns, of one activity type if given, ordered by activity type and distance."""
+    stmt = select(*PersonalBestModel.__table__.columns)
+    if activity_type is not None:
+        stmt = stmt.where(PersonalBestModel.activity_type == activity_type)
+    return stmt.order_by(PersonalBestModel.activity_type, PersonalBestModel.distance)
@@ -0,0 +1,97 @@
+"""
+Time aggregation repository - handles all database operations for daily/weekly/monthly activity totals.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.database import TimeAggregationModel
+from app.repositories.personal_best_repository import UPSERT_INSERTS
+
+# Columns that are summed when changes are added to a bucket
+SUM_COLUMNS = ('duration', 'total_distance', 'activity_count')
+
+# Columns identifying a bucket
+BUCKET_COLUMNS = ('aggregation_type', 'activity_type', 'date')
+
+
+class TimeAggregationRepository:
+    """Repository for time aggregation data access."""
+
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+
+    def add_many(self, changes: List[Dict[str, Any]]) -> None:
+        """
+        Add changes to the totals of their buckets.
+
+        changes are dicts with aggregation_type, activity_type, date (the
+        period start), duration, total_distance and activity_count, at most
+        one per bucket; negative values subtract, e.g. for a deleted
+        activity. Runs a single INSERT ... ON CONFLICT DO UPDATE that adds
+        to existing buckets, then drops buckets left without activities.
+        Dialects without ON CONFLICT fall back to one query per bucket.
+        """
+        if not changes:
+            return
+
+        connection = self.db.connection()
+        table = TimeAggregationModel.__table__
+        insert = UPSERT_INSERTS.get(connection.dialect.name)
+        if insert is None:
+            self._add_one_by_one(changes)
+        else:
+            stmt = insert(table).values(changes)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(BUCKET_COLUMNS),
+                set_={column: table.c[column] + stmt.excluded[column] for column in SUM_COLUMNS}
+            )
+            connection.execute(stmt)
+
+        if any(change['activity_count'] < 0 for change in changes):
+            connection.execute(table.delete().where(table.c.activity_count <= 0))
+        # Let service handle commit
+
+    def _add_one_by_one(self, changes: List[Dict[str, Any]]) -> None:
+        for change in changes:
+            bucket = self.db.query(TimeAggregationModel).filter_by(
+                **{column: change[column] for column in BUCKET_COLUMNS}
+            ).first()
+            if bucket is None:
+                self.db.add(TimeAggregationModel(**change))
+            else:
+                for column in SUM_COLUMNS:
+                    setattr(bucket, column, getattr(bucket, column) + change[column])
+        self.db.flush()
+
+    def replace_all(self, buckets: List[Dict[str, Any]]) -> None:
+        """Replace all buckets, e.g. after recomputing them from the activities."""
+        table = TimeAggregationModel.__table__
+        connection = self.db.connection()
+        connection.execute(table.delete())
+        if buckets:
+            connection.execute(table.insert(), buckets)
+        # Let service handle commit
+
+    def get_buckets(
+        self,
+        aggregation_type: str,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[TimeAggregationModel]:
+        """
+        Get the buckets of one period type, ordered by date and activity type.
+
+        start and end are inclusive bounds on the period start.
+        """
+        query = self.db.query(TimeAggregationModel).filter(
+            TimeAggregationModel.aggregation_type == aggregation_type
+        )
+        if activity_types:
+            query = query.filter(TimeAggregationModel.activity_type.in_(activity_types))
+        if start is not None:
+            query = query.filter(TimeAggregationModel.date >= start)
+        if end is not None:
+            query = query.filter(TimeAggregationModel.date <= end)
+        return query.order_by(TimeAggregationModel.date, TimeAggregationModel.activity_type).all()
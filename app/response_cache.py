@@ -0,0 +1,155 @@
+"""
+Cached responses of read-heavy endpoints, with ETags.
+
+A cached endpoint's response is stored under its path and query string
+together with the current generation of each namespace of data it shows
+(activities, personal bests). Services invalidate a namespace after they
+commit a change to it by giving it a new random generation, which makes
+every response stored under the old one unreachable; those entries then
+age out of the backend. Generations are never reused, so a lost
+generation (an evicted or expired entry, a restarted process) only causes
+misses, never stale responses.
+
+Every response carries an ETag, the hash of its body. A request whose
+If-None-Match matches the cached response gets a 304 without the database
+being queried.
+
+Config.RESPONSE_CACHE selects the backend: 'memory' (per process LRU),
+a redis:// URL (shared by all processes; needs the redis package) or ''
+to disable caching. Writes made outside the services, or by another process
+with the memory backend, show up once RESPONSE_CACHE_TTL has passed.
+"""
+import hashlib
+import uuid
+from typing import Awaitable, Callable, NamedTuple, Optional, Sequence, Union
+from fastapi import Request, Response
+from app.cache import LRUCache, RedisCache
+from app.config import Config
+
+# Namespaces of cached data
+ACTIVITIES = 'activities'
+PERSONAL_BESTS = 'personal_bests'
+
+
+class CachedResponse(NamedTuple):
+    """Body of a successful response with its media type and ETag."""
+    etag: str
+    media_type: str
+    body: bytes
+
+    def pack(self) -> bytes:
+        return f"{self.etag}\n{self.media_type}\n".encode() + self.body
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'CachedResponse':
+        etag, media_type, body = data.split(b'\n', 2)
+        return cls(etag.decode(), media_type.decode(), body)
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag of a response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value names etag (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+class ResponseCache:
+    """Responses keyed by request and namespace generations, in a LRUCache or RedisCache."""
+
+    def __init__(self, backend: Union[LRUCache, RedisCache]):
+        self.backend = backend
+
+    def _generation(self, namespace: str) -> str:
+        key = f"generation:{namespace}"
+        generation = self.backend.get(key)
+        if generation is None:
+            generation = uuid.uuid4().hex.encode()
+            self.backend.put(key, generation)
+        return generation.decode()
+
+    def key(self, request: Request, namespaces: Sequence[str]) -> str:
+        """Key of the response to request, which shows data of the given namespaces."""
+        generations = '.'.join(self._generation(namespace) for namespace in namespaces)
+        query = '&'.join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        return f"response:{generations}:{request.url.path}?{query}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        data = self.backend.get(key)
+        return CachedResponse.unpack(data) if data is not None else None
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        self.backend.put(key, response.pack())
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Make every cached response showing data of the namespaces unreachable."""
+        for namespace in namespaces:
+            self.backend.put(f"generation:{namespace}", uuid.uuid4().hex.encode())
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_setting: Optional[str] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the shared response cache, or None if RESPONSE_CACHE is empty."""
+    global _cache, _cache_setting
+    if not Config.RESPONSE_CACHE:
+        return None
+    if _cache is None or _cache_setting != Config.RESPONSE_CACHE:
+        if Config.RESPONSE_CACHE == 'memory':
+            backend = LRUCache(Config.RESPONSE_CACHE_SIZE, Config.RESPONSE_CACHE_TTL)
+        else:
+            import redis  # Only needed for a Redis backend
+            backend = RedisCache(redis.Redis.from_url(Config.RESPONSE_CACHE), Config.RESPONSE_CACHE_TTL)
+        _cache, _cache_setting = ResponseCache(backend), Config.RESPONSE_CACHE
+    return _cache
+
+
+def invalidate(*namespaces: str) -> None:
+    """Invalidate cached responses of the namespaces; call after committing a change to them."""
+    cache = get_response_cache()
+    if cache is None:
+        return
+    try:
+        cache.invalidate(*namespaces)
+    except Exception as e:
+        # Keep the committed write; the entries expire after RESPONSE_CACHE_TTL
+        print(f"Error invalidating cached responses of {', '.join(namespaces)}: {e}")
+
+
+async def cached_response(
+    request: Request, namespaces: Sequence[str], build: Callable[[], Awaitable[Response]]
+) -> Response:
+    """
+    Respond to request from the cache, or with await build() stored in the cache.
+
+    namespaces are the data the response shows. build runs only on a miss
+    and only successful responses are stored. Either way the response has
+    an ETag, and a request whose If-None-Match matches it gets a 304.
+    """
+    cache = get_response_cache()
+    key = cache.key(request, namespaces) if cache is not None else None
+    cached = cache.get(key) if cache is not None else None
+
+    if cached is None:
+        response = await build()
+        if response.status_code != 200:
+            return response
+        cached = CachedResponse(etag_for(response.body), response.media_type, response.body)
+        if cache is not None:
+            cache.put(key, cached)
+
+    # Clients may keep the response but must revalidate it with the ETag
+    headers = {'ETag': cached.etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type=cached.media_type, headers=headers)
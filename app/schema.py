@@ -0,0 +1,148 @@
+"""
+Database schema versioning with Alembic.
+
+Tables are created and changed only by the migrations in migrations/. The
+app does not create tables itself; at startup it reads the revision stored
+in alembic_version, compares it with the head of the migration scripts and
+checks that every table and column of the models exists, so a database
+stamped at a revision it was never migrated to is caught too.
+"""
+import os
+from typing import List, Optional
+from alembic import command, op
+from alembic.config import Config as AlembicConfig
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+from app import database
+from app.exceptions import SchemaVersionError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The schema of the first release, which init_db created before migrations existed
+BASELINE_REVISION = '3f1c2a9d8b7e'
+
+
+def alembic_config(connection: Optional[Connection] = None) -> AlembicConfig:
+    """
+    Alembic configuration for this project, independent of the working directory.
+
+    Migrations run against Config.DATABASE_URL, or against connection if one is given.
+    """
+    config = AlembicConfig(os.path.join(ROOT, 'alembic.ini'))
+    config.set_main_option('script_location', os.path.join(ROOT, 'migrations'))
+    if connection is not None:
+        config.attributes['connection'] = connection
+    return config
+
+
+def head_revision() -> str:
+    """The latest revision of the migration scripts."""
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(engine: Optional[Engine] = None) -> Optional[str]:
+    """The revision the database is at, or None if it has never been migrated."""
+    with (engine or database.engine).connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def check_schema_version(engine: Optional[Engine] = None) -> None:
+    """
+    Check that the database has been migrated to the latest revision.
+
+    Raises:
+        SchemaVersionError: If the database is behind, ahead of or unknown to
+            the migrations, or lacks tables or columns of the models.
+    """
+    current, head = current_revision(engine), head_revision()
+    if current == head:
+        missing = missing_schema(engine)
+        if missing:
+            raise SchemaVersionError(
+                f"Database is stamped at revision {head} but lacks {', '.join(missing)}; it was stamped "
+                f"without being migrated. Stamp the revision it actually has and run `python -m app.cli db upgrade`"
+            )
+        return
+    if current is None:
+        raise SchemaVersionError(
+            f"Database has not been migrated; run `python -m app.cli db upgrade` (expected revision {head})"
+        )
+    raise SchemaVersionError(
+        f"Database schema is at revision {current} but the application expects {head}; "
+        f"run `python -m app.cli db upgrade`"
+    )
+
+
+def missing_schema(engine: Optional[Engine] = None) -> List[str]:
+    """Tables and columns (as table.column) of the models that the database lacks."""
+    inspector = inspect(engine or database.engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in database.Base.metadata.sorted_tables:
+        if table.name not in tables:
+            missing.append(table.name)
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in columns)
+    return missing
+
+
+def stamp_unversioned(engine: Optional[Engine] = None) -> bool:
+    """
+    Mark a database created before migrations existed as being at BASELINE_REVISION.
+
+    Such a database has the tables of the first release but no
+    alembic_version; upgrading it without the stamp would try to create
+    them again. Databases that are versioned or empty are left alone.
+
+    Returns whether the database was stamped.
+    """
+    engine = engine or database.engine
+    with engine.connect() as connection:
+        if MigrationContext.configure(connection).get_current_revision() is not None:
+            return False
+        if not inspect(connection).has_table('activities'):
+            return False
+        command.stamp(alembic_config(connection), BASELINE_REVISION)
+        connection.commit()
+    return True
+
+
+def upgrade(revision: str = 'head') -> None:
+    """Migrate the database at Config.DATABASE_URL up to revision, stamping an unversioned one first."""
+    if stamp_unversioned():
+        print(f"Database has tables but no migration history; stamped as baseline {BASELINE_REVISION}")
+    command.upgrade(alembic_config(), revision)
+
+
+def downgrade(revision: str) -> None:
+    """Migrate the database at Config.DATABASE_URL down to revision."""
+    command.downgrade(alembic_config(), revision)
+
+
+def stamp(revision: str) -> None:
+    """Record revision in alembic_version without running any migrations."""
+    command.stamp(alembic_config(), revision)
+
+
+# Checks for migrations that may find their changes already made: before
+# migrations existed, the app ran create_all on every start, which created
+# tables added by later versions in full but never changed existing ones.
+# Each call inspects afresh, since the schema changes as the migration runs.
+
+def has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    return column in {c['name'] for c in inspect(op.get_bind()).get_columns(table)}
+
+
+def has_index(table: str, index: str) -> bool:
+    return index in {i['name'] for i in inspect(op.get_bind()).get_indexes(table)}
+
+
+def has_unique_constraint(table: str, constraint: str) -> bool:
+    return constraint in {c['name'] for c in inspect(op.get_bind()).get_unique_constraints(table)}
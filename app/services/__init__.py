@@ -1,10 +1,16 @@
 """
 Service layer - Business logic.
 """
-from .activity_service import ActivityService
-from .personal_best_service import PersonalBestService
+from .activity_service import ActivityService, AsyncActivityService
+from .analytics_service import AnalyticsService
+from .personal_best_service import AsyncPersonalBestService, PersonalBestService
+from .ingest_service import IngestService
 
 __all__ = [
     "ActivityService",
+    "AsyncActivityService",
+    "AnalyticsService",
     "PersonalBestService",
+    "AsyncPersonalBestService",
+    "IngestService",
 ]
@@ -1,11 +1,111 @@
 """
 Activity service - Business logic for activity operations.
 """
-from typing import List, Optional, Dict, Any
+import base64
+import json
+import time
+from typing import Callable, List, Optional, Dict, Any, Sequence, Tuple
 from datetime import datetime
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.repositories import ActivityRepository, GPSPointRepository
-from app.fit_parser import parse_fit_file
+from app.activity_metrics import compute_metrics
+from app.cache import LRUCache
+from app.config import Config
+from app.downsampling import downsample_stream
+from app.executors import run_in_thread
+from app.repositories import (
+    ActivityRepository, AsyncActivityRepository, GPSPointRepository, GPSStreamRepository, get_async_gps_repository,
+    get_gps_repository
+)
+from app.fit_parser import iter_record_batches
+from app.exceptions import ActivityNotFoundError, FitFileParseError, InvalidCursorError
+from app.gps_stream import GPSStream
+from app.response_cache import ACTIVITIES, PERSONAL_BESTS, invalidate
+from app.services.analytics_service import AnalyticsService
+from app.services.personal_best_service import PersonalBestService
+from app.stream_cache import StreamCache, get_stream_cache
+from app.uploads import file_content_hash
+from app.utils import row_to_dict
+
+
+def encode_cursor(activity_date: datetime, activity_id: int) -> str:
+    """Opaque pagination cursor for the position after an activity."""
+    payload = json.dumps([activity_date.isoformat(), activity_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor made by encode_cursor into (activity_date, id).
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        activity_date, activity_id = json.loads(payload)
+        return datetime.fromisoformat(activity_date), int(activity_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+# Activity totals inserted by create_from_fit_file until the session summary is read
+PLACEHOLDER_SUMMARY = {
+    'activity_type': 'running',
+    'activity_date': datetime(1970, 1, 1),
+    'duration': 0,
+    'total_distance': 0.0,
+    'avg_heart_rate': None,
+}
+
+# Downsampled streams per activity (see _downsample_key), as {max_points: result}
+_downsampled_streams = LRUCache(Config.STREAM_RESULT_CACHE_SIZE)
+
+
+def _downsample_key(activity) -> Tuple[int, Optional[datetime]]:
+    """
+    Key of an activity's downsampled streams: its ID and upload time.
+
+    Each worker process has its own cache and only drops the entries of
+    activities it deletes itself. With the upload time in the key, an
+    activity re-ingested under a reused ID (possible on SQLite) never gets
+    the results of the deleted one from another worker's cache.
+    """
+    return activity.id, activity.upload_date
+
+
+def _get_downsampled(activity, max_points: int) -> Optional[Dict[str, Any]]:
+    """A cached downsampled stream of an activity, or None."""
+    results = _downsampled_streams.get(_downsample_key(activity))
+    return results.get(max_points) if results else None
+
+
+def _put_downsampled(activity, max_points: int, result: Dict[str, Any]) -> None:
+    """Cache a downsampled stream of an activity next to its other sizes."""
+    key = _downsample_key(activity)
+    _downsampled_streams.put(key, {**(_downsampled_streams.get(key) or {}), max_points: result})
+
+
+def _cache_stream(stream_cache: Optional[StreamCache], activity_id: int, stream: GPSStream) -> None:
+    """Write a committed activity's stream to the stream cache, if enabled."""
+    if stream_cache is None:
+        return
+    try:
+        stream_cache.put(activity_id, stream)
+    except OSError as e:
+        # The cache is only an accelerator; the points are in the database
+        print(f"Error caching GPS stream of activity {activity_id}: {e}")
+
+
+def _page(rows: List[Row], limit: int, iso_dates: bool) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """The activities of a page fetched with one extra row, and the cursor of the next page."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].activity_date, rows[-1].id)
+    return [row_to_dict(row, iso_dates) for row in rows], next_cursor
 
 
 class ActivityService:
@@ -15,65 +115,305 @@ class ActivityService:
         """Initialize service with database session."""
         self.db = db
         self.activity_repo = ActivityRepository(db)
-        self.gps_repo = GPSPointRepository(db)
+        self.gps_repo = get_gps_repository(db)
+        self.pb_service = PersonalBestService(db)
+        self.analytics_service = AnalyticsService(db)
+        self.stream_cache = get_stream_cache()
 
-    def create_from_fit_file(self, filepath: str) -> Optional[int]:
+    def create_from_fit_file(
+        self, filepath: str, batch_size: Optional[int] = None, content_hash: Optional[str] = None
+    ) -> Optional[int]:
         """
         Parse a FIT file and create an activity with GPS points.
 
-        Returns the activity ID if successful, None otherwise.
+        The file is read once: GPS points are streamed from it in batches
+        without building a Python object per point, and the session summary
+        is collected in the same pass. Row storage writes each batch as it
+        is parsed, columnar storage encodes the joined batches once
+        (GPS_STORAGE); either way the whole activity is then held as
+        columns, which best efforts, metrics and the stream cache need.
+        Personal bests improved by the activity, its metrics (splits, moving
+        time, zone times...) and the daily, weekly and monthly totals are
+        updated in the same transaction.
+        If a file with the same content (sha256, computed here unless given)
+        was stored before, it is not parsed again.
+
+        Returns the activity ID if successful (the existing one for a
+        duplicate, also if it was stored concurrently), None otherwise.
         """
+        content_hash = content_hash or file_content_hash(filepath)
+        existing = self.activity_repo.get_by_content_hash(content_hash)
+        if existing:
+            return existing.id
+
         try:
-            # Parse the FIT file
-            activity_data = parse_fit_file(filepath)
-            if not activity_data:
+            # The GPS points must reference the activity row, but the session
+            # summary follows the records in the file; insert the row with
+            # placeholder totals and fill them in once the file is read
+            activity = self._create_activity(filepath, {**PLACEHOLDER_SUMMARY, 'content_hash': content_hash})
+            summary = {}
+            stream = self.gps_repo.create_batches(activity.id, iter_record_batches(filepath, batch_size, summary))
+            if not summary:
+                self.db.rollback()
                 return None
+            for key, value in summary.items():
+                setattr(activity, key, value)
 
-            # Create activity record
-            activity = self.activity_repo.create(
-                activity_type=activity_data['activity_type'],
-                activity_date=activity_data['activity_date'],
-                duration=activity_data['duration'],
-                total_distance=activity_data['total_distance'],
-                file_path=filepath,
-                avg_heart_rate=activity_data['avg_heart_rate']
-            )
-
-            # Store GPS points if available
-            if activity_data['gps_points']:
-                self.gps_repo.create_batch(activity.id, activity_data['gps_points'])
+            self.analytics_service.add_activities([activity])
+            self._add_best_efforts(activity, stream)
+            activity.metrics = compute_metrics(activity.activity_type, stream)
 
             # Commit the transaction
             self.db.commit()
+            invalidate(ACTIVITIES, PERSONAL_BESTS)
+            _cache_stream(self.stream_cache, activity.id, stream)
             return activity.id
+        except FitFileParseError:
+            self.db.rollback()
+            return None
+        except IntegrityError:
+            # The same content was stored concurrently since the check above
+            self.db.rollback()
+            existing = self.activity_repo.get_by_content_hash(content_hash)
+            if existing is None:
+                raise
+            return existing.id
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def create_from_parsed(self, filepath: str, activity_data: Dict[str, Any]) -> int:
+        """
+        Create an activity with GPS points from already parsed FIT data.
+
+        activity_data is the output of parse_fit_stream, which lets the
+        parsing run elsewhere (e.g. in a worker process), optionally with the
+        content_hash of the file added.
+
+        Returns the activity ID; if the same file content was stored
+        concurrently, the ID of that activity.
+        """
+        try:
+            return self.create_many_from_parsed([(filepath, activity_data)])[0]
+        except IntegrityError:
+            content_hash = activity_data.get('content_hash')
+            existing = self.activity_repo.get_by_content_hash(content_hash) if content_hash else None
+            if existing is None:
+                raise
+            return existing.id
+
+    def create_many_from_parsed(self, parsed: List[Tuple[str, Dict[str, Any]]]) -> List[int]:
+        """
+        Create activities with GPS points for several parsed FIT files in one transaction.
+
+        parsed holds (filepath, activity_data) pairs. Personal bests improved
+        by the activities, their metrics and the time aggregations are
+        updated in the same transaction. If any of them fails, none are stored.
+
+        Returns the activity IDs in the same order.
+        """
+        try:
+            activities = []
+            for filepath, activity_data in parsed:
+                activity = self._create_activity(filepath, activity_data)
+                self.gps_repo.create_stream(activity.id, activity_data['gps_stream'])
+                self._add_best_efforts(activity, activity_data['gps_stream'])
+                activity.metrics = compute_metrics(activity.activity_type, activity_data['gps_stream'])
+                activities.append(activity)
+            self.analytics_service.add_activities(activities)
+
+            # Commit the transaction
+            self.db.commit()
+            invalidate(ACTIVITIES, PERSONAL_BESTS)
+            for activity, (_, activity_data) in zip(activities, parsed):
+                _cache_stream(self.stream_cache, activity.id, activity_data['gps_stream'])
+            return [activity.id for activity in activities]
         except Exception:
             self.db.rollback()
             raise
 
-    def get_all_activities(self) -> List[Dict[str, Any]]:
-        """Get all activities as dictionaries."""
-        activities = self.activity_repo.get_all()
-        return [self._to_dict(activity) for activity in activities]
+    def _create_activity(self, filepath: str, activity_data: Dict[str, Any]):
+        """Create the activity record from a parsed session summary."""
+        return self.activity_repo.create(
+            activity_type=activity_data['activity_type'],
+            activity_date=activity_data['activity_date'],
+            duration=activity_data['duration'],
+            total_distance=activity_data['total_distance'],
+            file_path=filepath,
+            avg_heart_rate=activity_data['avg_heart_rate'],
+            content_hash=activity_data.get('content_hash')
+        )
+
+    def _add_best_efforts(self, activity, stream) -> None:
+        """Update the personal bests beaten by an activity, without committing."""
+        self.pb_service.add_best_efforts(
+            activity.id, activity.activity_type, activity.activity_date, stream
+        )
+
+    def get_activity_stream(self, activity_id: int) -> GPSStream:
+        """
+        Get the GPS points of an activity as a columnar stream.
+
+        Streams are served from the memory-mapped stream cache when enabled,
+        without querying the database; on a miss the stream is read from the
+        database and cached for the next request.
+        """
+        if self.stream_cache is not None:
+            stream = self.stream_cache.get(activity_id)
+            if stream is not None:
+                return stream
+
+        stream = self.gps_repo.get_stream(activity_id)
+        if len(stream):
+            _cache_stream(self.stream_cache, activity_id, stream)
+        return stream
+
+    def get_downsampled_stream(self, activity_id: int, max_points: int) -> Dict[str, Any]:
+        """
+        Get the GPS stream of an activity reduced to at most max_points points per series.
+
+        The track is simplified with Douglas–Peucker and the speed and heart
+        rate series with LTTB (see app.downsampling). Results are kept per
+        activity in an in-process LRU cache (see _downsample_key), dropped
+        when the activity is deleted.
+
+        Raises:
+            ActivityNotFoundError: If the activity does not exist.
+        """
+        activity = self.activity_repo.get_by_id(activity_id)
+        if activity is None:
+            raise ActivityNotFoundError(f"Activity with ID {activity_id} not found")
+
+        result = _get_downsampled(activity, max_points)
+        if result is None:
+            stream = self.get_activity_stream(activity_id)
+            result = {'activity_id': activity_id, **downsample_stream(stream, max_points)}
+            _put_downsampled(activity, max_points, result)
+        return result
+
+    def rebuild_metrics(self, progress: Optional[Callable[[int, int, float], None]] = None) -> int:
+        """
+        Recompute the metrics of every activity from its stored GPS points.
+
+        Only needed for activities stored before metrics were computed at
+        ingest, or after the metric definitions change. Activities are read
+        one at a time and all metrics are committed together; progress is
+        called with (activities done, activities total, seconds elapsed).
+
+        Returns the number of activities.
+        """
+        started = time.perf_counter()
+        try:
+            activities = self.activity_repo.get_ids_and_types()
+            for done, (activity_id, activity_type) in enumerate(activities, 1):
+                stream = self.gps_repo.get_stream(activity_id)
+                self.activity_repo.set_metrics(activity_id, compute_metrics(activity_type, stream))
+                if progress:
+                    progress(done, len(activities), time.perf_counter() - started)
+
+            # Commit the transaction
+            self.db.commit()
+            return len(activities)
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def backfill_gps_streams(self, progress: Optional[Callable[[int, int, float], None]] = None) -> int:
+        """
+        Copy the GPS points of activities stored in gps_points into gps_streams.
+
+        Needed once after switching GPS_STORAGE to columnar, so personal
+        best rebuilds see every activity. Each activity is committed on its
+        own, so an interrupted backfill resumes where it stopped; the rows
+        in gps_points are kept. progress is called with (activities done,
+        activities total, seconds elapsed).
+
+        Returns the number of activities copied.
+        """
+        started = time.perf_counter()
+        point_repo, stream_repo = GPSPointRepository(self.db), GPSStreamRepository(self.db)
+        try:
+            activity_ids = stream_repo.get_unconverted_ids()
+            for done, activity_id in enumerate(activity_ids, 1):
+                stream_repo.create_stream(activity_id, point_repo.get_stream(activity_id))
+                # Commit the activity
+                self.db.commit()
+                if progress:
+                    progress(done, len(activity_ids), time.perf_counter() - started)
+            return len(activity_ids)
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def get_all_activities(self, *, iso_dates: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get all activities as dictionaries.
+
+        List methods build the dicts straight from the selected rows, with
+        dates as ISO strings; iso_dates=False leaves them datetimes for
+        orjson. See _to_dict for single activities.
+        """
+        return [row_to_dict(row, iso_dates) for row in self.activity_repo.get_all_rows()]
+
+    def count_activities(self) -> int:
+        """Count all activities."""
+        return self.activity_repo.count()
+
+    def get_activities_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        *,
+        iso_dates: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of activities, newest first.
+
+        cursor is the next_cursor returned with the previous page. start and
+        end are inclusive bounds on the activity date. Dates are ISO strings
+        unless iso_dates is False, as in get_all_activities.
+
+        Returns the activities and the cursor of the next page, which is
+        None on the last page.
+
+        Raises:
+            InvalidCursorError: If the cursor cannot be decoded.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        activity_types = [t.lower() for t in activity_types] if activity_types else None
+        # One extra row tells whether there is a next page
+        return _page(self.activity_repo.get_page(limit + 1, after, activity_types, start, end), limit, iso_dates)
 
     def get_activity_by_id(self, activity_id: int) -> Optional[Dict[str, Any]]:
-        """Get a specific activity by ID."""
+        """Get a specific activity by ID, with its metrics (None if not computed)."""
         activity = self.activity_repo.get_by_id(activity_id)
         if not activity:
             return None
-        return self._to_dict(activity)
+        return {**self._to_dict(activity), 'metrics': activity.metrics}
 
-    def get_activities_by_type(self, activity_type: str) -> List[Dict[str, Any]]:
-        """Get all activities of a specific type."""
-        activities = self.activity_repo.get_by_type(activity_type)
-        return [self._to_dict(activity) for activity in activities]
+    def get_activities_by_type(self, activity_type: str, *, iso_dates: bool = True) -> List[Dict[str, Any]]:
+        """Get all activities of a specific type, as get_all_activities."""
+        return [row_to_dict(row, iso_dates) for row in self.activity_repo.get_all_rows([activity_type])]
 
     def delete_activity(self, activity_id: int) -> bool:
-        """Delete an activity and its GPS points."""
+        """Delete an activity and its GPS points, and remove it from the time aggregations."""
         try:
-            result = self.activity_repo.delete(activity_id)
-            if result:
-                self.db.commit()
-            return result
+            activity = self.activity_repo.get_by_id(activity_id)
+            if activity is None:
+                return False
+            downsample_key = _downsample_key(activity)
+            self.analytics_service.remove_activities([activity])
+            self.activity_repo.delete(activity_id)
+            self.db.commit()
+            # Personal bests set by the activity are deleted with it
+            invalidate(ACTIVITIES, PERSONAL_BESTS)
+            _downsampled_streams.pop(downsample_key)
+            if self.stream_cache is not None:
+                self.stream_cache.delete(activity_id)
+            return True
         except Exception:
             self.db.rollback()
             raise
@@ -91,3 +431,82 @@ class ActivityService:
             'avg_heart_rate': activity.avg_heart_rate,
             'file_path': activity.file_path
         }
+
+
+class AsyncActivityService:
+    """
+    Read methods of ActivityService on an AsyncSession, used when Config.DB_ASYNC is on.
+
+    Queries await the database instead of holding a worker thread, so the
+    event loop keeps serving other requests meanwhile. Results are the same
+    as ActivityService's and share its stream and downsampling caches.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """Initialize service with async database session."""
+        self.db = db
+        self.activity_repo = AsyncActivityRepository(db)
+        self.gps_repo = get_async_gps_repository(db)
+        self.stream_cache = get_stream_cache()
+
+    async def count_activities(self) -> int:
+        """Count all activities."""
+        return await self.activity_repo.count()
+
+    async def get_activities_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        *,
+        iso_dates: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of activities, newest first, as ActivityService.get_activities_page.
+
+        Raises:
+            InvalidCursorError: If the cursor cannot be decoded.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        activity_types = [t.lower() for t in activity_types] if activity_types else None
+        return _page(await self.activity_repo.get_page(limit + 1, after, activity_types, start, end), limit, iso_dates)
+
+    async def get_activity_by_id(self, activity_id: int) -> Optional[Dict[str, Any]]:
+        """Get a specific activity by ID, with its metrics (None if not computed)."""
+        activity = await self.activity_repo.get_by_id(activity_id)
+        if not activity:
+            return None
+        return {**ActivityService._to_dict(activity), 'metrics': activity.metrics}
+
+    async def get_activity_stream(self, activity_id: int) -> GPSStream:
+        """Get the GPS points of an activity as a columnar stream, from the stream cache if enabled."""
+        if self.stream_cache is not None:
+            stream = self.stream_cache.get(activity_id)
+            if stream is not None:
+                return stream
+
+        stream = await self.gps_repo.get_stream(activity_id)
+        if len(stream):
+            _cache_stream(self.stream_cache, activity_id, stream)
+        return stream
+
+    async def get_downsampled_stream(self, activity_id: int, max_points: int) -> Dict[str, Any]:
+        """
+        Get the GPS stream of an activity reduced to at most max_points points per series,
+        as ActivityService.get_downsampled_stream. Downsampling runs in the thread pool.
+
+        Raises:
+            ActivityNotFoundError: If the activity does not exist.
+        """
+        activity = await self.activity_repo.get_by_id(activity_id)
+        if activity is None:
+            raise ActivityNotFoundError(f"Activity with ID {activity_id} not found")
+
+        result = _get_downsampled(activity, max_points)
+        if result is None:
+            stream = await self.get_activity_stream(activity_id)
+            result = {'activity_id': activity_id, **await run_in_thread(downsample_stream, stream, max_points)}
+            _put_downsampled(activity, max_points, result)
+        return result
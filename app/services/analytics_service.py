@@ -0,0 +1,233 @@
+"""
+Analytics service - Business logic for activity totals over time.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from app.config import Config
+from app.exceptions import InvalidDateRangeError
+from app.repositories import ActivityRepository, TimeAggregationRepository
+from app.response_cache import ACTIVITIES, invalidate
+from app.utils import AGGREGATION_PERIODS, next_period_start, period_count, period_start
+
+
+# Metrics reported by the summary and timeseries
+METRICS = ('activity_count', 'duration', 'total_distance', 'avg_heart_rate')
+
+
+def _lower(activity_types: Optional[Sequence[str]]) -> Optional[List[str]]:
+    return [t.lower() for t in activity_types] if activity_types else None
+
+
+def _metric(row: Dict[str, Any], metric: str) -> Any:
+    """A metric of a summarize row, rounded for the response."""
+    value = row[metric]
+    if metric == 'avg_heart_rate':
+        return round(float(value), 1) if value is not None else None
+    if metric == 'total_distance':
+        return round(float(value or 0), 1)
+    return int(value or 0)
+
+
+def _totals(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Overall totals of summarize rows; the heart rate is averaged over activities that have one."""
+    heart_rate_count = sum(row['heart_rate_count'] for row in rows)
+    heart_rate_sum = sum(float(row['avg_heart_rate']) * row['heart_rate_count'] for row in rows if row['heart_rate_count'])
+    return {
+        'activity_count': sum(_metric(row, 'activity_count') for row in rows),
+        'duration': sum(_metric(row, 'duration') for row in rows),
+        'total_distance': round(sum(float(row['total_distance'] or 0) for row in rows), 1),
+        'avg_heart_rate': round(heart_rate_sum / heart_rate_count, 1) if heart_rate_count else None
+    }
+
+
+def _summaries(activities: Iterable[Any]) -> Iterable[Tuple[str, datetime, int, float]]:
+    return ((a.activity_type, a.activity_date, a.duration, a.total_distance) for a in activities)
+
+
+class AnalyticsService:
+    """Service for analytics-related business logic."""
+
+    def __init__(self, db: Session):
+        """Initialize service with database session."""
+        self.db = db
+        self.aggregation_repo = TimeAggregationRepository(db)
+        self.activity_repo = ActivityRepository(db)
+
+    def add_activities(self, activities: Iterable[Any]) -> None:
+        """
+        Add activities to their daily, weekly and monthly buckets, without committing.
+
+        Called when activities are created, so the changes become part of
+        the transaction creating them.
+        """
+        self.aggregation_repo.add_many(self._bucket_changes(_summaries(activities)))
+
+    def remove_activities(self, activities: Iterable[Any]) -> None:
+        """Subtract activities from their buckets, without committing; empty buckets are dropped."""
+        self.aggregation_repo.add_many(self._bucket_changes(_summaries(activities), sign=-1))
+
+    def rebuild_time_aggregations(self, chunk_size: int = 10000) -> int:
+        """
+        Recompute all buckets from the activities table.
+
+        Only needed for activities stored before the buckets were
+        maintained. Returns the number of buckets written.
+        """
+        try:
+            buckets = self._bucket_changes(
+                row for rows in self.activity_repo.iter_summaries(chunk_size) for row in rows
+            )
+            self.aggregation_repo.replace_all(buckets)
+
+            # Commit the transaction
+            self.db.commit()
+            # The dashboard shows the weekly totals
+            invalidate(ACTIVITIES)
+            return len(buckets)
+        except Exception:
+            self.db.rollback()
+            raise
+
+    @staticmethod
+    def _bucket_changes(
+        activities: Iterable[Tuple[str, datetime, int, float]], sign: int = 1
+    ) -> List[Dict[str, Any]]:
+        """Sum (activity_type, activity_date, duration, total_distance) rows into one change per bucket."""
+        totals = defaultdict(lambda: [0, 0.0, 0])
+        for activity_type, activity_date, duration, total_distance in activities:
+            for period in AGGREGATION_PERIODS:
+                bucket = totals[(period, activity_type, period_start(activity_date, period))]
+                bucket[0] += sign * (duration or 0)
+                bucket[1] += sign * (total_distance or 0.0)
+                bucket[2] += sign
+        return [
+            {
+                'aggregation_type': period,
+                'activity_type': activity_type,
+                'date': date,
+                'duration': duration,
+                'total_distance': total_distance,
+                'activity_count': count
+            }
+            for (period, activity_type, date), (duration, total_distance, count) in totals.items()
+        ]
+
+    def get_time_aggregations(
+        self,
+        period: str,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the stored daily, weekly or monthly totals per activity type.
+
+        start and end select the periods that overlap the range.
+
+        Raises:
+            ValueError: If period is not one of AGGREGATION_PERIODS.
+        """
+        if period not in AGGREGATION_PERIODS:
+            raise ValueError(f"Invalid period '{period}'. Must be one of: {', '.join(AGGREGATION_PERIODS)}")
+        if start is not None:
+            start = period_start(start, period)
+        buckets = self.aggregation_repo.get_buckets(period, _lower(activity_types), start, end)
+        return [self._to_dict(bucket) for bucket in buckets]
+
+    def get_totals_by_type(self) -> Dict[str, Dict[str, Any]]:
+        """Get all-time duration, distance and activity count per activity type."""
+        totals = {}
+        for bucket in self.aggregation_repo.get_buckets('monthly'):
+            total = totals.setdefault(
+                bucket.activity_type, {'duration': 0, 'total_distance': 0.0, 'activity_count': 0}
+            )
+            total['duration'] += bucket.duration
+            total['total_distance'] += bucket.total_distance
+            total['activity_count'] += bucket.activity_count
+        return totals
+
+    def get_summary(
+        self,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Get activity count, duration, distance and average heart rate per activity type.
+
+        Computed with one GROUP BY in the database over the activities
+        between start and end (inclusive). Returns parallel arrays, one
+        entry per activity type, plus the overall totals.
+        """
+        rows = self.activity_repo.summarize(None, _lower(activity_types), start, end)
+        summary = {'activity_types': [row['activity_type'] for row in rows]}
+        for metric in METRICS:
+            summary[metric] = [_metric(row, metric) for row in rows]
+        summary['totals'] = _totals(rows)
+        return summary
+
+    def get_timeseries(
+        self,
+        period: str,
+        activity_types: Optional[Sequence[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Get activity count, duration, distance and average heart rate per activity type and period.
+
+        Periods are grouped in the database. Returns the period start dates
+        as labels, from the period containing start (or the first activity)
+        to the one containing end (or the last activity) without gaps, and
+        per activity type one array per metric aligned with the labels.
+        Periods without activities count as 0, with a null heart rate.
+
+        Raises:
+            ValueError: If period is not one of AGGREGATION_PERIODS.
+            InvalidDateRangeError: If the labels would span more than
+                Config.TIMESERIES_MAX_PERIODS periods.
+        """
+        if period not in AGGREGATION_PERIODS:
+            raise ValueError(f"Invalid period '{period}'. Must be one of: {', '.join(AGGREGATION_PERIODS)}")
+        rows = self.activity_repo.summarize(period, _lower(activity_types), start, end)
+
+        labels = []
+        if rows:
+            first = period_start(start, period) if start else rows[0]['date']
+            last = period_start(end, period) if end else rows[-1]['date']
+            if period_count(first, last, period) > Config.TIMESERIES_MAX_PERIODS:
+                raise InvalidDateRangeError(
+                    f"The range spans more than {Config.TIMESERIES_MAX_PERIODS} {period} periods"
+                )
+            date = first
+            while date <= last:
+                labels.append(date)
+                date = next_period_start(date, period)
+        index = {date: i for i, date in enumerate(labels)}
+
+        series = {}
+        for row in rows:
+            values = series.setdefault(row['activity_type'], {
+                metric: [None if metric == 'avg_heart_rate' else 0] * len(labels) for metric in METRICS
+            })
+            for metric in METRICS:
+                values[metric][index[row['date']]] = _metric(row, metric)
+        return {
+            'period': period,
+            'labels': [date.date().isoformat() for date in labels],
+            'series': series
+        }
+
+    @staticmethod
+    def _to_dict(bucket) -> Dict[str, Any]:
+        """Convert time aggregation model to dictionary."""
+        return {
+            'activity_type': bucket.activity_type,
+            'period': bucket.aggregation_type,
+            'date': bucket.date.isoformat() if bucket.date else None,
+            'duration': bucket.duration,
+            'total_distance': bucket.total_distance,
+            'activity_count': bucket.activity_count
+        }
@@ -0,0 +1,355 @@
+"""
+Ingest service - Business logic for queued FIT file ingestion.
+"""
+import os
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from app.database import ActivityModel, IngestJobModel
+from app.repositories import ActivityRepository, IngestJobRepository
+from app.services.activity_service import ActivityService
+from app.config import Config
+from app.executors import call_in_process, imap_in_process, submit_ingest
+from app.fit_parser import read_fit_stream
+from app.uploads import SavedUpload
+
+# Job stages in the order a job goes through them, with the column marking their start
+STAGES = (
+    ('queued', 'created_at'),
+    ('parsing', 'parsing_started_at'),
+    ('persisting', 'persisting_started_at'),
+)
+
+# Error recorded on jobs that were running when the server stopped
+INTERRUPTED_ERROR = 'Interrupted by a server restart; upload the file again'
+
+
+class IngestService:
+    """Service for ingest job business logic."""
+
+    def __init__(self, db: Session, session_factory: Optional[Callable[[], Session]] = None):
+        """
+        Initialize service with database session.
+
+        Jobs run outside the request, so they open their own sessions from
+        session_factory (by default bound to the same engine as db).
+        """
+        self.db = db
+        self.job_repo = IngestJobRepository(db)
+        self.activity_repo = ActivityRepository(db)
+        self.session_factory = session_factory or sessionmaker(
+            autocommit=False, autoflush=False, bind=db.get_bind()
+        )
+
+    def enqueue(self, filepath: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Record a queued job for an uploaded FIT file and hand it to the ingest workers.
+
+        If an activity was already created from a file with the same
+        content_hash, the upload is deleted and the job is finished right
+        away with that activity, without parsing.
+
+        Returns the job as a dictionary; it usually is still queued.
+        """
+        try:
+            existing = self.activity_repo.get_by_content_hash(content_hash) if content_hash else None
+            if existing:
+                job = self.job_repo.create(existing.file_path, content_hash)
+                job.duplicate = True
+                self.job_repo.set_status(job, 'done', activity_id=existing.id)
+            else:
+                job = self.job_repo.create(filepath, content_hash)
+            self.db.commit()
+            job_id = job.id
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if existing:
+            _remove_upload(filepath)
+        else:
+            submit_ingest(run_ingest_job, job_id, self.session_factory)
+        return self.get_job(job_id)
+
+    def resume_jobs(self) -> Dict[str, int]:
+        """
+        Pick up the jobs a stopped server left unfinished; called at startup.
+
+        Jobs only live in the ingest pool of the server process, so queued
+        jobs are handed to the workers again. Jobs that were parsing or
+        persisting are finished with their activity if it was stored
+        (found by content hash), and marked failed otherwise rather than
+        run again, since they may be what stopped the server.
+
+        Returns the number of jobs requeued, finished and failed.
+        """
+        counts = {'requeued': 0, 'done': 0, 'failed': 0}
+        try:
+            for job in self.job_repo.get_by_status(('parsing', 'persisting')):
+                existing = self.activity_repo.get_by_content_hash(job.content_hash) if job.content_hash else None
+                if existing:
+                    self.job_repo.set_status(job, 'done', activity_id=existing.id)
+                    counts['done'] += 1
+                else:
+                    self.job_repo.set_status(job, 'failed', error=INTERRUPTED_ERROR)
+                    counts['failed'] += 1
+            queued = [job.id for job in self.job_repo.get_by_status(('queued',))]
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        for job_id in queued:
+            submit_ingest(run_ingest_job, job_id, self.session_factory)
+        counts['requeued'] = len(queued)
+        return counts
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Get a specific ingest job by ID."""
+        # Jobs are updated by other sessions, so always read the current row
+        self.db.expire_all()
+        job = self.job_repo.get_by_id(job_id)
+        if not job:
+            return None
+        return self._to_dict(job)
+
+    def ingest_files(self, files: List[SavedUpload], batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Parse and store many uploaded FIT files, reporting the outcome of each.
+
+        files is the output of save_uploads; files rejected on upload are
+        reported as failed with their error. Files whose content is already stored, or appears earlier in
+        the same upload, are reported as duplicates without being parsed.
+        The rest are parsed in parallel in the process pool and stored
+        batch_size files per transaction. If a batch fails, its files are
+        retried one at a time so only the broken ones are reported as failed.
+
+        Returns the per-file results in upload order, with totals and throughput.
+        """
+        batch_size = batch_size or Config.BULK_BATCH_SIZE
+        started = time.perf_counter()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+        stored = self.activity_repo.get_ids_by_content_hashes([f.content_hash for f in files if f.content_hash])
+        indexes = {}
+        first_by_hash = {}
+        duplicates = []
+        for index, (name, filepath, content_hash, error) in enumerate(files):
+            if filepath is None:
+                results[index] = self._file_result(name, error=error)
+            elif content_hash in stored:
+                results[index] = self._file_result(name, activity_id=stored[content_hash], duplicate=True)
+                _remove_upload(filepath)
+            elif content_hash in first_by_hash:
+                duplicates.append((index, first_by_hash[content_hash]))
+                _remove_upload(filepath)
+            else:
+                if content_hash:
+                    first_by_hash[content_hash] = index
+                indexes[filepath] = index
+
+        batch = []
+        for filepath, future in imap_in_process(read_fit_stream, list(indexes)):
+            index = indexes[filepath]
+            try:
+                activity_data = future.result()
+            except Exception as e:
+                results[index] = self._file_result(files[index].name, error=str(e))
+                continue
+
+            activity_data['content_hash'] = files[index].content_hash
+            batch.append((index, filepath, activity_data))
+            if len(batch) >= batch_size:
+                self._store_batch(batch, files, results)
+                batch = []
+        if batch:
+            self._store_batch(batch, files, results)
+
+        # Repeats within the upload share the outcome of their first copy
+        for index, first in duplicates:
+            if results[first]['status'] == 'failed':
+                results[index] = self._file_result(files[index].name, error=results[first]['error'])
+            else:
+                results[index] = self._file_result(
+                    files[index].name, activity_id=results[first]['activity_id'], duplicate=True
+                )
+
+        elapsed = time.perf_counter() - started
+        counts = {
+            status: sum(1 for result in results if result['status'] == status)
+            for status in ('created', 'duplicate', 'failed')
+        }
+        return {
+            'files': results,
+            **counts,
+            'seconds': round(elapsed, 3),
+            'files_per_second': round(len(results) / elapsed, 2) if elapsed > 0 else None
+        }
+
+    def _store_batch(self, batch: List[tuple], files: List[SavedUpload], results: List[Optional[Dict[str, Any]]]) -> None:
+        """Store a batch of parsed files in one transaction, falling back to one file at a time."""
+        activity_service = ActivityService(self.db)
+        try:
+            activity_ids = activity_service.create_many_from_parsed(
+                [(filepath, activity_data) for _, filepath, activity_data in batch]
+            )
+        except Exception:
+            activity_ids = None
+
+        for i, (index, filepath, activity_data) in enumerate(batch):
+            name = files[index].name
+            if activity_ids is not None:
+                results[index] = self._file_result(name, activity_id=activity_ids[i])
+                continue
+            try:
+                activity_id, duplicate = _store_parsed(activity_service, filepath, activity_data)
+            except Exception as e:
+                results[index] = self._file_result(name, error=str(e))
+                continue
+            if duplicate:
+                _remove_upload(filepath)
+            results[index] = self._file_result(name, activity_id=activity_id, duplicate=duplicate)
+
+    @staticmethod
+    def _file_result(
+        name: str, activity_id: Optional[int] = None, error: Optional[str] = None, duplicate: bool = False
+    ) -> Dict[str, Any]:
+        """Outcome of one file of a bulk upload."""
+        return {
+            'file': name,
+            'status': 'failed' if error else 'duplicate' if duplicate else 'created',
+            'activity_id': activity_id,
+            'error': error
+        }
+
+    @staticmethod
+    def _to_dict(job) -> Dict[str, Any]:
+        """Convert ingest job model to dictionary, with the seconds spent in each stage."""
+        starts = [getattr(job, column) for _, column in STAGES] + [job.finished_at]
+        stage_seconds = {}
+        for i, (stage, _) in enumerate(STAGES):
+            start = starts[i]
+            end = next((ts for ts in starts[i + 1:] if ts is not None), None)
+            stage_seconds[stage] = (end - start).total_seconds() if start and end else None
+
+        return {
+            'id': job.id,
+            'status': job.status,
+            'file_path': job.file_path,
+            'activity_id': job.activity_id,
+            'error': job.error,
+            'duplicate': job.duplicate,
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'parsing_started_at': job.parsing_started_at.isoformat() if job.parsing_started_at else None,
+            'persisting_started_at': job.persisting_started_at.isoformat() if job.persisting_started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+            'stage_seconds': stage_seconds
+        }
+
+
+def run_ingest_job(job_id: int, session_factory: Callable[[], Session]) -> None:
+    """
+    Parse and persist the FIT file of a queued job, recording each stage.
+
+    Jobs that are not queued, e.g. already claimed by another worker, are
+    left alone. Parsing runs in the process pool. Any failure marks the job as failed
+    with the error message instead of raising.
+
+    Jobs whose content was stored since they were enqueued finish as
+    duplicates without parsing. Jobs whose content an earlier job has not
+    finished with yet go back to the queue; the earlier job runs them again
+    when it finishes, so they find its activity or, if it failed, parse
+    the file themselves.
+    """
+    db = session_factory()
+    try:
+        job_repo = IngestJobRepository(db)
+        claimed = job_repo.claim(job_id)
+        db.commit()
+        if not claimed:
+            return
+        job = job_repo.get_by_id(job_id)
+
+        existing = _get_stored(db, job.content_hash)
+        if existing:
+            _finish_duplicate(db, job_repo, job, existing)
+        elif job.content_hash and job_repo.has_in_flight_before(job_id, job.content_hash):
+            job_repo.release(job_id)
+            db.commit()
+            # The earlier job may have finished before the release was committed
+            if not job_repo.has_in_flight_before(job_id, job.content_hash):
+                submit_ingest(run_ingest_job, job_id, session_factory)
+            return
+        else:
+            _ingest(db, job_repo, job)
+
+        if job.content_hash:
+            for waiting_id in job_repo.get_queued_ids_by_hash(job.content_hash, job_id):
+                submit_ingest(run_ingest_job, waiting_id, session_factory)
+    finally:
+        db.close()
+
+
+def _ingest(db: Session, job_repo: IngestJobRepository, job: IngestJobModel) -> None:
+    """Parse and persist the file of a claimed job, finishing the job as done, duplicate or failed."""
+    try:
+        activity_data = call_in_process(read_fit_stream, job.file_path)
+        activity_data['content_hash'] = job.content_hash
+
+        job_repo.set_status(job, 'persisting')
+        db.commit()
+        activity_id, duplicate = _store_parsed(ActivityService(db), job.file_path, activity_data)
+    except Exception as e:
+        db.rollback()
+        job_repo.set_status(job, 'failed', error=str(e))
+        db.commit()
+        return
+
+    if duplicate:
+        _finish_duplicate(db, job_repo, job, ActivityRepository(db).get_by_id(activity_id))
+        return
+    job_repo.set_status(job, 'done', activity_id=activity_id)
+    db.commit()
+
+
+def _store_parsed(
+    activity_service: ActivityService, filepath: str, activity_data: Dict[str, Any]
+) -> Tuple[int, bool]:
+    """
+    Store a parsed upload; returns the activity ID and whether the content was already stored.
+
+    Content stored by another upload since the duplicate check makes the
+    insert hit the unique content_hash index; the activity stored then is
+    returned instead.
+    """
+    try:
+        return activity_service.create_many_from_parsed([(filepath, activity_data)])[0], False
+    except IntegrityError:
+        existing = _get_stored(activity_service.db, activity_data.get('content_hash'))
+        if existing is None:
+            raise
+        return existing.id, True
+
+
+def _get_stored(db: Session, content_hash: Optional[str]) -> Optional[ActivityModel]:
+    """The activity created from a file with content_hash, if any."""
+    return ActivityRepository(db).get_by_content_hash(content_hash) if content_hash else None
+
+
+def _finish_duplicate(db: Session, job_repo: IngestJobRepository, job: IngestJobModel, activity: ActivityModel) -> None:
+    """Finish a job whose content is stored as activity, as enqueue does, and delete its upload."""
+    upload = job.file_path
+    job.file_path = activity.file_path
+    job.duplicate = True
+    job_repo.set_status(job, 'done', activity_id=activity.id)
+    db.commit()
+    if upload != activity.file_path:
+        _remove_upload(upload)
+
+
+def _remove_upload(filepath: str) -> None:
+    """Delete an uploaded file that is not needed, e.g. a duplicate."""
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
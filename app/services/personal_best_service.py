@@ -1,10 +1,23 @@
 """
 Personal Best service - Business logic for personal best operations.
 """
-from typing import List, Dict, Any
+import time
+from collections import defaultdict
+from typing import Callable, Iterator, List, Dict, Any, Optional, Sequence
 from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.repositories import PersonalBestRepository
+from app.best_efforts import best_efforts, best_efforts_for_activities
+from app.config import Config
+from app.exceptions import GPSStorageNotBackfilledError
+from app.executors import imap_in_process
+from app.gps_stream import GPSStream
+from app.repositories import (
+    ActivityRepository, AsyncPersonalBestRepository, GPSStreamRepository, PersonalBestProgressionRepository,
+    PersonalBestRepository, get_gps_repository
+)
+from app.response_cache import PERSONAL_BESTS, invalidate
+from app.utils import calculate_pace_or_speed, row_to_dict
 
 
 class PersonalBestService:
@@ -14,6 +27,9 @@ class PersonalBestService:
         """Initialize service with database session."""
         self.db = db
         self.pb_repo = PersonalBestRepository(db)
+        self.progression_repo = PersonalBestProgressionRepository(db)
+        self.activity_repo = ActivityRepository(db)
+        self.gps_repo = get_gps_repository(db)
 
     def upsert_personal_best(
         self,
@@ -29,55 +45,277 @@ class PersonalBestService:
 
         Only updates if the new time is better than the existing one.
         """
+        self.upsert_personal_bests([{
+            'activity_type': activity_type,
+            'distance': distance,
+            'best_time': best_time,
+            'avg_pace': avg_pace,
+            'activity_id': activity_id,
+            'achieved_date': achieved_date
+        }])
+
+    def upsert_personal_bests(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Store the candidate efforts that beat the current personal bests.
+
+        candidates are dicts with the PersonalBestModel columns, typically
+        all best efforts of one activity. The current records are loaded
+        with one query per activity type and the improvements are written
+        with a single upsert, the progression timeline is updated (see
+        _update_progression) and everything is committed once.
+
+        Returns the candidates that were written.
+        """
         try:
-            existing = self.pb_repo.get_by_type_and_distance(activity_type, distance)
-
-            if existing:
-                # Only update if new time is better (lower)
-                if best_time < existing.best_time:
-                    self.pb_repo.update(
-                        existing,
-                        best_time=best_time,
-                        avg_pace=avg_pace,
-                        activity_id=activity_id,
-                        achieved_date=achieved_date
-                    )
-            else:
-                # Create new PB record
-                self.pb_repo.create(
-                    activity_type=activity_type,
-                    distance=distance,
-                    best_time=best_time,
-                    avg_pace=avg_pace,
-                    activity_id=activity_id,
-                    achieved_date=achieved_date
-                )
+            written = self._write_improvements(candidates)
 
             # Commit the transaction
             self.db.commit()
+            if written:
+                invalidate(PERSONAL_BESTS)
+            return written
         except Exception:
             self.db.rollback()
             raise
 
-    def get_all_personal_bests(self) -> List[Dict[str, Any]]:
-        """Get all personal bests as dictionaries."""
-        pbs = self.pb_repo.get_all()
-        return [self._to_dict(pb) for pb in pbs]
+    def add_best_efforts(
+        self,
+        activity_id: int,
+        activity_type: str,
+        achieved_date: datetime,
+        stream: GPSStream
+    ) -> List[Dict[str, Any]]:
+        """
+        Compute an activity's best efforts and store those that beat the current personal bests.
+
+        Works like upsert_personal_bests, but the changes are not committed,
+        so they become part of the caller's transaction (e.g. the one
+        creating the activity).
+
+        Returns the personal bests written.
+        """
+        candidates = []
+        for distance, seconds in best_efforts(activity_type, stream).items():
+            best_time = int(round(seconds))
+            if best_time <= 0:
+                continue
+            candidates.append({
+                'activity_type': activity_type,
+                'distance': distance,
+                'best_time': best_time,
+                'avg_pace': calculate_pace_or_speed(activity_type, distance, best_time)['value'],
+                'activity_id': activity_id,
+                'achieved_date': achieved_date
+            })
+        return self._write_improvements(candidates)
+
+    def _write_improvements(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Upsert the candidates that beat the current records and update the timeline, without committing."""
+        if not candidates:
+            return []
+
+        current = {}
+        for activity_type in {c['activity_type'].lower() for c in candidates}:
+            for pb in self.pb_repo.get_by_type(activity_type):
+                current[(activity_type, pb.distance)] = pb
+
+        # Keep the fastest candidate per (type, distance) that beats the stored record
+        improvements = {}
+        for candidate in candidates:
+            key = (candidate['activity_type'].lower(), candidate['distance'])
+            existing = current.get(key)
+            if existing is not None and candidate['best_time'] >= existing.best_time:
+                continue
+            if key in improvements and improvements[key]['best_time'] <= candidate['best_time']:
+                continue
+            improvements[key] = candidate
+
+        written = set(self.pb_repo.upsert_many(list(improvements.values())))
+        written = [candidate for key, candidate in improvements.items() if key in written]
+        self._update_progression(candidates)
+
+        # The upsert bypasses the session, so drop the copies loaded above
+        for pb in current.values():
+            self.db.expire(pb)
+        return written
+
+    def _update_progression(self, candidates: List[Dict[str, Any]]) -> None:
+        """
+        Add the candidates that were records at their date to the timeline, without committing.
+
+        Activities are not necessarily ingested in date order, so a
+        candidate is added only if it beats every entry dated up to its own
+        date, and the later entries it beats or ties are deleted. Each
+        timeline thus stays what a rebuild replaying all activities in date
+        order would give. The timelines are loaded with one query per
+        activity type.
+        """
+        timelines = defaultdict(list)
+        for activity_type in {c['activity_type'].lower() for c in candidates}:
+            for entry in self.progression_repo.get_by_type(activity_type):
+                timelines[(activity_type, entry.distance)].append((entry.achieved_date, entry.best_time, entry.id))
+
+        added, deleted = [], []
+        # Fastest first among candidates of the same date, so the slower ones are skipped
+        for candidate in sorted(candidates, key=lambda c: (c['achieved_date'], c['best_time'])):
+            timeline = timelines[(candidate['activity_type'].lower(), candidate['distance'])]
+            achieved_date, best_time = candidate['achieved_date'], candidate['best_time']
+            if any(date <= achieved_date and time <= best_time for date, time, _ in timeline):
+                continue
+            beaten = [entry for entry in timeline if entry[0] > achieved_date and entry[1] >= best_time]
+            deleted.extend(entry_id for _, _, entry_id in beaten if entry_id is not None)
+            timeline[:] = [entry for entry in timeline if entry not in beaten] + [(achieved_date, best_time, None)]
+            added.append(candidate)
+
+        self.progression_repo.delete_many(deleted)
+        self.progression_repo.append_many(added)
+
+    def rebuild_personal_bests(
+        self,
+        activity_types: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int, float], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Recompute personal bests from scratch from the stored GPS points.
+
+        Use this after the standard distances change or activities are
+        deleted. GPS points of all activities (or only activity_types) are
+        streamed through a server-side cursor chunk_size points at a time,
+        best efforts are computed in the process pool, and the personal
+        bests and their progression timeline of the rebuilt types are
+        replaced in one transaction at the end, so readers never see a
+        partial table. progress is called with
+        (activities done, activities total, seconds elapsed) after each chunk.
+
+        Returns the number of activities, points, personal bests and
+        progression entries with the elapsed time and throughput.
+
+        Raises:
+            GPSStorageNotBackfilledError: If GPS_STORAGE is columnar and some
+                activities still only have rows in gps_points, whose
+                personal bests would be dropped.
+        """
+        chunk_size = chunk_size or Config.PB_REBUILD_CHUNK_SIZE
+        activity_types = [t.lower() for t in activity_types] if activity_types else None
+        if isinstance(self.gps_repo, GPSStreamRepository):
+            unconverted = len(self.gps_repo.get_unconverted_ids(activity_types))
+            if unconverted:
+                raise GPSStorageNotBackfilledError(
+                    f"{unconverted} activities have GPS points that are not in gps_streams yet; "
+                    f"run 'python -m app.cli backfill-gps-streams' before rebuilding"
+                )
+        started = time.perf_counter()
+        total = self.activity_repo.count(activity_types)
+        stats = {'activities': 0, 'points': 0}
+
+        efforts_by_key = defaultdict(list)
+        chunks = self._iter_activity_chunks(activity_types, chunk_size, stats)
+        for _, future in imap_in_process(best_efforts_for_activities, chunks):
+            for activity_id, activity_type, achieved_date, efforts in future.result():
+                stats['activities'] += 1
+                for distance, seconds in efforts.items():
+                    best_time = int(round(seconds))
+                    if best_time > 0:
+                        efforts_by_key[(activity_type, distance)].append((achieved_date, best_time, activity_id))
+            if progress:
+                progress(stats['activities'], total, time.perf_counter() - started)
+
+        # Replay the efforts in date order; each new fastest time is a step of the progression
+        best, progression = {}, []
+        for (activity_type, distance), efforts in efforts_by_key.items():
+            for achieved_date, best_time, activity_id in sorted(efforts):
+                key = (activity_type, distance)
+                if key in best and best[key]['best_time'] <= best_time:
+                    continue
+                best[key] = {
+                    'activity_type': activity_type,
+                    'distance': distance,
+                    'best_time': best_time,
+                    'avg_pace': calculate_pace_or_speed(activity_type, distance, best_time)['value'],
+                    'activity_id': activity_id,
+                    'achieved_date': achieved_date
+                }
+                progression.append(best[key])
+
+        try:
+            self.pb_repo.replace_all(list(best.values()), activity_types)
+            self.progression_repo.replace_all(progression, activity_types)
 
-    def get_personal_bests_by_type(self, activity_type: str) -> List[Dict[str, Any]]:
-        """Get all personal bests for a specific activity type."""
-        pbs = self.pb_repo.get_by_type(activity_type)
-        return [self._to_dict(pb) for pb in pbs]
+            # Commit the transaction
+            self.db.commit()
+            invalidate(PERSONAL_BESTS)
+        except Exception:
+            self.db.rollback()
+            raise
 
-    @staticmethod
-    def _to_dict(pb) -> Dict[str, Any]:
-        """Convert personal best model to dictionary."""
+        elapsed = time.perf_counter() - started
         return {
-            'id': pb.id,
-            'activity_type': pb.activity_type,
-            'distance': pb.distance,
-            'best_time': pb.best_time,
-            'avg_pace': pb.avg_pace,
-            'activity_id': pb.activity_id,
-            'achieved_date': pb.achieved_date.isoformat() if pb.achieved_date else None
+            'activities': stats['activities'],
+            'points': stats['points'],
+            'personal_bests': len(best),
+            'progression': len(progression),
+            'seconds': round(elapsed, 3),
+            'activities_per_second': round(stats['activities'] / elapsed, 2) if elapsed > 0 else None,
+            'points_per_second': round(stats['points'] / elapsed, 2) if elapsed > 0 else None
         }
+
+    def _iter_activity_chunks(
+        self, activity_types: Optional[List[str]], chunk_size: int, stats: Dict[str, int]
+    ) -> Iterator[List[tuple]]:
+        """
+        Stream chunks of whole activities of about chunk_size points, counting the points.
+
+        Each chunk holds (activity_id, activity_type, activity_date, elapsed
+        seconds, distances) tuples, ready for best_efforts_for_activities.
+        """
+        for chunk in self.gps_repo.iter_distance_chunks(activity_types, chunk_size):
+            stats['points'] += sum(len(distances) for *_, distances in chunk)
+            yield chunk
+
+    def get_all_personal_bests(self, *, iso_dates: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get all personal bests as dictionaries.
+
+        The dicts are built straight from the selected rows, with
+        achieved_date an ISO string; iso_dates=False leaves it a datetime
+        for orjson.
+        """
+        return [row_to_dict(row, iso_dates) for row in self.pb_repo.get_all_rows()]
+
+    def get_personal_bests_by_type(self, activity_type: str, *, iso_dates: bool = True) -> List[Dict[str, Any]]:
+        """Get all personal bests for a specific activity type, as get_all_personal_bests."""
+        return [row_to_dict(row, iso_dates) for row in self.pb_repo.get_all_rows(activity_type)]
+
+    def get_progression(
+        self,
+        activity_type: str,
+        distance: Optional[float] = None,
+        *,
+        iso_dates: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Get how the personal bests of an activity type improved over time.
+
+        Returns every recorded improvement, ordered by distance and date,
+        optionally for one distance only, with dates as in get_all_personal_bests.
+        """
+        entries = self.progression_repo.get_by_type(activity_type.lower(), distance)
+        return [row_to_dict(entry, iso_dates) for entry in entries]
+
+
+class AsyncPersonalBestService:
+    """Read methods of PersonalBestService on an AsyncSession, used when Config.DB_ASYNC is on."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize service with async database session."""
+        self.db = db
+        self.pb_repo = AsyncPersonalBestRepository(db)
+
+    async def get_all_personal_bests(self, *, iso_dates: bool = True) -> List[Dict[str, Any]]:
+        """Get all personal bests as dictionaries, as PersonalBestService.get_all_personal_bests."""
+        return [row_to_dict(row, iso_dates) for row in await self.pb_repo.get_all_rows()]
+
+    async def get_personal_bests_by_type(self, activity_type: str, *, iso_dates: bool = True) -> List[Dict[str, Any]]:
+        """Get all personal bests for a specific activity type, as get_all_personal_bests."""
+        return [row_to_dict(row, iso_dates) for row in await self.pb_repo.get_all_rows(activity_type)]
@@ -0,0 +1,116 @@
+"""
+Local file cache of activity GPS streams, read back through mmap.
+
+Each activity's stream is one file in Config.STREAM_CACHE_DIR with a fixed
+layout: a 16 byte header (magic, version, number of points) followed by the
+GPSStream columns in COLUMNS order, each as count little-endian 8 byte
+values (int64 microseconds for timestamps, float64 for the rest, NaN for
+missing values). Reading maps the file and wraps each column in a NumPy
+view of the mapping, so nothing is parsed or copied until the arrays are
+used. The views are read-only.
+
+The cache is keyed by activity ID only; it must be cleared together with
+the database it was filled from.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from typing import Optional
+import numpy as np
+from app.config import Config
+from app.gps_stream import COLUMNS, TIMESTAMP_DTYPE, GPSStream
+
+MAGIC = b'VGSC'
+VERSION = 1
+
+# magic, version, number of points; 16 bytes, so every column is 8 byte aligned
+HEADER = struct.Struct('<4sIQ')
+
+# On-disk type of each column
+DTYPES = {column: np.dtype('<f8') for column in COLUMNS}
+DTYPES['timestamps'] = np.dtype(TIMESTAMP_DTYPE).newbyteorder('<')
+
+
+class StreamCache:
+    """Per-activity GPS stream files in a directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, activity_id: int) -> str:
+        return os.path.join(self.directory, f"{activity_id}.stream")
+
+    def get(self, activity_id: int) -> Optional[GPSStream]:
+        """The cached stream of an activity as views of the mapped file, or None if not cached."""
+        try:
+            with open(self.path(activity_id), 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # An empty file, which cannot be mapped
+            self.delete(activity_id)
+            return None
+
+        if len(mapping) < HEADER.size:
+            return self._discard(activity_id, mapping)
+        magic, version, count = HEADER.unpack_from(mapping)
+        if magic != MAGIC or version != VERSION or len(mapping) != HEADER.size + 8 * len(COLUMNS) * count:
+            return self._discard(activity_id, mapping)
+
+        # The views keep the mapping open for as long as they are referenced
+        columns = []
+        for index, column in enumerate(COLUMNS):
+            offset = HEADER.size + 8 * count * index
+            columns.append(np.frombuffer(mapping, dtype=DTYPES[column], count=count, offset=offset))
+        return GPSStream(*columns)
+
+    def put(self, activity_id: int, stream: GPSStream) -> None:
+        """
+        Write the stream of an activity, replacing any cached one.
+
+        The file is written under a temporary name and renamed into place,
+        so readers never see a partly written file.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(stream)))
+                for column in COLUMNS:
+                    f.write(np.ascontiguousarray(getattr(stream, column), dtype=DTYPES[column]).tobytes())
+            os.replace(temp_path, self.path(activity_id))
+        except BaseException:
+            _remove(temp_path)
+            raise
+
+    def delete(self, activity_id: int) -> None:
+        """Remove the cached stream of an activity, if any."""
+        _remove(self.path(activity_id))
+
+    def _discard(self, activity_id: int, mapping: mmap.mmap) -> None:
+        """Drop a file that is not a valid cache file of this version; it is treated as not cached."""
+        mapping.close()
+        self.delete(activity_id)
+        return None
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_cache: Optional[StreamCache] = None
+
+
+def get_stream_cache() -> Optional[StreamCache]:
+    """Get the shared stream cache, or None if STREAM_CACHE_DIR is empty."""
+    global _cache
+    if not Config.STREAM_CACHE_DIR:
+        return None
+    if _cache is None or _cache.directory != Config.STREAM_CACHE_DIR:
+        _cache = StreamCache(Config.STREAM_CACHE_DIR)
+    return _cache
@@ -0,0 +1,122 @@
+"""
+Compact binary encoding of a GPSStream, stored as one blob per activity.
+
+Each column is quantized to the integer type and resolution that the FIT
+protocol itself uses, so streams parsed from FIT files round-trip exactly:
+
+    timestamps   int64   microseconds since 1970
+    latitudes    int32   semicircles
+    longitudes   int32   semicircles
+    distances    uint32  centimeters  (FIT distance scale)
+    speeds       uint32  mm/s         (FIT enhanced_speed scale)
+    heart_rates  uint8   bpm
+
+Every column is delta-encoded; consecutive samples differ by little, so
+after the bytes of each column are shuffled by significance most of the
+payload is runs of zeros, which zlib compresses well. Missing values of the
+optional columns are kept as one bitmask per column.
+"""
+import struct
+import zlib
+import numpy as np
+from app.gps_stream import COLUMNS, SEMICIRCLES_TO_DEGREES, TIMESTAMP_DTYPE, GPSStream, forward_fill
+
+MAGIC = b'VGPS'
+VERSION = 1
+
+# magic, version, number of points
+HEADER = struct.Struct('<4sBI')
+
+# Stored integer type of each column
+DTYPES = {
+    'latitudes': np.int32,
+    'longitudes': np.int32,
+    'distances': np.uint32,
+    'speeds': np.uint32,
+    'heart_rates': np.uint8,
+}
+
+# Stored value = value * scale; positions are converted back to semicircles instead
+SCALES = {'distances': 100.0, 'speeds': 1000.0, 'heart_rates': 1.0}
+
+# Columns that may have missing (NaN) values, in bitmask order
+OPTIONAL_COLUMNS = ('latitudes', 'longitudes', 'speeds', 'heart_rates')
+
+
+def _delta(values: np.ndarray) -> np.ndarray:
+    # Integer overflow wraps around and the cumulative sum in _undelta wraps back
+    return np.diff(values, prepend=values.dtype.type(0))
+
+
+def _undelta(deltas: np.ndarray) -> np.ndarray:
+    return np.cumsum(deltas, dtype=deltas.dtype)
+
+
+def _shuffle(values: np.ndarray) -> bytes:
+    """Bytes of values grouped by significance: all first bytes, then all second bytes..."""
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+
+def _unshuffle(data: bytes, dtype, count: int) -> np.ndarray:
+    itemsize = np.dtype(dtype).itemsize
+    return np.frombuffer(data, dtype=np.uint8).reshape(itemsize, count).T.copy().view(dtype).ravel()
+
+
+def _quantize(column: str, values: np.ndarray) -> np.ndarray:
+    dtype = DTYPES[column]
+    if column in SCALES:
+        values = values * SCALES[column]
+    else:
+        values = values / SEMICIRCLES_TO_DEGREES
+    # Missing values repeat the previous value so that their delta is 0
+    info = np.iinfo(dtype)
+    return np.clip(np.round(forward_fill(values, 0.0)), info.min, info.max).astype(dtype)
+
+
+def _dequantize(column: str, values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.float64)
+    if column in SCALES:
+        # Divided like the FIT decoder scales fields, so parsed values compare equal
+        return values / SCALES[column]
+    return values * SEMICIRCLES_TO_DEGREES
+
+
+def encode_stream(stream: GPSStream) -> bytes:
+    """Encode a stream into a compressed blob for decode_stream."""
+    count = len(stream)
+    parts = [_shuffle(_delta(stream.timestamps.view(np.int64)))]
+    for column in COLUMNS[1:]:
+        parts.append(_shuffle(_delta(_quantize(column, getattr(stream, column)))))
+    for column in OPTIONAL_COLUMNS:
+        parts.append(np.packbits(~np.isnan(getattr(stream, column))).tobytes())
+    return HEADER.pack(MAGIC, VERSION, count) + zlib.compress(b''.join(parts))
+
+
+def decode_stream(data: bytes) -> GPSStream:
+    """
+    Decode a blob made by encode_stream.
+
+    Raises:
+        ValueError: If data is not an encoded stream of a known version.
+    """
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a GPS stream blob (magic {magic!r}, version {version})")
+    payload = zlib.decompress(data[HEADER.size:])
+
+    offset = 0
+
+    def take(size: int) -> bytes:
+        nonlocal offset
+        offset += size
+        return payload[offset - size:offset]
+
+    columns = {'timestamps': _undelta(_unshuffle(take(8 * count), np.int64, count)).view(TIMESTAMP_DTYPE)}
+    for column in COLUMNS[1:]:
+        dtype = DTYPES[column]
+        values = _undelta(_unshuffle(take(np.dtype(dtype).itemsize * count), dtype, count))
+        columns[column] = _dequantize(column, values)
+    for column in OPTIONAL_COLUMNS:
+        present = np.unpackbits(np.frombuffer(take((count + 7) // 8), dtype=np.uint8), count=count)
+        columns[column][present == 0] = np.nan
+    return GPSStream(*(columns[column] for column in COLUMNS))
@@ -0,0 +1,269 @@
+"""
+Storage of uploaded FIT files.
+
+Uploads are copied to disk in CHUNK_SIZE pieces, so the memory used per
+upload is bounded by the chunk size. The same pass enforces
+Config.MAX_CONTENT_LENGTH, computes the sha256 content hash and checks the
+FIT file header. Zip archives are also bounded in size, number of entries
+and total extracted bytes (Config.MAX_ARCHIVE_*).
+"""
+import hashlib
+import os
+import uuid
+import zipfile
+from datetime import datetime
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
+import aiofiles
+from fastapi import UploadFile
+from app.config import Config
+from app.exceptions import FitFileParseError, InvalidUploadError, UploadTooLargeError
+from app.executors import run_in_thread
+from app.fit_decoder import HEADER_MIN_SIZE, read_header
+
+# Bytes read at a time when copying or hashing files
+CHUNK_SIZE = 64 * 1024
+
+
+class SavedUpload(NamedTuple):
+    """A file of a bulk upload: where it was saved, or why it was rejected."""
+    name: str
+    path: Optional[str]
+    content_hash: Optional[str]
+    error: Optional[str] = None
+
+
+def _too_large(name: str) -> UploadTooLargeError:
+    return UploadTooLargeError(
+        f"{name} is larger than the maximum upload size of {Config.MAX_CONTENT_LENGTH // (1024 * 1024)}MB"
+    )
+
+
+def _archive_too_large(name: str) -> UploadTooLargeError:
+    return UploadTooLargeError(
+        f"{name} extracts to more than {Config.MAX_ARCHIVE_EXTRACTED_SIZE // (1024 * 1024)}MB of .fit files"
+    )
+
+
+class _ArchiveBudgetExceeded(Exception):
+    """Raised while extracting a zip member once the archive's extracted bytes exceed their limit."""
+
+
+class _UploadCheck:
+    """Size limit, content hash and FIT header check, fed one chunk at a time."""
+
+    def __init__(self, name: str, budget: Optional[int] = None):
+        """budget, if given, bounds the size too, raising _ArchiveBudgetExceeded."""
+        self.name = name
+        self.budget = budget
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.header = b''
+        self.expected_size: Optional[int] = None
+
+    def update(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.budget is not None and self.size > self.budget:
+            raise _ArchiveBudgetExceeded()
+        if self.size > Config.MAX_CONTENT_LENGTH:
+            raise _too_large(self.name)
+        if self.expected_size is None:
+            self.header += chunk[:HEADER_MIN_SIZE - len(self.header)]
+            if len(self.header) == HEADER_MIN_SIZE:
+                header_size, data_size = self._read_header()
+                self.expected_size = header_size + data_size
+        self.digest.update(chunk)
+
+    def finish(self) -> str:
+        """Check that the whole FIT file arrived and return its sha256 hex digest."""
+        if self.expected_size is None:
+            self._read_header()
+        if self.size < self.expected_size:
+            raise InvalidUploadError(f"{self.name} is not a valid .fit file: file is truncated")
+        return self.digest.hexdigest()
+
+    def _read_header(self) -> Tuple[int, int]:
+        try:
+            return read_header(self.header)
+        except FitFileParseError as e:
+            raise InvalidUploadError(f"{self.name} is not a valid .fit file: {e}") from e
+
+
+def _remove_file(filepath: str) -> None:
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
+
+
+def is_fit_filename(filename: str) -> bool:
+    """Check that an uploaded file has the .fit extension."""
+    return bool(filename) and filename.endswith('.fit')
+
+
+def is_zip_filename(filename: str) -> bool:
+    """Check that an uploaded file has the .zip extension."""
+    return bool(filename) and filename.lower().endswith('.zip')
+
+
+def upload_path(filename: str) -> str:
+    """
+    Path in the upload folder for an uploaded file, prefixed with the upload time.
+
+    A random suffix after the time keeps uploads of files with the same
+    name apart, within one bulk upload or from concurrent requests.
+    """
+    prefix = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}"
+    return os.path.join(Config.UPLOAD_FOLDER, f"{prefix}_{os.path.basename(filename)}")
+
+
+def file_content_hash(filepath: str) -> str:
+    """sha256 hex digest of a file on disk, as stored in ActivityModel.content_hash."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _stream_to_disk(file: UploadFile, filepath: str) -> str:
+    """Copy an upload to filepath chunk by chunk, returning its content hash."""
+    # Reject early when the multipart parser already knows the size
+    if file.size is not None and file.size > Config.MAX_CONTENT_LENGTH:
+        raise _too_large(file.filename)
+
+    check = _UploadCheck(file.filename)
+    try:
+        async with aiofiles.open(filepath, "wb") as target:
+            while chunk := await file.read(CHUNK_SIZE):
+                check.update(chunk)
+                await target.write(chunk)
+        return check.finish()
+    except BaseException:
+        await run_in_thread(_remove_file, filepath)
+        raise
+
+
+def _copy_file(source: BinaryIO, filepath: str, name: str, budget: Optional[int] = None) -> Tuple[str, int]:
+    """Copy a file object to filepath chunk by chunk, returning its content hash and size."""
+    check = _UploadCheck(name, budget)
+    try:
+        with open(filepath, "wb") as target:
+            while chunk := source.read(CHUNK_SIZE):
+                check.update(chunk)
+                target.write(chunk)
+        return check.finish(), check.size
+    except BaseException:
+        _remove_file(filepath)
+        raise
+
+
+async def save_upload(file: UploadFile) -> Tuple[str, str]:
+    """
+    Save an uploaded .fit file under a timestamped name in the upload folder.
+
+    Returns the path and the sha256 hex digest of the content.
+
+    Raises:
+        UploadTooLargeError: If the file is larger than Config.MAX_CONTENT_LENGTH.
+        InvalidUploadError: If the file does not have a complete FIT header and data.
+    """
+    filepath = upload_path(file.filename)
+    content_hash = await _stream_to_disk(file, filepath)
+    return filepath, content_hash
+
+
+def _extract_fit_files(archive: BinaryIO, name: str) -> List[SavedUpload]:
+    """
+    Extract the .fit members of a zip archive into the upload folder.
+
+    Members are stored by their base name only, so paths in the archive can
+    never point outside the upload folder. Members that are too large or
+    are not FIT files are reported with an error instead of being stored.
+    The bytes actually extracted are counted, not the sizes the archive
+    declares, and extraction stops as soon as they exceed the limit.
+
+    Raises:
+        UploadTooLargeError: If the archive is larger than Config.MAX_ARCHIVE_SIZE
+            or its .fit members extract to more than Config.MAX_ARCHIVE_EXTRACTED_SIZE;
+            no members are kept then.
+        InvalidUploadError: If the archive is not a valid zip file or has
+            more than Config.MAX_ARCHIVE_MEMBERS entries.
+    """
+    archive.seek(0, os.SEEK_END)
+    if archive.tell() > Config.MAX_ARCHIVE_SIZE:
+        raise UploadTooLargeError(
+            f"{name} is larger than the maximum archive size of {Config.MAX_ARCHIVE_SIZE // (1024 * 1024)}MB"
+        )
+    archive.seek(0)
+    try:
+        zf = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile as e:
+        raise InvalidUploadError(f"Invalid zip archive: {e}") from e
+
+    extracted = []
+    extracted_bytes = 0
+    with zf:
+        members = zf.infolist()
+        if len(members) > Config.MAX_ARCHIVE_MEMBERS:
+            raise InvalidUploadError(f"{name} has more than {Config.MAX_ARCHIVE_MEMBERS} entries")
+        try:
+            for info in members:
+                if info.is_dir() or not is_fit_filename(info.filename):
+                    continue
+
+                filepath = upload_path(info.filename)
+                try:
+                    with zf.open(info) as source:
+                        content_hash, size = _copy_file(
+                            source, filepath, info.filename, Config.MAX_ARCHIVE_EXTRACTED_SIZE - extracted_bytes
+                        )
+                except InvalidUploadError as e:
+                    extracted.append(SavedUpload(info.filename, None, None, str(e)))
+                    continue
+                extracted_bytes += size
+                extracted.append(SavedUpload(info.filename, filepath, content_hash))
+        except _ArchiveBudgetExceeded:
+            _remove_saved(extracted)
+            raise _archive_too_large(name) from None
+    return extracted
+
+
+def _remove_saved(saved: List[SavedUpload]) -> None:
+    """Delete the stored files of a bulk upload that is rejected as a whole."""
+    for upload in saved:
+        if upload.path:
+            _remove_file(upload.path)
+
+
+async def save_uploads(files: List[UploadFile]) -> List[SavedUpload]:
+    """
+    Save the .fit files of a bulk upload, extracting any zip archives.
+
+    Returns one SavedUpload per file in upload order. Files that are not
+    .fit files or zip archives, or fail the size or header check, are not
+    stored and carry the reason in error.
+
+    Raises:
+        UploadTooLargeError: If a zip archive exceeds the archive size limits.
+        InvalidUploadError: If a zip archive cannot be read or has too many entries.
+        Files already stored for the upload are deleted in both cases.
+    """
+    saved = []
+    for file in files:
+        if is_zip_filename(file.filename):
+            try:
+                saved.extend(await run_in_thread(_extract_fit_files, file.file, file.filename))
+            except InvalidUploadError:
+                await run_in_thread(_remove_saved, saved)
+                raise
+        elif is_fit_filename(file.filename):
+            filepath = upload_path(file.filename)
+            try:
+                content_hash = await _stream_to_disk(file, filepath)
+            except InvalidUploadError as e:
+                saved.append(SavedUpload(file.filename, None, None, str(e)))
+                continue
+            saved.append(SavedUpload(file.filename, filepath, content_hash))
+        else:
+            saved.append(SavedUpload(file.filename, None, None, "Only .fit files are supported"))
+    return saved
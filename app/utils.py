@@ -1,6 +1,11 @@
 """
 Utility functions for calculations and formatting.
 """
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+# Periods activities are aggregated by, as stored in TimeAggregationModel.aggregation_type
+AGGREGATION_PERIODS = ('daily', 'weekly', 'monthly')
 
 
 def calculate_pace_or_speed(activity_type: str, distance_meters: float, duration_seconds: int) -> dict:
@@ -61,3 +66,64 @@ def format_distance(meters: float, activity_type: str = None) -> str:
     else:
         # Cycling and Running: show in km
         return f"{meters / 1000:.2f} km"
+
+
+def to_naive_utc(when: Optional[datetime]) -> Optional[datetime]:
+    """when in UTC without tzinfo, as dates are stored; naive datetimes are returned unchanged."""
+    if when is None or when.tzinfo is None:
+        return when
+    return when.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def row_to_dict(row, iso_dates: bool = True) -> Dict[str, Any]:
+    """
+    A selected row as a dict, with datetimes as ISO 8601 strings.
+
+    iso_dates=False leaves the datetimes for orjson, which serializes them
+    faster; only the API responses do that.
+    """
+    values = row._asdict()
+    if iso_dates:
+        for key, value in values.items():
+            if isinstance(value, datetime):
+                values[key] = value.isoformat()
+    return values
+
+
+def period_start(when: datetime, period: str) -> datetime:
+    """
+    Start of the daily, weekly (Monday) or monthly period containing when.
+
+    Raises:
+        ValueError: If period is not one of AGGREGATION_PERIODS.
+    """
+    day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'daily':
+        return day
+    if period == 'weekly':
+        return day - timedelta(days=day.weekday())
+    if period == 'monthly':
+        return day.replace(day=1)
+    raise ValueError(f"Invalid period '{period}'. Must be one of: {', '.join(AGGREGATION_PERIODS)}")
+
+
+def next_period_start(start: datetime, period: str) -> datetime:
+    """Start of the period following the one starting at start."""
+    if period == 'daily':
+        return start + timedelta(days=1)
+    if period == 'weekly':
+        return start + timedelta(weeks=1)
+    if period == 'monthly':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    raise ValueError(f"Invalid period '{period}'. Must be one of: {', '.join(AGGREGATION_PERIODS)}")
+
+
+def period_count(first: datetime, last: datetime, period: str) -> int:
+    """Number of periods from the one starting at first to the one starting at last, inclusive."""
+    if period == 'daily':
+        return (last - first).days + 1
+    if period == 'weekly':
+        return (last - first).days // 7 + 1
+    if period == 'monthly':
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    raise ValueError(f"Invalid period '{period}'. Must be one of: {', '.join(AGGREGATION_PERIODS)}")
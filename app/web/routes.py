@@ -1,12 +1,16 @@
+from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Request, UploadFile, File, Form, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-import os
-from datetime import datetime
 from app.database import get_db
-from app.services import ActivityService, PersonalBestService
+from app.services import ActivityService, AnalyticsService, PersonalBestService, IngestService
 from app.config import Config
+from app.exceptions import InvalidCursorError, InvalidUploadError, UploadTooLargeError
+from app.executors import run_in_thread
+from app.response_cache import ACTIVITIES, PERSONAL_BESTS, cached_response
+from app.uploads import is_fit_filename, save_upload
 from app.utils import calculate_pace_or_speed, format_duration, format_distance
 
 router = APIRouter()
@@ -28,21 +32,27 @@ def get_template_context(request: Request, **kwargs):
 
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request, db: Session = Depends(get_db)):
-    """Dashboard/Home page."""
-    activity_service = ActivityService(db)
-    pb_service = PersonalBestService(db)
+    """Dashboard/Home page, cached until activities or personal bests change."""
+    async def build() -> HTMLResponse:
+        activity_service = ActivityService(db)
+        pb_service = PersonalBestService(db)
 
-    recent_activities = activity_service.get_all_activities()[:10]
-    personal_bests = pb_service.get_all_personal_bests()[:5]
+        recent_activities, _ = activity_service.get_activities_page(limit=10)
+        personal_bests = pb_service.get_all_personal_bests()[:5]
+        this_week = AnalyticsService(db).get_time_aggregations('weekly', start=datetime.now())
 
-    return templates.TemplateResponse(
-        "index.html",
-        get_template_context(
-            request,
-            recent_activities=recent_activities,
-            personal_bests=personal_bests
+        return templates.TemplateResponse(
+            "index.html",
+            get_template_context(
+                request,
+                total_activities=activity_service.count_activities(),
+                recent_activities=recent_activities,
+                personal_bests=personal_bests,
+                week_duration=sum(bucket['duration'] for bucket in this_week)
+            )
         )
-    )
+
+    return await cached_response(request, (ACTIVITIES, PERSONAL_BESTS), build)
 
 
 @router.get("/upload", response_class=HTMLResponse)
@@ -57,44 +67,44 @@ async def upload_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
-    """Handle file upload and parse .fit file."""
-    if not file.filename.endswith('.fit'):
+    """Handle file upload and queue the .fit file for ingestion."""
+    if not is_fit_filename(file.filename):
         # Return to upload page with error
         return templates.TemplateResponse(
             "upload.html",
             get_template_context(request, error="Only .fit files are supported")
         )
 
-    # Save file
-    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-    filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
-
-    with open(filepath, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-
-    # Use service layer to create activity from FIT file
-    activity_service = ActivityService(db)
-    activity_id = activity_service.create_from_fit_file(filepath)
-
-    if not activity_id:
+    try:
+        filepath, content_hash = await save_upload(file)
+    except InvalidUploadError as e:
         return templates.TemplateResponse(
             "upload.html",
-            get_template_context(request, error="Failed to parse .fit file. Please ensure it's a valid file.")
+            get_template_context(request, error=str(e)),
+            status_code=413 if isinstance(e, UploadTooLargeError) else 400
         )
 
-    # Redirect to activities page with success
-    return RedirectResponse(url="/activities", status_code=303)
+    # Parsing and persisting happen in an ingest job; the page polls its status
+    job = await run_in_thread(IngestService(db).enqueue, filepath, content_hash)
+
+    return templates.TemplateResponse(
+        "upload.html",
+        get_template_context(request, job=job),
+        status_code=202
+    )
 
 
 @router.get("/activities", response_class=HTMLResponse)
-async def activities(request: Request, db: Session = Depends(get_db)):
-    """Activities list page."""
+async def activities(request: Request, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """Activities list page, one page at a time."""
     activity_service = ActivityService(db)
-    all_activities = activity_service.get_all_activities()
+    try:
+        page, next_cursor = activity_service.get_activities_page(Config.ACTIVITIES_PAGE_SIZE, cursor)
+    except InvalidCursorError:
+        return RedirectResponse(url="/activities", status_code=303)
     return templates.TemplateResponse(
         "activities.html",
-        get_template_context(request, activities=all_activities)
+        get_template_context(request, activities=page, next_cursor=next_cursor)
     )
 
 
@@ -132,6 +142,7 @@ async def personal_bests(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/analytics", response_class=HTMLResponse)
-async def analytics(request: Request):
+async def analytics(request: Request, db: Session = Depends(get_db)):
     """Analytics and trends page."""
-    return templates.TemplateResponse("analytics.html", get_template_context(request))
+    totals = AnalyticsService(db).get_totals_by_type()
+    return templates.TemplateResponse("analytics.html", get_template_context(request, totals=totals))
@@ -0,0 +1,104 @@
+"""
+Benchmark serializing the activity list to JSON.
+
+Fills the activities table and times turning all of it into a JSON response
+body two ways: the ORM path (full ActivityModel entities, a _to_dict per row
+with isoformat() dates, then FastAPI's jsonable_encoder and JSONResponse)
+and the list path the endpoints use (ActivityService.get_all_activities
+selecting the list columns as Core rows, then ORJSONResponse). Reports
+lists and rows per second.
+
+Usage:
+    python -m benchmarks.bench_activity_list [--database-url URL] [--activities N] [--repeat N]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.database import ActivityModel, Base
+from app.repositories import ActivityRepository
+from app.services import ActivityService
+
+ACTIVITY_TYPES = ('running', 'cycling', 'swimming')
+
+
+def add_activities(db, count: int) -> None:
+    """Insert count activities with one executemany."""
+    start = datetime(2024, 1, 1, 6, 0)
+    db.execute(insert(ActivityModel), [
+        {
+            'activity_type': ACTIVITY_TYPES[i % 3],
+            'upload_date': start + timedelta(days=i // 2, hours=1),
+            'activity_date': start + timedelta(days=i // 2, minutes=i % 2),
+            'duration': 1800 + i % 3600,
+            'total_distance': 5000.0 + i,
+            'avg_heart_rate': 120 + i % 60,
+            'file_path': f'uploads/activity-{i}.fit',
+            'content_hash': f'{i:064x}'
+        }
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def orm_body(db) -> bytes:
+    """The list as built before: ORM entities, _to_dict and jsonable_encoder."""
+    activities = [ActivityService._to_dict(a) for a in ActivityRepository(db).get_all()]
+    return JSONResponse(jsonable_encoder({"success": True, "data": activities, "count": len(activities)})).body
+
+
+def rows_body(db) -> bytes:
+    """The list as built now: Core rows and orjson."""
+    activities = ActivityService(db).get_all_activities(iso_dates=False)
+    return ORJSONResponse({"success": True, "data": activities, "count": len(activities)}).body
+
+
+def time_body(Session, build, repeat: int) -> float:
+    """Mean seconds per list, each built in a fresh session so no ORM identity map is reused."""
+    elapsed = 0.0
+    for _ in range(repeat):
+        db = Session()
+        try:
+            started = time.perf_counter()
+            build(db)
+            elapsed += time.perf_counter() - started
+        finally:
+            db.close()
+    return elapsed / repeat
+
+
+def run(database_url: str, activities: int, repeat: int) -> None:
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    db = Session()
+    try:
+        add_activities(db, activities)
+        # Both paths return the same JSON, up to the encoders' whitespace
+        assert json.loads(orm_body(db)) == json.loads(rows_body(db))
+    finally:
+        db.close()
+
+    print(f"{engine.dialect.name}: list of {activities} activities, mean of {repeat}")
+    print(f"  {'path':<22} {'per list':>10} {'lists/s':>9} {'rows/s':>11}")
+    try:
+        for name, build in (('ORM + jsonable_encoder', orm_body), ('Core rows + orjson', rows_body)):
+            seconds = time_body(Session, build, repeat)
+            print(f"  {name:<22} {seconds * 1000:8.1f}ms {1 / seconds:9.1f} {activities / seconds:11,.0f}")
+    finally:
+        Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--activities', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    run(args.database_url, args.activities, args.repeat)
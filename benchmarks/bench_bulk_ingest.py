@@ -0,0 +1,72 @@
+"""
+Benchmark bulk FIT ingestion throughput against the number of parse workers.
+
+Writes a set of synthetic FIT files and ingests them all through
+IngestService.ingest_files once per worker count, reporting files/second.
+Throughput should grow with the number of workers up to the core count.
+
+Usage:
+    python -m benchmarks.bench_bulk_ingest [--database-url URL] [--files N] [--records N] [--workers 1,2,4]
+"""
+import argparse
+import os
+import tempfile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import executors
+from app.config import Config
+from app.database import Base
+from app.services import IngestService
+from tests.fit_files import build_fit_file, make_records
+
+
+def worker_counts(cpus: int):
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def run(database_url: str, files: int, records: int, workers) -> None:
+    engine = create_engine(database_url)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    # validate_file_path only accepts relative paths
+    workdir = tempfile.mkdtemp(prefix='bench_bulk_')
+    os.chdir(workdir)
+    build_fit_file('template.fit', make_records(records, step=2.5))
+    template = open('template.fit', 'rb').read()
+    paths = []
+    for i in range(files):
+        path = f'{i}.fit'
+        with open(path, 'wb') as f:
+            f.write(template)
+        paths.append((path, path))
+
+    print(f"{engine.dialect.name}: ingesting {files} files of {records} records each")
+    for count in workers:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        Config.PARSE_WORKERS = count
+        executors.shutdown_pools()
+        executors.get_process_pool()  # Start the workers outside the timing
+
+        db = Session()
+        try:
+            summary = IngestService(db).ingest_files(paths)
+        finally:
+            db.close()
+        print(f"  {count:>3} workers {summary['seconds']:8.3f}s  {summary['files_per_second']:10,.1f} files/s")
+    executors.shutdown_pools()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', default=f"sqlite:///{os.path.abspath('benchmark.db')}")
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--records', type=int, default=3600)
+    parser.add_argument('--workers', default=','.join(map(str, worker_counts(os.cpu_count() or 1))))
+    args = parser.parse_args()
+    run(args.database_url, args.files, args.records, [int(w) for w in args.workers.split(',')])
@@ -0,0 +1,90 @@
+"""
+Benchmark loading one activity's GPS points as the gps_points table grows.
+
+For each table size, fills gps_points with activities of --points points
+each and times GPSPointRepository.get_stream (the activity detail query)
+with and without the (activity_id, timestamp) index. Without the index the
+query scans the whole table, so its latency grows with the table; with it
+the latency only depends on the size of the activity.
+
+Usage:
+    python -m benchmarks.bench_gps_detail_query [--database-url URL] [--points N]
+        [--activities 10,100,1000] [--queries N]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, GPSPointModel
+from app.repositories import ActivityRepository, GPSPointRepository
+from benchmarks.bench_gps_insert import make_stream
+
+INDEX = next(i for i in GPSPointModel.__table__.indexes if i.name == 'ix_gps_points_activity_id_timestamp')
+
+
+def add_activities(db, count: int, points: int) -> list:
+    """Add count activities of points GPS points each, returning their ids."""
+    stream = make_stream(points)
+    activity_repo, gps_repo = ActivityRepository(db), GPSPointRepository(db)
+    ids = []
+    for _ in range(count):
+        activity = activity_repo.create(
+            activity_type='cycling',
+            activity_date=datetime.now() - timedelta(days=1),
+            duration=points,
+            total_distance=float(stream.distances[-1]),
+            file_path='uploads/benchmark.fit'
+        )
+        gps_repo.create_stream(activity.id, stream)
+        ids.append(activity.id)
+    db.commit()
+    return ids
+
+
+def time_queries(db, ids: list, queries: int) -> float:
+    """Mean seconds per get_stream call over queries randomly chosen activities."""
+    repo = GPSPointRepository(db)
+    started = time.perf_counter()
+    for activity_id in random.choices(ids, k=queries):
+        repo.get_stream(activity_id)
+    return (time.perf_counter() - started) / queries
+
+
+def run(database_url: str, points: int, sizes: list, queries: int) -> None:
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    print(f"{engine.dialect.name}: get_stream latency, {points} points per activity")
+    print(f"  {'rows':>12} {'no index':>10} {'index':>10}")
+    db = Session()
+    try:
+        ids = []
+        for size in sizes:
+            ids += add_activities(db, size - len(ids), points)
+
+            INDEX.drop(bind=engine)
+            without_index = time_queries(db, ids, queries)
+            db.rollback()
+            INDEX.create(bind=engine)
+            with_index = time_queries(db, ids, queries)
+            db.rollback()
+
+            print(f"  {len(ids) * points:>12,} {without_index * 1000:8.1f}ms {with_index * 1000:8.1f}ms")
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--points', type=int, default=2_000)
+    parser.add_argument('--activities', default='10,100,1000',
+                        help='comma separated numbers of activities in the table')
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+    run(args.database_url, args.points, sorted(int(n) for n in args.activities.split(',')), args.queries)
@@ -0,0 +1,86 @@
+"""
+Benchmark GPS point ingestion: ORM add_all versus the bulk insert path.
+
+Inserts one activity with 50k GPS points through each path and reports the
+wall time per path. The bulk path uses COPY on PostgreSQL and an executemany
+Core insert on other databases.
+
+Usage:
+    python -m benchmarks.bench_gps_insert [--database-url URL] [--points N]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, GPSPointModel
+from app.gps_stream import GPSStream
+from app.repositories import ActivityRepository, GPSPointRepository
+
+
+def make_stream(count: int) -> GPSStream:
+    start = np.datetime64(datetime(2024, 1, 15, 6, 0), 'us')
+    seconds = np.arange(count)
+    return GPSStream(
+        start + seconds.astype('timedelta64[s]'),
+        37.7749 + seconds * 1e-5,
+        -122.4194 + seconds * 1e-5,
+        seconds * 8.0,
+        np.full(count, 8.0),
+        140 + seconds % 30
+    )
+
+
+def insert_orm(db, activity_id: int, stream: GPSStream) -> None:
+    """The previous implementation: one ORM object per point and add_all."""
+    db.add_all([
+        GPSPointModel(
+            activity_id=activity_id, timestamp=timestamp, latitude=latitude, longitude=longitude,
+            distance=distance, speed=speed, heart_rate=heart_rate
+        )
+        for timestamp, latitude, longitude, distance, speed, heart_rate in stream.rows()
+    ])
+
+
+def insert_bulk(db, activity_id: int, stream: GPSStream) -> None:
+    GPSPointRepository(db).create_stream(activity_id, stream)
+
+
+def run(database_url: str, points: int) -> None:
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    stream = make_stream(points)
+
+    print(f"{engine.dialect.name}: inserting {points} GPS points per activity")
+    for name, insert in (('orm add_all', insert_orm), ('bulk', insert_bulk)):
+        db = Session()
+        try:
+            activity = ActivityRepository(db).create(
+                activity_type='cycling',
+                activity_date=datetime.now() - timedelta(days=1),
+                duration=points,
+                total_distance=float(stream.distances[-1]),
+                file_path='uploads/benchmark.fit'
+            )
+            db.commit()
+
+            started = time.perf_counter()
+            insert(db, activity.id, stream)
+            db.commit()
+            elapsed = time.perf_counter() - started
+
+            print(f"  {name:<12} {elapsed:8.3f}s  {points / elapsed:12,.0f} points/s")
+            ActivityRepository(db).delete(activity.id)
+            db.commit()
+        finally:
+            db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--points', type=int, default=50_000)
+    args = parser.parse_args()
+    run(args.database_url, args.points)
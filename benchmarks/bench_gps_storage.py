@@ -0,0 +1,120 @@
+"""
+Benchmark GPS point storage: one row per point versus one columnar blob per activity.
+
+Stores the same activities through GPSPointRepository and
+GPSStreamRepository and reports the bytes used per point and the latency of
+reading one activity back with get_stream. The memory-mapped stream cache
+is measured the same way, with the read including a pass over the
+distances so that the mapped pages are actually touched. Sizes are measured with
+pg_total_relation_size on PostgreSQL and as the growth of the database
+file on SQLite.
+
+Usage:
+    python -m benchmarks.bench_gps_storage [--database-url URL] [--points N] [--activities N]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.gps_stream import SEMICIRCLES_TO_DEGREES, GPSStream
+from app.repositories import ActivityRepository, GPSPointRepository, GPSStreamRepository
+from app.stream_cache import StreamCache
+
+def make_stream(count: int, seed: int) -> GPSStream:
+    """A noisy ride sampled once per second, at FIT resolution."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(datetime(2024, 1, 15, 6, 0), 'us')
+    speeds = np.round(np.clip(8.0 + np.cumsum(rng.normal(0, 0.1, count)), 0, 20), 3)
+    semicircles = np.cumsum(rng.integers(-900, 900, (2, count)), axis=1) + [[450_000_000], [-1_460_000_000]]
+    return GPSStream(
+        start + np.arange(count).astype('timedelta64[s]'),
+        semicircles[0] * SEMICIRCLES_TO_DEGREES,
+        semicircles[1] * SEMICIRCLES_TO_DEGREES,
+        np.round(np.cumsum(speeds), 2),
+        speeds,
+        np.clip(140 + np.cumsum(rng.integers(-1, 2, count)), 60, 200)
+    )
+
+
+def database_size(db, table: str) -> int:
+    """Bytes used by table on PostgreSQL, or by the whole database on SQLite."""
+    if db.bind.dialect.name == 'postgresql':
+        return db.execute(text("SELECT pg_total_relation_size(:table)"), {'table': table}).scalar()
+    page_size = db.execute(text("PRAGMA page_size")).scalar()
+    return db.execute(text("PRAGMA page_count")).scalar() * page_size
+
+
+def run(database_url: str, points: int, activities: int) -> None:
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    print(f"{engine.dialect.name}: {activities} activities of {points} GPS points")
+    print(f"  {'storage':<10} {'write':>9} {'bytes/point':>12} {'get_stream':>11}")
+    for name, repository, table in (
+        ('rows', GPSPointRepository, 'gps_points'), ('columnar', GPSStreamRepository, 'gps_streams')
+    ):
+        db = Session()
+        try:
+            ids = []
+            size_before = database_size(db, table)
+            started = time.perf_counter()
+            for i in range(activities):
+                stream = make_stream(points, seed=i)
+                activity = ActivityRepository(db).create(
+                    activity_type='cycling',
+                    activity_date=datetime.now() - timedelta(days=i),
+                    duration=points,
+                    total_distance=float(stream.distances[-1]),
+                    file_path='uploads/benchmark.fit'
+                )
+                repository(db).create_stream(activity.id, stream)
+                ids.append(activity.id)
+            db.commit()
+            write = time.perf_counter() - started
+
+            if engine.dialect.name == 'postgresql':
+                db.execute(text(f"ANALYZE {table}"))
+            size = database_size(db, table)
+            if engine.dialect.name != 'postgresql':
+                size -= size_before
+
+            started = time.perf_counter()
+            for activity_id in ids:
+                repository(db).get_stream(activity_id)
+                db.expire_all()
+            read = (time.perf_counter() - started) / activities
+
+            print(f"  {name:<10} {write:8.3f}s {size / (points * activities):12.1f} {read * 1000:9.1f}ms")
+        finally:
+            db.close()
+    Base.metadata.drop_all(bind=engine)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = StreamCache(directory)
+        started = time.perf_counter()
+        for i in range(activities):
+            cache.put(i, make_stream(points, seed=i))
+        write = time.perf_counter() - started
+        size = sum(entry.stat().st_size for entry in os.scandir(directory))
+
+        started = time.perf_counter()
+        for i in range(activities):
+            cache.get(i).distances.sum()
+        read = (time.perf_counter() - started) / activities
+        print(f"  {'mmap cache':<10} {write:8.3f}s {size / (points * activities):12.1f} {read * 1000:9.1f}ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--points', type=int, default=10_800)
+    parser.add_argument('--activities', type=int, default=20)
+    args = parser.parse_args()
+    run(args.database_url, args.points, args.activities)
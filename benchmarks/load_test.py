@@ -0,0 +1,181 @@
+"""
+Load test the read endpoints with the synchronous and the async database layer.
+
+Fills a database with activities and GPS points, then for each mode starts
+the app under uvicorn (DB_ASYNC=false, then DB_ASYNC=true, response cache
+off) and sends requests from many concurrent clients: activity list pages,
+single activities and downsampled streams, spread over the activities.
+Reports requests per second and median and 95th percentile latency.
+
+With DB_ASYNC=false the endpoints query the database on the event loop, so
+one slow query holds up every other request; with DB_ASYNC=true they await
+asyncpg/aiosqlite and the loop serves other requests meanwhile. The
+difference grows with database latency, so run it against PostgreSQL for
+numbers that mean anything.
+
+Keep --concurrency within the synchronous engine's connection pool (15
+connections by default). Beyond it, a sync-mode request blocks the event
+loop waiting for a connection that only the loop can give back, and the
+server stalls until the pool times out; requests taking longer than
+--timeout seconds are counted as failed.
+
+Usage:
+    python -m benchmarks.load_test [--database-url URL] [--activities N]
+        [--requests N] [--concurrency N] [--timeout SECONDS] [--port N]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+import httpx
+import numpy as np
+from sqlalchemy import create_engine, insert
+from app.database import ActivityModel, Base, GPSPointModel
+
+ACTIVITY_TYPES = ('running', 'cycling', 'swimming')
+POINTS_PER_ACTIVITY = 600
+
+
+def fill(database_url: str, activities: int) -> None:
+    """Recreate the tables and insert activities with POINTS_PER_ACTIVITY GPS points each."""
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2024, 1, 1, 6, 0)
+    with engine.begin() as connection:
+        connection.execute(insert(ActivityModel), [
+            {
+                'id': i + 1,
+                'activity_type': ACTIVITY_TYPES[i % 3],
+                'upload_date': start + timedelta(hours=i, minutes=30),
+                'activity_date': start + timedelta(hours=i),
+                'duration': POINTS_PER_ACTIVITY,
+                'total_distance': POINTS_PER_ACTIVITY * 3.0,
+                'avg_heart_rate': 140,
+                'file_path': f'uploads/activity-{i}.fit',
+                'content_hash': f'{i:064x}'
+            }
+            for i in range(activities)
+        ])
+        for i in range(activities):
+            connection.execute(insert(GPSPointModel), [
+                {
+                    'activity_id': i + 1,
+                    'timestamp': start + timedelta(hours=i, seconds=s),
+                    'latitude': 37.0 + s * 1e-5,
+                    'longitude': -122.0 + np.sin(s / 50) * 1e-3,
+                    'distance': s * 3.0,
+                    'speed': 3.0,
+                    'heart_rate': 130 + s % 30
+                }
+                for s in range(POINTS_PER_ACTIVITY)
+            ])
+    engine.dispose()
+
+
+def paths(activities: int, count: int):
+    """count request paths, cycling through list pages, activities and streams."""
+    for i in range(count):
+        activity_id = i * 7919 % activities + 1
+        yield (
+            f"/api/v1/activities?limit=50&activity_type={ACTIVITY_TYPES[i % 3]}",
+            f"/api/v1/activities/{activity_id}",
+            f"/api/v1/activities/{activity_id}/stream?max_points={100 + i % 50}",
+        )[i % 3]
+
+
+def start_server(database_url: str, port: int, db_async: bool) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'DATABASE_URL': database_url,
+        'DB_ASYNC': str(db_async).lower(),
+        'SCHEMA_CHECK': 'false',
+        'RESPONSE_CACHE': '',
+        'STREAM_CACHE_DIR': '',
+        'STREAM_RESULT_CACHE_SIZE': '0',
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning'],
+        env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError("The server did not start")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    """Stop the server, killing it if it does not finish its open requests in time."""
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+async def load(port: int, activities: int, requests: int, concurrency: int, timeout: float):
+    """Send the requests from concurrency clients; return (seconds, latencies, failures)."""
+    queue = list(paths(activities, requests))
+    latencies, failures = [], 0
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal failures
+        while queue:
+            path = queue.pop()
+            started = time.perf_counter()
+            try:
+                response = await http.get(path)
+                failures += response.status_code != 200
+            except httpx.TimeoutException:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=timeout) as http:
+        # Warm up connections and caches of the driver
+        await asyncio.gather(
+            *(http.get("/api/v1/activities?limit=1") for _ in range(concurrency)), return_exceptions=True
+        )
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        return time.perf_counter() - started, np.array(latencies), failures
+
+
+def run(database_url: str, activities: int, requests: int, concurrency: int, timeout: float, port: int) -> None:
+    fill(database_url, activities)
+    print(f"{database_url.split(':')[0]}: {requests} requests from {concurrency} clients, {activities} activities")
+    print(f"  {'mode':<6} {'req/s':>8} {'p50':>9} {'p95':>9} {'failed':>7}")
+    try:
+        for name, db_async in (('sync', False), ('async', True)):
+            server = start_server(database_url, port, db_async)
+            try:
+                seconds, latencies, failures = asyncio.run(load(port, activities, requests, concurrency, timeout))
+            finally:
+                stop_server(server)
+            p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+            print(f"  {name:<6} {requests / seconds:8.1f} {p50:7.1f}ms {p95:7.1f}ms {failures:7d}")
+    finally:
+        engine = create_engine(database_url)
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', default='sqlite:///benchmark.db')
+    parser.add_argument('--activities', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    run(args.database_url, args.activities, args.requests, args.concurrency, args.timeout, args.port)
@@ -0,0 +1,74 @@
+"""
+Alembic migration environment.
+
+Migrations run against Config.DATABASE_URL unless a connection is passed in
+config.attributes['connection'] (as the tests do). SQLite uses batch mode,
+since it cannot alter most constraints in place.
+"""
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from app.config import Config
+from app.database import Base
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get('configure_logger', True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    """
+    Leave indexes with expression columns (such as activity_date DESC) out of
+    autogenerate comparisons: SQLite reflects them as plain column indexes,
+    so they would otherwise show up as changed on every run.
+    """
+    if type_ == 'index':
+        index = compare_to if reflected else obj
+        if index is not None and any(not hasattr(e, 'name') for e in index.expressions):
+            return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL for Config.DATABASE_URL without connecting."""
+    context.configure(
+        url=Config.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=Config.DATABASE_URL.startswith('sqlite'),
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == 'sqlite',
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run the migrations on a live connection."""
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        _run(connection)
+        return
+
+    engine = create_engine(Config.DATABASE_URL, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _run(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
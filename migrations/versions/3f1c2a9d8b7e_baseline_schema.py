@@ -0,0 +1,84 @@
+"""baseline schema
+
+The schema as created by init_db (Base.metadata.create_all) in the first
+release, before any of the later tables, columns and indexes. Databases
+created that way are brought under Alembic by stamping this revision and
+then upgrading; `python -m app.cli db upgrade` stamps it by itself when it
+finds tables but no alembic_version.
+
+Revision ID: 3f1c2a9d8b7e
+Revises:
+Create Date: 2026-10-17 06:57:19.036379
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d8b7e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'activities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('activity_type', sa.String(), nullable=False),
+        sa.Column('upload_date', sa.DateTime(), nullable=False),
+        sa.Column('activity_date', sa.DateTime(), nullable=False),
+        sa.Column('duration', sa.Integer(), nullable=False),
+        sa.Column('total_distance', sa.Float(), nullable=False),
+        sa.Column('avg_heart_rate', sa.Integer(), nullable=True),
+        sa.Column('file_path', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_activities_id', 'activities', ['id'])
+
+    op.create_table(
+        'gps_points',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('activity_id', sa.Integer(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('distance', sa.Float(), nullable=False),
+        sa.Column('speed', sa.Float(), nullable=True),
+        sa.Column('heart_rate', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_gps_points_id', 'gps_points', ['id'])
+
+    op.create_table(
+        'personal_bests',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('activity_type', sa.String(), nullable=False),
+        sa.Column('distance', sa.Float(), nullable=False),
+        sa.Column('best_time', sa.Integer(), nullable=False),
+        sa.Column('avg_pace', sa.Float(), nullable=False),
+        sa.Column('activity_id', sa.Integer(), nullable=False),
+        sa.Column('achieved_date', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_personal_bests_id', 'personal_bests', ['id'])
+
+    op.create_table(
+        'time_aggregations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('activity_type', sa.String(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('duration', sa.Integer(), nullable=False),
+        sa.Column('aggregation_type', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_time_aggregations_id', 'time_aggregations', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('time_aggregations')
+    op.drop_table('personal_bests')
+    op.drop_table('gps_points')
+    op.drop_table('activities')
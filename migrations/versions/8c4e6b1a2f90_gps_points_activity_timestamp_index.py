@@ -0,0 +1,35 @@
+"""index gps_points on (activity_id, timestamp)
+
+Loading an activity's points in order, deleting them and the ORM cascade
+all filter gps_points by activity_id; without an index each of them scans
+the whole table. On PostgreSQL the index is built CONCURRENTLY, outside the
+migration transaction, so ingest can keep writing while it builds.
+
+Revision ID: 8c4e6b1a2f90
+Revises: e5c3c76884e8
+Create Date: 2026-10-17 07:12:40.518224
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e6b1a2f90'
+down_revision = 'e5c3c76884e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_gps_points_activity_id_timestamp', 'gps_points', ['activity_id', 'timestamp'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_gps_points_activity_id_timestamp', table_name='gps_points',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,42 @@
+"""add ingest_jobs for the ingest job queue
+
+Revision ID: a2d8ebfb80c8
+Revises: 3f1c2a9d8b7e
+Create Date: 2026-10-17 06:58:02.114527
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.schema import has_table
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2d8ebfb80c8'
+down_revision = '3f1c2a9d8b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if has_table('ingest_jobs'):
+        return
+    op.create_table(
+        'ingest_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_path', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('duplicate', sa.Boolean(), nullable=False),
+        sa.Column('activity_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('parsing_started_at', sa.DateTime(), nullable=True),
+        sa.Column('persisting_started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ingest_jobs_id', 'ingest_jobs', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('ingest_jobs')
@@ -0,0 +1,45 @@
+"""add personal_best_progression
+
+Existing personal bests have no history; `python -m app.cli
+rebuild-personal-bests` fills it by replaying all activities.
+
+Revision ID: ac829f521357
+Revises: d6fec27400eb
+Create Date: 2026-10-17 07:00:24.691538
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.schema import has_table
+
+
+# revision identifiers, used by Alembic.
+revision = 'ac829f521357'
+down_revision = 'd6fec27400eb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if has_table('personal_best_progression'):
+        return
+    op.create_table(
+        'personal_best_progression',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('activity_type', sa.String(), nullable=False),
+        sa.Column('distance', sa.Float(), nullable=False),
+        sa.Column('best_time', sa.Integer(), nullable=False),
+        sa.Column('avg_pace', sa.Float(), nullable=False),
+        sa.Column('activity_id', sa.Integer(), nullable=False),
+        sa.Column('achieved_date', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_personal_best_progression_id', 'personal_best_progression', ['id'])
+    op.create_index(
+        'ix_personal_best_progression_type_distance_date', 'personal_best_progression',
+        ['activity_type', 'distance', 'achieved_date']
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('personal_best_progression')
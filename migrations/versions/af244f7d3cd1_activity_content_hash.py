@@ -0,0 +1,31 @@
+"""add activities.content_hash for upload deduplication
+
+Activities stored before this revision have no hash and are never matched
+as duplicates.
+
+Revision ID: af244f7d3cd1
+Revises: a2d8ebfb80c8
+Create Date: 2026-10-17 06:58:41.372096
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.schema import has_column, has_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'af244f7d3cd1'
+down_revision = 'a2d8ebfb80c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not has_column('activities', 'content_hash'):
+        op.add_column('activities', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    if not has_index('activities', 'ix_activities_content_hash'):
+        op.create_index('ix_activities_content_hash', 'activities', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activities_content_hash', table_name='activities')
+    op.drop_column('activities', 'content_hash')
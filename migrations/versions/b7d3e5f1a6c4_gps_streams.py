@@ -0,0 +1,30 @@
+"""add gps_streams for columnar GPS storage
+
+Revision ID: b7d3e5f1a6c4
+Revises: 8c4e6b1a2f90
+Create Date: 2026-10-17 09:41:05.218337
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e5f1a6c4'
+down_revision = '8c4e6b1a2f90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'gps_streams',
+        sa.Column('activity_id', sa.Integer(), nullable=False),
+        sa.Column('point_count', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('activity_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('gps_streams')
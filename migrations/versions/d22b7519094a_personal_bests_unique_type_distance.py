@@ -0,0 +1,39 @@
+"""make personal_bests unique on (activity_type, distance)
+
+The batched upsert relies on this constraint for ON CONFLICT. Duplicate
+records left by concurrent writers of earlier versions are removed first,
+keeping the fastest (and of equal times the oldest) per key.
+
+Revision ID: d22b7519094a
+Revises: af244f7d3cd1
+Create Date: 2026-10-17 06:59:13.840273
+"""
+from alembic import op
+from app.schema import has_unique_constraint
+
+
+# revision identifiers, used by Alembic.
+revision = 'd22b7519094a'
+down_revision = 'af244f7d3cd1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if has_unique_constraint('personal_bests', 'uq_personal_bests_type_distance'):
+        return
+    op.execute(
+        "DELETE FROM personal_bests WHERE EXISTS ("
+        "SELECT 1 FROM personal_bests AS other "
+        "WHERE other.activity_type = personal_bests.activity_type "
+        "AND other.distance = personal_bests.distance "
+        "AND (other.best_time < personal_bests.best_time "
+        "OR (other.best_time = personal_bests.best_time AND other.id < personal_bests.id)))"
+    )
+    with op.batch_alter_table('personal_bests') as batch:
+        batch.create_unique_constraint('uq_personal_bests_type_distance', ['activity_type', 'distance'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('personal_bests') as batch:
+        batch.drop_constraint('uq_personal_bests_type_distance', type_='unique')
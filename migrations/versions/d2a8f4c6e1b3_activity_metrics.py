@@ -0,0 +1,23 @@
+"""add activities.metrics for metrics computed at ingest
+
+Revision ID: d2a8f4c6e1b3
+Revises: b7d3e5f1a6c4
+Create Date: 2026-10-17 11:12:47.604512
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8f4c6e1b3'
+down_revision = 'b7d3e5f1a6c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('activities', sa.Column('metrics', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('activities', 'metrics')
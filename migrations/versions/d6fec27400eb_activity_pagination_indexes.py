@@ -0,0 +1,34 @@
+"""index activities for keyset pagination
+
+(activity_date DESC, id DESC) serves the activity list and
+(activity_type, activity_date DESC, id DESC) the list filtered by type.
+
+Revision ID: d6fec27400eb
+Revises: d22b7519094a
+Create Date: 2026-10-17 06:59:50.227164
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.schema import has_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6fec27400eb'
+down_revision = 'd22b7519094a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not has_index('activities', 'ix_activities_date'):
+        op.create_index('ix_activities_date', 'activities', [sa.text('activity_date DESC'), sa.text('id DESC')])
+    if not has_index('activities', 'ix_activities_type_date'):
+        op.create_index(
+            'ix_activities_type_date', 'activities',
+            ['activity_type', sa.text('activity_date DESC'), sa.text('id DESC')]
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activities_type_date', table_name='activities')
+    op.drop_index('ix_activities_date', table_name='activities')
@@ -0,0 +1,42 @@
+"""add distance and count totals to time_aggregations
+
+Buckets become unique per (aggregation_type, activity_type, date) so they
+can be upserted. Earlier versions never wrote this table, so any rows in it
+are discarded; `python -m app.cli rebuild-aggregations` computes the totals
+of existing activities.
+
+Revision ID: e5c3c76884e8
+Revises: ac829f521357
+Create Date: 2026-10-17 07:01:09.503817
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.schema import has_column, has_unique_constraint
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c3c76884e8'
+down_revision = 'ac829f521357'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if has_unique_constraint('time_aggregations', 'uq_time_aggregations_bucket'):
+        return
+    op.execute("DELETE FROM time_aggregations")
+    with op.batch_alter_table('time_aggregations') as batch:
+        if not has_column('time_aggregations', 'total_distance'):
+            batch.add_column(sa.Column('total_distance', sa.Float(), nullable=False))
+        if not has_column('time_aggregations', 'activity_count'):
+            batch.add_column(sa.Column('activity_count', sa.Integer(), nullable=False))
+        batch.create_unique_constraint(
+            'uq_time_aggregations_bucket', ['aggregation_type', 'activity_type', 'date']
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('time_aggregations') as batch:
+        batch.drop_constraint('uq_time_aggregations_bucket', type_='unique')
+        batch.drop_column('activity_count')
+        batch.drop_column('total_distance')
@@ -4,6 +4,7 @@ Pytest configuration and fixtures for testing.
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.database import Base
 from datetime import datetime
 
@@ -12,10 +13,17 @@ from datetime import datetime
 def test_db():
     """
     Create a test database for each test function.
-    Uses an in-memory SQLite database for fast, isolated tests.
+    Uses an in-memory SQLite database for fast, isolated tests. The single
+    connection is shared across threads so requests handled by the test
+    client and work offloaded to worker threads see the same database.
     """
     # Create in-memory SQLite database
-    engine = create_engine("sqlite:///:memory:", echo=False)
+    engine = create_engine(
+        "sqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
     TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     # Create all tables
@@ -0,0 +1,185 @@
+"""
+Helpers for building small .fit files in tests.
+
+Only the messages and fields the application reads are written: an optional
+developer data description, the record stream and the session summary.
+"""
+import struct
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+from fitparse.records import Crc
+
+# Seconds between the Unix epoch and the FIT epoch (1989-12-31 00:00:00 UTC)
+FIT_EPOCH_OFFSET = 631065600
+
+SPORTS = {'generic': 0, 'running': 1, 'cycling': 2, 'swimming': 5, 'walking': 11}
+
+# (field_def_num, struct format, base type, scale) per record field name
+RECORD_FIELDS = {
+    'timestamp': (253, 'I', 0x86, None),
+    'position_lat': (0, 'i', 0x85, None),
+    'position_long': (1, 'i', 0x85, None),
+    'heart_rate': (3, 'B', 0x02, None),
+    'distance': (5, 'I', 0x86, 100),
+    'speed': (6, 'H', 0x84, 1000),
+}
+
+INVALID_VALUES = {'I': 0xFFFFFFFF, 'i': 0x7FFFFFFF, 'H': 0xFFFF, 'B': 0xFF}
+
+
+def semicircles(degrees: float) -> int:
+    """Convert degrees to FIT semicircles."""
+    return int(round(degrees * 2**31 / 180.0))
+
+
+def fit_timestamp(value: datetime) -> int:
+    """Convert a naive UTC datetime to seconds since the FIT epoch."""
+    return int((value - datetime(1970, 1, 1)).total_seconds()) - FIT_EPOCH_OFFSET
+
+
+def _encode_value(name: str, value: Any, fmt: str) -> int:
+    if value is None:
+        return INVALID_VALUES[fmt]
+    if name == 'timestamp':
+        return fit_timestamp(value)
+    scale = RECORD_FIELDS[name][3]
+    if scale:
+        return int(round(value * scale))
+    return int(value)
+
+
+class FitFileBuilder:
+    """Incrementally assemble the data section of a FIT file."""
+
+    def __init__(self, endian: str = '<'):
+        self.endian = endian
+        self.data = bytearray()
+
+    def definition(self, local_num: int, global_num: int, fields: Sequence[tuple],
+                   dev_fields: Sequence[tuple] = ()) -> None:
+        """Write a definition message; fields are (def_num, size, base_type) tuples."""
+        header = 0x40 | local_num | (0x20 if dev_fields else 0)
+        arch = 1 if self.endian == '>' else 0
+        self.data += struct.pack(self.endian + 'BBBHB', header, 0, arch, global_num, len(fields))
+        for field in fields:
+            self.data += struct.pack('3B', *field)
+        if dev_fields:
+            self.data += struct.pack('B', len(dev_fields))
+            for field in dev_fields:
+                self.data += struct.pack('3B', *field)
+
+    def message(self, local_num: int, fmt: str, values: Sequence, header: Optional[int] = None,
+                extra: bytes = b'') -> None:
+        """Write a data message with the given struct format (without endian prefix)."""
+        self.data += struct.pack('B', local_num if header is None else header)
+        self.data += struct.pack(self.endian + fmt, *values) + extra
+
+    def to_bytes(self, header_size: int = 14) -> bytes:
+        header = struct.pack('<2BHI4s', header_size, 0x20, 2132, len(self.data), b'.FIT')
+        if header_size == 14:
+            header += struct.pack('<H', Crc.calculate(header))
+        body = header + bytes(self.data)
+        return body + struct.pack('<H', Crc.calculate(body))
+
+
+def make_records(count: int, start: datetime = datetime(2024, 1, 15, 10, 30),
+                 step: float = 3.0, heart_rate: int = 140) -> List[Dict[str, Any]]:
+    """Generate a simple straight-line track sampled once per second."""
+    records = []
+    for i in range(count):
+        records.append({
+            'timestamp': start + timedelta(seconds=i),
+            'position_lat': semicircles(37.7749 + i * 0.00002),
+            'position_long': semicircles(-122.4194 + i * 0.00001),
+            'distance': round(i * step, 2),
+            'speed': step,
+            'heart_rate': heart_rate + (i % 20),
+        })
+    return records
+
+
+def build_fit_file(
+    path,
+    records: List[Dict[str, Any]],
+    sport: Optional[str] = 'running',
+    start_time: Optional[datetime] = None,
+    total_elapsed_time: Optional[float] = None,
+    total_distance: Optional[float] = None,
+    avg_heart_rate: Optional[int] = None,
+    endian: str = '<',
+    header_size: int = 14,
+    compressed_timestamps: bool = False,
+    developer_fields: bool = False,
+    session: bool = True,
+) -> str:
+    """
+    Write a .fit file containing the given record dicts and a session summary.
+
+    Record dicts use the FIT field names (timestamp, position_lat/long in
+    semicircles, distance, speed, heart_rate). A new definition message is
+    written whenever the set of keys changes, and a key mapped to None is
+    written as the FIT invalid value.
+    """
+    builder = FitFileBuilder(endian)
+    dev_fields = ()
+    dev_extra = b''
+    if developer_fields:
+        # developer_data_id and a single uint8 field_description
+        builder.definition(3, 207, [(3, 1, 0x02)])
+        builder.message(3, 'B', [0])
+        builder.definition(3, 206, [(0, 1, 0x02), (1, 1, 0x02), (2, 1, 0x02), (3, 8, 0x07)])
+        builder.message(3, 'BBB8s', [0, 0, 0x02, b'cadence2'])
+        dev_fields = [(0, 1, 0)]
+        dev_extra = b'\x5a'
+
+    current_keys = None
+    last_timestamp = None
+    for record in records:
+        keys = tuple(name for name in RECORD_FIELDS if name in record)
+        use_compressed = (
+            compressed_timestamps
+            and last_timestamp is not None
+            and record.get('timestamp') is not None
+            and 0 <= fit_timestamp(record['timestamp']) - last_timestamp < 32
+        )
+        if use_compressed:
+            keys = tuple(name for name in keys if name != 'timestamp')
+            local_num = 1
+        else:
+            local_num = 0
+        if (keys, local_num) != current_keys:
+            builder.definition(
+                local_num, 20,
+                [(RECORD_FIELDS[name][0], struct.calcsize(RECORD_FIELDS[name][1]), RECORD_FIELDS[name][2])
+                 for name in keys],
+                dev_fields,
+            )
+            current_keys = (keys, local_num)
+        fmt = ''.join(RECORD_FIELDS[name][1] for name in keys)
+        values = [_encode_value(name, record[name], RECORD_FIELDS[name][1]) for name in keys]
+        header = None
+        if use_compressed:
+            timestamp = fit_timestamp(record['timestamp'])
+            header = 0x80 | (local_num << 5) | (timestamp & 0x1F)
+            last_timestamp = timestamp
+        elif record.get('timestamp') is not None:
+            last_timestamp = fit_timestamp(record['timestamp'])
+        builder.message(local_num, fmt, values, header=header, extra=dev_extra)
+
+    if session:
+        start_time = start_time or records[0]['timestamp']
+        builder.definition(2, 18, [
+            (253, 4, 0x86), (2, 4, 0x86), (7, 4, 0x86), (9, 4, 0x86), (16, 1, 0x02), (5, 1, 0x00),
+        ])
+        builder.message(2, 'IIIIBB', [
+            fit_timestamp(records[-1]['timestamp'] if records else start_time),
+            fit_timestamp(start_time),
+            0xFFFFFFFF if total_elapsed_time is None else int(round(total_elapsed_time * 1000)),
+            0xFFFFFFFF if total_distance is None else int(round(total_distance * 100)),
+            0xFF if avg_heart_rate is None else avg_heart_rate,
+            0xFF if sport is None else SPORTS[sport],
+        ])
+
+    with open(path, 'wb') as f:
+        f.write(builder.to_bytes(header_size))
+    return str(path)
@@ -0,0 +1,46 @@
+"""
+Fixtures for integration tests.
+"""
+import os
+import shutil
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import get_db
+from app.config import Config
+from app.response_cache import get_response_cache
+
+
+@pytest.fixture
+def client(test_db, monkeypatch):
+    """Create a test client with test database."""
+    # test_db creates its tables directly rather than through the migrations
+    monkeypatch.setattr(Config, 'SCHEMA_CHECK', False)
+    # Startup would resume ingest jobs in the app's own database, not test_db
+    monkeypatch.setattr(Config, 'INGEST_RESUME', False)
+    # Every test starts with a new database, so responses cached by earlier tests are stale
+    cache = get_response_cache()
+    if cache is not None:
+        cache.clear()
+
+    def override_get_db():
+        try:
+            yield test_db
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def upload_folder(monkeypatch):
+    """Store uploads in a throwaway folder under the upload directory."""
+    folder = os.path.join(Config.UPLOAD_FOLDER, f"test-{uuid.uuid4().hex}")
+    os.makedirs(folder)
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', folder)
+    yield folder
+    shutil.rmtree(folder, ignore_errors=True)
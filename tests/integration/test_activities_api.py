@@ -2,33 +2,19 @@
 Integration tests for activities API endpoints.
 """
 import pytest
-from fastapi.testclient import TestClient
-from app.main import app
-from app.database import get_db
 from datetime import datetime
-
-
-@pytest.fixture
-def client(test_db):
-    """Create a test client with test database."""
-    def override_get_db():
-        try:
-            yield test_db
-        finally:
-            pass
-
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as test_client:
-        yield test_client
-    app.dependency_overrides.clear()
+import numpy as np
+from app.gps_stream import GPSStream
+from app.repositories import ActivityRepository, GPSPointRepository
+from app.services import activity_service
 
 
 class TestActivitiesAPI:
-    """Integration tests for /api/activities endpoints."""
+    """Integration tests for /api/v1/activities endpoints."""
 
     def test_get_all_activities_empty(self, client):
         """Test getting activities when database is empty."""
-        response = client.get("/api/activities")
+        response = client.get("/api/v1/activities")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
@@ -37,7 +23,7 @@ class TestActivitiesAPI:
 
     def test_get_activity_not_found(self, client):
         """Test getting non-existent activity returns 404."""
-        response = client.get("/api/activities/9999")
+        response = client.get("/api/v1/activities/9999")
         assert response.status_code == 404
         data = response.json()
         assert data["success"] is False
@@ -52,13 +38,60 @@ class TestActivitiesAPI:
         activity = repo.create(**sample_activity_data)
         test_db.commit()
 
-        response = client.get("/api/activities")
+        response = client.get("/api/v1/activities")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert data["count"] == 1
         assert len(data["data"]) == 1
         assert data["data"][0]["id"] == activity.id
+        assert data["data"][0]["activity_date"] == "2024-01-15T10:30:00"
+        assert data["data"][0]["total_distance"] == 10000.0
+
+    def test_paginate_activities(self, client, test_db, sample_activity_data):
+        """Test walking all activities page by page with the cursor."""
+        from app.repositories import ActivityRepository
+
+        repo = ActivityRepository(test_db)
+        ids = [
+            repo.create(**{**sample_activity_data, 'activity_date': datetime(2024, 1, day)}).id
+            for day in (1, 2, 2, 3, 4)
+        ]
+        test_db.commit()
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            data = client.get("/api/v1/activities", params=params).json()
+            assert data["count"] == len(data["data"]) <= 2
+            seen.extend(activity["id"] for activity in data["data"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+
+    def test_filter_activities(self, client, test_db, sample_activity_data):
+        """Test filtering activities by type and date range."""
+        from app.repositories import ActivityRepository
+
+        repo = ActivityRepository(test_db)
+        repo.create(**{**sample_activity_data, 'activity_date': datetime(2024, 1, 1)})
+        repo.create(**{**sample_activity_data, 'activity_date': datetime(2024, 2, 1), 'activity_type': 'cycling'})
+        test_db.commit()
+
+        response = client.get("/api/v1/activities", params={"activity_type": "cycling"})
+        assert [a["activity_type"] for a in response.json()["data"]] == ["cycling"]
+        response = client.get("/api/v1/activities", params={"to": "2024-01-15T00:00:00"})
+        assert [a["activity_date"] for a in response.json()["data"]] == ["2024-01-01T00:00:00"]
+
+    def test_invalid_pagination_parameters(self, client):
+        """Test that bad cursors, limits and activity types are rejected."""
+        response = client.get("/api/v1/activities", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+        assert response.json() == {"success": False, "error": "Invalid cursor"}
+        assert client.get("/api/v1/activities", params={"limit": 0}).status_code == 422
+        assert client.get("/api/v1/activities", params={"activity_type": "flying"}).status_code == 400
 
     def test_get_activity_by_id(self, client, test_db, sample_activity_data):
         """Test getting a specific activity by ID."""
@@ -69,9 +102,50 @@ class TestActivitiesAPI:
         activity = repo.create(**sample_activity_data)
         test_db.commit()
 
-        response = client.get(f"/api/activities/{activity.id}")
+        response = client.get(f"/api/v1/activities/{activity.id}")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert data["data"]["id"] == activity.id
         assert data["data"]["activity_type"] == sample_activity_data["activity_type"]
+        assert data["data"]["metrics"] is None
+
+
+class TestActivityStreamAPI:
+    """Integration tests for /api/v1/activities/{id}/stream."""
+
+    @pytest.fixture(autouse=True)
+    def clear_downsampled_streams(self):
+        activity_service._downsampled_streams.clear()
+
+    def test_get_stream(self, client, test_db, sample_activity_data):
+        """Test that a long stream is downsampled to max_points points per series."""
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        seconds = np.arange(4000)
+        timestamps = np.datetime64(datetime(2024, 1, 15, 10, 30), 'us') + seconds.astype('timedelta64[s]')
+        GPSPointRepository(test_db).create_stream(activity.id, GPSStream(
+            timestamps, 37.0 + np.sin(seconds / 100) * 1e-2, -122.0 + seconds * 1e-4, seconds * 3.0,
+            3.0 + np.sin(seconds / 20), 140.0 + seconds % 20
+        ))
+        test_db.commit()
+
+        response = client.get(f"/api/v1/activities/{activity.id}/stream", params={"max_points": 100})
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["activity_id"] == activity.id
+        assert data["points"] == 4000
+        assert len(data["track"]["latitudes"]) == 100
+        assert len(data["speed"]["values"]) == len(data["heart_rate"]["values"]) == 100
+
+    def test_get_stream_not_found(self, client):
+        """Test that the stream of a missing activity is a 404."""
+        response = client.get("/api/v1/activities/9999/stream")
+        assert response.status_code == 404
+        assert response.json()["success"] is False
+
+    @pytest.mark.parametrize('max_points', [1, 100000])
+    def test_invalid_max_points(self, client, max_points):
+        """Test that max_points outside the allowed range is rejected."""
+        response = client.get("/api/v1/activities/1/stream", params={"max_points": max_points})
+        assert response.status_code == 422
@@ -0,0 +1,155 @@
+"""
+Integration tests for analytics API endpoints.
+"""
+import pytest
+from datetime import datetime
+from app.repositories import ActivityRepository
+from app.services import AnalyticsService
+
+
+def _store_activities(test_db, sample_activity_data):
+    activities = [
+        ActivityRepository(test_db).create(**{**sample_activity_data, 'activity_date': date, 'activity_type': activity_type})
+        for date, activity_type in (
+            (datetime(2024, 1, 2, 7), 'running'),
+            (datetime(2024, 1, 3, 7), 'running'),
+            (datetime(2024, 1, 20, 7), 'swimming'),
+        )
+    ]
+    AnalyticsService(test_db).add_activities(activities)
+    test_db.commit()
+
+
+class TestTimeAggregationsAPI:
+    """Integration tests for GET /api/v1/analytics/aggregations."""
+
+    def test_aggregations(self, client, test_db, sample_activity_data):
+        """Test reading weekly totals filtered by type and range."""
+        _store_activities(test_db, sample_activity_data)
+
+        response = client.get("/api/v1/analytics/aggregations")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert [(b["date"], b["activity_type"], b["activity_count"]) for b in data["data"]] == [
+            ("2024-01-01T00:00:00", "running", 2), ("2024-01-15T00:00:00", "swimming", 1)
+        ]
+
+        response = client.get(
+            "/api/v1/analytics/aggregations",
+            params={"period": "daily", "activity_type": "running", "from": "2024-01-03T00:00:00"}
+        )
+        assert [b["date"] for b in response.json()["data"]] == ["2024-01-03T00:00:00"]
+
+    def test_invalid_parameters(self, client):
+        """Test that an unknown period or activity type is rejected."""
+        assert client.get("/api/v1/analytics/aggregations", params={"period": "yearly"}).status_code == 422
+        assert client.get("/api/v1/analytics/aggregations", params={"activity_type": "flying"}).status_code == 400
+
+    def test_analytics_page_shows_totals(self, client, test_db, sample_activity_data):
+        """Test that the analytics page shows the hours per activity type."""
+        _store_activities(test_db, sample_activity_data)
+
+        response = client.get("/analytics")
+
+        assert response.status_code == 200
+        assert "2.0 hrs" in response.text
+        assert "1.0 hrs" in response.text
+
+
+class TestSummaryAPI:
+    """Integration tests for GET /api/v1/analytics/summary."""
+
+    def test_summary(self, client, test_db, sample_activity_data):
+        """Test totals per activity type with a date range."""
+        _store_activities(test_db, sample_activity_data)
+
+        response = client.get("/api/v1/analytics/summary")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["activity_types"] == ["running", "swimming"]
+        assert data["activity_count"] == [2, 1]
+        assert data["duration"] == [7200, 3600]
+        assert data["avg_heart_rate"] == [150.0, 150.0]
+        assert data["totals"] == {
+            "activity_count": 3, "duration": 10800, "total_distance": 30000.0, "avg_heart_rate": 150.0
+        }
+
+        response = client.get("/api/v1/analytics/summary", params={"from": "2024-01-03T00:00:00", "to": "2024-01-31T00:00:00"})
+        assert response.json()["data"]["activity_count"] == [1, 1]
+
+    def test_summary_empty(self, client):
+        """Test the summary without activities."""
+        data = client.get("/api/v1/analytics/summary").json()["data"]
+        assert data["activity_types"] == []
+        assert data["totals"]["activity_count"] == 0
+        assert data["totals"]["avg_heart_rate"] is None
+
+
+class TestTimeseriesAPI:
+    """Integration tests for GET /api/v1/analytics/timeseries."""
+
+    def test_weekly(self, client, test_db, sample_activity_data):
+        """Test that weekly periods are contiguous with zeros for empty weeks."""
+        _store_activities(test_db, sample_activity_data)
+
+        response = client.get("/api/v1/analytics/timeseries", params={"granularity": "weekly"})
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["labels"] == ["2024-01-01", "2024-01-08", "2024-01-15"]
+        assert data["series"]["running"]["activity_count"] == [2, 0, 0]
+        assert data["series"]["running"]["avg_heart_rate"] == [150.0, None, None]
+        assert data["series"]["swimming"]["duration"] == [0, 0, 3600]
+
+    def test_daily_range_and_type(self, client, test_db, sample_activity_data):
+        """Test daily periods covering the requested range for one activity type."""
+        _store_activities(test_db, sample_activity_data)
+
+        response = client.get("/api/v1/analytics/timeseries", params={
+            "granularity": "daily", "activity_type": "running",
+            "from": "2023-12-31T00:00:00", "to": "2024-01-04T00:00:00"
+        })
+
+        data = response.json()["data"]
+        assert data["labels"] == ["2023-12-31", "2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]
+        assert list(data["series"]) == ["running"]
+        assert data["series"]["running"]["total_distance"] == [0.0, 0.0, 10000.0, 10000.0, 0.0]
+
+    def test_monthly(self, client, test_db, sample_activity_data):
+        """Test monthly periods."""
+        _store_activities(test_db, sample_activity_data)
+
+        data = client.get("/api/v1/analytics/timeseries", params={"granularity": "monthly"}).json()["data"]
+        assert data["labels"] == ["2024-01-01"]
+        assert data["series"]["running"]["duration"] == [7200]
+
+    def test_invalid_granularity(self, client):
+        """Test that an unknown granularity is rejected."""
+        assert client.get("/api/v1/analytics/timeseries", params={"granularity": "yearly"}).status_code == 422
+
+    @pytest.mark.parametrize("granularity", ["daily", "weekly"])
+    def test_utc_range(self, client, test_db, sample_activity_data, granularity):
+        """Test that a range with a Z suffix is taken as UTC, like the stored naive dates."""
+        _store_activities(test_db, sample_activity_data)
+
+        response = client.get("/api/v1/analytics/timeseries", params={
+            "granularity": granularity, "from": "2024-01-01T01:00:00+01:00", "to": "2024-01-15T00:00:00Z"
+        })
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["labels"][0] == "2024-01-01"
+        assert data["labels"][-1] == "2024-01-15"
+        assert sum(data["series"]["running"]["activity_count"]) == 2
+
+    def test_range_too_long(self, client, test_db, sample_activity_data):
+        """Test that a range of more than TIMESERIES_MAX_PERIODS periods is rejected."""
+        _store_activities(test_db, sample_activity_data)
+
+        response = client.get("/api/v1/analytics/timeseries", params={"granularity": "daily", "from": "0001-01-01"})
+
+        assert response.status_code == 400
+        assert response.json()["success"] is False
+        response = client.get("/api/v1/analytics/timeseries", params={"granularity": "monthly", "from": "0001-01-01"})
+        assert response.status_code == 400
@@ -0,0 +1,107 @@
+"""
+Integration tests for the read endpoints served through the async engine (DB_ASYNC).
+"""
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import Config
+from app.database import Base, async_database_url, get_async_db, get_db
+from app.main import app
+from app.repositories import ActivityRepository, GPSPointRepository, PersonalBestRepository
+from app.services import activity_service
+
+# Endpoints that use the async session when DB_ASYNC is on
+READ_PATHS = [
+    "/api/v1/activities",
+    "/api/v1/activities?activity_type=running&limit=1",
+    "/api/v1/activities/1",
+    "/api/v1/activities/1/stream",
+    "/api/v1/personal-bests",
+    "/api/v1/personal-bests/running",
+]
+
+
+@pytest.fixture
+def file_db(tmp_path, sample_activity_data, sample_gps_points):
+    """A file database with an activity, GPS points and a personal best; in-memory ones are per connection."""
+    url = f"sqlite:///{tmp_path / 'api.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    activity = ActivityRepository(db).create(**sample_activity_data)
+    GPSPointRepository(db).create_batch(activity.id, sample_gps_points)
+    PersonalBestRepository(db).create('running', 5000.0, 1500, 300.0, activity.id, datetime(2024, 1, 15))
+    db.commit()
+
+    yield url, db
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def async_client(file_db, monkeypatch):
+    """A test client whose sync and async sessions both use file_db."""
+    url, db = file_db
+    monkeypatch.setattr(Config, 'SCHEMA_CHECK', False)
+    monkeypatch.setattr(Config, 'INGEST_RESUME', False)
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE', '')
+    monkeypatch.setattr(Config, 'STREAM_CACHE_DIR', '')
+    activity_service._downsampled_streams.clear()
+
+    def override_get_db():
+        yield db
+
+    async def override_get_async_db():
+        if not Config.DB_ASYNC:
+            yield None
+            return
+        engine = create_async_engine(async_database_url(url))
+        try:
+            async with AsyncSession(engine) as session:
+                yield session
+        finally:
+            await engine.dispose()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+    activity_service._downsampled_streams.clear()
+
+
+class TestAsyncAPI:
+    """The read endpoints answer the same with and without DB_ASYNC."""
+
+    @pytest.mark.parametrize('path', READ_PATHS)
+    def test_same_response(self, async_client, monkeypatch, path):
+        """Test that the async path returns the body the synchronous path returns."""
+        monkeypatch.setattr(Config, 'DB_ASYNC', False)
+        sync_response = async_client.get(path)
+        activity_service._downsampled_streams.clear()
+
+        monkeypatch.setattr(Config, 'DB_ASYNC', True)
+        async_response = async_client.get(path)
+
+        assert sync_response.status_code == async_response.status_code == 200
+        assert async_response.json() == sync_response.json()
+
+    def test_not_found(self, async_client, monkeypatch):
+        """Test that missing activities are 404s on the async path too."""
+        monkeypatch.setattr(Config, 'DB_ASYNC', True)
+        assert async_client.get("/api/v1/activities/999").status_code == 404
+        assert async_client.get("/api/v1/activities/999/stream").status_code == 404
+
+    def test_writes_seen_by_async_reads(self, async_client, file_db, monkeypatch, sample_activity_data):
+        """Test that activities committed by the synchronous session are listed on the async path."""
+        _, db = file_db
+        ActivityRepository(db).create(**{**sample_activity_data, 'activity_type': 'cycling'})
+        db.commit()
+
+        monkeypatch.setattr(Config, 'DB_ASYNC', True)
+        data = async_client.get("/api/v1/activities").json()
+        assert [activity["activity_type"] for activity in data["data"]] == ["cycling", "running"]
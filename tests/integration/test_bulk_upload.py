@@ -0,0 +1,125 @@
+"""
+Integration tests for the bulk upload endpoint.
+"""
+import io
+import os
+import zipfile
+import pytest
+from app.config import Config
+from app.repositories import ActivityRepository
+from tests.fit_files import build_fit_file, make_records
+
+
+@pytest.fixture
+def fit_bytes(tmp_path):
+    """Contents of small FIT files for each sport."""
+    return {
+        sport: open(build_fit_file(tmp_path / f'{sport}.fit', make_records(10), sport=sport), 'rb').read()
+        for sport in ('running', 'cycling', 'swimming')
+    }
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TestBulkUploadAPI:
+    """Integration tests for POST /api/v1/activities/bulk."""
+
+    @pytest.mark.parametrize('workers', [0, 2])
+    def test_upload_many_files(self, client, test_db, upload_folder, fit_bytes, monkeypatch, workers):
+        """Test that every file gets a result and valid files become activities."""
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', workers)
+        files = [
+            ("files", ("run.fit", fit_bytes['running'], "application/octet-stream")),
+            ("files", ("broken.fit", b"not a fit file", "application/octet-stream")),
+            ("files", ("ride.fit", fit_bytes['cycling'], "application/octet-stream")),
+            ("files", ("notes.txt", b"hello", "text/plain")),
+        ]
+
+        response = client.post("/api/v1/activities/bulk", files=files)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["count"] == 4
+        assert data["created"] == 2
+        assert data["failed"] == 2
+        assert [r["file"] for r in data["data"]] == ["run.fit", "broken.fit", "ride.fit", "notes.txt"]
+        assert [r["status"] for r in data["data"]] == ["created", "failed", "created", "failed"]
+        assert data["data"][3]["error"] == "Only .fit files are supported"
+
+        activity_types = {a.activity_type for a in ActivityRepository(test_db).get_all()}
+        assert activity_types == {'running', 'cycling'}
+
+    def test_upload_zip_archive(self, client, test_db, upload_folder, fit_bytes):
+        """Test that the .fit members of a zip archive are ingested."""
+        archive = _zip({
+            'export/activities/a.fit': fit_bytes['running'],
+            'export/activities/b.fit': fit_bytes['swimming'],
+            'export/other/a.fit': fit_bytes['cycling'],
+            'export/README.txt': b'ignored',
+        })
+
+        response = client.post(
+            "/api/v1/activities/bulk", files=[("files", ("export.zip", archive, "application/zip"))]
+        )
+
+        data = response.json()
+        assert data["created"] == 3
+        assert [r["file"] for r in data["data"]] == [
+            'export/activities/a.fit', 'export/activities/b.fit', 'export/other/a.fit'
+        ]
+        # Members with the same base name are stored as separate files
+        paths = [a.file_path for a in ActivityRepository(test_db).get_all()]
+        assert len(set(paths)) == 3
+        assert all(path.startswith(upload_folder) for path in paths)
+
+    def test_small_batches(self, client, test_db, upload_folder, tmp_path, monkeypatch):
+        """Test that files are stored across several transactions."""
+        monkeypatch.setattr(Config, 'BULK_BATCH_SIZE', 2)
+        files = [
+            ("files", (f"{i}.fit", open(build_fit_file(tmp_path / f'{i}.fit', make_records(5 + i)), 'rb').read(),
+                       "application/octet-stream"))
+            for i in range(5)
+        ]
+
+        data = client.post("/api/v1/activities/bulk", files=files).json()
+
+        assert data["created"] == 5
+        assert len(ActivityRepository(test_db).get_all()) == 5
+
+    def test_duplicates_are_not_stored_twice(self, client, test_db, upload_folder, fit_bytes):
+        """Test that files already stored, or repeated in the upload, point at one activity."""
+        first = client.post(
+            "/api/v1/activities/bulk", files=[("files", ("run.fit", fit_bytes['running'], "application/octet-stream"))]
+        ).json()
+        activity_id = first["data"][0]["activity_id"]
+
+        files = [
+            ("files", ("run-again.fit", fit_bytes['running'], "application/octet-stream")),
+            ("files", ("ride.fit", fit_bytes['cycling'], "application/octet-stream")),
+            ("files", ("ride-again.fit", fit_bytes['cycling'], "application/octet-stream")),
+        ]
+        data = client.post("/api/v1/activities/bulk", files=files).json()
+
+        assert [r["status"] for r in data["data"]] == ["duplicate", "created", "duplicate"]
+        assert data["data"][0]["activity_id"] == activity_id
+        assert data["data"][2]["activity_id"] == data["data"][1]["activity_id"]
+        assert (data["created"], data["duplicate"], data["failed"]) == (1, 2, 0)
+        assert len(ActivityRepository(test_db).get_all()) == 2
+        assert len(os.listdir(upload_folder)) == 2
+
+    def test_invalid_zip_archive(self, client, upload_folder):
+        """Test that an unreadable zip archive is rejected."""
+        response = client.post(
+            "/api/v1/activities/bulk", files=[("files", ("export.zip", b"not a zip", "application/zip"))]
+        )
+
+        assert response.status_code == 400
+        assert response.json()["success"] is False
+        assert "zip" in response.json()["error"].lower()
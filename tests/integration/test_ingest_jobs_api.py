@@ -0,0 +1,111 @@
+"""
+Integration tests for ingest jobs API endpoints.
+"""
+import os
+import pytest
+from app.config import Config
+from tests.fit_files import build_fit_file, make_records
+
+
+@pytest.fixture
+def inline_ingest(monkeypatch):
+    """Run ingest jobs to completion before the request returns."""
+    monkeypatch.setattr(Config, 'INGEST_WORKERS', 0)
+    monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+
+
+class TestIngestJobsAPI:
+    """Integration tests for /api/v1/ingest-jobs endpoints."""
+
+    def test_create_and_poll_job(self, client, upload_folder, inline_ingest, tmp_path):
+        """Test that an uploaded file gets a job which reports every stage."""
+        path = build_fit_file(tmp_path / 'run.fit', make_records(20))
+
+        with open(path, 'rb') as f:
+            response = client.post(
+                "/api/v1/ingest-jobs", files={"file": ("run.fit", f, "application/octet-stream")}
+            )
+
+        assert response.status_code == 202
+        job_id = response.json()["data"]["id"]
+
+        response = client.get(f"/api/v1/ingest-jobs/{job_id}")
+        assert response.status_code == 200
+        job = response.json()["data"]
+        assert job["status"] == "done"
+        assert job["error"] is None
+        assert job["finished_at"] is not None
+        assert set(job["stage_seconds"]) == {"queued", "parsing", "persisting"}
+        assert all(seconds >= 0 for seconds in job["stage_seconds"].values())
+
+        activity = client.get(f"/api/v1/activities/{job['activity_id']}").json()["data"]
+        assert activity["file_path"] == job["file_path"]
+
+    def test_duplicate_upload_returns_existing_activity(self, client, upload_folder, inline_ingest, tmp_path):
+        """Test that uploading the same file again reuses the stored activity."""
+        path = build_fit_file(tmp_path / 'run.fit', make_records(20))
+        jobs = []
+        for _ in range(2):
+            with open(path, 'rb') as f:
+                response = client.post(
+                    "/api/v1/ingest-jobs", files={"file": ("run.fit", f, "application/octet-stream")}
+                )
+            jobs.append(response.json()["data"])
+
+        assert jobs[1]["status"] == "done"
+        assert jobs[1]["duplicate"] is True
+        assert jobs[1]["activity_id"] == jobs[0]["activity_id"]
+        assert client.get("/api/v1/activities").json()["count"] == 1
+
+    def test_failed_job_reports_error(self, client, upload_folder, inline_ingest, tmp_path):
+        """Test that a file which cannot be parsed ends in a failed job with an error message."""
+        path = build_fit_file(tmp_path / 'run.fit', make_records(5), session=False)
+
+        with open(path, 'rb') as f:
+            response = client.post(
+                "/api/v1/ingest-jobs", files={"file": ("run.fit", f, "application/octet-stream")}
+            )
+
+        job = client.get(f"/api/v1/ingest-jobs/{response.json()['data']['id']}").json()["data"]
+        assert job["status"] == "failed"
+        assert job["activity_id"] is None
+        assert "no session" in job["error"]
+        assert job["stage_seconds"]["persisting"] is None
+
+    def test_rejects_invalid_fit_file(self, client, upload_folder):
+        """Test that a file without a FIT header is rejected before a job is created."""
+        response = client.post(
+            "/api/v1/ingest-jobs", files={"file": ("bad.fit", b"not a fit file", "application/octet-stream")}
+        )
+
+        assert response.status_code == 400
+        assert "not a valid .fit file" in response.json()["error"]
+        assert os.listdir(upload_folder) == []
+
+    def test_rejects_too_large_file(self, client, upload_folder, tmp_path, monkeypatch):
+        """Test that uploads over the size limit are rejected with 413."""
+        monkeypatch.setattr(Config, 'MAX_CONTENT_LENGTH', 1000)
+        path = build_fit_file(tmp_path / 'run.fit', make_records(100))
+
+        with open(path, 'rb') as f:
+            response = client.post(
+                "/api/v1/ingest-jobs", files={"file": ("run.fit", f, "application/octet-stream")}
+            )
+
+        assert response.status_code == 413
+        assert response.json()["success"] is False
+        assert os.listdir(upload_folder) == []
+
+    def test_rejects_other_extensions(self, client, upload_folder):
+        """Test that only .fit files are accepted."""
+        response = client.post(
+            "/api/v1/ingest-jobs", files={"file": ("notes.txt", b"hello", "text/plain")}
+        )
+        assert response.status_code == 400
+        assert response.json()["success"] is False
+
+    def test_get_job_not_found(self, client):
+        """Test getting non-existent job returns 404."""
+        response = client.get("/api/v1/ingest-jobs/9999")
+        assert response.status_code == 404
+        assert response.json() == {"success": False, "error": "Ingest job not found"}
@@ -0,0 +1,125 @@
+"""
+Integration tests for personal bests API endpoints.
+"""
+import pytest
+from datetime import datetime
+import numpy as np
+from app.config import Config
+from app.gps_stream import GPSStream
+from app.repositories import ActivityRepository, GPSPointRepository
+
+
+class TestRebuildPersonalBestsAPI:
+    """Integration tests for POST /api/v1/personal-bests/rebuild."""
+
+    @pytest.fixture(autouse=True)
+    def inline_workers(self, monkeypatch):
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        monkeypatch.setattr(Config, 'DB_WORKERS', 0)
+
+    @pytest.fixture
+    def activity_id(self, test_db, sample_activity_data):
+        """A stored run at 4 m/s over 6km, without personal bests."""
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        seconds = np.arange(0, 1501)
+        timestamps = np.datetime64(datetime(2024, 1, 15, 10, 30), 'us') + seconds.astype('timedelta64[s]')
+        nan = np.full(len(seconds), np.nan)
+        GPSPointRepository(test_db).create_stream(activity.id, GPSStream(timestamps, nan, nan, seconds * 4.0, nan, nan))
+        test_db.commit()
+        return activity.id
+
+    def test_rebuild(self, client, activity_id):
+        """Test that personal bests are computed from the stored GPS points."""
+        response = client.post("/api/v1/personal-bests/rebuild")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["data"]["activities"] == 1
+        assert data["data"]["points"] == 1501
+        assert data["data"]["personal_bests"] == 3
+
+        pbs = client.get("/api/v1/personal-bests/running").json()["data"]
+        assert {pb["distance"]: pb["best_time"] for pb in pbs} == {1000.0: 250, 1609.344: 402, 5000.0: 1250}
+        assert all(pb["activity_id"] == activity_id for pb in pbs)
+
+    def test_rebuild_one_type(self, client, activity_id):
+        """Test rebuilding only one activity type."""
+        response = client.post("/api/v1/personal-bests/rebuild", params={"activity_type": "cycling"})
+
+        assert response.status_code == 200
+        assert response.json()["data"]["activities"] == 0
+        assert client.get("/api/v1/personal-bests").json()["count"] == 0
+
+    def test_rebuild_invalid_type(self, client):
+        """Test that an unknown activity type is rejected."""
+        response = client.post("/api/v1/personal-bests/rebuild", params={"activity_type": "flying"})
+
+        assert response.status_code == 400
+        assert response.json()["success"] is False
+
+
+class TestPersonalBestsAPI:
+    """Integration tests for GET /api/v1/personal-bests and /api/v1/personal-bests/{activity_type}."""
+
+    def test_list(self, client, test_db, sample_activity_data):
+        """Test that personal bests are listed by type and distance, with ISO dates."""
+        from app.services import PersonalBestService
+
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+        service = PersonalBestService(test_db)
+        service.upsert_personal_best('running', 5000.0, 1500, 5.0, activity.id, datetime(2024, 1, 15, 10, 30))
+        service.upsert_personal_best('cycling', 10000.0, 1200, 30.0, activity.id, datetime(2024, 1, 15, 10, 30))
+
+        data = client.get("/api/v1/personal-bests").json()
+        assert data["count"] == 2
+        assert [(pb["activity_type"], pb["distance"]) for pb in data["data"]] == [
+            ("cycling", 10000.0), ("running", 5000.0)
+        ]
+        assert data["data"][1] == {
+            "id": data["data"][1]["id"],
+            "activity_type": "running",
+            "distance": 5000.0,
+            "best_time": 1500,
+            "avg_pace": 5.0,
+            "activity_id": activity.id,
+            "achieved_date": "2024-01-15T10:30:00"
+        }
+
+        running = client.get("/api/v1/personal-bests/running").json()
+        assert running["count"] == 1
+        assert running["data"][0]["best_time"] == 1500
+
+
+class TestPersonalBestProgressionAPI:
+    """Integration tests for GET /api/v1/personal-bests/{activity_type}/progression."""
+
+    def test_progression(self, client, test_db, sample_activity_data):
+        """Test that the timeline lists every improvement per distance."""
+        from app.services import PersonalBestService
+
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+        service = PersonalBestService(test_db)
+        for best_time in (1500, 1400, 1450, 1300):
+            service.upsert_personal_best('running', 5000.0, best_time, best_time / 300, activity.id, datetime(2024, 1, 1))
+        service.upsert_personal_best('running', 1000.0, 280, 4.7, activity.id, datetime(2024, 1, 1))
+
+        response = client.get("/api/v1/personal-bests/running/progression")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 4
+        assert [(e["distance"], e["best_time"]) for e in data["data"]] == [
+            (1000.0, 280), (5000.0, 1500), (5000.0, 1400), (5000.0, 1300)
+        ]
+        assert data["data"][0]["achieved_date"] == "2024-01-01T00:00:00"
+
+        response = client.get("/api/v1/personal-bests/running/progression", params={"distance": 1000})
+        assert response.json()["count"] == 1
+
+    def test_progression_invalid_type(self, client):
+        """Test that an unknown activity type is rejected."""
+        response = client.get("/api/v1/personal-bests/flying/progression")
+        assert response.status_code == 400
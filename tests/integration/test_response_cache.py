@@ -0,0 +1,117 @@
+"""
+Integration tests for cached responses and ETags.
+"""
+import pytest
+from datetime import datetime
+from app import response_cache
+from app.cache import RedisCache
+from app.config import Config
+from app.repositories import ActivityRepository
+from app.services import ActivityService, PersonalBestService
+from tests.local_redis import LocalRedis
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("database queried for a cached response")
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request, monkeypatch):
+    """Run a test against the in-process and the (stand-in) Redis backend."""
+    if request.param == 'redis':
+        monkeypatch.setattr(Config, 'RESPONSE_CACHE', 'redis://localhost:6379/0')
+        monkeypatch.setattr(response_cache, '_cache', response_cache.ResponseCache(RedisCache(LocalRedis())))
+        monkeypatch.setattr(response_cache, '_cache_setting', Config.RESPONSE_CACHE)
+    return request.param
+
+
+class TestResponseCache:
+    """Integration tests for the cached list, personal best and dashboard responses."""
+
+    def test_activities_cached_until_changed(self, backend, client, test_db, sample_activity_data, monkeypatch):
+        """Test that the activity list is served from the cache until an activity is deleted."""
+        service = ActivityService(test_db)
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+
+        first = client.get("/api/v1/activities")
+        assert first.status_code == 200
+        assert first.json()["count"] == 1
+        assert first.headers["cache-control"] == "no-cache"
+
+        with monkeypatch.context() as patch:
+            patch.setattr(ActivityService, 'get_activities_page', _fail)
+            second = client.get("/api/v1/activities")
+            assert second.json() == first.json()
+            assert second.headers["etag"] == first.headers["etag"]
+
+        service.delete_activity(activity.id)
+        third = client.get("/api/v1/activities")
+        assert third.json()["count"] == 0
+        assert third.headers["etag"] != first.headers["etag"]
+
+    def test_not_modified(self, backend, client, test_db, sample_activity_data, monkeypatch):
+        """Test that a matching If-None-Match gets a 304 without querying the database."""
+        ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+        etag = client.get("/api/v1/activities", params={"limit": 5}).headers["etag"]
+        monkeypatch.setattr(ActivityService, 'get_activities_page', _fail)
+
+        response = client.get("/api/v1/activities", params={"limit": 5}, headers={"If-None-Match": f'"other", W/{etag}'})
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b''
+
+    def test_keyed_by_parameters(self, client, test_db, sample_activity_data):
+        """Test that each set of query parameters is cached on its own, in any order."""
+        ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+
+        running = client.get("/api/v1/activities?activity_type=running&limit=5")
+        cycling = client.get("/api/v1/activities?activity_type=cycling&limit=5")
+        reordered = client.get("/api/v1/activities?limit=5&activity_type=running")
+
+        assert running.json()["count"] == 1
+        assert cycling.json()["count"] == 0
+        assert reordered.headers["etag"] == running.headers["etag"]
+
+    def test_personal_bests_invalidated_by_upsert(self, backend, client, test_db, sample_activity_data):
+        """Test that storing a personal best invalidates the cached personal bests."""
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+        assert client.get("/api/v1/personal-bests").json()["count"] == 0
+
+        PersonalBestService(test_db).upsert_personal_best(
+            'running', 5000.0, 1500, 5.0, activity.id, datetime(2024, 1, 15)
+        )
+
+        assert client.get("/api/v1/personal-bests").json()["count"] == 1
+
+    def test_dashboard_cached(self, client, test_db, sample_activity_data, monkeypatch):
+        """Test that the dashboard is rendered once until the data changes."""
+        etag = client.get("/").headers["etag"]
+        monkeypatch.setattr(ActivityService, 'get_activities_page', _fail)
+
+        assert client.get("/", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/").status_code == 200
+
+    def test_disabled(self, client, test_db, sample_activity_data, monkeypatch):
+        """Test that without a cache every request is answered from the database, still with ETags."""
+        monkeypatch.setattr(Config, 'RESPONSE_CACHE', '')
+        first = client.get("/api/v1/activities")
+        ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+
+        second = client.get("/api/v1/activities", headers={"If-None-Match": first.headers["etag"]})
+
+        assert second.status_code == 200
+        assert second.json()["count"] == 1
+        assert client.get("/api/v1/activities", headers={"If-None-Match": second.headers["etag"]}).status_code == 304
+
+    def test_errors_not_cached(self, client):
+        """Test that error responses are not cached."""
+        assert client.get("/api/v1/activities", params={"cursor": "bad"}).status_code == 400
+        response = client.get("/api/v1/activities", params={"cursor": "bad"})
+        assert response.status_code == 400
+        assert "etag" not in response.headers
@@ -0,0 +1,77 @@
+"""
+Integration tests for the FIT file upload route.
+"""
+import pytest
+from app import executors
+from app.config import Config
+from app.repositories import ActivityRepository, GPSPointRepository, IngestJobRepository
+from tests.fit_files import build_fit_file, make_records
+
+
+class TestUpload:
+    """Integration tests for POST /upload."""
+
+    @pytest.mark.parametrize('workers', [0, 1])
+    def test_upload_creates_activity(self, client, test_db, upload_folder, tmp_path, monkeypatch, workers):
+        """Test that an uploaded FIT file is queued, parsed and stored, inline or in worker pools."""
+        for setting in ('PARSE_WORKERS', 'DB_WORKERS', 'INGEST_WORKERS'):
+            monkeypatch.setattr(Config, setting, workers)
+        path = build_fit_file(tmp_path / 'ride.fit', make_records(30), sport='cycling')
+
+        with open(path, 'rb') as f:
+            response = client.post(
+                "/upload", files={"file": ("ride.fit", f, "application/octet-stream")}
+            )
+        executors.shutdown_pools()  # Wait for the queued job
+
+        assert response.status_code == 202
+        assert "Upload received (job #1)" in response.text
+        activities = ActivityRepository(test_db).get_all()
+        assert len(activities) == 1
+        assert activities[0].activity_type == 'cycling'
+        assert activities[0].file_path.startswith(upload_folder)
+        assert len(GPSPointRepository(test_db).get_by_activity(activities[0].id)) == 30
+        assert IngestJobRepository(test_db).get_by_id(1).activity_id == activities[0].id
+
+    def test_upload_invalid_fit_file(self, client, test_db, upload_folder):
+        """Test that a file without a FIT header is rejected before it is queued."""
+        response = client.post(
+            "/upload", files={"file": ("bad.fit", b"not a fit file", "application/octet-stream")}
+        )
+
+        assert response.status_code == 400
+        assert "not a valid .fit file" in response.text
+        assert IngestJobRepository(test_db).get_by_id(1) is None
+
+    def test_upload_failed_job(self, client, test_db, upload_folder, tmp_path, monkeypatch):
+        """Test that a FIT file which cannot be parsed fails its job and stores nothing."""
+        monkeypatch.setattr(Config, 'INGEST_WORKERS', 0)
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        path = build_fit_file(tmp_path / 'run.fit', make_records(5), session=False)
+
+        with open(path, 'rb') as f:
+            response = client.post("/upload", files={"file": ("run.fit", f, "application/octet-stream")})
+
+        assert response.status_code == 202
+        assert IngestJobRepository(test_db).get_by_id(1).status == 'failed'
+        assert ActivityRepository(test_db).get_all() == []
+
+    def test_upload_too_large(self, client, upload_folder, tmp_path, monkeypatch):
+        """Test that uploads over the size limit are rejected."""
+        monkeypatch.setattr(Config, 'MAX_CONTENT_LENGTH', 1000)
+        path = build_fit_file(tmp_path / 'run.fit', make_records(100))
+
+        with open(path, 'rb') as f:
+            response = client.post("/upload", files={"file": ("run.fit", f, "application/octet-stream")})
+
+        assert response.status_code == 413
+        assert "maximum upload size" in response.text
+
+    def test_upload_rejects_other_extensions(self, client, upload_folder):
+        """Test that only .fit files are accepted."""
+        response = client.post(
+            "/upload", files={"file": ("notes.txt", b"hello", "text/plain")}
+        )
+
+        assert response.status_code == 200
+        assert "Only .fit files are supported" in response.text
@@ -0,0 +1,87 @@
+"""
+Integration tests for the web pages.
+"""
+from datetime import datetime, timedelta
+import numpy as np
+from app.activity_metrics import compute_metrics
+from app.config import Config
+from app.gps_stream import GPSStream
+from app.repositories import ActivityRepository
+from app.services import AnalyticsService
+
+
+def _store_activities(test_db, sample_activity_data, count):
+    repo = ActivityRepository(test_db)
+    now = datetime.now().replace(microsecond=0)
+    activities = [
+        repo.create(**{**sample_activity_data, 'activity_date': now - timedelta(days=30 + i)})
+        for i in range(count)
+    ]
+    test_db.commit()
+    return activities
+
+
+class TestWebRoutes:
+    """Integration tests for the dashboard and activity list pages."""
+
+    def test_dashboard_shows_ten_most_recent(self, client, test_db, sample_activity_data):
+        """Test that the dashboard lists the newest ten activities and counts all of them."""
+        activities = _store_activities(test_db, sample_activity_data, 12)
+        recent = ActivityRepository(test_db).create(**{**sample_activity_data, 'activity_date': datetime.now()})
+        AnalyticsService(test_db).add_activities([recent])
+        test_db.commit()
+
+        response = client.get("/")
+
+        assert response.status_code == 200
+        assert f'href="/activities/{recent.id}"' in response.text
+        assert f'href="/activities/{activities[8].id}"' in response.text
+        assert f'href="/activities/{activities[9].id}"' not in response.text
+        assert '>13</p>' in response.text
+        assert '1.0 hrs' in response.text
+
+    def test_activity_list_pages(self, client, test_db, sample_activity_data, monkeypatch):
+        """Test that the activity list links to the next page until the last one."""
+        monkeypatch.setattr(Config, 'ACTIVITIES_PAGE_SIZE', 2)
+        activities = _store_activities(test_db, sample_activity_data, 3)
+
+        first = client.get("/activities")
+        assert f'/activities/{activities[1].id}"' in first.text
+        assert f'/activities/{activities[2].id}"' not in first.text
+        cursor = first.text.split('/activities?cursor=')[1].split('"')[0]
+
+        second = client.get("/activities", params={"cursor": cursor})
+        assert f'/activities/{activities[2].id}"' in second.text
+        assert '/activities?cursor=' not in second.text
+
+    def test_activity_list_invalid_cursor(self, client):
+        """Test that a bad cursor goes back to the first page."""
+        response = client.get("/activities", params={"cursor": "bad"}, follow_redirects=False)
+        assert response.status_code == 303
+
+    def test_activity_detail_metrics(self, client, test_db, sample_activity_data):
+        """Test that the detail page shows the splits and zone times stored at ingest."""
+        [activity] = _store_activities(test_db, sample_activity_data, 1)
+        seconds = np.arange(1201)
+        timestamps = np.datetime64(datetime(2024, 1, 15, 10, 0), 'us') + seconds.astype('timedelta64[s]')
+        nan = np.full(len(seconds), np.nan)
+        stream = GPSStream(timestamps, nan, nan, seconds * 2.5, nan, np.full(len(seconds), 150.0))
+        ActivityRepository(test_db).set_metrics(activity.id, compute_metrics('running', stream))
+        test_db.commit()
+
+        response = client.get(f"/activities/{activity.id}")
+
+        assert response.status_code == 200
+        assert 'Moving Time' in response.text
+        assert 'Splits' in response.text
+        assert '6:40' in response.text  # 1 km at 2.5 m/s
+        assert 'Z3' in response.text
+
+    def test_activity_detail_without_metrics(self, client, test_db, sample_activity_data):
+        """Test that activities stored before metrics were computed still render."""
+        [activity] = _store_activities(test_db, sample_activity_data, 1)
+
+        response = client.get(f"/activities/{activity.id}")
+
+        assert response.status_code == 200
+        assert 'rebuild-metrics' in response.text
@@ -0,0 +1,26 @@
+"""
+In-memory stand-in for a Redis server, for testing the Redis cache backend.
+"""
+import fnmatch
+
+
+class LocalRedis:
+    """Dict-backed stand-in for the redis.Redis commands RedisCache uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expiry[key] = ex
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in self.data if fnmatch.fnmatchcase(key, match)]
@@ -0,0 +1,88 @@
+"""
+Unit tests for activity metrics.
+"""
+import pytest
+from datetime import datetime
+import numpy as np
+from app.activity_metrics import compute_metrics
+from app.gps_stream import GPSStream
+
+
+def _stream(distances, heart_rates=None, speeds=None):
+    seconds = np.arange(len(distances), dtype=float)
+    timestamps = np.datetime64(datetime(2024, 1, 15, 10, 0), 'us') + (seconds * 1e6).astype('timedelta64[us]')
+    nan = np.full(len(distances), np.nan)
+    return GPSStream(
+        timestamps, nan, nan, distances,
+        nan if speeds is None else speeds,
+        nan if heart_rates is None else heart_rates
+    )
+
+
+class TestComputeMetrics:
+    """Tests for compute_metrics."""
+
+    def test_moving_time_excludes_stops(self):
+        """Test that intervals without progress count towards elapsed but not moving time."""
+        steps = np.r_[0.0, np.full(300, 3.0), np.zeros(120), np.full(300, 3.0)]
+        metrics = compute_metrics('running', _stream(np.cumsum(steps)))
+
+        assert metrics['elapsed_time'] == 720.0
+        assert metrics['moving_time'] == 600.0
+        assert metrics['avg_moving_speed'] == pytest.approx(3.0)
+
+    def test_recorded_speed_decides_moving(self):
+        """Test that a recorded speed takes precedence over distance over time."""
+        distances = np.arange(101) * 3.0
+        speeds = np.full(101, 3.0)
+        speeds[51:] = 0.1
+        metrics = compute_metrics('running', _stream(distances, speeds=speeds))
+
+        assert metrics['moving_time'] == 50.0
+        assert metrics['max_speed'] == 3.0
+
+    def test_splits(self):
+        """Test per-kilometer splits, including a trailing partial split."""
+        speeds = np.r_[np.full(250, 4.0), np.full(400, 2.5)]
+        distances = np.r_[0.0, np.cumsum(speeds)]
+        heart_rates = np.r_[np.full(251, 150.0), np.full(400, 130.0)]
+        metrics = compute_metrics('running', _stream(distances, heart_rates))
+
+        assert metrics['split_distance'] == 1000.0
+        assert [split['distance'] for split in metrics['splits']] == [1000.0, 1000.0]
+        assert [split['seconds'] for split in metrics['splits']] == [250.0, 400.0]
+        assert [split['avg_heart_rate'] for split in metrics['splits']] == [150, 130]
+
+        metrics = compute_metrics('running', _stream(distances[:401]))
+        assert [split['distance'] for split in metrics['splits']] == [1000.0, 375.0]
+        assert metrics['splits'][1]['seconds'] == pytest.approx(150.0)
+        assert metrics['splits'][1]['avg_heart_rate'] is None
+
+    def test_swim_splits_per_100m(self):
+        """Test that swims are split every 100 meters."""
+        metrics = compute_metrics('swimming', _stream(np.arange(301) * 1.0))
+        assert metrics['split_distance'] == 100.0
+        assert [split['seconds'] for split in metrics['splits']] == [100.0, 100.0, 100.0]
+
+    def test_heart_rate_zones(self):
+        """Test that moving time is counted in the zone of the heart rate at each interval start."""
+        heart_rates = np.r_[np.full(100, 110.0), np.full(50, 140.0), np.full(51, 180.0)]
+        metrics = compute_metrics('running', _stream(np.arange(201) * 3.0, heart_rates), (120, 140, 155, 170))
+
+        assert metrics['heart_rate_zones'] == {
+            'bounds': [120, 140, 155, 170],
+            'seconds': [100.0, 50.0, 0.0, 0.0, 50.0]
+        }
+        assert metrics['max_heart_rate'] == 180
+
+    def test_empty_stream(self):
+        """Test metrics of an activity without points."""
+        metrics = compute_metrics('cycling', GPSStream.empty(), (120, 140, 155, 170))
+
+        assert metrics['elapsed_time'] == 0.0
+        assert metrics['moving_time'] == 0.0
+        assert metrics['max_speed'] is None
+        assert metrics['avg_moving_speed'] is None
+        assert metrics['max_heart_rate'] is None
+        assert metrics['heart_rate_zones']['seconds'] == [0.0] * 5
+        assert metrics['splits'] == []
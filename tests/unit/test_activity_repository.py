@@ -3,6 +3,8 @@ Unit tests for ActivityRepository.
 """
 import pytest
 from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from app.repositories import ActivityRepository
 from app.exceptions import InvalidActivityTypeError
 
@@ -92,6 +94,21 @@ class TestActivityRepository:
         # Should be ordered by date descending
         assert activities[0].activity_date > activities[1].activity_date
 
+    def test_get_all_rows(self, test_db, sample_activity_data):
+        """Test that list rows hold the list columns only, newest first, optionally filtered by type."""
+        repo = ActivityRepository(test_db)
+        repo.create(**sample_activity_data)
+        repo.create(**{**sample_activity_data, 'activity_type': 'cycling', 'activity_date': datetime(2024, 1, 16)})
+        test_db.commit()
+
+        rows = repo.get_all_rows()
+        assert [row.activity_type for row in rows] == ['cycling', 'running']
+        assert set(rows[0]._fields) == {
+            'id', 'activity_type', 'upload_date', 'activity_date',
+            'duration', 'total_distance', 'avg_heart_rate', 'file_path'
+        }
+        assert [row.activity_type for row in repo.get_all_rows(['running'])] == ['running']
+
     def test_get_by_id(self, test_db, sample_activity_data):
         """Test getting activity by ID."""
         repo = ActivityRepository(test_db)
@@ -149,3 +166,92 @@ class TestActivityRepository:
         repo = ActivityRepository(test_db)
         result = repo.delete(9999)
         assert result is False
+
+    def test_get_by_content_hash(self, test_db, sample_activity_data):
+        """Test looking up activities by the hash of their file."""
+        repo = ActivityRepository(test_db)
+        activity = repo.create(**sample_activity_data, content_hash='a' * 64)
+        repo.create(**{**sample_activity_data, 'file_path': 'uploads/other.fit'})
+        test_db.commit()
+
+        assert repo.get_by_content_hash('a' * 64).id == activity.id
+        assert repo.get_by_content_hash('b' * 64) is None
+        assert repo.get_ids_by_content_hashes(['a' * 64, 'b' * 64]) == {'a' * 64: activity.id}
+        assert repo.get_ids_by_content_hashes([]) == {}
+
+    def test_content_hash_is_unique(self, test_db, sample_activity_data):
+        """Test that two activities cannot share a content hash."""
+        repo = ActivityRepository(test_db)
+        repo.create(**sample_activity_data, content_hash='a' * 64)
+
+        with pytest.raises(IntegrityError):
+            repo.create(**sample_activity_data, content_hash='a' * 64)
+
+    @pytest.mark.parametrize('period, expected', [
+        ('daily', [datetime(2024, 1, 7), datetime(2024, 1, 8), datetime(2024, 1, 14)]),
+        ('weekly', [datetime(2024, 1, 1), datetime(2024, 1, 8)]),
+        ('monthly', [datetime(2024, 1, 1)]),
+    ])
+    def test_summarize_by_period(self, test_db, sample_activity_data, period, expected):
+        """Test grouping activities by period, with weeks running Monday to Sunday."""
+        repo = ActivityRepository(test_db)
+        # Sunday, Monday and the following Sunday
+        for day in (7, 8, 14):
+            repo.create(**{**sample_activity_data, 'activity_date': datetime(2024, 1, day, 23, 30)})
+        test_db.commit()
+
+        rows = repo.summarize(period)
+
+        assert [row['date'] for row in rows] == expected
+        assert sum(row['activity_count'] for row in rows) == 3
+
+    def test_summarize_by_type(self, test_db, sample_activity_data):
+        """Test totals per activity type with filters."""
+        repo = ActivityRepository(test_db)
+        repo.create(**sample_activity_data)
+        repo.create(**{**sample_activity_data, 'avg_heart_rate': None})
+        repo.create(**{**sample_activity_data, 'activity_type': 'cycling', 'activity_date': datetime(2024, 2, 1)})
+        test_db.commit()
+
+        [running, cycling] = sorted(repo.summarize(), key=lambda row: row['activity_type'], reverse=True)
+        assert (running['activity_count'], running['duration'], running['heart_rate_count']) == (2, 7200, 1)
+        assert running['avg_heart_rate'] == 150
+        assert 'date' not in running
+        assert [row['activity_type'] for row in repo.summarize(activity_types=['cycling'])] == ['cycling']
+        assert [row['activity_type'] for row in repo.summarize(end=datetime(2024, 1, 31))] == ['running']
+
+    def test_get_page_walks_keyset(self, test_db, sample_activity_data):
+        """Test that pages continue after (activity_date, id), also across equal dates."""
+        repo = ActivityRepository(test_db)
+        dates = [datetime(2024, 1, 1), datetime(2024, 1, 2), datetime(2024, 1, 2), datetime(2024, 1, 3)]
+        ids = [repo.create(**{**sample_activity_data, 'activity_date': date}).id for date in dates]
+        test_db.commit()
+
+        first = repo.get_page(3)
+        second = repo.get_page(3, after=(first[-1].activity_date, first[-1].id))
+
+        assert [a.id for a in first] == [ids[3], ids[2], ids[1]]
+        assert [a.id for a in second] == [ids[0]]
+
+    def test_get_page_filters(self, test_db, sample_activity_data):
+        """Test filtering pages by activity type and date range."""
+        repo = ActivityRepository(test_db)
+        repo.create(**{**sample_activity_data, 'activity_date': datetime(2024, 1, 1)})
+        repo.create(**{**sample_activity_data, 'activity_date': datetime(2024, 2, 1)})
+        repo.create(**{**sample_activity_data, 'activity_date': datetime(2024, 2, 1), 'activity_type': 'cycling'})
+        test_db.commit()
+
+        assert [a.activity_type for a in repo.get_page(10, activity_types=['cycling'])] == ['cycling']
+        assert len(repo.get_page(10, start=datetime(2024, 1, 15))) == 2
+        assert len(repo.get_page(10, end=datetime(2024, 1, 15))) == 1
+
+    def test_get_page_uses_index(self, test_db):
+        """Test that the newest-first page is read from the (activity_date, id) index without sorting."""
+        plan = test_db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM activities "
+            "WHERE (activity_date, id) < ('2024-01-01', 5) ORDER BY activity_date DESC, id DESC LIMIT 10"
+        )).fetchall()
+        details = ' '.join(row[-1] for row in plan)
+
+        assert 'ix_activities_date' in details
+        assert 'TEMP B-TREE' not in details
@@ -3,8 +3,21 @@ Unit tests for ActivityService.
 """
 import pytest
 from datetime import datetime
-from app.services import ActivityService
-from app.repositories import ActivityRepository
+from app.services import ActivityService, PersonalBestService
+from app.config import Config
+from app.database import GPSPointModel, GPSStreamModel
+from app.repositories import ActivityRepository, GPSPointRepository, GPSStreamRepository
+from app.exceptions import ActivityNotFoundError
+from app import fit_parser
+from app.fit_parser import parse_fit_stream
+from app.services import activity_service
+from tests.fit_files import build_fit_file, make_records
+
+
+@pytest.fixture(autouse=True)
+def clear_downsampled_streams():
+    """Activity IDs are reused between test databases, so cached results must not outlive a test."""
+    activity_service._downsampled_streams.clear()
 
 
 class TestActivityService:
@@ -23,6 +36,9 @@ class TestActivityService:
         assert len(activities) == 1
         assert isinstance(activities[0], dict)
         assert activities[0]['activity_type'] == sample_activity_data['activity_type']
+        assert activities[0]['activity_date'] == sample_activity_data['activity_date'].isoformat()
+        raw = service.get_all_activities(iso_dates=False)
+        assert raw[0]['activity_date'] == sample_activity_data['activity_date']
 
     def test_get_activity_by_id(self, test_db, sample_activity_data):
         """Test getting a specific activity by ID."""
@@ -100,3 +116,276 @@ class TestActivityService:
         # Check date formatting
         assert isinstance(activity_dict['activity_date'], str)
         assert isinstance(activity_dict['upload_date'], str)
+
+    def test_create_from_fit_file(self, test_db, tmp_path, monkeypatch):
+        """Test creating an activity and streaming its GPS points from a FIT file."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'ride.fit', make_records(25), sport='cycling', total_distance=72.0)
+        service = ActivityService(test_db)
+
+        activity_id = service.create_from_fit_file('ride.fit', batch_size=10)
+
+        assert activity_id is not None
+        activity = service.get_activity_by_id(activity_id)
+        assert activity['activity_type'] == 'cycling'
+        assert activity['total_distance'] == 72.0
+        points = GPSPointRepository(test_db).get_by_activity(activity_id)
+        assert len(points) == 25
+        assert points[-1].distance == 72.0
+        assert activity['metrics']['elapsed_time'] == 24.0
+        assert activity['metrics']['max_heart_rate'] == 159
+
+    def test_create_from_fit_file_columnar(self, test_db, tmp_path, monkeypatch):
+        """Test that columnar storage keeps the GPS points as one stream per activity."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(Config, 'GPS_STORAGE', 'columnar')
+        build_fit_file(tmp_path / 'ride.fit', make_records(25), sport='cycling', total_distance=72.0)
+        service = ActivityService(test_db)
+
+        activity_id = service.create_from_fit_file('ride.fit', batch_size=10)
+
+        stream = GPSStreamRepository(test_db).get_stream(activity_id)
+        assert len(stream) == 25
+        assert stream.distances[-1] == 72.0
+        assert test_db.query(GPSPointModel).count() == 0
+
+        assert service.delete_activity(activity_id)
+        assert len(GPSStreamRepository(test_db).get_stream(activity_id)) == 0
+
+    def test_rebuild_metrics(self, test_db, sample_activity_data, tmp_path, monkeypatch):
+        """Test that metrics are recomputed from the stored points, also for activities without any."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'run.fit', make_records(1200), total_distance=3597.0)
+        service = ActivityService(test_db)
+        activity_id = service.create_from_fit_file('run.fit')
+        computed = service.get_activity_by_id(activity_id)['metrics']
+        ActivityRepository(test_db).set_metrics(activity_id, None)
+        without_points = ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+
+        progress = []
+        assert service.rebuild_metrics(lambda done, total, elapsed: progress.append((done, total))) == 2
+
+        test_db.expire_all()
+        assert service.get_activity_by_id(activity_id)['metrics'] == computed
+        assert [split['distance'] for split in computed['splits']] == [1000.0, 1000.0, 1000.0, 597.0]
+        assert service.get_activity_by_id(without_points.id)['metrics']['splits'] == []
+        assert progress == [(1, 2), (2, 2)]
+
+    def test_backfill_gps_streams(self, test_db, sample_activity_data, sample_gps_points):
+        """Test that row-stored points are copied into gps_streams once, keeping the rows."""
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        GPSPointRepository(test_db).create_batch(activity.id, sample_gps_points)
+        without_points = ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+        service = ActivityService(test_db)
+
+        progress = []
+        assert service.backfill_gps_streams(lambda done, total, elapsed: progress.append((done, total))) == 1
+
+        assert test_db.get(GPSStreamModel, activity.id).point_count == len(sample_gps_points)
+        assert test_db.get(GPSStreamModel, without_points.id) is None
+        assert test_db.query(GPSPointModel).count() == len(sample_gps_points)
+        assert progress == [(1, 1)]
+        assert service.backfill_gps_streams() == 0
+
+    def test_stream_cache(self, test_db, tmp_path, monkeypatch):
+        """Test that streams are cached at ingest, served from the cache and dropped on delete."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(Config, 'STREAM_CACHE_DIR', str(tmp_path / 'streams'))
+        build_fit_file(tmp_path / 'ride.fit', make_records(25), sport='cycling')
+        service = ActivityService(test_db)
+        activity_id = service.create_from_fit_file('ride.fit', batch_size=10)
+        stored = GPSPointRepository(test_db).get_stream(activity_id)
+
+        def no_query(activity_id):
+            raise AssertionError("stream read from the database")
+        monkeypatch.setattr(service.gps_repo, 'get_stream', no_query)
+        assert service.get_activity_stream(activity_id) == stored
+
+        assert service.delete_activity(activity_id)
+        assert not (tmp_path / 'streams' / f'{activity_id}.stream').exists()
+
+    def test_stream_cache_miss(self, test_db, tmp_path, monkeypatch):
+        """Test that a stream missing from the cache is read from the database and cached."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'ride.fit', make_records(25))
+        activity_id = ActivityService(test_db).create_from_fit_file('ride.fit')
+        monkeypatch.setattr(Config, 'STREAM_CACHE_DIR', str(tmp_path / 'streams'))
+        service = ActivityService(test_db)
+
+        stream = service.get_activity_stream(activity_id)
+
+        assert len(stream) == 25
+        assert service.stream_cache.get(activity_id) == stream
+
+    def test_get_downsampled_stream(self, test_db, tmp_path, monkeypatch):
+        """Test that downsampled streams are cached per activity until it is deleted."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'ride.fit', make_records(300), sport='cycling')
+        service = ActivityService(test_db)
+        activity_id = service.create_from_fit_file('ride.fit')
+
+        result = service.get_downsampled_stream(activity_id, 50)
+        assert result['activity_id'] == activity_id
+        assert result['points'] == 300
+        assert len(result['speed']['values']) == 50
+
+        reads = []
+        monkeypatch.setattr(service, 'get_activity_stream', lambda activity_id: reads.append(activity_id))
+        assert service.get_downsampled_stream(activity_id, 50) is result
+        assert reads == []
+
+        service.delete_activity(activity_id)
+        assert len(activity_service._downsampled_streams) == 0
+        with pytest.raises(ActivityNotFoundError):
+            service.get_downsampled_stream(activity_id, 50)
+
+    def test_downsampled_stream_of_reused_id(self, test_db, tmp_path, monkeypatch):
+        """Test that an activity stored under the ID of one deleted by another worker gets its own results."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(Config, 'STREAM_CACHE_DIR', '')
+        build_fit_file(tmp_path / 'ride.fit', make_records(300), sport='cycling')
+        build_fit_file(tmp_path / 'run.fit', make_records(200))
+        service = ActivityService(test_db)
+        activity_id = service.create_from_fit_file('ride.fit')
+        assert service.get_downsampled_stream(activity_id, 50)['points'] == 300
+
+        # Deleted without this process's cache knowing, then the ID is reused (as SQLite does)
+        ActivityRepository(test_db).delete(activity_id)
+        test_db.commit()
+        assert service.create_from_fit_file('run.fit') == activity_id
+
+        assert service.get_downsampled_stream(activity_id, 50)['points'] == 200
+
+    def test_create_from_invalid_fit_file(self, test_db, tmp_path, monkeypatch):
+        """Test that an unparseable file creates nothing and returns None."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'bad.fit').write_bytes(b'not a fit file at all')
+        service = ActivityService(test_db)
+
+        assert service.create_from_fit_file('bad.fit') is None
+        assert service.get_all_activities() == []
+
+    def test_create_from_fit_file_without_session(self, test_db, tmp_path, monkeypatch):
+        """Test that a file without a session message creates nothing, GPS points included."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'run.fit', make_records(5), session=False)
+        service = ActivityService(test_db)
+
+        assert service.create_from_fit_file('run.fit') is None
+        assert service.get_all_activities() == []
+        assert test_db.query(GPSPointModel).count() == 0
+
+    def test_create_from_fit_file_reads_file_once(self, test_db, tmp_path, monkeypatch):
+        """Test that the summary is collected in the pass that streams the GPS points."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'swim.fit', make_records(25), sport='swimming')
+        reads = []
+        iter_messages = fit_parser._iter_messages
+        monkeypatch.setattr(
+            fit_parser, '_iter_messages', lambda path, *args: reads.append(path) or iter_messages(path, *args)
+        )
+
+        activity_id = ActivityService(test_db).create_from_fit_file('swim.fit', batch_size=10)
+
+        assert reads == ['swim.fit']
+        activity = ActivityRepository(test_db).get_by_id(activity_id)
+        assert activity.activity_type == 'swimming'
+        assert activity.activity_date == make_records(1)[0]['timestamp']
+
+    def test_create_from_fit_file_twice(self, test_db, tmp_path, monkeypatch):
+        """Test that the same file content is stored only once."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'ride.fit', make_records(5))
+        (tmp_path / 'copy.fit').write_bytes((tmp_path / 'ride.fit').read_bytes())
+        service = ActivityService(test_db)
+
+        first = service.create_from_fit_file('ride.fit')
+        second = service.create_from_fit_file('copy.fit')
+
+        assert second == first
+        assert len(service.get_all_activities()) == 1
+        assert len(GPSPointRepository(test_db).get_by_activity(first)) == 5
+
+    def test_create_from_parsed_with_stored_hash(self, test_db, tmp_path, monkeypatch):
+        """Test that a concurrent duplicate resolves to the activity stored first."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'ride.fit', make_records(5))
+        service = ActivityService(test_db)
+        first = service.create_from_parsed('ride.fit', {**parse_fit_stream('ride.fit'), 'content_hash': 'abc'})
+
+        second = service.create_from_parsed('ride.fit', {**parse_fit_stream('ride.fit'), 'content_hash': 'abc'})
+
+        assert second == first
+        assert len(service.get_all_activities()) == 1
+
+    def test_create_from_fit_file_stored_concurrently(self, test_db, tmp_path, monkeypatch):
+        """Test that content stored by another request after the duplicate check resolves to that activity."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'ride.fit', make_records(5))
+        service = ActivityService(test_db)
+        first = service.create_from_parsed('ride.fit', {**parse_fit_stream('ride.fit'), 'content_hash': 'abc'})
+        # Let the duplicate check miss, as if the other request committed right after it
+        get_by_content_hash = service.activity_repo.get_by_content_hash
+        calls = []
+
+        def miss_first(content_hash):
+            calls.append(content_hash)
+            return get_by_content_hash(content_hash) if len(calls) > 1 else None
+        monkeypatch.setattr(service.activity_repo, 'get_by_content_hash', miss_first)
+
+        second = service.create_from_fit_file('ride.fit', content_hash='abc')
+
+        assert second == first
+        assert len(calls) == 2
+        assert len(service.get_all_activities()) == 1
+
+    def test_create_from_fit_file_updates_personal_bests(self, test_db, tmp_path, monkeypatch):
+        """Test that ingesting an activity records its best efforts."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'run.fit', make_records(400, step=4.0))
+        service = ActivityService(test_db)
+
+        activity_id = service.create_from_fit_file('run.fit', batch_size=50)
+
+        pbs = PersonalBestService(test_db).get_personal_bests_by_type('running')
+        assert [(pb['distance'], pb['best_time'], pb['activity_id']) for pb in pbs] == [
+            (1000.0, 250, activity_id)
+        ]
+
+    def test_create_from_parsed_updates_personal_bests(self, test_db, tmp_path, monkeypatch):
+        """Test that personal bests are stored with the activity."""
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'swim.fit', make_records(300, step=1.0), sport='swimming')
+        service = ActivityService(test_db)
+
+        activity_id = service.create_from_parsed('swim.fit', parse_fit_stream('swim.fit'))
+
+        pbs = PersonalBestService(test_db).get_personal_bests_by_type('swimming')
+        assert [pb['distance'] for pb in pbs] == [100.0, 200.0]
+        assert all(pb['activity_id'] == activity_id for pb in pbs)
+
+    def test_create_and_delete_update_time_aggregations(self, test_db, tmp_path, monkeypatch):
+        """Test that activity totals follow activities being created and deleted."""
+        from app.services import AnalyticsService
+
+        monkeypatch.chdir(tmp_path)
+        build_fit_file(tmp_path / 'a.fit', make_records(5), start_time=datetime(2024, 1, 15, 7), total_elapsed_time=600)
+        build_fit_file(tmp_path / 'b.fit', make_records(6), start_time=datetime(2024, 1, 17, 18), total_elapsed_time=900)
+        service = ActivityService(test_db)
+        analytics = AnalyticsService(test_db)
+
+        first = service.create_from_fit_file('a.fit')
+        service.create_many_from_parsed([('b.fit', parse_fit_stream('b.fit'))])
+
+        [week] = analytics.get_time_aggregations('weekly')
+        assert (week['date'], week['duration'], week['activity_count']) == ('2024-01-15T00:00:00', 1500, 2)
+        assert len(analytics.get_time_aggregations('daily')) == 2
+
+        service.delete_activity(first)
+        test_db.expire_all()
+
+        [week] = analytics.get_time_aggregations('weekly')
+        assert (week['duration'], week['activity_count']) == (900, 1)
+        assert [day['date'] for day in analytics.get_time_aggregations('daily')] == ['2024-01-17T00:00:00']
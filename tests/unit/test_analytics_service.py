@@ -0,0 +1,100 @@
+"""
+Unit tests for AnalyticsService.
+"""
+import pytest
+from datetime import datetime
+from app.repositories import ActivityRepository
+from app.services import AnalyticsService
+from app.utils import next_period_start, period_start
+
+
+@pytest.mark.parametrize('period, expected', [
+    ('daily', datetime(2024, 2, 29)),
+    ('weekly', datetime(2024, 2, 26)),
+    ('monthly', datetime(2024, 2, 1)),
+])
+def test_period_start(period, expected):
+    """Test the start of the day, week (Monday) and month of a date."""
+    assert period_start(datetime(2024, 2, 29, 18, 45, 10), period) == expected
+
+
+def test_period_start_invalid():
+    """Test that an unknown period is rejected."""
+    with pytest.raises(ValueError):
+        period_start(datetime(2024, 2, 29), 'yearly')
+
+
+class TestAnalyticsService:
+    """Tests for AnalyticsService class."""
+
+    @pytest.fixture
+    def activities(self, test_db, sample_activity_data):
+        repo = ActivityRepository(test_db)
+        activities = [
+            repo.create(**{**sample_activity_data, 'activity_date': date, 'activity_type': activity_type})
+            for date, activity_type in (
+                (datetime(2024, 1, 30, 7), 'running'),
+                (datetime(2024, 2, 1, 7), 'running'),
+                (datetime(2024, 2, 1, 18), 'cycling'),
+            )
+        ]
+        test_db.commit()
+        return activities
+
+    def test_add_activities(self, test_db, activities):
+        """Test that activities are summed per period and activity type."""
+        service = AnalyticsService(test_db)
+        service.add_activities(activities)
+        test_db.commit()
+
+        weekly = service.get_time_aggregations('weekly')
+        assert [(b['date'], b['activity_type'], b['activity_count']) for b in weekly] == [
+            ('2024-01-29T00:00:00', 'cycling', 1), ('2024-01-29T00:00:00', 'running', 2)
+        ]
+        monthly = service.get_time_aggregations('monthly', ['Running'])
+        assert [(b['date'], b['duration']) for b in monthly] == [
+            ('2024-01-01T00:00:00', 3600), ('2024-02-01T00:00:00', 3600)
+        ]
+        assert service.get_totals_by_type() == {
+            'running': {'duration': 7200, 'total_distance': 20000.0, 'activity_count': 2},
+            'cycling': {'duration': 3600, 'total_distance': 10000.0, 'activity_count': 1},
+        }
+
+    def test_range_selects_overlapping_periods(self, test_db, activities):
+        """Test that a range starting mid-period includes that period."""
+        service = AnalyticsService(test_db)
+        service.add_activities(activities)
+        test_db.commit()
+
+        monthly = service.get_time_aggregations('monthly', start=datetime(2024, 1, 15), end=datetime(2024, 1, 31))
+        assert [b['date'] for b in monthly] == ['2024-01-01T00:00:00']
+
+    def test_invalid_period(self, test_db):
+        """Test that an unknown period is rejected."""
+        with pytest.raises(ValueError):
+            AnalyticsService(test_db).get_time_aggregations('yearly')
+
+    def test_rebuild_matches_incremental(self, test_db, activities):
+        """Test that a rebuild from the activities table gives the same buckets."""
+        service = AnalyticsService(test_db)
+        service.add_activities(activities)
+        service.remove_activities(activities[:1])
+        test_db.commit()
+        ActivityRepository(test_db).delete(activities[0].id)
+        test_db.commit()
+        expected = {period: service.get_time_aggregations(period) for period in ('daily', 'weekly', 'monthly')}
+
+        assert service.rebuild_time_aggregations(chunk_size=1) == 6
+        test_db.expire_all()
+
+        assert {period: service.get_time_aggregations(period) for period in expected} == expected
+
+
+@pytest.mark.parametrize('start, period, expected', [
+    (datetime(2024, 2, 28), 'daily', datetime(2024, 2, 29)),
+    (datetime(2024, 2, 26), 'weekly', datetime(2024, 3, 4)),
+    (datetime(2024, 12, 1), 'monthly', datetime(2025, 1, 1)),
+])
+def test_next_period_start(start, period, expected):
+    """Test stepping to the next day, week and month."""
+    assert next_period_start(start, period) == expected
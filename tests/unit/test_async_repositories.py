@@ -0,0 +1,228 @@
+"""
+Unit tests for the async repositories and services, against the synchronous ones.
+"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import Config
+from app.database import Base, async_database_url
+from app.exceptions import ActivityNotFoundError
+from app.repositories import (
+    ActivityRepository,
+    AsyncActivityRepository,
+    AsyncGPSPointRepository,
+    AsyncGPSStreamRepository,
+    AsyncPersonalBestRepository,
+    GPSPointRepository,
+    GPSStreamRepository,
+    PersonalBestRepository,
+    get_async_gps_repository,
+)
+from app.services import ActivityService, AsyncActivityService, AsyncPersonalBestService, activity_service
+
+
+@pytest.fixture(autouse=True)
+def clear_downsampled_streams():
+    """Activity IDs are reused between test databases, so cached results must not outlive a test."""
+    activity_service._downsampled_streams.clear()
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    """A file database, which the sync and async engines both connect to."""
+    return f"sqlite:///{tmp_path / 'async.db'}"
+
+
+@pytest.fixture
+def db(database_url):
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def activities(db, sample_gps_points):
+    """Three activities, the first with GPS points, and a personal best."""
+    repo = ActivityRepository(db)
+    created = [
+        repo.create(
+            activity_type=activity_type,
+            activity_date=datetime(2024, 1, 1) + timedelta(days=day),
+            duration=1800,
+            total_distance=5000.0,
+            file_path=f"uploads/{day}.fit",
+            avg_heart_rate=140
+        )
+        for day, activity_type in enumerate(['running', 'cycling', 'running'])
+    ]
+    GPSPointRepository(db).create_batch(created[0].id, sample_gps_points)
+    PersonalBestRepository(db).create('running', 5000.0, 1500, 300.0, created[0].id, datetime(2024, 1, 1))
+    repo.set_metrics(created[0].id, {'moving_time': 1700})
+    db.commit()
+    return created
+
+
+def _run(database_url, use):
+    """Run the coroutine function use with an AsyncSession on the database."""
+    async def run():
+        engine = create_async_engine(async_database_url(database_url))
+        try:
+            async with AsyncSession(engine) as session:
+                return await use(session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+class TestAsyncDatabaseURL:
+    """Tests for async_database_url."""
+
+    @pytest.mark.parametrize('url, expected', [
+        ('postgresql://victoria:secret@db:5432/victoria', 'postgresql+asyncpg://victoria:secret@db:5432/victoria'),
+        ('postgresql+psycopg2://victoria@db/victoria', 'postgresql+asyncpg://victoria@db/victoria'),
+        ('sqlite:///./victoria.db', 'sqlite+aiosqlite:///./victoria.db'),
+    ])
+    def test_driver_replaced(self, url, expected):
+        """Test that the driver is swapped and the rest of the URL, password included, is kept."""
+        assert async_database_url(url) == expected
+
+
+class TestAsyncActivityRepository:
+    """Tests for AsyncActivityRepository."""
+
+    def test_get_page_matches_sync(self, database_url, db, activities):
+        """Test that pages and counts are the rows the synchronous repository returns."""
+        repo = ActivityRepository(db)
+
+        async def use(session):
+            async_repo = AsyncActivityRepository(session)
+            return (
+                await async_repo.get_page(2),
+                await async_repo.get_page(10, activity_types=['running']),
+                await async_repo.get_all_rows(),
+                await async_repo.count(),
+                await async_repo.count(['cycling'])
+            )
+
+        page, running, rows, count, cycling = _run(database_url, use)
+        assert page == repo.get_page(2)
+        assert running == repo.get_page(10, activity_types=['running'])
+        assert rows == repo.get_all_rows()
+        assert (count, cycling) == (3, 1)
+
+    def test_get_by_id_loads_metrics(self, database_url, activities):
+        """Test that the deferred metrics column is loaded, since it cannot be lazy loaded."""
+        async def use(session):
+            activity = await AsyncActivityRepository(session).get_by_id(activities[0].id)
+            return activity.metrics, await AsyncActivityRepository(session).get_by_id(999)
+
+        assert _run(database_url, use) == ({'moving_time': 1700}, None)
+
+
+class TestAsyncGPSRepositories:
+    """Tests for AsyncGPSPointRepository and AsyncGPSStreamRepository."""
+
+    def test_point_stream_matches_sync(self, database_url, db, activities):
+        """Test that the stream read from gps_points is the synchronous repository's."""
+        async def use(session):
+            return await AsyncGPSPointRepository(session).get_stream(activities[0].id)
+
+        stream = _run(database_url, use)
+        assert len(stream) == 3
+        assert stream == GPSPointRepository(db).get_stream(activities[0].id)
+
+    def test_columnar_stream_matches_sync(self, database_url, db, activities):
+        """Test that the stream decoded from gps_streams is the synchronous repository's."""
+        stream = GPSPointRepository(db).get_stream(activities[0].id)
+        GPSStreamRepository(db).create_stream(activities[1].id, stream)
+        db.commit()
+
+        async def use(session):
+            repo = AsyncGPSStreamRepository(session)
+            return await repo.get_stream(activities[1].id), await repo.get_stream(activities[2].id)
+
+        columnar, missing = _run(database_url, use)
+        assert len(columnar) == 3
+        assert columnar == GPSStreamRepository(db).get_stream(activities[1].id)
+        assert len(missing) == 0
+
+    def test_selected_by_config(self, monkeypatch):
+        """Test that get_async_gps_repository follows GPS_STORAGE."""
+        monkeypatch.setattr(Config, 'GPS_STORAGE', 'columnar')
+        assert isinstance(get_async_gps_repository(None), AsyncGPSStreamRepository)
+        monkeypatch.setattr(Config, 'GPS_STORAGE', 'rows')
+        assert isinstance(get_async_gps_repository(None), AsyncGPSPointRepository)
+
+
+class TestAsyncPersonalBestRepository:
+    """Tests for AsyncPersonalBestRepository."""
+
+    def test_get_all_rows_matches_sync(self, database_url, db, activities):
+        """Test that all and per-type rows are the synchronous repository's."""
+        async def use(session):
+            repo = AsyncPersonalBestRepository(session)
+            return await repo.get_all_rows(), await repo.get_all_rows('cycling')
+
+        rows, cycling = _run(database_url, use)
+        assert rows == PersonalBestRepository(db).get_all_rows()
+        assert len(rows) == 1
+        assert cycling == []
+
+
+class TestAsyncServices:
+    """Tests for AsyncActivityService and AsyncPersonalBestService."""
+
+    def test_activity_service_matches_sync(self, database_url, db, activities, monkeypatch):
+        """Test that the async service returns what ActivityService returns."""
+        monkeypatch.setattr(Config, 'STREAM_CACHE_DIR', '')
+        service = ActivityService(db)
+        activity_id = activities[0].id
+
+        async def use(session):
+            async_service = AsyncActivityService(session)
+            return (
+                await async_service.get_activities_page(2),
+                await async_service.get_activity_by_id(activity_id),
+                await async_service.get_downsampled_stream(activity_id, 2),
+                await async_service.count_activities()
+            )
+
+        page, activity, stream, count = _run(database_url, use)
+        # Compute the synchronous result afresh rather than reading the async one back
+        activity_service._downsampled_streams.clear()
+        assert page == service.get_activities_page(2)
+        assert page[1] is not None
+        assert activity == service.get_activity_by_id(activity_id)
+        assert stream == service.get_downsampled_stream(activity_id, 2)
+        assert count == 3
+
+    def test_downsampled_stream_of_missing_activity(self, database_url, db):
+        """Test that a missing activity raises like the synchronous service."""
+        async def use(session):
+            return await AsyncActivityService(session).get_downsampled_stream(999, 100)
+
+        with pytest.raises(ActivityNotFoundError):
+            _run(database_url, use)
+
+    def test_personal_best_service(self, database_url, activities):
+        """Test that personal bests come back as dicts with ISO dates, or datetimes for orjson."""
+        async def use(session):
+            service = AsyncPersonalBestService(session)
+            return (
+                await service.get_all_personal_bests(),
+                await service.get_personal_bests_by_type('running'),
+                await service.get_all_personal_bests(iso_dates=False)
+            )
+
+        pbs, running, raw = _run(database_url, use)
+        assert pbs == running
+        assert pbs[0]['best_time'] == 1500
+        assert pbs[0]['achieved_date'] == '2024-01-01T00:00:00'
+        assert raw[0]['achieved_date'] == datetime(2024, 1, 1)
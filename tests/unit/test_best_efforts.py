@@ -0,0 +1,101 @@
+"""
+Unit tests for best effort computation.
+"""
+import pytest
+from datetime import datetime
+import numpy as np
+from app.best_efforts import STANDARD_DISTANCES, best_effort_seconds, best_efforts
+from app.gps_stream import GPSStream
+
+
+def _brute_force(distances, seconds, target):
+    """Reference: try every window start, interpolating the exact start time."""
+    best = None
+    for j in range(len(distances)):
+        for i in range(j):
+            if distances[j] - distances[i] < target:
+                break
+            if distances[j] - distances[i + 1] >= target:
+                continue
+            start = distances[j] - target
+            span = distances[i + 1] - distances[i]
+            fraction = (start - distances[i]) / span if span > 0 else 0.0
+            duration = seconds[j] - (seconds[i] + fraction * (seconds[i + 1] - seconds[i]))
+            if duration > 0 and (best is None or duration < best):
+                best = duration
+    return best
+
+
+def _stream(distances, seconds=None):
+    seconds = np.arange(len(distances)) if seconds is None else np.asarray(seconds)
+    timestamps = np.datetime64(datetime(2024, 1, 15, 10, 0), 'us') + (seconds * 1e6).astype('timedelta64[us]')
+    nan = np.full(len(distances), np.nan)
+    return GPSStream(timestamps, nan, nan, distances, nan, nan)
+
+
+class TestBestEffortSeconds:
+    """Tests for best_effort_seconds."""
+
+    def test_constant_pace(self):
+        """Test that a steady effort takes target / speed."""
+        seconds = np.arange(0, 1000, dtype=float)
+        distances = seconds * 3.0
+
+        assert best_effort_seconds(distances, seconds, 1000.0) == pytest.approx(1000 / 3)
+
+    def test_finds_fastest_segment(self):
+        """Test that the fastest part of the stream is found, wherever it is."""
+        speeds = np.r_[np.full(300, 2.0), np.full(200, 5.0), np.full(300, 2.0)]
+        distances = np.r_[0.0, np.cumsum(speeds)]
+        seconds = np.arange(len(distances), dtype=float)
+
+        assert best_effort_seconds(distances, seconds, 1000.0) == pytest.approx(200.0)
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_matches_brute_force(self, seed):
+        """Test against checking every window on irregular samples."""
+        rng = np.random.default_rng(seed)
+        seconds = np.cumsum(rng.uniform(0.5, 3.0, 300))
+        distances = np.cumsum(rng.uniform(0.0, 12.0, 300))
+        distances[50:55] = distances[49]  # Stopped
+
+        for target in (100.0, 400.0, 1000.0):
+            expected = _brute_force(distances, seconds, target)
+            assert best_effort_seconds(distances, seconds, target) == pytest.approx(expected)
+
+    def test_too_short(self):
+        """Test that a stream shorter than the target has no effort."""
+        distances = np.array([0.0, 400.0, 900.0])
+        assert best_effort_seconds(distances, np.arange(3.0), 1000.0) is None
+        assert best_effort_seconds(np.array([0.0]), np.array([0.0]), 1.0) is None
+
+    def test_distance_dropping_back(self):
+        """Test that a drop in cumulative distance does not create a shortcut."""
+        distances = np.array([0.0, 500.0, 100.0, 600.0, 1100.0])
+        seconds = np.arange(5.0)
+
+        assert best_effort_seconds(distances, seconds, 1000.0) == pytest.approx(3.8)
+
+
+class TestBestEfforts:
+    """Tests for best_efforts."""
+
+    def test_standard_distances(self):
+        """Test that every covered standard distance gets an effort."""
+        stream = _stream(np.arange(0, 12000, 4.0))
+
+        efforts = best_efforts('running', stream)
+
+        assert list(efforts) == [1000.0, 1609.344, 5000.0, 10000.0]
+        assert efforts[5000.0] == pytest.approx(1250.0)
+
+    def test_unknown_type_and_empty_stream(self):
+        """Test that there is nothing to compute for other types or empty streams."""
+        assert best_efforts('yoga', _stream(np.arange(0, 5000, 4.0))) == {}
+        assert best_efforts('running', GPSStream.empty()) == {}
+
+    def test_every_sport_has_distances(self):
+        """Test that swimming, cycling and running have increasing distances."""
+        for activity_type in ('swimming', 'cycling', 'running'):
+            distances = STANDARD_DISTANCES[activity_type]
+            assert list(distances) == sorted(distances)
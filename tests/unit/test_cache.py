@@ -0,0 +1,76 @@
+"""
+Unit tests for the cache backends.
+"""
+from app import cache as cache_module
+from app.cache import LRUCache, RedisCache
+from tests.local_redis import LocalRedis
+
+
+class TestLRUCache:
+    """Tests for LRUCache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that entries beyond maxsize are evicted, least recently used first."""
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+
+    def test_ttl(self, monkeypatch):
+        """Test that entries expire ttl seconds after they were put."""
+        now = [100.0]
+        monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+        cache = LRUCache(10, ttl=5)
+        cache.put('a', 1)
+
+        now[0] = 104.0
+        assert cache.get('a') == 1
+        now[0] = 105.0
+        assert cache.get('a', 'missing') == 'missing'
+        assert len(cache) == 0
+
+    def test_pop_and_clear(self):
+        """Test removing one and all entries."""
+        cache = LRUCache(10)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.pop('a')
+        cache.pop('missing')
+        assert cache.get('a') is None
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestRedisCache:
+    """Tests for RedisCache."""
+
+    def test_get_put_pop(self):
+        """Test that values are stored under the prefix with the ttl as expiry."""
+        client = LocalRedis()
+        cache = RedisCache(client, ttl=30, prefix='test:')
+        cache.put('a', b'1')
+
+        assert client.data == {'test:a': b'1'}
+        assert client.expiry == {'test:a': 30}
+        assert cache.get('a') == b'1'
+        assert cache.get('b', b'default') == b'default'
+        cache.pop('a')
+        assert cache.get('a') is None
+
+    def test_clear_only_removes_prefix(self):
+        """Test that clear leaves keys of other users of the server alone."""
+        client = LocalRedis()
+        client.set('other', b'x')
+        cache = RedisCache(client, prefix='test:')
+        cache.put('a', b'1')
+        cache.put('b', b'2')
+
+        cache.clear()
+
+        assert client.data == {'other': b'x'}
@@ -0,0 +1,93 @@
+"""
+Unit tests for stream downsampling.
+"""
+from datetime import datetime
+import numpy as np
+from app.downsampling import douglas_peucker, downsample_stream, lttb
+from app.gps_stream import GPSStream
+
+
+def _stream(count):
+    seconds = np.arange(count)
+    timestamps = np.datetime64(datetime(2024, 1, 15, 10, 30), 'us') + seconds.astype('timedelta64[s]')
+    return GPSStream(
+        timestamps, 37.0 + np.sin(seconds / 100) * 1e-2, -122.0 + seconds * 1e-4, seconds * 3.0,
+        3.0 + np.sin(seconds / 20), 140.0 + seconds % 20
+    )
+
+
+class TestDouglasPeucker:
+    """Tests for douglas_peucker."""
+
+    def test_keeps_corners(self):
+        """Test that points on straight segments are dropped and corners kept."""
+        x = np.array([0.0, 1.0, 2.0, 3.0, 3.0, 3.0, 3.0])
+        y = np.array([0.0, 0.0, 0.0, 0.0, 1.0, 2.0, 3.0])
+        assert douglas_peucker(x, y, 5).tolist() == [0, 3, 6]
+
+    def test_point_budget(self):
+        """Test that at most max_points points are kept, farthest deviations first."""
+        x = np.arange(1000.0)
+        y = np.sin(x / 30)
+        kept = douglas_peucker(x, y, 50)
+
+        assert len(kept) == 50
+        assert kept[0] == 0 and kept[-1] == 999
+        assert np.all(np.diff(kept) > 0)
+
+    def test_short_line(self):
+        """Test that lines within the budget are returned whole."""
+        assert douglas_peucker(np.arange(3.0), np.arange(3.0), 10).tolist() == [0, 1, 2]
+
+
+class TestLTTB:
+    """Tests for lttb."""
+
+    def test_keeps_end_points_and_spike(self):
+        """Test that the first and last points and a spike survive downsampling."""
+        x = np.arange(1000.0)
+        y = np.zeros(1000)
+        y[437] = 50.0
+        kept = lttb(x, y, 20)
+
+        assert len(kept) == 20
+        assert kept[0] == 0 and kept[-1] == 999
+        assert 437 in kept
+        assert np.all(np.diff(kept) > 0)
+
+    def test_short_series(self):
+        """Test that series within the budget are returned whole."""
+        assert lttb(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+class TestDownsampleStream:
+    """Tests for downsample_stream."""
+
+    def test_downsample(self):
+        """Test that each series is reduced to max_points points."""
+        result = downsample_stream(_stream(5000), 200)
+
+        assert result['points'] == 5000
+        assert result['start_time'] == '2024-01-15T10:30:00'
+        assert len(result['track']['latitudes']) == len(result['track']['longitudes']) == 200
+        assert len(result['speed']['values']) == len(result['speed']['elapsed_seconds']) == 200
+        assert result['heart_rate']['elapsed_seconds'][0] == 0.0
+        assert result['heart_rate']['elapsed_seconds'][-1] == 4999.0
+
+    def test_missing_values_are_left_out(self):
+        """Test that points without a position or heart rate are not part of those series."""
+        stream = _stream(100)
+        stream.latitudes[:50] = np.nan
+        stream.heart_rates[:] = np.nan
+
+        result = downsample_stream(stream, 1000)
+
+        assert len(result['track']['latitudes']) == 50
+        assert result['heart_rate'] == {'elapsed_seconds': [], 'values': []}
+        assert len(result['speed']['values']) == 100
+
+    def test_empty_stream(self):
+        """Test downsampling an activity without points."""
+        result = downsample_stream(GPSStream.empty(), 100)
+        assert result['points'] == 0 and result['start_time'] is None
+        assert result['track']['latitudes'] == []
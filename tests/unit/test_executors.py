@@ -0,0 +1,75 @@
+"""
+Unit tests for the worker pools.
+"""
+import asyncio
+import os
+import threading
+import pytest
+from app import executors
+from app.config import Config
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools():
+    """Make sure every test starts and ends without pools."""
+    executors.shutdown_pools()
+    yield
+    executors.shutdown_pools()
+
+
+class TestExecutors:
+    """Tests for run_in_process and run_in_thread."""
+
+    def test_run_in_process(self, monkeypatch):
+        """Test that work is sent to another process."""
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 1)
+        pid = asyncio.run(executors.run_in_process(os.getpid))
+        assert pid != os.getpid()
+
+    def test_run_in_thread(self, monkeypatch):
+        """Test that work is sent to another thread."""
+        monkeypatch.setattr(Config, 'DB_WORKERS', 1)
+        ident = asyncio.run(executors.run_in_thread(threading.get_ident))
+        assert ident != threading.get_ident()
+
+    def test_zero_workers_runs_inline(self, monkeypatch):
+        """Test that a pool size of 0 runs the work in the calling process and thread."""
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        monkeypatch.setattr(Config, 'DB_WORKERS', 0)
+
+        async def run():
+            return await executors.run_in_process(os.getpid), await executors.run_in_thread(threading.get_ident)
+
+        assert asyncio.run(run()) == (os.getpid(), threading.get_ident())
+
+    def test_keyword_arguments(self, monkeypatch):
+        """Test that keyword arguments are passed through."""
+        monkeypatch.setattr(Config, 'DB_WORKERS', 1)
+        assert asyncio.run(executors.run_in_thread(int, '10', base=2)) == 2
+
+    def test_submit_ingest(self, monkeypatch):
+        """Test that ingest work runs in the background and can be waited for."""
+        monkeypatch.setattr(Config, 'INGEST_WORKERS', 1)
+        future = executors.submit_ingest(threading.current_thread)
+        assert future.result().name.startswith('ingest')
+
+    def test_submit_ingest_inline_keeps_errors(self, monkeypatch):
+        """Test that inline ingest work reports errors through the future."""
+        monkeypatch.setattr(Config, 'INGEST_WORKERS', 0)
+        future = executors.submit_ingest(int, 'x')
+        with pytest.raises(ValueError):
+            future.result()
+
+    @pytest.mark.parametrize('workers', [0, 2])
+    def test_imap_in_process(self, monkeypatch, workers):
+        """Test that every item is yielded once with its own result or error."""
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', workers)
+        items = ['1', '2', 'x', '4', '5']
+
+        results = {}
+        for item, future in executors.imap_in_process(int, items, window=2):
+            results[item] = future.exception() or future.result()
+
+        assert set(results) == set(items)
+        assert results['4'] == 4
+        assert isinstance(results['x'], ValueError)
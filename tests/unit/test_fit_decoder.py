@@ -0,0 +1,117 @@
+"""
+Unit tests for the native FIT decoder.
+"""
+import pytest
+from datetime import datetime
+from app import fit_decoder
+from app.config import Config
+from app.exceptions import FitFileParseError
+from app.fit_parser import parse_fit_file
+from tests.fit_files import build_fit_file, make_records, semicircles
+
+
+def _records_with_gaps():
+    records = make_records(40)
+    del records[3]['distance']
+    records[4]['distance'] = None
+    del records[10]['timestamp']
+    records[11]['position_lat'] = None
+    records[11]['position_long'] = None
+    records[12]['heart_rate'] = None
+    records[13]['speed'] = None
+    for record in records[20:25]:
+        del record['heart_rate']
+    return records
+
+
+# Each entry builds one sample file: (name, build_fit_file keyword arguments)
+CORPUS = [
+    ('running', dict(records=make_records(50), total_elapsed_time=49.9, total_distance=147.0,
+                     avg_heart_rate=148)),
+    ('cycling_big_endian', dict(records=make_records(30, step=8.5), sport='cycling', endian='>')),
+    ('swimming_short_header', dict(records=make_records(20, step=1.1), sport='swimming', header_size=12)),
+    ('compressed_timestamps', dict(records=make_records(60), compressed_timestamps=True)),
+    ('developer_fields', dict(records=make_records(15), developer_fields=True)),
+    ('gaps_and_redefinitions', dict(records=_records_with_gaps(), avg_heart_rate=141)),
+    ('generic_sport', dict(records=make_records(5), sport='generic')),
+    ('unmapped_sport', dict(records=make_records(5), sport='walking')),
+    ('no_sport', dict(records=make_records(5), sport=None)),
+    ('southern_hemisphere', dict(records=[
+        {'timestamp': datetime(2023, 6, 1, 6, 0, s), 'position_lat': semicircles(-33.8688),
+         'position_long': semicircles(151.2093), 'distance': s * 2.0, 'speed': 2.0, 'heart_rate': 120}
+        for s in range(10)
+    ])),
+    ('no_session', dict(records=make_records(5), session=False)),
+]
+
+
+@pytest.mark.parametrize('name,kwargs', CORPUS, ids=[name for name, _ in CORPUS])
+def test_native_decoder_matches_fitparse(tmp_path, monkeypatch, name, kwargs):
+    """Test that both decoders produce identical parser output on the sample corpus."""
+    path = build_fit_file(tmp_path / f'{name}.fit', **kwargs)
+
+    monkeypatch.setattr(Config, 'FIT_DECODER', 'fitparse')
+    expected = parse_fit_file(path)
+    monkeypatch.setattr(Config, 'FIT_DECODER', 'native')
+    actual = parse_fit_file(path)
+
+    assert actual == expected
+
+
+class TestFitDecoder:
+    """Tests for fit_decoder.iter_messages."""
+
+    def test_only_requested_messages_are_yielded(self, tmp_path):
+        """Test that record messages are skipped when only sessions are requested."""
+        path = build_fit_file(tmp_path / 'run.fit', make_records(10))
+
+        messages = list(fit_decoder.iter_messages(path, ('session',)))
+
+        assert [name for name, _ in messages] == ['session']
+
+    def test_only_stored_fields_are_decoded(self, tmp_path):
+        """Test that developer fields and other fields are not decoded."""
+        path = build_fit_file(tmp_path / 'run.fit', make_records(2), developer_fields=True)
+
+        _, values = next(fit_decoder.iter_messages(path, ('record',)))
+
+        assert set(values) == {
+            'timestamp', 'position_lat', 'position_long', 'distance', 'speed', 'heart_rate'
+        }
+
+    def test_chained_files(self, tmp_path):
+        """Test that messages from chained FIT files are all decoded."""
+        first = build_fit_file(tmp_path / 'a.fit', make_records(3), session=False)
+        second = build_fit_file(tmp_path / 'b.fit', make_records(4))
+        chained = tmp_path / 'chained.fit'
+        chained.write_bytes(open(first, 'rb').read() + open(second, 'rb').read())
+
+        messages = list(fit_decoder.iter_messages(str(chained), ('record', 'session')))
+
+        assert [name for name, _ in messages] == ['record'] * 7 + ['session']
+
+    def test_invalid_header_raises(self, tmp_path):
+        """Test that a file without the .FIT signature is rejected."""
+        path = tmp_path / 'bad.fit'
+        path.write_bytes(b'\x0e' + b'\x00' * 20)
+
+        with pytest.raises(FitFileParseError):
+            list(fit_decoder.iter_messages(str(path), ('record',)))
+
+    def test_truncated_file_raises(self, tmp_path):
+        """Test that a file cut off in the middle of its data is rejected."""
+        path = build_fit_file(tmp_path / 'run.fit', make_records(10))
+        data = open(path, 'rb').read()
+        truncated = tmp_path / 'truncated.fit'
+        truncated.write_bytes(data[:len(data) // 2])
+
+        with pytest.raises(FitFileParseError):
+            list(fit_decoder.iter_messages(str(truncated), ('record',)))
+
+    def test_empty_file_raises(self, tmp_path):
+        """Test that an empty file is rejected."""
+        path = tmp_path / 'empty.fit'
+        path.write_bytes(b'')
+
+        with pytest.raises(FitFileParseError):
+            list(fit_decoder.iter_messages(str(path), ('record',)))
@@ -0,0 +1,165 @@
+"""
+Unit tests for the FIT file parser.
+"""
+import pytest
+import numpy as np
+from app.fit_parser import parse_fit_file, parse_fit_session, parse_fit_stream, read_fit_stream, iter_record_batches
+from app.gps_stream import GPSStream
+from app.exceptions import FitFileParseError
+from tests.fit_files import build_fit_file, make_records
+
+
+class TestParseFitFile:
+    """Tests for parse_fit_file."""
+
+    def test_parse_summary_and_points(self, tmp_path):
+        """Test that the session summary and GPS points are extracted."""
+        records = make_records(10)
+        path = build_fit_file(
+            tmp_path / 'run.fit', records, sport='cycling',
+            total_elapsed_time=10.5, total_distance=27.0, avg_heart_rate=150
+        )
+
+        data = parse_fit_file(path)
+
+        assert data['activity_type'] == 'cycling'
+        assert data['activity_date'] == records[0]['timestamp']
+        assert data['duration'] == 10
+        assert data['total_distance'] == 27.0
+        assert data['avg_heart_rate'] == 150
+        assert len(data['gps_points']) == 10
+        first = data['gps_points'][0]
+        assert first['timestamp'] == records[0]['timestamp']
+        assert first['latitude'] == pytest.approx(37.7749, abs=1e-6)
+        assert first['longitude'] == pytest.approx(-122.4194, abs=1e-6)
+        assert first['speed'] == 3.0
+        assert first['heart_rate'] == 140
+
+    def test_missing_distance_is_filled_forward(self, tmp_path):
+        """Test that records without distance reuse the last cumulative distance."""
+        records = make_records(4)
+        del records[2]['distance']
+        records[3]['distance'] = None
+        path = build_fit_file(tmp_path / 'run.fit', records)
+
+        points = parse_fit_file(path)['gps_points']
+
+        assert [p['distance'] for p in points] == [0.0, 3.0, 3.0, 3.0]
+
+    def test_records_without_timestamp_are_dropped(self, tmp_path):
+        """Test that records without a timestamp are skipped but still update distance."""
+        records = make_records(3)
+        del records[1]['timestamp']
+        records[1]['distance'] = 50.0
+        path = build_fit_file(tmp_path / 'run.fit', records)
+
+        points = parse_fit_file(path)['gps_points']
+
+        assert len(points) == 2
+        assert points[1]['distance'] == 6.0
+
+    def test_no_session_returns_none(self, tmp_path):
+        """Test that a file without a session message is rejected."""
+        path = build_fit_file(tmp_path / 'run.fit', make_records(3), session=False)
+        assert parse_fit_file(path) is None
+
+    def test_invalid_file_returns_none(self, tmp_path):
+        """Test that a file which is not a FIT file is rejected."""
+        path = tmp_path / 'bad.fit'
+        path.write_bytes(b'not a fit file at all')
+        assert parse_fit_file(str(path)) is None
+
+
+class TestStreamingParser:
+    """Tests for parse_fit_session and iter_record_batches."""
+
+    def test_parse_session(self, tmp_path):
+        """Test parsing only the session summary."""
+        path = build_fit_file(tmp_path / 'swim.fit', make_records(5), sport='swimming')
+
+        summary = parse_fit_session(path)
+
+        assert summary['activity_type'] == 'swimming'
+        assert 'gps_points' not in summary
+
+    def test_batches_collect_session_summary(self, tmp_path):
+        """Test that the session summary is collected in the same pass as the batches."""
+        path = build_fit_file(tmp_path / 'swim.fit', make_records(25), sport='swimming')
+        summary = {}
+
+        batches = list(iter_record_batches(path, batch_size=10, summary=summary))
+
+        assert sum(len(batch) for batch in batches) == 25
+        assert summary == parse_fit_session(path)
+
+    def test_batches_have_fixed_size(self, tmp_path):
+        """Test that points are yielded in batches of the requested size."""
+        path = build_fit_file(tmp_path / 'run.fit', make_records(25))
+
+        batches = list(iter_record_batches(path, batch_size=10))
+
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert all(isinstance(batch, GPSStream) for batch in batches)
+
+    def test_batches_match_full_parse(self, tmp_path):
+        """Test that concatenated batches equal the points of a full parse."""
+        records = make_records(25)
+        del records[10]['distance']
+        path = build_fit_file(tmp_path / 'run.fit', records)
+
+        streamed = [p for batch in iter_record_batches(path, batch_size=7) for p in batch.to_points()]
+
+        assert streamed == parse_fit_file(path)['gps_points']
+
+    def test_batches_are_column_oriented(self, tmp_path):
+        """Test that a batch exposes one array per column."""
+        records = make_records(3)
+        path = build_fit_file(tmp_path / 'run.fit', records)
+
+        batch = next(iter_record_batches(path))
+
+        assert batch.timestamps.astype(object).tolist() == [r['timestamp'] for r in records]
+        assert batch.distances.tolist() == [0.0, 3.0, 6.0]
+        assert batch.heart_rates.tolist() == [140, 141, 142]
+
+    def test_distance_filled_forward_across_batches(self, tmp_path):
+        """Test that a batch starting without distance continues from the previous batch."""
+        records = make_records(6)
+        for record in records[3:]:
+            del record['distance']
+        path = build_fit_file(tmp_path / 'run.fit', records)
+
+        batches = list(iter_record_batches(path, batch_size=3))
+
+        assert batches[1].distances.tolist() == [6.0, 6.0, 6.0]
+
+    def test_parse_fit_stream(self, tmp_path):
+        """Test parsing the whole file into a columnar GPS stream."""
+        records = make_records(12)
+        path = build_fit_file(tmp_path / 'run.fit', records)
+
+        data = parse_fit_stream(path)
+
+        stream = data['gps_stream']
+        assert len(stream) == 12
+        assert stream.latitudes.dtype == np.float64
+        assert stream.to_points() == parse_fit_file(path)['gps_points']
+
+    def test_invalid_file_raises(self, tmp_path):
+        """Test that streaming a broken file raises FitFileParseError."""
+        path = tmp_path / 'bad.fit'
+        path.write_bytes(b'not a fit file at all')
+
+        with pytest.raises(FitFileParseError):
+            list(iter_record_batches(str(path)))
+
+    def test_read_fit_stream_raises(self, tmp_path):
+        """Test that read_fit_stream raises instead of returning None."""
+        no_session = build_fit_file(tmp_path / 'run.fit', make_records(3), session=False)
+        bad = tmp_path / 'bad.fit'
+        bad.write_bytes(b'not a fit file at all')
+
+        with pytest.raises(FitFileParseError, match='no session'):
+            read_fit_stream(no_session)
+        with pytest.raises(FitFileParseError):
+            read_fit_stream(str(bad))
@@ -1,8 +1,9 @@
 """
 Unit tests for GPSPointRepository.
 """
-import pytest
+from unittest.mock import MagicMock
 from app.repositories import GPSPointRepository, ActivityRepository
+from app.gps_stream import GPSStream
 
 
 class TestGPSPointRepository:
@@ -91,3 +92,85 @@ class TestGPSPointRepository:
         assert first_point.distance == sample_gps_points[0]['distance']
         assert first_point.speed == sample_gps_points[0]['speed']
         assert first_point.heart_rate == sample_gps_points[0]['heart_rate']
+
+    def test_create_and_get_stream(self, test_db, sample_activity_data, sample_gps_points):
+        """Test storing and loading GPS points as a columnar stream."""
+        activity_repo = ActivityRepository(test_db)
+        activity = activity_repo.create(**sample_activity_data)
+        test_db.commit()
+
+        gps_repo = GPSPointRepository(test_db)
+        stream = GPSStream.from_points(sample_gps_points)
+        gps_repo.create_stream(activity.id, stream)
+        test_db.commit()
+
+        assert gps_repo.get_stream(activity.id) == stream
+
+    def test_create_batches(self, test_db, sample_activity_data, sample_gps_points):
+        """Test that batches are inserted and returned as one stream."""
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        gps_repo = GPSPointRepository(test_db)
+        stream = GPSStream.from_points(sample_gps_points)
+
+        stored = gps_repo.create_batches(activity.id, iter([stream[:1], stream[1:]]))
+        test_db.commit()
+
+        assert stored == stream
+        assert gps_repo.get_stream(activity.id) == stream
+
+    def test_get_stream_no_points(self, test_db, sample_activity_data):
+        """Test loading the stream of an activity without GPS points."""
+        activity_repo = ActivityRepository(test_db)
+        activity = activity_repo.create(**sample_activity_data)
+        test_db.commit()
+
+        stream = GPSPointRepository(test_db).get_stream(activity.id)
+        assert len(stream) == 0
+
+    def test_iter_distance_rows(self, test_db, sample_activity_data, sample_gps_points):
+        """Test streaming distance rows in chunks, ordered by activity and time."""
+        activity_repo = ActivityRepository(test_db)
+        running = activity_repo.create(**sample_activity_data)
+        cycling = activity_repo.create(**{**sample_activity_data, 'activity_type': 'cycling'})
+        gps_repo = GPSPointRepository(test_db)
+        gps_repo.create_batch(cycling.id, sample_gps_points)
+        gps_repo.create_batch(running.id, list(reversed(sample_gps_points)))
+        test_db.commit()
+
+        chunks = list(gps_repo.iter_distance_rows(chunk_size=2))
+        rows = [tuple(row) for chunk in chunks for row in chunk]
+
+        assert all(len(chunk) <= 2 for chunk in chunks)
+        assert [row[0] for row in rows] == [running.id] * 3 + [cycling.id] * 3
+        assert [row[3] for row in rows[:3]] == sorted(p['timestamp'] for p in sample_gps_points)
+        assert rows[0][1:3] == ('running', sample_activity_data['activity_date'])
+        assert [
+            row[0] for chunk in gps_repo.iter_distance_rows(['cycling']) for row in chunk
+        ] == [cycling.id] * 3
+
+    def test_create_batch_bypasses_orm(self, test_db, sample_activity_data, sample_gps_points):
+        """Test that bulk inserted points are not tracked by the session."""
+        activity_repo = ActivityRepository(test_db)
+        activity = activity_repo.create(**sample_activity_data)
+
+        gps_repo = GPSPointRepository(test_db)
+        gps_repo.create_batch(activity.id, sample_gps_points)
+
+        assert len(test_db.new) == 0
+        assert len(gps_repo.get_by_activity(activity.id)) == len(sample_gps_points)
+
+    def test_copy_rows_writes_csv(self, sample_gps_points):
+        """Test the CSV payload streamed to PostgreSQL COPY."""
+        connection = MagicMock()
+        cursor = connection.connection.dbapi_connection.cursor.return_value.__enter__.return_value
+        rows = [(1, *row) for row in GPSStream.from_points(sample_gps_points[:1]).rows()]
+        rows.append((1, sample_gps_points[1]['timestamp'], None, None, 100.0, None, None))
+
+        GPSPointRepository._copy_rows(connection, rows)
+
+        sql, buffer = cursor.copy_expert.call_args[0]
+        assert sql.startswith("COPY gps_points (activity_id, timestamp, latitude")
+        assert buffer.getvalue().splitlines() == [
+            '1,2024-01-15 10:30:00,37.7749,-122.4194,0.0,0.0,145',
+            '1,2024-01-15 10:31:00,,,100.0,,',
+        ]
@@ -0,0 +1,75 @@
+"""
+Unit tests for the columnar GPS stream.
+"""
+import pickle
+import numpy as np
+from datetime import datetime
+from app.gps_stream import GPSStream, forward_fill
+
+
+class TestGPSStream:
+    """Tests for GPSStream."""
+
+    def test_from_raw_converts_semicircles(self):
+        """Test that positions are converted from semicircles to degrees."""
+        stream = GPSStream.from_raw(
+            [datetime(2024, 1, 1, 8, 0, 0)], [2**30], [-2**30], [0.0], [1.5], [120]
+        )
+
+        assert stream.latitudes[0] == 90.0
+        assert stream.longitudes[0] == -90.0
+
+    def test_from_raw_fills_distance_and_drops_missing_timestamps(self):
+        """Test forward fill of distance and dropping points without a timestamp."""
+        timestamps = [datetime(2024, 1, 1, 8, 0, s) for s in range(5)]
+        timestamps[2] = None
+        stream = GPSStream.from_raw(
+            timestamps,
+            [None] * 5,
+            [None] * 5,
+            [None, 10.0, 20.0, None, 35.0],
+            [None, 2.0, 2.0, 2.0, 2.0],
+            [None, 130, 131, None, 133],
+            initial_distance=5.0
+        )
+
+        assert len(stream) == 4
+        assert stream.distances.tolist() == [5.0, 10.0, 20.0, 35.0]
+        assert np.isnan(stream.latitudes).all()
+        assert np.isnan(stream.heart_rates[[0, 2]]).all()
+
+    def test_rows_use_none_for_missing_values(self):
+        """Test that rows yields plain Python values with None for missing ones."""
+        stream = GPSStream.from_raw(
+            [datetime(2024, 1, 1, 8, 0, 0)], [None], [None], [None], [None], [None]
+        )
+
+        assert list(stream.rows()) == [(datetime(2024, 1, 1, 8, 0, 0), None, None, 0.0, None, None)]
+
+    def test_from_points_round_trip(self, sample_gps_points):
+        """Test that per-point dicts survive a round trip through the stream."""
+        assert GPSStream.from_points(sample_gps_points).to_points() == sample_gps_points
+
+    def test_slice_and_concatenate(self, sample_gps_points):
+        """Test slicing a stream and joining the parts back together."""
+        stream = GPSStream.from_points(sample_gps_points)
+
+        joined = GPSStream.concatenate([stream[:1], stream[1:]])
+
+        assert joined == stream
+
+    def test_pickle(self, sample_gps_points):
+        """Test that streams can be sent to worker processes."""
+        stream = GPSStream.from_points(sample_gps_points)
+        assert pickle.loads(pickle.dumps(stream)) == stream
+
+    def test_elapsed_seconds(self, sample_gps_points):
+        """Test elapsed time relative to the first point."""
+        stream = GPSStream.from_points(sample_gps_points)
+        assert stream.elapsed_seconds().tolist() == [0.0, 60.0, 120.0]
+
+
+def test_forward_fill():
+    """Test forward filling NaN values."""
+    values = np.array([np.nan, 1.0, np.nan, np.nan, 4.0, np.nan])
+    assert forward_fill(values, 0.5).tolist() == [0.5, 1.0, 1.0, 1.0, 4.0, 4.0]
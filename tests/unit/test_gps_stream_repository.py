@@ -0,0 +1,149 @@
+"""
+Unit tests for GPSStreamRepository.
+"""
+import pytest
+from datetime import datetime
+import numpy as np
+from app.config import Config
+from app.database import GPSPointModel, GPSStreamModel
+from app.gps_stream import SEMICIRCLES_TO_DEGREES, GPSStream
+from app.repositories import (
+    ActivityRepository, GPSPointRepository, GPSStreamRepository, get_gps_repository
+)
+
+
+def _stream(count, start=0):
+    """A stream at FIT resolution (positions in whole semicircles), one point per second."""
+    seconds = np.arange(start, start + count)
+    timestamps = np.datetime64(datetime(2024, 1, 15, 10, 30), 'us') + seconds.astype('timedelta64[s]')
+    semicircles = 440_000_000 + seconds * 1000
+    return GPSStream(
+        timestamps, semicircles * SEMICIRCLES_TO_DEGREES, -semicircles * SEMICIRCLES_TO_DEGREES,
+        seconds * 3.0, np.full(count, 3.0), 140.0 + seconds % 20
+    )
+
+
+@pytest.fixture
+def activity(test_db, sample_activity_data):
+    activity = ActivityRepository(test_db).create(**sample_activity_data)
+    test_db.commit()
+    return activity
+
+
+class TestGPSStreamRepository:
+    """Tests for GPSStreamRepository class."""
+
+    def test_create_and_get_stream(self, test_db, activity):
+        """Test that a stored stream is one row and decodes back to the same points."""
+        repo = GPSStreamRepository(test_db)
+        stream = _stream(100)
+        repo.create_stream(activity.id, stream)
+        test_db.commit()
+        test_db.expire_all()
+
+        assert repo.get_stream(activity.id) == stream
+        assert test_db.query(GPSStreamModel).one().point_count == 100
+        assert test_db.query(GPSPointModel).count() == 0
+
+    def test_create_stream_appends(self, test_db, activity):
+        """Test that streams stored for the same activity are joined in order."""
+        repo = GPSStreamRepository(test_db)
+        repo.create_stream(activity.id, _stream(10))
+        repo.create_stream(activity.id, _stream(5, start=10))
+        test_db.commit()
+
+        assert repo.get_stream(activity.id) == _stream(15)
+
+    def test_create_batches(self, test_db, activity):
+        """Test that batches are stored as one stream and returned."""
+        repo = GPSStreamRepository(test_db)
+
+        stream = repo.create_batches(activity.id, iter([_stream(10), _stream(10, start=10)]))
+        test_db.commit()
+
+        assert stream == _stream(20)
+        assert repo.get_stream(activity.id) == stream
+
+    def test_get_stream_no_points(self, test_db, activity):
+        """Test that an empty stream is not stored and reads back empty."""
+        repo = GPSStreamRepository(test_db)
+        repo.create_stream(activity.id, GPSStream.empty())
+
+        assert len(repo.get_stream(activity.id)) == 0
+        assert test_db.query(GPSStreamModel).count() == 0
+
+    def test_get_stream_falls_back_to_rows(self, test_db, activity, sample_activity_data):
+        """Test that activities stored as rows are read from gps_points until backfilled."""
+        GPSPointRepository(test_db).create_stream(activity.id, _stream(10))
+        converted = ActivityRepository(test_db).create(**sample_activity_data)
+        GPSStreamRepository(test_db).create_stream(converted.id, _stream(5))
+        test_db.commit()
+        repo = GPSStreamRepository(test_db)
+
+        assert repo.get_stream(activity.id) == GPSPointRepository(test_db).get_stream(activity.id)
+        assert len(repo.get_stream(activity.id)) == 10
+        assert repo.get_unconverted_ids() == [activity.id]
+        assert repo.get_unconverted_ids(['cycling']) == []
+
+    def test_iter_distance_chunks(self, test_db, sample_activity_data):
+        """Test streaming whole activities in chunks, ordered by activity."""
+        activity_repo = ActivityRepository(test_db)
+        running = activity_repo.create(**sample_activity_data)
+        cycling = activity_repo.create(**{**sample_activity_data, 'activity_type': 'cycling'})
+        repo = GPSStreamRepository(test_db)
+        repo.create_stream(cycling.id, _stream(30))
+        repo.create_stream(running.id, _stream(20))
+        test_db.commit()
+
+        chunks = list(repo.iter_distance_chunks(chunk_size=10))
+
+        assert [[entry[0] for entry in chunk] for chunk in chunks] == [[running.id], [cycling.id]]
+        activity_id, activity_type, activity_date, seconds, distances = chunks[0][0]
+        assert (activity_type, activity_date) == ('running', sample_activity_data['activity_date'])
+        np.testing.assert_array_equal(seconds, np.arange(20.0))
+        np.testing.assert_array_equal(distances, np.arange(20) * 3.0)
+        assert [
+            entry[0] for chunk in repo.iter_distance_chunks(['cycling']) for entry in chunk
+        ] == [cycling.id]
+
+    def test_matches_row_storage_chunks(self, test_db, activity):
+        """Test that both storages yield the same distance chunks."""
+        GPSStreamRepository(test_db).create_stream(activity.id, _stream(50))
+        GPSPointRepository(test_db).create_stream(activity.id, _stream(50))
+        test_db.commit()
+
+        [[columnar]] = GPSStreamRepository(test_db).iter_distance_chunks()
+        [[rows]] = GPSPointRepository(test_db).iter_distance_chunks()
+
+        assert columnar[:3] == rows[:3]
+        np.testing.assert_array_equal(columnar[3], rows[3])
+        np.testing.assert_array_equal(columnar[4], rows[4])
+
+    def test_delete_by_activity(self, test_db, activity):
+        """Test deleting the stream of an activity."""
+        repo = GPSStreamRepository(test_db)
+        repo.create_stream(activity.id, _stream(10))
+        test_db.commit()
+
+        repo.delete_by_activity(activity.id)
+        test_db.commit()
+
+        assert len(repo.get_stream(activity.id)) == 0
+
+    def test_deleted_with_activity(self, test_db, activity):
+        """Test that the stream is deleted along with its activity."""
+        GPSStreamRepository(test_db).create_stream(activity.id, _stream(10))
+        test_db.commit()
+
+        ActivityRepository(test_db).delete(activity.id)
+        test_db.commit()
+
+        assert test_db.query(GPSStreamModel).count() == 0
+
+    @pytest.mark.parametrize('storage, repository', [
+        ('rows', GPSPointRepository), ('columnar', GPSStreamRepository)
+    ])
+    def test_get_gps_repository(self, test_db, monkeypatch, storage, repository):
+        """Test that GPS_STORAGE selects the repository."""
+        monkeypatch.setattr(Config, 'GPS_STORAGE', storage)
+        assert isinstance(get_gps_repository(test_db), repository)
@@ -0,0 +1,87 @@
+"""
+Unit tests for IngestJobRepository.
+"""
+import pytest
+from app.repositories import IngestJobRepository
+
+
+class TestIngestJobRepository:
+    """Tests for IngestJobRepository class."""
+
+    def test_create_job(self, test_db):
+        """Test that a new job starts out queued."""
+        repo = IngestJobRepository(test_db)
+
+        job = repo.create('uploads/run.fit')
+
+        assert job.id is not None
+        assert job.status == 'queued'
+        assert job.created_at is not None
+        assert job.parsing_started_at is None
+
+    def test_get_by_id(self, test_db):
+        """Test getting a job by ID."""
+        repo = IngestJobRepository(test_db)
+        job = repo.create('uploads/run.fit')
+        test_db.commit()
+
+        assert repo.get_by_id(job.id).file_path == 'uploads/run.fit'
+        assert repo.get_by_id(9999) is None
+
+    def test_set_status_records_stage_times(self, test_db):
+        """Test that each stage records when the job entered it."""
+        repo = IngestJobRepository(test_db)
+        job = repo.create('uploads/run.fit')
+
+        repo.set_status(job, 'parsing')
+        repo.set_status(job, 'persisting')
+        repo.set_status(job, 'done', activity_id=7)
+
+        assert job.status == 'done'
+        assert job.created_at <= job.parsing_started_at <= job.persisting_started_at <= job.finished_at
+        assert job.activity_id == 7
+
+    def test_set_status_failed(self, test_db):
+        """Test that a failed job keeps its error message."""
+        repo = IngestJobRepository(test_db)
+        job = repo.create('uploads/run.fit')
+
+        repo.set_status(job, 'failed', error='boom')
+
+        assert job.status == 'failed'
+        assert job.error == 'boom'
+        assert job.finished_at is not None
+
+    def test_set_invalid_status(self, test_db):
+        """Test that unknown statuses are rejected."""
+        repo = IngestJobRepository(test_db)
+        job = repo.create('uploads/run.fit')
+
+        with pytest.raises(ValueError):
+            repo.set_status(job, 'exploded')
+
+    def test_jobs_for_the_same_content(self, test_db):
+        """Test finding earlier unfinished and later queued jobs for the same content."""
+        repo = IngestJobRepository(test_db)
+        done = repo.set_status(repo.create('uploads/a.fit', 'hash'), 'done')
+        first = repo.create('uploads/b.fit', 'hash')
+        second = repo.create('uploads/c.fit', 'hash')
+        other = repo.create('uploads/d.fit', 'other')
+        test_db.commit()
+
+        assert repo.has_in_flight_before(second.id, 'hash') is True
+        assert repo.has_in_flight_before(first.id, 'hash') is False
+        assert repo.get_queued_ids_by_hash('hash', done.id) == [first.id, second.id]
+        assert repo.get_queued_ids_by_hash('other', done.id) == [other.id]
+
+    def test_release(self, test_db):
+        """Test that release puts a claimed job back in the queue, and leaves other jobs alone."""
+        repo = IngestJobRepository(test_db)
+        job_id = repo.create('uploads/run.fit').id
+        repo.claim(job_id)
+
+        assert repo.release(job_id) is True
+        assert repo.release(job_id) is False
+        test_db.expire_all()
+        job = repo.get_by_id(job_id)
+        assert (job.status, job.parsing_started_at) == ('queued', None)
@@ -0,0 +1,210 @@
+"""
+Unit tests for IngestService.
+"""
+import pytest
+from datetime import datetime
+from app import executors
+from app.config import Config
+from app.services import IngestService, ingest_service
+from app.services.ingest_service import INTERRUPTED_ERROR, run_ingest_job
+from app.repositories import ActivityRepository, IngestJobRepository
+from app.uploads import SavedUpload
+from tests.fit_files import build_fit_file, make_records
+
+
+@pytest.fixture
+def fit_path(tmp_path, monkeypatch):
+    """A FIT file at a relative path, as stored by uploads."""
+    monkeypatch.chdir(tmp_path)
+    build_fit_file(tmp_path / 'run.fit', make_records(10))
+    return 'run.fit'
+
+
+class TestIngestService:
+    """Tests for IngestService class."""
+
+    def test_enqueue_runs_job_inline(self, test_db, fit_path, monkeypatch):
+        """Test that without ingest workers the job completes before enqueue returns."""
+        monkeypatch.setattr(Config, 'INGEST_WORKERS', 0)
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        service = IngestService(test_db)
+
+        job = service.enqueue(fit_path)
+
+        assert job['status'] == 'done'
+        assert ActivityRepository(test_db).get_by_id(job['activity_id']).file_path == fit_path
+
+    def test_enqueue_returns_before_job_runs(self, test_db, fit_path, monkeypatch):
+        """Test that with ingest workers the job runs in the background."""
+        monkeypatch.setattr(Config, 'INGEST_WORKERS', 1)
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        service = IngestService(test_db)
+
+        job = service.enqueue(fit_path)
+        executors.shutdown_pools()
+
+        assert service.get_job(job['id'])['status'] == 'done'
+
+    def test_failed_parse_marks_job_failed(self, test_db, tmp_path, monkeypatch):
+        """Test that a parse error is recorded on the job."""
+        monkeypatch.setattr(Config, 'INGEST_WORKERS', 0)
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'bad.fit').write_bytes(b'not a fit file')
+
+        job = IngestService(test_db).enqueue('bad.fit')
+
+        assert job['status'] == 'failed'
+        assert 'header' in job['error']
+        assert job['stage_seconds']['parsing'] is not None
+        assert ActivityRepository(test_db).get_all() == []
+
+    def test_duplicate_skips_parsing(self, test_db, fit_path, tmp_path, monkeypatch):
+        """Test that re-uploading stored content finishes the job with the existing activity."""
+        monkeypatch.setattr(Config, 'INGEST_WORKERS', 0)
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        service = IngestService(test_db)
+        first = service.enqueue(fit_path, 'hash-1')
+        (tmp_path / 'again.fit').write_bytes((tmp_path / fit_path).read_bytes())
+
+        second = service.enqueue('again.fit', 'hash-1')
+
+        assert second['status'] == 'done'
+        assert second['duplicate'] is True
+        assert second['activity_id'] == first['activity_id']
+        assert second['parsing_started_at'] is None
+        assert not (tmp_path / 'again.fit').exists()
+        assert len(ActivityRepository(test_db).get_all()) == 1
+
+    def test_duplicates_enqueued_before_jobs_run(self, test_db, fit_path, tmp_path, monkeypatch):
+        """Test that a copy enqueued while the first job is pending waits for it and ends as its duplicate."""
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        submitted = []
+        monkeypatch.setattr(ingest_service, 'submit_ingest', lambda func, *args: submitted.append(args))
+        (tmp_path / 'again.fit').write_bytes((tmp_path / fit_path).read_bytes())
+        service = IngestService(test_db)
+        first = service.enqueue(fit_path, 'hash-1')
+        second = service.enqueue('again.fit', 'hash-1')
+        assert [job_id for job_id, _ in submitted] == [first['id'], second['id']]
+
+        # The copy is claimed first, while the first job is still queued
+        run_ingest_job(*submitted[1])
+        assert service.get_job(second['id'])['status'] == 'queued'
+        run_ingest_job(*submitted[0])
+        assert submitted[2][0] == second['id']
+        run_ingest_job(*submitted[2])
+
+        first, second = service.get_job(first['id']), service.get_job(second['id'])
+        assert (first['status'], first['duplicate']) == ('done', False)
+        assert (second['status'], second['duplicate']) == ('done', True)
+        assert second['activity_id'] == first['activity_id']
+        assert second['file_path'] == fit_path
+        assert not (tmp_path / 'again.fit').exists()
+        assert len(ActivityRepository(test_db).get_all()) == 1
+
+    def test_resume_jobs(self, test_db, fit_path, sample_activity_data, monkeypatch):
+        """Test that queued jobs are run again and jobs left running are finished or failed."""
+        monkeypatch.setattr(Config, 'INGEST_WORKERS', 0)
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        repo = IngestJobRepository(test_db)
+        activity = ActivityRepository(test_db).create(**sample_activity_data, content_hash='stored')
+        queued = repo.create(fit_path)
+        parsing = repo.set_status(repo.create('gone.fit'), 'parsing')
+        persisted = repo.set_status(repo.create('stored.fit', 'stored'), 'persisting')
+        test_db.commit()
+        service = IngestService(test_db)
+
+        counts = service.resume_jobs()
+
+        assert counts == {'requeued': 1, 'done': 1, 'failed': 1}
+        assert service.get_job(queued.id)['status'] == 'done'
+        assert service.get_job(parsing.id)['status'] == 'failed'
+        assert service.get_job(parsing.id)['error'] == INTERRUPTED_ERROR
+        assert service.get_job(persisted.id)['activity_id'] == activity.id
+        assert service.resume_jobs() == {'requeued': 0, 'done': 0, 'failed': 0}
+
+    def test_claimed_job_is_not_run_again(self, test_db, fit_path, monkeypatch):
+        """Test that a job another worker already claimed is left alone."""
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        repo = IngestJobRepository(test_db)
+        job_id = repo.create(fit_path).id
+        test_db.commit()
+        assert repo.claim(job_id) is True
+        test_db.commit()
+
+        assert repo.claim(job_id) is False
+        run_ingest_job(job_id, lambda: test_db)
+        assert IngestService(test_db).get_job(job_id)['status'] == 'parsing'
+        assert ActivityRepository(test_db).get_all() == []
+
+    def test_stage_seconds(self, test_db):
+        """Test that stage times are derived from the stage timestamps."""
+        repo = IngestJobRepository(test_db)
+        job = repo.create('uploads/run.fit')
+        test_db.commit()
+
+        result = IngestService(test_db).get_job(job.id)
+
+        assert result['status'] == 'queued'
+        assert result['stage_seconds'] == {'queued': None, 'parsing': None, 'persisting': None}
+
+    def test_get_job_not_found(self, test_db):
+        """Test getting a non-existent job."""
+        assert IngestService(test_db).get_job(9999) is None
+
+
+class TestIngestFiles:
+    """Tests for IngestService.ingest_files."""
+
+    @pytest.fixture(autouse=True)
+    def inline(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        monkeypatch.chdir(tmp_path)
+
+    def test_ingest_files(self, test_db, tmp_path):
+        """Test that each file is reported in order with totals."""
+        build_fit_file(tmp_path / 'a.fit', make_records(5))
+        build_fit_file(tmp_path / 'b.fit', make_records(5), sport='cycling')
+
+        summary = IngestService(test_db).ingest_files(
+            [SavedUpload('a.fit', 'a.fit', 'hash-a'), SavedUpload('c.txt', None, None, 'Only .fit files are supported'),
+             SavedUpload('b.fit', 'b.fit', 'hash-b')]
+        )
+
+        assert [r['status'] for r in summary['files']] == ['created', 'failed', 'created']
+        assert summary['created'] == 2
+        assert summary['failed'] == 1
+        assert summary['files'][1]['error'] == 'Only .fit files are supported'
+        assert summary['files_per_second'] > 0
+
+    def test_failed_batch_is_retried_per_file(self, test_db, tmp_path):
+        """Test that one file failing to store does not fail the rest of its batch."""
+        build_fit_file(tmp_path / 'a.fit', make_records(5))
+        build_fit_file(tmp_path / 'future.fit', make_records(5), start_time=datetime(2100, 1, 1))
+        build_fit_file(tmp_path / 'b.fit', make_records(5))
+
+        summary = IngestService(test_db).ingest_files(
+            [SavedUpload('a.fit', 'a.fit', 'hash-a'), SavedUpload('future.fit', 'future.fit', 'hash-f'),
+             SavedUpload('b.fit', 'b.fit', 'hash-b')],
+            batch_size=10
+        )
+
+        assert [r['status'] for r in summary['files']] == ['created', 'failed', 'created']
+        assert 'future' in summary['files'][1]['error']
+        assert len(ActivityRepository(test_db).get_all()) == 2
+
+    def test_concurrently_stored_file_is_duplicate(self, test_db, tmp_path, monkeypatch):
+        """Test that content stored after the duplicate check is reported as a duplicate, not created."""
+        build_fit_file(tmp_path / 'a.fit', make_records(5))
+        service = IngestService(test_db)
+        service.ingest_files([SavedUpload('a.fit', 'a.fit', 'hash-a')])
+        (tmp_path / 'b.fit').write_bytes((tmp_path / 'a.fit').read_bytes())
+        # As if a.fit was stored by another request after b.fit was checked
+        monkeypatch.setattr(ActivityRepository, 'get_ids_by_content_hashes', lambda self, hashes: {})
+
+        summary = service.ingest_files([SavedUpload('b.fit', 'b.fit', 'hash-a')])
+
+        assert summary['files'][0]['status'] == 'duplicate'
+        assert summary['files'][0]['activity_id'] == ActivityRepository(test_db).get_by_content_hash('hash-a').id
+        assert not (tmp_path / 'b.fit').exists()
+        assert len(ActivityRepository(test_db).get_all()) == 1
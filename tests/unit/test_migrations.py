@@ -0,0 +1,154 @@
+"""
+Unit tests for the Alembic migrations.
+"""
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+from app.database import Base, IngestJobModel, PersonalBestProgressionModel
+from app.exceptions import SchemaVersionError
+from app.schema import (
+    BASELINE_REVISION, alembic_config, check_schema_version, current_revision, head_revision, stamp_unversioned
+)
+
+# Indexes on expressions, which SQLite reflects as plain column indexes
+EXPRESSION_INDEXES = {'ix_activities_date', 'ix_activities_type_date'}
+
+
+@pytest.fixture
+def migration_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _run(engine, *args):
+    """Run an alembic command such as 'upgrade', 'head' on engine."""
+    with engine.connect() as connection:
+        config = alembic_config(connection)
+        config.attributes['configure_logger'] = False
+        getattr(command, args[0])(config, *args[1:])
+        connection.commit()
+
+
+def _schema_diffs(engine):
+    """Differences between the database schema and the models."""
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        return [
+            diff for diff in compare_metadata(context, Base.metadata)
+            if not (diff[0] in ('add_index', 'remove_index') and diff[1].name in EXPRESSION_INDEXES)
+        ]
+
+
+def _create_first_release_schema(engine):
+    """The tables init_db created in the first release, without migration history."""
+    _run(engine, 'upgrade', BASELINE_REVISION)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE alembic_version"))
+
+
+class TestMigrations:
+    """Tests for the migration scripts."""
+
+    def test_upgrade_matches_models(self, migration_engine):
+        """Test that upgrading to head builds the schema the models describe."""
+        _run(migration_engine, 'upgrade', 'head')
+
+        assert _schema_diffs(migration_engine) == []
+
+        indexes = {i['name'] for i in inspect(migration_engine).get_indexes('activities')}
+        assert EXPRESSION_INDEXES <= indexes
+
+    def test_gps_points_index(self, migration_engine):
+        """Test that the (activity_id, timestamp) index is added and removed by its revision."""
+        _run(migration_engine, 'upgrade', 'head')
+        indexes = {i['name']: i['column_names'] for i in inspect(migration_engine).get_indexes('gps_points')}
+        assert indexes['ix_gps_points_activity_id_timestamp'] == ['activity_id', 'timestamp']
+
+        _run(migration_engine, 'downgrade', 'e5c3c76884e8')
+        indexes = {i['name'] for i in inspect(migration_engine).get_indexes('gps_points')}
+        assert 'ix_gps_points_activity_id_timestamp' not in indexes
+
+    def test_downgrade_to_base(self, migration_engine):
+        """Test that downgrading to base removes every table."""
+        _run(migration_engine, 'upgrade', 'head')
+        _run(migration_engine, 'downgrade', 'base')
+        assert inspect(migration_engine).get_table_names() == ['alembic_version']
+
+    def test_upgrade_first_release_database(self, migration_engine):
+        """Test that a database created by the first release's init_db is stamped and upgraded to the models."""
+        _create_first_release_schema(migration_engine)
+        with migration_engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO activities (id, activity_type, upload_date, activity_date, duration, total_distance, "
+                "file_path) VALUES (1, 'running', '2024-01-01', '2024-01-01', 1800, 5000.0, 'a.fit')"
+            ))
+            # Duplicates the unique constraint would reject; the fastest is kept
+            for best_time in (1300, 1200, 1250):
+                connection.execute(text(
+                    "INSERT INTO personal_bests (activity_type, distance, best_time, avg_pace, activity_id, "
+                    f"achieved_date) VALUES ('running', 5000.0, {best_time}, 300.0, 1, '2024-01-01')"
+                ))
+
+        assert stamp_unversioned(migration_engine)
+        assert current_revision(migration_engine) == BASELINE_REVISION
+        _run(migration_engine, 'upgrade', 'head')
+
+        assert _schema_diffs(migration_engine) == []
+        with migration_engine.connect() as connection:
+            assert connection.execute(text("SELECT best_time FROM personal_bests")).scalars().all() == [1200]
+            assert connection.execute(text("SELECT content_hash FROM activities")).scalars().all() == [None]
+        check_schema_version(migration_engine)
+
+    def test_upgrade_database_with_later_tables(self, migration_engine):
+        """Test that tables a later version's create_all already made in full are left as they are."""
+        _create_first_release_schema(migration_engine)
+        IngestJobModel.__table__.create(migration_engine)
+        PersonalBestProgressionModel.__table__.create(migration_engine)
+
+        assert stamp_unversioned(migration_engine)
+        _run(migration_engine, 'upgrade', 'head')
+        assert _schema_diffs(migration_engine) == []
+
+    def test_stamp_unversioned_leaves_others_alone(self, migration_engine):
+        """Test that empty and already versioned databases are not stamped."""
+        assert not stamp_unversioned(migration_engine)
+        assert current_revision(migration_engine) is None
+
+        _run(migration_engine, 'upgrade', 'head')
+        assert not stamp_unversioned(migration_engine)
+        assert current_revision(migration_engine) == head_revision()
+
+
+class TestCheckSchemaVersion:
+    """Tests for the startup schema version check."""
+
+    def test_migrated_database(self, migration_engine):
+        """Test that a database at the head revision passes the check."""
+        _run(migration_engine, 'upgrade', 'head')
+        assert current_revision(migration_engine) == head_revision()
+        check_schema_version(migration_engine)
+
+    def test_unmigrated_database(self, migration_engine):
+        """Test that a database without alembic_version fails the check, even with all tables."""
+        Base.metadata.create_all(bind=migration_engine)
+        assert current_revision(migration_engine) is None
+        with pytest.raises(SchemaVersionError, match='has not been migrated'):
+            check_schema_version(migration_engine)
+
+    def test_outdated_database(self, migration_engine):
+        """Test that a database behind the head revision fails the check."""
+        _run(migration_engine, 'upgrade', 'head')
+        _run(migration_engine, 'downgrade', '-1')
+        with pytest.raises(SchemaVersionError, match=head_revision()):
+            check_schema_version(migration_engine)
+
+    def test_stamped_without_migrating(self, migration_engine):
+        """Test that a database stamped at head without its migrations fails the check."""
+        _create_first_release_schema(migration_engine)
+        _run(migration_engine, 'stamp', 'head')
+        with pytest.raises(SchemaVersionError, match='activities.content_hash') as error:
+            check_schema_version(migration_engine)
+        assert 'ingest_jobs' in str(error.value)
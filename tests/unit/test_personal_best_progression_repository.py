@@ -0,0 +1,81 @@
+"""
+Unit tests for PersonalBestProgressionRepository.
+"""
+import pytest
+from datetime import datetime
+from app.exceptions import InvalidActivityTypeError
+from app.repositories import ActivityRepository, PersonalBestProgressionRepository
+
+
+class TestPersonalBestProgressionRepository:
+    """Tests for PersonalBestProgressionRepository class."""
+
+    @pytest.fixture
+    def activity_id(self, test_db, sample_activity_data):
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+        return activity.id
+
+    @staticmethod
+    def _record(activity_id, distance, best_time, achieved_date, activity_type='running'):
+        return {
+            'activity_type': activity_type,
+            'distance': distance,
+            'best_time': best_time,
+            'avg_pace': best_time / distance,
+            'activity_id': activity_id,
+            'achieved_date': achieved_date
+        }
+
+    def test_append_many_and_get_by_type(self, test_db, activity_id):
+        """Test that entries come back ordered by distance and date."""
+        repo = PersonalBestProgressionRepository(test_db)
+        repo.append_many([
+            self._record(activity_id, 5000.0, 1400, datetime(2024, 3, 1)),
+            self._record(activity_id, 1000.0, 280, datetime(2024, 2, 1)),
+            self._record(activity_id, 5000.0, 1500, datetime(2024, 1, 1)),
+            self._record(activity_id, 10000.0, 1500, datetime(2024, 1, 1), activity_type='Cycling'),
+        ])
+        test_db.commit()
+
+        assert [(e.distance, e.best_time) for e in repo.get_by_type('running')] == [
+            (1000.0, 280), (5000.0, 1500), (5000.0, 1400)
+        ]
+        assert [e.best_time for e in repo.get_by_type('running', 5000.0)] == [1500, 1400]
+        assert [e.activity_type for e in repo.get_by_type('cycling')] == ['cycling']
+
+    def test_append_many_validates(self, test_db, activity_id):
+        """Test that entries are validated before writing."""
+        repo = PersonalBestProgressionRepository(test_db)
+        with pytest.raises(ValueError):
+            repo.append_many([self._record(activity_id, 1000.0, -1, datetime(2024, 1, 1))])
+        with pytest.raises(InvalidActivityTypeError):
+            repo.append_many([self._record(activity_id, 1000.0, 300, datetime(2024, 1, 1), activity_type='flying')])
+
+    def test_delete_many(self, test_db, activity_id):
+        """Test that only the given entries are deleted."""
+        repo = PersonalBestProgressionRepository(test_db)
+        repo.append_many([
+            self._record(activity_id, 1000.0, 300, datetime(2024, 1, 1)),
+            self._record(activity_id, 1000.0, 290, datetime(2024, 2, 1)),
+        ])
+        repo.delete_many([repo.get_by_type('running')[0].id])
+        repo.delete_many([])
+        test_db.commit()
+
+        assert [e.best_time for e in repo.get_by_type('running')] == [290]
+
+    def test_replace_all(self, test_db, activity_id):
+        """Test that only the timeline of the given types is replaced."""
+        repo = PersonalBestProgressionRepository(test_db)
+        repo.append_many([
+            self._record(activity_id, 1000.0, 300, datetime(2024, 1, 1)),
+            self._record(activity_id, 5000.0, 600, datetime(2024, 1, 1), activity_type='cycling'),
+        ])
+        test_db.commit()
+
+        repo.replace_all([self._record(activity_id, 1000.0, 290, datetime(2024, 1, 2))], ['running'])
+        test_db.commit()
+
+        assert [e.best_time for e in repo.get_by_type('running')] == [290]
+        assert [e.best_time for e in repo.get_by_type('cycling')] == [600]
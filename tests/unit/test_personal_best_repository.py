@@ -3,7 +3,8 @@ Unit tests for PersonalBestRepository.
 """
 import pytest
 from datetime import datetime
-from app.repositories import PersonalBestRepository, ActivityRepository
+from sqlalchemy.exc import IntegrityError
+from app.repositories import PersonalBestRepository, ActivityRepository, personal_best_repository
 from app.exceptions import InvalidActivityTypeError
 
 
@@ -137,3 +138,83 @@ class TestPersonalBestRepository:
 
         all_pbs = pb_repo.get_all()
         assert len(all_pbs) == 2
+
+
+class TestUpsertMany:
+    """Tests for PersonalBestRepository.upsert_many."""
+
+    @pytest.fixture
+    def activity_id(self, test_db, sample_activity_data):
+        activity = ActivityRepository(test_db).create(**sample_activity_data)
+        test_db.commit()
+        return activity.id
+
+    @staticmethod
+    def _record(activity_id, distance, best_time, activity_type='running'):
+        return {
+            'activity_type': activity_type,
+            'distance': distance,
+            'best_time': best_time,
+            'avg_pace': best_time / distance,
+            'activity_id': activity_id,
+            'achieved_date': datetime(2024, 1, 15, 10, 30)
+        }
+
+    @pytest.mark.parametrize('on_conflict', [True, False])
+    def test_upsert_many(self, test_db, activity_id, monkeypatch, on_conflict):
+        """Test that new records are inserted and only faster ones replace existing ones."""
+        if not on_conflict:
+            monkeypatch.setattr(personal_best_repository, 'UPSERT_INSERTS', {})
+        repo = PersonalBestRepository(test_db)
+        repo.upsert_many([self._record(activity_id, 1000.0, 300), self._record(activity_id, 5000.0, 1500)])
+        test_db.commit()
+
+        written = repo.upsert_many([
+            self._record(activity_id, 1000.0, 280),
+            self._record(activity_id, 5000.0, 1600),
+            self._record(activity_id, 10000.0, 3300),
+        ])
+        test_db.commit()
+        test_db.expire_all()
+
+        assert sorted(written) == [('running', 1000.0), ('running', 10000.0)]
+        assert [(pb.distance, pb.best_time) for pb in repo.get_by_type('running')] == [
+            (1000.0, 280), (5000.0, 1500), (10000.0, 3300)
+        ]
+
+    def test_upsert_many_validates(self, test_db, activity_id):
+        """Test that records are validated before writing."""
+        repo = PersonalBestRepository(test_db)
+        with pytest.raises(ValueError):
+            repo.upsert_many([self._record(activity_id, 1000.0, -1)])
+        with pytest.raises(InvalidActivityTypeError):
+            repo.upsert_many([self._record(activity_id, 1000.0, 300, activity_type='flying')])
+
+    def test_type_and_distance_are_unique(self, test_db, activity_id):
+        """Test that there is only one personal best per type and distance."""
+        repo = PersonalBestRepository(test_db)
+        repo.create(**self._record(activity_id, 1000.0, 300))
+
+        with pytest.raises(IntegrityError):
+            repo.create(**self._record(activity_id, 1000.0, 280))
+
+    def test_replace_all(self, test_db, activity_id):
+        """Test that the records of the given types are replaced and others kept."""
+        repo = PersonalBestRepository(test_db)
+        repo.upsert_many([
+            self._record(activity_id, 1000.0, 300),
+            self._record(activity_id, 5000.0, 1500),
+            self._record(activity_id, 5000.0, 600, activity_type='cycling'),
+        ])
+        test_db.commit()
+
+        repo.replace_all([self._record(activity_id, 1000.0, 320)], ['running'])
+        test_db.commit()
+
+        assert sorted((pb.activity_type, pb.distance, pb.best_time) for pb in repo.get_all()) == [
+            ('cycling', 5000.0, 600), ('running', 1000.0, 320)
+        ]
+
+        repo.replace_all([])
+        test_db.commit()
+        assert repo.get_all() == []
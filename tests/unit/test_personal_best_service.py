@@ -0,0 +1,341 @@
+"""
+Unit tests for PersonalBestService.
+"""
+import pytest
+from datetime import datetime
+import numpy as np
+from sqlalchemy import event
+from app.config import Config
+from app.gps_stream import GPSStream
+from app.repositories import ActivityRepository, GPSPointRepository, PersonalBestRepository, get_gps_repository
+from app.exceptions import GPSStorageNotBackfilledError
+from app.services import ActivityService, PersonalBestService
+
+
+def _steady_stream(speed, meters):
+    """A stream at constant speed (m/s), one point per second."""
+    seconds = np.arange(0, meters / speed + 1)
+    timestamps = np.datetime64(datetime(2024, 1, 15, 10, 0), 'us') + seconds.astype('timedelta64[s]')
+    nan = np.full(len(seconds), np.nan)
+    return GPSStream(timestamps, nan, nan, seconds * speed, nan, nan)
+
+
+@pytest.fixture
+def make_activity(test_db, sample_activity_data):
+    def make(activity_type='running', activity_date=datetime(2024, 1, 15, 10, 30)):
+        activity = ActivityRepository(test_db).create(
+            **{**sample_activity_data, 'activity_type': activity_type, 'activity_date': activity_date}
+        )
+        test_db.commit()
+        return activity
+    return make
+
+
+class TestAddBestEfforts:
+    """Tests for PersonalBestService.add_best_efforts."""
+
+    def test_first_activity_sets_all_records(self, test_db, make_activity):
+        """Test that every covered distance gets a personal best."""
+        activity = make_activity()
+        service = PersonalBestService(test_db)
+
+        improved = service.add_best_efforts(activity.id, 'running', activity.activity_date, _steady_stream(4.0, 6000))
+        test_db.commit()
+
+        assert [pb['distance'] for pb in improved] == [1000.0, 1609.344, 5000.0]
+        pbs = {pb['distance']: pb for pb in service.get_personal_bests_by_type('running')}
+        assert pbs[5000.0]['best_time'] == 1250
+        assert pbs[5000.0]['avg_pace'] == pytest.approx(1250 / 60 / 5)
+        assert pbs[5000.0]['activity_id'] == activity.id
+
+    def test_only_improvements_are_written(self, test_db, make_activity):
+        """Test that a slower activity keeps old records and a longer one adds new ones."""
+        fast = make_activity()
+        slow = make_activity(activity_date=datetime(2024, 2, 1))
+        service = PersonalBestService(test_db)
+        service.add_best_efforts(fast.id, 'running', fast.activity_date, _steady_stream(4.0, 6000))
+
+        improved = service.add_best_efforts(slow.id, 'running', slow.activity_date, _steady_stream(3.0, 11000))
+
+        assert [pb['distance'] for pb in improved] == [10000.0]
+        pbs = {pb.distance: pb for pb in PersonalBestRepository(test_db).get_by_type('running')}
+        assert pbs[5000.0].activity_id == fast.id
+        assert pbs[10000.0].activity_id == slow.id
+        assert pbs[10000.0].achieved_date == datetime(2024, 2, 1)
+
+    def test_faster_activity_replaces_record(self, test_db, make_activity):
+        """Test that a faster effort updates the existing record in place."""
+        slow = make_activity()
+        fast = make_activity()
+        service = PersonalBestService(test_db)
+        service.add_best_efforts(slow.id, 'cycling', slow.activity_date, _steady_stream(8.0, 6000))
+
+        improved = service.add_best_efforts(fast.id, 'cycling', fast.activity_date, _steady_stream(10.0, 6000))
+
+        assert len(improved) == 1
+        pbs = PersonalBestRepository(test_db).get_by_type('cycling')
+        assert len(pbs) == 1
+        assert (pbs[0].best_time, pbs[0].activity_id) == (500, fast.id)
+        assert pbs[0].avg_pace == pytest.approx(36.0)
+
+    def test_does_not_commit(self, test_db, make_activity):
+        """Test that changes are left for the caller to commit."""
+        activity = make_activity()
+        PersonalBestService(test_db).add_best_efforts(
+            activity.id, 'swimming', activity.activity_date, _steady_stream(1.0, 500)
+        )
+
+        test_db.rollback()
+
+        assert PersonalBestRepository(test_db).get_all() == []
+
+
+class TestUpsertPersonalBests:
+    """Tests for PersonalBestService.upsert_personal_bests."""
+
+    @staticmethod
+    def _candidates(activity_id, times):
+        return [
+            {
+                'activity_type': 'running',
+                'distance': distance,
+                'best_time': best_time,
+                'avg_pace': best_time / 60 / (distance / 1000),
+                'activity_id': activity_id,
+                'achieved_date': datetime(2024, 1, 15, 10, 30)
+            }
+            for distance, best_time in times.items()
+        ]
+
+    def test_one_query_one_upsert_one_commit(self, test_db, make_activity):
+        """Test that a whole activity's efforts cost a SELECT of records and timeline, one upsert, one progression INSERT and one commit."""
+        activity_id = make_activity().id
+        service = PersonalBestService(test_db)
+        service.upsert_personal_bests(self._candidates(activity_id, {1000.0: 300, 5000.0: 1600}))
+
+        statements = []
+        listen = lambda conn, cursor, statement, *args: statements.append(statement.split()[0])
+        event.listen(test_db.get_bind(), 'before_cursor_execute', listen)
+        commits = []
+        event.listen(test_db, 'after_commit', lambda session: commits.append(session))
+        try:
+            written = service.upsert_personal_bests(
+                self._candidates(activity_id, {1000.0: 290, 5000.0: 1700, 10000.0: 3500})
+            )
+        finally:
+            event.remove(test_db.get_bind(), 'before_cursor_execute', listen)
+
+        assert statements == ['SELECT', 'INSERT', 'SELECT', 'INSERT']
+        assert len(commits) == 1
+        assert [c['distance'] for c in written] == [1000.0, 10000.0]
+        pbs = {pb['distance']: pb['best_time'] for pb in service.get_personal_bests_by_type('running')}
+        assert pbs == {1000.0: 290, 5000.0: 1600, 10000.0: 3500}
+
+    def test_no_improvement_writes_nothing(self, test_db, make_activity):
+        """Test that slower efforts do not issue an upsert."""
+        activity = make_activity()
+        service = PersonalBestService(test_db)
+        service.upsert_personal_bests(self._candidates(activity.id, {1000.0: 300}))
+
+        assert service.upsert_personal_bests(self._candidates(activity.id, {1000.0: 300})) == []
+
+    def test_upsert_personal_best(self, test_db, make_activity):
+        """Test the single record API."""
+        activity = make_activity()
+        service = PersonalBestService(test_db)
+
+        service.upsert_personal_best('running', 1000.0, 300, 5.0, activity.id, datetime(2024, 1, 15))
+        service.upsert_personal_best('running', 1000.0, 320, 5.3, activity.id, datetime(2024, 1, 16))
+
+        pbs = service.get_personal_bests_by_type('running')
+        assert [(pb['best_time'], pb['avg_pace']) for pb in pbs] == [(300, 5.0)]
+
+
+class TestRebuildPersonalBests:
+    """Tests for PersonalBestService.rebuild_personal_bests."""
+
+    @pytest.fixture(autouse=True)
+    def inline_workers(self, monkeypatch):
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+
+    @pytest.fixture(autouse=True, params=['rows', 'columnar'])
+    def gps_storage(self, request, monkeypatch):
+        monkeypatch.setattr(Config, 'GPS_STORAGE', request.param)
+
+    @pytest.fixture
+    def store_activity(self, test_db, make_activity):
+        def store(speed, meters, activity_type='running', activity_date=datetime(2024, 1, 15, 10, 30)):
+            activity = make_activity(activity_type, activity_date)
+            stream = _steady_stream(speed, meters)
+            get_gps_repository(test_db).create_stream(activity.id, stream)
+            PersonalBestService(test_db).add_best_efforts(activity.id, activity_type, activity_date, stream)
+            test_db.commit()
+            return activity
+        return store
+
+    @staticmethod
+    def _records(test_db):
+        return sorted(
+            (pb.activity_type, pb.distance, pb.best_time, pb.activity_id, pb.achieved_date)
+            for pb in PersonalBestRepository(test_db).get_all()
+        )
+
+    @pytest.mark.parametrize('chunk_size', [50, 100000])
+    def test_matches_incremental_records(self, test_db, store_activity, chunk_size):
+        """Test that a rebuild reproduces the records kept up to date at ingest."""
+        activities = [
+            store_activity(4.0, 6000),
+            store_activity(3.0, 11000, activity_date=datetime(2024, 2, 1)),
+            store_activity(10.0, 12000, activity_type='cycling')
+        ]
+        expected = self._records(test_db)
+
+        stats = PersonalBestService(test_db).rebuild_personal_bests(chunk_size=chunk_size)
+
+        assert self._records(test_db) == expected
+        assert stats['activities'] == 3
+        assert stats['points'] == sum(len(get_gps_repository(test_db).get_stream(a.id)) for a in activities)
+        assert stats['personal_bests'] == len(expected)
+
+    def test_records_of_deleted_activity_are_replaced(self, test_db, store_activity):
+        """Test that records of a deleted activity fall back to the next best activity."""
+        slow = store_activity(3.0, 6000)
+        fast = store_activity(4.0, 6000, activity_date=datetime(2024, 2, 1))
+        ActivityRepository(test_db).delete(fast.id)
+        test_db.commit()
+
+        PersonalBestService(test_db).rebuild_personal_bests()
+
+        pbs = {pb.distance: pb for pb in PersonalBestRepository(test_db).get_by_type('running')}
+        assert pbs[5000.0].activity_id == slow.id
+        assert pbs[5000.0].best_time == 1667
+
+    def test_earliest_activity_keeps_tied_record(self, test_db, store_activity):
+        """Test that on equal times the earlier activity holds the record."""
+        later = store_activity(4.0, 1200, activity_date=datetime(2024, 3, 1))
+        earlier = store_activity(4.0, 1200, activity_date=datetime(2024, 1, 1))
+
+        PersonalBestService(test_db).rebuild_personal_bests()
+
+        [pb] = PersonalBestRepository(test_db).get_by_type('running')
+        assert pb.activity_id == earlier.id != later.id
+
+    def test_only_rebuilds_requested_types(self, test_db, store_activity):
+        """Test that records of other activity types are left untouched."""
+        store_activity(4.0, 6000)
+        store_activity(10.0, 12000, activity_type='cycling')
+        PersonalBestRepository(test_db).replace_all([], ['running'])
+        test_db.commit()
+
+        stats = PersonalBestService(test_db).rebuild_personal_bests(['Cycling'])
+
+        assert stats['activities'] == 1
+        assert {pb.activity_type for pb in PersonalBestRepository(test_db).get_all()} == {'cycling'}
+
+    def test_refuses_rows_not_backfilled(self, test_db, make_activity):
+        """Test that a columnar rebuild does not drop the records of activities only stored as rows."""
+        activity = make_activity()
+        GPSPointRepository(test_db).create_stream(activity.id, _steady_stream(4.0, 1200))
+        test_db.commit()
+        service = PersonalBestService(test_db)
+
+        if Config.GPS_STORAGE == 'rows':
+            assert service.rebuild_personal_bests()['activities'] == 1
+            return
+        with pytest.raises(GPSStorageNotBackfilledError):
+            service.rebuild_personal_bests()
+        ActivityService(test_db).backfill_gps_streams()
+        assert service.rebuild_personal_bests()['personal_bests'] > 0
+
+    def test_reports_progress(self, test_db, store_activity):
+        """Test that progress is reported after each chunk of activities."""
+        for day in range(1, 4):
+            store_activity(4.0, 1200, activity_date=datetime(2024, 1, day))
+        calls = []
+
+        PersonalBestService(test_db).rebuild_personal_bests(
+            chunk_size=100, progress=lambda done, total, elapsed: calls.append((done, total))
+        )
+
+        assert calls == [(1, 3), (2, 3), (3, 3)]
+
+
+class TestProgression:
+    """Tests for the personal best progression timeline."""
+
+    def test_improvements_are_appended(self, test_db, make_activity):
+        """Test that every written improvement is added to the timeline."""
+        first = make_activity(activity_date=datetime(2024, 1, 1))
+        slower = make_activity(activity_date=datetime(2024, 2, 1))
+        faster = make_activity(activity_date=datetime(2024, 3, 1))
+        service = PersonalBestService(test_db)
+        service.add_best_efforts(first.id, 'running', first.activity_date, _steady_stream(3.0, 1200))
+        service.add_best_efforts(slower.id, 'running', slower.activity_date, _steady_stream(2.5, 1200))
+        service.add_best_efforts(faster.id, 'running', faster.activity_date, _steady_stream(4.0, 1700))
+        test_db.commit()
+
+        progression = service.get_progression('Running')
+
+        assert [(p['distance'], p['best_time'], p['activity_id']) for p in progression] == [
+            (1000.0, 333, first.id), (1000.0, 250, faster.id), (1609.344, 402, faster.id)
+        ]
+        assert [p['distance'] for p in service.get_progression('running', 1609.344)] == [1609.344]
+        assert progression[0]['achieved_date'] == '2024-01-01T00:00:00'
+        assert service.get_progression('running', iso_dates=False)[0]['achieved_date'] == datetime(2024, 1, 1)
+
+    @staticmethod
+    def _upsert(service, activity, best_time):
+        """Upsert a 5k effort of activity at its date."""
+        return service.upsert_personal_bests([{
+            'activity_type': 'running',
+            'distance': 5000.0,
+            'best_time': best_time,
+            'avg_pace': best_time / 60 / 5,
+            'activity_id': activity.id,
+            'achieved_date': activity.activity_date
+        }])
+
+    def test_earlier_faster_effort_replaces_later_entries(self, test_db, make_activity):
+        """Test that an out-of-order, earlier and faster effort removes the later entries it beats."""
+        recent = make_activity(activity_date=datetime(2024, 5, 1))
+        old = make_activity(activity_date=datetime(2022, 5, 1))
+        service = PersonalBestService(test_db)
+        self._upsert(service, recent, 1300)
+        self._upsert(service, old, 1200)
+
+        assert [(p['best_time'], p['achieved_date']) for p in service.get_progression('running')] == [
+            (1200, '2022-05-01T00:00:00')
+        ]
+
+    def test_earlier_slower_effort_is_inserted(self, test_db, make_activity):
+        """Test that an out-of-order effort that was a record at its date is inserted before the later ones."""
+        recent = make_activity(activity_date=datetime(2024, 5, 1))
+        middle = make_activity(activity_date=datetime(2023, 5, 1))
+        old = make_activity(activity_date=datetime(2022, 5, 1))
+        service = PersonalBestService(test_db)
+        self._upsert(service, recent, 1200)
+        self._upsert(service, old, 1300)
+        self._upsert(service, middle, 1350)
+
+        assert [(p['best_time'], p['achieved_date']) for p in service.get_progression('running')] == [
+            (1300, '2022-05-01T00:00:00'), (1200, '2024-05-01T00:00:00')
+        ]
+        assert [pb['best_time'] for pb in service.get_personal_bests_by_type('running')] == [1200]
+
+    def test_rebuild_replays_in_date_order(self, test_db, make_activity, monkeypatch):
+        """Test that a rebuild recreates the timeline in chronological order."""
+        monkeypatch.setattr(Config, 'PARSE_WORKERS', 0)
+        gps_repo = GPSPointRepository(test_db)
+        # Stored newest first, so ingest order differs from date order
+        for speed, day in ((4.0, 3), (2.5, 2), (3.0, 1)):
+            activity = make_activity(activity_date=datetime(2024, 1, day))
+            gps_repo.create_stream(activity.id, _steady_stream(speed, 1200))
+        test_db.commit()
+        service = PersonalBestService(test_db)
+
+        stats = service.rebuild_personal_bests()
+
+        assert stats['progression'] == 2
+        assert [(p['best_time'], p['achieved_date']) for p in service.get_progression('running')] == [
+            (333, '2024-01-01T00:00:00'), (250, '2024-01-03T00:00:00')
+        ]
@@ -0,0 +1,83 @@
+"""
+Unit tests for the memory-mapped stream cache.
+"""
+import mmap
+import pytest
+from datetime import datetime
+import numpy as np
+from app.config import Config
+from app.gps_stream import GPSStream
+from app.stream_cache import HEADER, StreamCache, get_stream_cache
+
+
+def _stream(count):
+    seconds = np.arange(count)
+    timestamps = np.datetime64(datetime(2024, 1, 15, 10, 30), 'us') + seconds.astype('timedelta64[s]')
+    heart_rates = 140.0 + seconds % 20
+    heart_rates[::7] = np.nan
+    return GPSStream(timestamps, 37.0 + seconds * 1e-5, -122.0 + seconds * 1e-5, seconds * 3.0,
+                     np.full(count, 3.0), heart_rates)
+
+
+class TestStreamCache:
+    """Tests for StreamCache class."""
+
+    def test_put_and_get(self, tmp_path):
+        """Test that a cached stream is read back as read-only views of the mapped file."""
+        cache = StreamCache(str(tmp_path))
+        stream = _stream(100)
+        cache.put(1, stream)
+
+        cached = cache.get(1)
+
+        assert cached == stream
+        assert not cached.distances.flags.writeable
+        assert isinstance(cached.distances.base.obj, mmap.mmap)
+        assert (tmp_path / '1.stream').stat().st_size == HEADER.size + 6 * 8 * 100
+
+    def test_put_replaces(self, tmp_path):
+        """Test that putting a stream again replaces the cached one."""
+        cache = StreamCache(str(tmp_path))
+        cache.put(1, _stream(10))
+        cache.put(1, _stream(20))
+
+        assert cache.get(1) == _stream(20)
+        assert [p.name for p in tmp_path.iterdir()] == ['1.stream']
+
+    def test_empty_stream(self, tmp_path):
+        """Test caching a stream without points."""
+        cache = StreamCache(str(tmp_path))
+        cache.put(1, GPSStream.empty())
+        assert len(cache.get(1)) == 0
+
+    def test_miss(self, tmp_path):
+        """Test that an activity that is not cached returns None."""
+        assert StreamCache(str(tmp_path)).get(1) is None
+
+    def test_delete(self, tmp_path):
+        """Test that a deleted stream is no longer cached."""
+        cache = StreamCache(str(tmp_path))
+        cache.put(1, _stream(10))
+        cache.delete(1)
+        cache.delete(2)
+
+        assert cache.get(1) is None
+
+    @pytest.mark.parametrize('content', [b'', b'VGSC', b'XXXX' + bytes(12), HEADER.pack(b'VGSC', 1, 5)])
+    def test_invalid_file_is_discarded(self, tmp_path, content):
+        """Test that truncated or foreign files are treated as a miss and removed."""
+        (tmp_path / '1.stream').write_bytes(content)
+        cache = StreamCache(str(tmp_path))
+
+        assert cache.get(1) is None
+        assert not (tmp_path / '1.stream').exists()
+
+    def test_get_stream_cache(self, tmp_path, monkeypatch):
+        """Test that STREAM_CACHE_DIR enables the cache."""
+        monkeypatch.setattr(Config, 'STREAM_CACHE_DIR', '')
+        assert get_stream_cache() is None
+
+        monkeypatch.setattr(Config, 'STREAM_CACHE_DIR', str(tmp_path / 'streams'))
+        cache = get_stream_cache()
+        assert cache.directory == str(tmp_path / 'streams')
+        assert get_stream_cache() is cache
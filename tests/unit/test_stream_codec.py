@@ -0,0 +1,73 @@
+"""
+Unit tests for the columnar GPS stream encoding.
+"""
+import pytest
+from datetime import datetime
+import numpy as np
+from app.config import Config
+from app.fit_parser import read_fit_stream
+from app.gps_stream import GPSStream
+from app.stream_codec import decode_stream, encode_stream
+from tests.fit_files import build_fit_file, make_records
+
+
+class TestStreamCodec:
+    """Tests for encode_stream and decode_stream."""
+
+    @pytest.mark.parametrize('decoder', ['native', 'fitparse'])
+    def test_fit_stream_round_trips_exactly(self, tmp_path, monkeypatch, decoder):
+        """Test that a stream parsed from a FIT file decodes to equal values."""
+        monkeypatch.setattr(Config, 'FIT_DECODER', decoder)
+        records = make_records(600)
+        records[10]['heart_rate'] = None
+        records[20]['position_lat'] = None
+        records[30]['speed'] = None
+        stream = read_fit_stream(build_fit_file(tmp_path / 'run.fit', records))['gps_stream']
+
+        decoded = decode_stream(encode_stream(stream))
+
+        assert decoded == stream
+        assert np.isnan(decoded.heart_rates[10]) and np.isnan(decoded.latitudes[20])
+
+    def test_quantizes_to_fit_resolution(self):
+        """Test that values are kept to the resolution of the FIT fields."""
+        stream = GPSStream(
+            [np.datetime64(datetime(2024, 1, 15, 10, 30, 0, 250000), 'us')],
+            [37.77491234567], [-122.41941234567], [1234.5678], [3.14159], [150.0]
+        )
+
+        decoded = decode_stream(encode_stream(stream))
+
+        assert decoded.timestamps[0] == stream.timestamps[0]
+        assert decoded.latitudes[0] == pytest.approx(37.77491234567, abs=1e-7)
+        assert decoded.longitudes[0] == pytest.approx(-122.41941234567, abs=1e-7)
+        assert (decoded.distances[0], decoded.speeds[0], decoded.heart_rates[0]) == (1234.57, 3.142, 150.0)
+
+    def test_large_jumps_wrap_around(self):
+        """Test that deltas overflowing the stored integer type still decode."""
+        timestamps = np.datetime64(datetime(2024, 1, 15), 'us') + np.array([0, 1, 2], dtype='timedelta64[s]')
+        stream = GPSStream(
+            timestamps, [-89.9, 89.9, -89.9], [-179.9, 179.9, -179.9], [0.0, 40_000_000.0, 40_000_000.0],
+            [0.0, 60.0, 0.0], [30.0, 250.0, 30.0]
+        )
+
+        decoded = decode_stream(encode_stream(stream))
+
+        np.testing.assert_allclose(decoded.latitudes, stream.latitudes, atol=1e-7)
+        np.testing.assert_allclose(decoded.longitudes, stream.longitudes, atol=1e-7)
+        np.testing.assert_array_equal(decoded.distances, stream.distances)
+        np.testing.assert_array_equal(decoded.heart_rates, stream.heart_rates)
+
+    def test_empty_stream(self):
+        """Test encoding a stream without points."""
+        assert len(decode_stream(encode_stream(GPSStream.empty()))) == 0
+
+    def test_smaller_than_raw_columns(self, tmp_path):
+        """Test that a regular stream compresses far below its 48 bytes per point."""
+        stream = read_fit_stream(build_fit_file(tmp_path / 'run.fit', make_records(3600)))['gps_stream']
+        assert len(encode_stream(stream)) < len(stream) * 48 / 10
+
+    def test_rejects_other_data(self):
+        """Test that data that is not an encoded stream raises ValueError."""
+        with pytest.raises(ValueError):
+            decode_stream(b'PK\x03\x04' + bytes(16))
@@ -0,0 +1,66 @@
+"""
+Unit tests for TimeAggregationRepository.
+"""
+import pytest
+from datetime import datetime
+from app.repositories import TimeAggregationRepository, time_aggregation_repository
+
+
+def _change(date, duration, count=1, activity_type='running', period='weekly'):
+    return {
+        'aggregation_type': period,
+        'activity_type': activity_type,
+        'date': date,
+        'duration': duration,
+        'total_distance': duration * 3.0,
+        'activity_count': count
+    }
+
+
+class TestTimeAggregationRepository:
+    """Tests for TimeAggregationRepository class."""
+
+    @pytest.mark.parametrize('on_conflict', [True, False])
+    def test_add_many(self, test_db, monkeypatch, on_conflict):
+        """Test that changes are summed into buckets and empty buckets are dropped."""
+        if not on_conflict:
+            monkeypatch.setattr(time_aggregation_repository, 'UPSERT_INSERTS', {})
+        repo = TimeAggregationRepository(test_db)
+        week1, week2 = datetime(2024, 1, 1), datetime(2024, 1, 8)
+        repo.add_many([_change(week1, 600), _change(week2, 300)])
+        test_db.commit()
+
+        repo.add_many([_change(week1, 900), _change(week2, -300, count=-1)])
+        test_db.commit()
+        test_db.expire_all()
+
+        [bucket] = repo.get_buckets('weekly')
+        assert (bucket.date, bucket.duration, bucket.total_distance, bucket.activity_count) == (week1, 1500, 4500.0, 2)
+
+    def test_get_buckets_filters(self, test_db):
+        """Test filtering buckets by period, activity type and date range."""
+        repo = TimeAggregationRepository(test_db)
+        repo.add_many([
+            _change(datetime(2024, 1, 1), 600),
+            _change(datetime(2024, 1, 8), 300),
+            _change(datetime(2024, 1, 8), 300, activity_type='cycling'),
+            _change(datetime(2024, 1, 1), 600, period='monthly'),
+        ])
+        test_db.commit()
+
+        assert [(b.date.day, b.activity_type) for b in repo.get_buckets('weekly')] == [
+            (1, 'running'), (8, 'cycling'), (8, 'running')
+        ]
+        assert len(repo.get_buckets('weekly', ['cycling'])) == 1
+        assert len(repo.get_buckets('weekly', start=datetime(2024, 1, 8))) == 2
+        assert len(repo.get_buckets('weekly', end=datetime(2024, 1, 7))) == 1
+        assert len(repo.get_buckets('monthly')) == 1
+
+    def test_replace_all(self, test_db):
+        """Test that all buckets are replaced."""
+        repo = TimeAggregationRepository(test_db)
+        repo.add_many([_change(datetime(2024, 1, 1), 600)])
+        repo.replace_all([_change(datetime(2024, 1, 8), 300)])
+        test_db.commit()
+
+        assert [b.date for b in repo.get_buckets('weekly')] == [datetime(2024, 1, 8)]
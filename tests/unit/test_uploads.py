@@ -0,0 +1,186 @@
+"""
+Unit tests for upload storage.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import zipfile
+import pytest
+from fastapi import UploadFile
+from app import uploads
+from app.config import Config
+from app.exceptions import InvalidUploadError, UploadTooLargeError
+from tests.fit_files import build_fit_file, make_records
+
+
+class _ChunkRecorder(io.BytesIO):
+    """In-memory file that records the size of every read."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+@pytest.fixture
+def upload_folder(tmp_path, monkeypatch):
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(folder))
+    return folder
+
+
+@pytest.fixture
+def fit_bytes(tmp_path):
+    return open(build_fit_file(tmp_path / 'run.fit', make_records(10000)), 'rb').read()
+
+
+def _save(data, filename='run.fit'):
+    file = _ChunkRecorder(data)
+    path, content_hash = asyncio.run(uploads.save_upload(UploadFile(file, filename=filename)))
+    return file, path, content_hash
+
+
+class TestSaveUpload:
+    """Tests for save_upload."""
+
+    def test_streams_in_chunks(self, upload_folder, fit_bytes):
+        """Test that the upload is copied in bounded chunks and hashed on the way."""
+        file, path, content_hash = _save(fit_bytes)
+
+        assert len(fit_bytes) > 2 * uploads.CHUNK_SIZE
+        assert set(file.reads) == {uploads.CHUNK_SIZE}
+        assert open(path, 'rb').read() == fit_bytes
+        assert content_hash == hashlib.sha256(fit_bytes).hexdigest()
+        assert os.path.dirname(path) == str(upload_folder)
+
+    @pytest.mark.parametrize('data,message', [
+        (b'not a fit file', 'Invalid .FIT file header'),
+        (b'\x0e\x10', 'Truncated .FIT file header'),
+        (b'', 'Truncated .FIT file header'),
+    ])
+    def test_rejects_invalid_header(self, upload_folder, data, message):
+        """Test that files without a FIT header are rejected and not kept."""
+        with pytest.raises(InvalidUploadError, match=message):
+            _save(data)
+        assert os.listdir(upload_folder) == []
+
+    def test_rejects_truncated_file(self, upload_folder, fit_bytes):
+        """Test that a file shorter than its header says is rejected."""
+        with pytest.raises(InvalidUploadError, match='truncated'):
+            _save(fit_bytes[:len(fit_bytes) // 2])
+        assert os.listdir(upload_folder) == []
+
+    def test_size_limit_enforced_while_streaming(self, upload_folder, fit_bytes, monkeypatch):
+        """Test that reading stops as soon as the size limit is passed."""
+        monkeypatch.setattr(Config, 'MAX_CONTENT_LENGTH', uploads.CHUNK_SIZE + 1)
+        file = _ChunkRecorder(fit_bytes)
+
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(uploads.save_upload(UploadFile(file, filename='run.fit')))
+
+        assert len(file.reads) == 2
+        assert os.listdir(upload_folder) == []
+
+    def test_size_limit_from_known_size(self, upload_folder, fit_bytes, monkeypatch):
+        """Test that an upload of known size over the limit is rejected before reading."""
+        monkeypatch.setattr(Config, 'MAX_CONTENT_LENGTH', 100)
+        file = _ChunkRecorder(fit_bytes)
+
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(uploads.save_upload(UploadFile(file, filename='run.fit', size=len(fit_bytes))))
+
+        assert file.reads == []
+
+
+class TestSaveUploads:
+    """Tests for save_uploads."""
+
+    def test_zip_members_are_checked(self, upload_folder, fit_bytes):
+        """Test that zip members go through the same checks as single files."""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('a/run.fit', fit_bytes)
+            zf.writestr('a/broken.fit', b'not a fit file')
+            zf.writestr('a/notes.txt', b'ignored')
+        archive.seek(0)
+
+        saved = asyncio.run(uploads.save_uploads([
+            UploadFile(archive, filename='export.zip'),
+            UploadFile(io.BytesIO(b'hello'), filename='notes.txt'),
+        ]))
+
+        assert [(s.name, s.path is not None) for s in saved] == [
+            ('a/run.fit', True), ('a/broken.fit', False), ('notes.txt', False)
+        ]
+        assert saved[0].content_hash == hashlib.sha256(fit_bytes).hexdigest()
+        assert 'not a valid .fit file' in saved[1].error
+        assert saved[2].error == 'Only .fit files are supported'
+        assert len(os.listdir(upload_folder)) == 1
+
+
+    @staticmethod
+    def _archive(members):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        archive.seek(0)
+        return archive
+
+    def test_archive_size_limit(self, upload_folder, fit_bytes, monkeypatch):
+        """Test that an archive over the size limit is rejected, deleting files stored before it."""
+        archive = self._archive({'run.fit': fit_bytes})
+        monkeypatch.setattr(Config, 'MAX_ARCHIVE_SIZE', len(archive.getvalue()) - 1)
+
+        with pytest.raises(UploadTooLargeError, match='maximum archive size'):
+            asyncio.run(uploads.save_uploads([
+                UploadFile(io.BytesIO(fit_bytes), filename='first.fit'),
+                UploadFile(archive, filename='export.zip'),
+            ]))
+
+        assert os.listdir(upload_folder) == []
+
+    def test_archive_member_limit(self, upload_folder, fit_bytes, monkeypatch):
+        """Test that an archive with too many entries is rejected before extracting."""
+        monkeypatch.setattr(Config, 'MAX_ARCHIVE_MEMBERS', 2)
+        archive = self._archive({f'{i}.fit': fit_bytes for i in range(3)})
+
+        with pytest.raises(InvalidUploadError, match='more than 2 entries'):
+            asyncio.run(uploads.save_uploads([UploadFile(archive, filename='export.zip')]))
+
+        assert os.listdir(upload_folder) == []
+
+    def test_extracted_size_limit(self, upload_folder, fit_bytes, monkeypatch):
+        """Test that extraction stops once the extracted bytes exceed the limit, keeping no members."""
+        monkeypatch.setattr(Config, 'MAX_ARCHIVE_EXTRACTED_SIZE', len(fit_bytes) * 2 - 1)
+        archive = self._archive({f'{i}.fit': fit_bytes for i in range(3)})
+
+        with pytest.raises(UploadTooLargeError, match='extracts to more than'):
+            asyncio.run(uploads.save_uploads([UploadFile(archive, filename='export.zip')]))
+
+        assert os.listdir(upload_folder) == []
+
+        monkeypatch.setattr(Config, 'MAX_ARCHIVE_EXTRACTED_SIZE', len(fit_bytes) * 3)
+        archive.seek(0)
+        saved = asyncio.run(uploads.save_uploads([UploadFile(archive, filename='export.zip')]))
+        assert all(s.path for s in saved)
+
+
+def test_upload_path_is_unique(upload_folder):
+    """Test that files with the same name uploaded in the same second get different paths."""
+    paths = {uploads.upload_path('dir/run.fit') for _ in range(100)}
+
+    assert len(paths) == 100
+    assert all(os.path.dirname(path) == str(upload_folder) and path.endswith('_run.fit') for path in paths)
+
+
+def test_file_content_hash(tmp_path, fit_bytes):
+    """Test hashing a file already on disk."""
+    path = tmp_path / 'copy.fit'
+    path.write_bytes(fit_bytes)
+    assert uploads.file_content_hash(str(path)) == hashlib.sha256(fit_bytes).hexdigest()